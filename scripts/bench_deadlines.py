@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark kalendara rokova za cijeli ured
+
+Dashboard upit "sve što dospijeva u idućih 7 dana za sve klijente":
+dosadašnji put (po klijentu DeadlineTracker.get_upcoming + filtar
+profila) naspram materijaliziranog kalendara (jedan range scan po
+indeksu due_date). Mjeri i početnu materijalizaciju (24 mjeseca).
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_deadlines
+    PYTHONPATH=src python -m scripts.bench_deadlines --clients 150 --queries 200
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+from typing import Dict
+
+
+def run_benchmark(clients: int = 150, queries: int = 200) -> Dict[str, Dict]:
+    from nyx_light.modules.deadlines import DeadlineTracker, applies_to
+    from nyx_light.modules.deadlines.calendar import DeadlineCalendar
+
+    profiles = {f"K{i:03d}": {"pdv_mjesecna": i % 3 != 0, "revizijski_obveznik": i % 10 == 0}
+                for i in range(clients)}
+    start = date(2026, 1, 5)
+    days = [start + timedelta(days=i % 300) for i in range(queries)]
+    results = {}
+
+    t0 = time.perf_counter()
+    legacy_count = 0
+    for today in days:
+        for cid, profile in profiles.items():
+            tracker = DeadlineTracker()  # kao API handler: novi tracker po pozivu
+            legacy_count += sum(1 for dl in tracker.get_upcoming(7, today=today)
+                                if applies_to(dl["name"], profile))
+    results["legacy"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    cal = DeadlineCalendar()
+    t0 = time.perf_counter()
+    rows = cal.sync_clients(profiles, today=start)
+    results["materialize"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    t0 = time.perf_counter()
+    cal_count = sum(len(cal.upcoming(7, today=today)) for today in days)
+    results["calendar"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    results["meta"] = {"clients": clients, "queries": queries, "rows": rows,
+                       "legacy_hits": legacy_count, "calendar_hits": cal_count}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light deadline calendar benchmark")
+    parser.add_argument("--clients", type=int, default=150)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.clients, args.queries)
+    meta = res.pop("meta")
+    print(f"{meta['clients']} klijenata, {meta['queries']} upita, {meta['rows']} redaka kalendara, "
+          f"pogodaka legacy/kalendar: {meta['legacy_hits']}/{meta['calendar_hits']}")
+    for mode, r in res.items():
+        print(f"{mode:<12} {r['seconds']:>8}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark plana amortizacije (petlja vs NumPy)
+
+Registar od N sredstava, plan za cijeli korisni vijek. Uspoređuje
+dosadašnji put (calculate_monthly_depreciation + apply_depreciation
+mjesec po mjesec, petlja po sredstvima) s vektoriziranim planom
+(DepreciationSchedule.matrix_c), uz provjeru da su iznosi jednaki u
+centima. Mjeri i "stanje na dan" te godišnju projekciju.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_depreciation
+    PYTHONPATH=src python -m scripts.bench_depreciation --assets 20000 --years 20
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+
+VRSTE = ["računalna_oprema", "uredska_oprema", "namjestaj", "osobni_automobili",
+         "teretna_vozila", "strojevi_oprema", "građevinski_objekti"]
+
+
+def _assets(n: int, seed: int = 7) -> List[Dict]:
+    rnd = random.Random(seed)
+    return [
+        {"naziv": f"Sredstvo {i}", "vrsta": rnd.choice(VRSTE),
+         "nabavna_vrijednost": round(rnd.uniform(700, 250_000), 2),
+         "datum_aktivacije": "2026-01-01"}
+        for i in range(n)
+    ]
+
+
+def _legacy(assets, months: int) -> np.ndarray:
+    """Dosadašnja petlja (bez SQLite upisa) — mjesec × sredstvo."""
+    out = np.zeros((len(assets), months), dtype=np.int64)
+    pos = {a.id: i for i, a in enumerate(assets)}
+    for m in range(months):
+        for a in assets:
+            if a.potpuno_amortizirano:
+                continue
+            mjesecna = round(a.nabavna_vrijednost * a.godisnja_stopa / 100 / 12, 2)
+            preostalo = a.nabavna_vrijednost - a.ukupna_amortizacija
+            if mjesecna > preostalo:
+                mjesecna = round(preostalo, 2)
+            if mjesecna <= 0:
+                a.potpuno_amortizirano = True
+                continue
+            a.ukupna_amortizacija += mjesecna
+            out[pos[a.id], m] = round(mjesecna * 100)
+    return out
+
+
+def run_benchmark(assets: int = 20_000, years: int = 20) -> Dict[str, Dict]:
+    from nyx_light.modules.osnovna_sredstva import OsnovnaSredstvaEngine
+
+    engine = OsnovnaSredstvaEngine()
+    for a in _assets(assets):
+        engine.add_asset(a)
+    months = years * 12
+    results = {}
+
+    t0 = time.perf_counter()
+    legacy = _legacy(list(engine._assets.values()), months)
+    results["legacy_loop"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    t0 = time.perf_counter()
+    plan = engine.schedule()
+    matrix = plan.matrix_c("2026-01", 2026 * 12 + months - 1)
+    results["numpy_plan"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    t0 = time.perf_counter()
+    engine.get_as_of("2031-06-30")
+    results["as_of"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    t0 = time.perf_counter()
+    engine.project_year_end(2030)
+    results["year_end"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    t0 = time.perf_counter()
+    posting = engine.prepare_monthly_posting("2027-03")
+    results["month_posting"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    results["meta"] = {
+        "assets": assets, "months": months,
+        "mismatched_cells": int((legacy != matrix).sum()),
+        "posting_lines": len(posting["po_kontu"]) + 1,
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light depreciation schedule benchmark")
+    parser.add_argument("--assets", type=int, default=20_000)
+    parser.add_argument("--years", type=int, default=20)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.assets, args.years)
+    meta = res.pop("meta")
+    print(f"{meta['assets']} sredstava × {meta['months']} mjeseci, "
+          f"razlika u centima: {meta['mismatched_cells']} ćelija, "
+          f"knjiženje mjeseca: {meta['posting_lines']} stavke")
+    for mode, r in res.items():
+        print(f"{mode:<14} {r['seconds']:>8}s")
+
+
+if __name__ == "__main__":
+    main()
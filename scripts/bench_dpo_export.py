@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark DPO exporta (DPODatasetBuilder.export_dataset)
+
+Baza ispravaka nakon nekoliko godina rada: N parova, dio ponovljen
+(isti ispravak za istog dobavljača, razlika samo u razmacima/slovima).
+
+  • legacy     — dosadašnji export: svi parovi u listu, JSONL odjednom,
+                 zatim jedan UPDATE ... IN (...) u zasebnoj transakciji
+  • streaming  — blokovi po 500 (keyset), dedup po hashu sadržaja,
+                 shardovi, označavanje u istoj transakciji
+
+Mjeri se vrijeme i (u zasebnom prolazu) vršna Python memorija (tracemalloc).
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_dpo_export
+    PYTHONPATH=src python -m scripts.bench_dpo_export --pairs 200000 --dup 0.2
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Dict
+
+
+def _fill(db_path: str, pairs: int, dup: float, seed: int):
+    """Popuni bazu bez record_correction() (brže, isti format redova)."""
+    from nyx_light.memory.dpo import DPODatasetBuilder
+
+    DPODatasetBuilder(db_path=db_path)
+    rnd = random.Random(seed)
+    start = datetime(2023, 1, 1)
+    rows, uniques = [], []
+    for i in range(pairs):
+        if uniques and rnd.random() < dup:
+            prompt, chosen, rejected = rnd.choice(uniques)
+            prompt = f"  {prompt.upper()} "
+        else:
+            iznos = rnd.randint(10, 99999)
+            prompt = (f"Ulazni račun br. {i} dobavljača {rnd.randint(1, 800)} d.o.o., "
+                      f"iznos {iznos},00 EUR + PDV 25%, opis: uredski materijal i usluge")
+            chosen = f"Duguje 4010 {iznos},00 / Duguje 1400 PDV / Potražuje 2200"
+            rejected = f"Duguje 4090 {iznos},00 / Duguje 1400 PDV / Potražuje 2200"
+            uniques.append((prompt, chosen, rejected))
+        ts = (start + timedelta(minutes=7 * i)).isoformat()
+        rows.append((f"{i:016x}", ts, "u1", "K001", prompt, chosen, rejected,
+                     "konto_change", json.dumps({"modul": "kontiranje"})))
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            """INSERT INTO corrections (pair_id, timestamp, user_id, client_id, prompt,
+               chosen, rejected, correction_type, metadata_json)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+
+
+def _legacy_export(builder, output_path: str, limit: int) -> int:
+    """Dosadašnji export_dataset (get_unused_pairs → write → UPDATE IN)."""
+    with sqlite3.connect(builder.db_path) as conn:
+        rows = conn.execute(
+            """SELECT pair_id, timestamp, user_id, client_id, prompt, chosen,
+                      rejected, correction_type, metadata_json
+               FROM corrections WHERE used_in_training = 0
+               ORDER BY timestamp DESC LIMIT ?""", (limit,)).fetchall()
+    pairs = [builder._row_to_pair(r) for r in rows]
+    with open(output_path, "w", encoding="utf-8") as f:
+        for pair in pairs:
+            f.write(json.dumps(pair.to_dpo_format(), ensure_ascii=False) + "\n")
+    pair_ids = [p.pair_id for p in pairs]
+    with sqlite3.connect(builder.db_path) as conn:
+        for i in range(0, len(pair_ids), 30000):       # SQLITE_MAX_VARIABLE_NUMBER
+            part = pair_ids[i:i + 30000]
+            conn.execute(
+                f"UPDATE corrections SET used_in_training = 1 WHERE pair_id IN ({','.join('?' * len(part))})",
+                part)
+    return len(pairs)
+
+
+def run_benchmark(pairs: int = 50000, dup: float = 0.1, seed: int = 3) -> Dict[str, Dict]:
+    from nyx_light.memory.dpo import DPODatasetBuilder
+
+    results: Dict[str, Dict] = {}
+    tmp = tempfile.mkdtemp(prefix="nyx_dpo_bench_")
+    try:
+        template = os.path.join(tmp, "template.db")
+        _fill(template, pairs, dup, seed)
+        for mode in ("legacy", "streaming"):
+            # Dva prolaza: vrijeme bez tracemalloca (usporava alokacije), pa memorija
+            for traced in (False, True):
+                db_path = os.path.join(tmp, f"{mode}.db")
+                shutil.copy(template, db_path)
+                builder = DPODatasetBuilder(db_path=db_path)
+                out = os.path.join(tmp, f"{mode}_{traced}.jsonl")
+                if traced:
+                    tracemalloc.start()
+                t0 = time.perf_counter()
+                if mode == "legacy":
+                    written, dups, shards = _legacy_export(builder, out, pairs), 0, 1
+                else:
+                    res = builder.export_dataset(out, min_pairs=1, max_pairs=0,
+                                                 shard_bytes=16 * 1024 * 1024)
+                    written, dups, shards = res["pairs_count"], res["duplicates_skipped"], len(res["shards"])
+                elapsed = time.perf_counter() - t0
+                if traced:
+                    results[mode]["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+                    tracemalloc.stop()
+                else:
+                    results[mode] = {"seconds": round(elapsed, 3),
+                                     "written": written, "duplicates": dups, "shards": shards,
+                                     "unused_left": builder.get_stats()["unused_corrections"]}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    results["meta"] = {"pairs": pairs, "dup": dup}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light DPO export benchmark")
+    parser.add_argument("--pairs", type=int, default=50000)
+    parser.add_argument("--dup", type=float, default=0.1, help="udio ponovljenih ispravaka")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.pairs, args.dup)
+    meta = res.pop("meta")
+    print(f"{meta['pairs']} parova, {meta['dup']:.0%} ponovljenih")
+    for mode, r in res.items():
+        print(f"{mode:<10} {r['seconds']:>7}s  vršna memorija {r['peak_mb']:>7} MB  "
+              f"zapisano {r['written']:>7}  duplikata {r['duplicates']:>6}  "
+              f"shardova {r['shards']:>3}  neiskorišteno {r['unused_left']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark ERP izvoza (CPP XML / Synesis CSV / JSON)
+
+Mjeri propusnost (stavki/s) i vršnu memoriju streaming writera
+nad generatorom knjiženja iz SQLite baze, uz usporedbu s
+dosadašnjim pristupom (ElementTree → string → minidom pretty-print).
+
+Svaki scenarij se vrti u zasebnom procesu da ru_maxrss bude čist.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_export
+    PYTHONPATH=src python -m scripts.bench_export --rows 50000 --gzip
+"""
+
+import argparse
+import multiprocessing as mp
+import resource
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict
+from xml.dom import minidom
+
+
+def _seed_db(db_path: Path, rows: int):
+    from nyx_light.storage.sqlite_store import SQLiteStorage
+
+    st = SQLiteStorage(str(db_path))
+    st._conn.executemany(
+        """INSERT INTO bookings (id, client_id, document_type, konto_duguje, konto_potrazuje,
+               iznos, pdv_iznos, opis, oib, datum_dokumenta, datum_knjizenja, status)
+           VALUES (?, 'K1', 'ulazni_racun', '4000', '2200', ?, ?, ?, '12345678901',
+                   '2026-01-15', '2026-01-16', 'approved')""",
+        ((f"bk_{i}", 100 + i % 997, 25 + i % 97, f"Stavka {i} — usluga & materijal")
+         for i in range(rows)),
+    )
+    st._conn.commit()
+    st.close()
+
+
+def _legacy_cpp_xml(bookings, path: Path):
+    root = ET.Element("KnjizenjaImport")
+    stavke = ET.SubElement(root, "Stavke")
+    for i, b in enumerate(bookings, 1):
+        s = ET.SubElement(stavke, "Stavka")
+        ET.SubElement(s, "RedniBroj").text = str(i)
+        for k in ("konto_duguje", "konto_potrazuje", "opis", "oib", "datum_dokumenta"):
+            ET.SubElement(s, k).text = str(b.get(k, ""))
+        ET.SubElement(s, "Iznos").text = f"{b.get('iznos', 0):.2f}"
+    xml_str = minidom.parseString(ET.tostring(root, encoding="unicode")).toprettyxml(indent="  ")
+    path.write_text(xml_str, encoding="utf-8")
+
+
+def _run(mode: str, db_path: str, out_dir: str, compress: bool, queue):
+    from nyx_light.export import ERPExporter
+    from nyx_light.storage.sqlite_store import SQLiteStorage
+
+    st = SQLiteStorage(db_path)
+    exporter = ERPExporter(export_dir=out_dir)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+
+    if mode == "legacy_xml":
+        _legacy_cpp_xml(st.get_approved_bookings("K1"), Path(out_dir) / "legacy.xml")
+        records = st.count_approved_bookings("K1")
+    elif mode == "stream_xml":
+        records = exporter.export_cpp_xml(
+            st.iter_approved_bookings("K1"), "K1", compress=compress,
+            count=st.count_approved_bookings("K1"),
+        )["records"]
+    elif mode == "stream_csv":
+        records = exporter.export_synesis_csv(
+            st.iter_approved_bookings("K1"), "K1", compress=compress)["records"]
+    else:
+        records = exporter.export_synesis_json(
+            st.iter_approved_bookings("K1"), "K1", compress=compress)["records"]
+
+    elapsed = time.perf_counter() - t0
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    queue.put({
+        "mode": mode,
+        "records": records,
+        "seconds": round(elapsed, 3),
+        "lines_per_s": int(records / elapsed) if elapsed else 0,
+        "py_peak_mb": round(py_peak / 1e6, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+
+
+def run_benchmark(rows: int = 50_000, compress: bool = False) -> Dict[str, Dict]:
+    tmp = Path(tempfile.mkdtemp(prefix="nyx_bench_export_"))
+    db_path = tmp / "bench.db"
+    _seed_db(db_path, rows)
+
+    results = {}
+    ctx = mp.get_context("spawn")
+    for mode in ("legacy_xml", "stream_xml", "stream_csv", "stream_json"):
+        q = ctx.Queue()
+        p = ctx.Process(target=_run, args=(mode, str(db_path), str(tmp / "out"), compress, q))
+        p.start()
+        results[mode] = q.get()
+        p.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light ERP export benchmark")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--gzip", action="store_true", help="Komprimirani streaming izvoz")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.gzip)
+    print(f"{'mode':<12} {'records':>8} {'sec':>7} {'lines/s':>9} {'py_peak':>8} {'max_rss':>8}")
+    for r in results.values():
+        print(f"{r['mode']:<12} {r['records']:>8} {r['seconds']:>7} {r['lines_per_s']:>9} "
+              f"{r['py_peak_mb']:>7}M {r['max_rss_mb']:>7}M")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark godišnjeg GFI-a za sve klijente
+
+Dosadašnji put: za svakog klijenta zaseban upit za bruto bilancu, konto →
+AOP traženjem najduljeg prefiksa kroz sva pravila i zbrajanje pozicija u
+Pythonu. Naspram GFIBatch: jedan grupirani upit za salda svih klijenata,
+pravila u prefiksnom stablu (s memom po kontu), isti XML izlaz.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_gfi
+    PYTHONPATH=src python -m scripts.bench_gfi --clients 200 --bookings 500
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+from scripts.bench_kpi import _seed
+
+
+def _legacy(storage, clients, godina: int):
+    """Upit po klijentu (tri stanja) + linearno traženje pravila po kontu."""
+    from nyx_light.modules.gfi_xml import GFIXMLGenerator
+    from nyx_light.modules.gfi_xml.aop_mapping import (
+        AOP_PRAVILA, PASIVA, ZBROJEVI_BILANCA, ZBROJEVI_RDG, _zbroji,
+    )
+
+    def rule(konto):
+        best = None
+        for prefiks, izvjestaj, aop, predznak in AOP_PRAVILA:
+            if konto.startswith(prefiks) and (best is None or len(prefiks) > len(best[0])):
+                best = (prefiks, izvjestaj, aop, predznak)
+        return best
+
+    def aop(salda, pocetno):
+        poz = {"bilanca": {}, "rdg": {}}
+        for konto, centi in salda.items():
+            r = rule(konto)
+            if r and r[1]:
+                poz[r[1]][r[2]] = poz[r[1]].get(r[2], 0) + r[3] * centi
+        for konto, centi in pocetno.items():
+            r = rule(konto)
+            if r and r[1] == "rdg":
+                poz["rdg"][r[2]] = poz["rdg"].get(r[2], 0) - r[3] * centi
+                poz["bilanca"]["050"] = poz["bilanca"].get("050", 0) + PASIVA * centi
+        _zbroji(poz["rdg"], ZBROJEVI_RDG)
+        if not poz["bilanca"].get("051"):
+            poz["bilanca"]["051"] = poz["rdg"]["129"]
+        _zbroji(poz["bilanca"], ZBROJEVI_BILANCA)
+        return {k: {a: v / 100 for a, v in p.items() if v} for k, p in poz.items()}
+
+    gen = GFIXMLGenerator()
+    out = {}
+    for client in clients:
+        stanja = []
+        for g in (godina, godina - 1, godina - 2):
+            salda: Dict[str, int] = {}
+            for konto, centi in storage._conn.execute(
+                    """SELECT konto_duguje, SUM(CAST(ROUND(iznos * 100) AS INTEGER)) FROM bookings
+                       WHERE client_id=? AND status='approved' AND datum_dokumenta < ?
+                       GROUP BY 1
+                       UNION ALL
+                       SELECT konto_potrazuje, -SUM(CAST(ROUND(iznos * 100) AS INTEGER))
+                       FROM bookings
+                       WHERE client_id=? AND status='approved' AND datum_dokumenta < ?
+                       GROUP BY 1""",
+                    (client, f"{g + 1}-01-01", client, f"{g + 1}-01-01")):
+                salda[konto] = salda.get(konto, 0) + centi
+            stanja.append(salda)
+        tekuce, prethodno = aop(stanja[0], stanja[1]), aop(stanja[1], stanja[2])
+        bil = gen.generate_bilanca(tekuce["bilanca"], prethodno["bilanca"], godina=godina)
+        rdg = gen.generate_rdg(tekuce["rdg"], prethodno["rdg"], godina=godina)
+        out[client] = (gen.to_xml(bil), gen.to_xml(rdg))
+    return out
+
+
+def run_benchmark(clients: int = 1000, bookings: int = 400, legacy: bool = True) -> Dict[str, Dict]:
+    from nyx_light.modules.gfi_xml.aop_mapping import GFIBatch
+    from nyx_light.storage.sqlite_store import SQLiteStorage
+
+    tmp = Path(tempfile.mkdtemp(prefix="nyx_gfi_"))
+    storage = SQLiteStorage(str(tmp / "nyx.db"))
+    n = _seed(storage, clients, bookings, years=3)
+    ids = storage.list_booking_clients()
+    results: Dict[str, Dict] = {}
+
+    if legacy:
+        t0 = time.perf_counter()
+        _legacy(storage, ids, 2025)
+        results["legacy"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    t0 = time.perf_counter()
+    rez = GFIBatch().run_from_storage(storage, 2025)
+    sec = time.perf_counter() - t0
+    per_client = sorted(r["seconds"] for r in rez["rezultati"])
+    results["batch"] = {"seconds": round(sec, 3), "query_s": round(sec - rez["seconds"], 3),
+                        "p50_client_ms": round(per_client[len(per_client) // 2] * 1000, 2),
+                        "max_client_ms": round(per_client[-1] * 1000, 2)}
+    results["meta"] = {"clients": len(ids), "bookings": n, "balanced": rez["balanced"]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light GFI batch benchmark")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=400)
+    parser.add_argument("--no-legacy", action="store_true")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.clients, args.bookings, legacy=not args.no_legacy)
+    meta = res.pop("meta")
+    print(f"{meta['clients']} klijenata, {meta['bookings']} knjiženja, "
+          f"{meta['balanced']} bilanci u ravnoteži")
+    for mode, r in res.items():
+        extra = "".join(f"  {k}={v}" for k, v in r.items() if k != "seconds")
+        print(f"{mode:<8} {r['seconds']:>8}s{extra}")
+
+
+if __name__ == "__main__":
+    main()
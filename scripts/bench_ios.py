@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark godišnje IOS kampanje
+
+Svi partneri svih klijenata iz spremljenih knjiženja (SQLiteStorage):
+dosadašnji put (po partneru upit + obični openpyxl workbook ćeliju po
+ćeliju) naspram IOSCampaign (jedan upit, grupiranje u jednom prolazu,
+write-only renderiranje, opcionalno u process poolu, spremanje u SQLite).
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_ios
+    PYTHONPATH=src python -m scripts.bench_ios --clients 20 --partners 50 --items 8 --workers 4
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+
+def _seed(storage, clients: int, partners: int, items: int, seed: int = 7) -> int:
+    rnd = random.Random(seed)
+    rows = []
+    for c in range(clients):
+        for p in range(partners):
+            for i in range(items):
+                izlazni = rnd.random() < 0.5
+                rows.append((f"bk-{c}-{p}-{i}", f"K{c:03d}",
+                             "izlazni_racun" if izlazni else "ulazni_racun",
+                             round(rnd.uniform(10, 20000), 2), f"Račun {i}", f"{p:011d}",
+                             f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"))
+    storage._conn.executemany(
+        "INSERT INTO bookings (id, client_id, document_type, iznos, opis, oib, "
+        "datum_dokumenta, status) VALUES (?, ?, ?, ?, ?, ?, ?, 'approved')", rows)
+    storage._conn.commit()
+    return len(rows)
+
+
+def _legacy_excel(form, filepath: Path):
+    """Dosadašnji IOSReconciliation._generate_excel (obični workbook, ćelija po ćelija)."""
+    import openpyxl
+    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "IOS"
+
+    # Styles
+    bold = Font(bold=True)
+    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    center = Alignment(horizontal="center")
+    thin = Side(border_style="thin")
+    border = Border(top=thin, bottom=thin, left=thin, right=thin)
+
+    # Title
+    ws.merge_cells("A1:G1")
+    ws["A1"] = "IZVOD OTVORENIH STAVKI (IOS)"
+    ws["A1"].font = Font(bold=True, size=14)
+    ws["A1"].alignment = center
+
+    # Client info
+    ws["A3"] = "Tvrtka:"
+    ws["B3"] = form.client_name
+    ws["A4"] = "OIB:"
+    ws["B4"] = form.client_oib
+    ws["A5"] = "Partner:"
+    ws["B5"] = form.partner_name
+    ws["A6"] = "Partner OIB:"
+    ws["B6"] = form.partner_oib
+    ws["A7"] = "Razdoblje:"
+    ws["B7"] = f"{form.datum_od} — {form.datum_do}"
+    ws["A8"] = "Datum izrade:"
+    ws["B8"] = datetime.now().strftime("%d.%m.%Y.")
+
+    for r in range(3, 9):
+        ws[f"A{r}"].font = bold
+
+    # Headers
+    headers = ["R.br.", "Broj dokumenta", "Datum dokumenta",
+               "Datum dospijeća", "Opis", "Duguje (EUR)", "Potražuje (EUR)"]
+    for col, h in enumerate(headers, 1):
+        cell = ws.cell(row=10, column=col, value=h)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = center
+        cell.border = border
+
+    # Data
+    for i, stavka in enumerate(form.stavke, 1):
+        row = 10 + i
+        ws.cell(row=row, column=1, value=i).border = border
+        ws.cell(row=row, column=2, value=stavka.broj_dokumenta).border = border
+        ws.cell(row=row, column=3, value=stavka.datum_dokumenta).border = border
+        ws.cell(row=row, column=4, value=stavka.datum_dospijeca).border = border
+        ws.cell(row=row, column=5, value=stavka.opis).border = border
+        c_dug = ws.cell(row=row, column=6, value=stavka.duguje)
+        c_dug.number_format = "#,##0.00"
+        c_dug.border = border
+        c_pot = ws.cell(row=row, column=7, value=stavka.potrazuje)
+        c_pot.number_format = "#,##0.00"
+        c_pot.border = border
+
+    # Totals
+    total_row = 11 + len(form.stavke)
+    ws.merge_cells(f"A{total_row}:E{total_row}")
+    ws[f"A{total_row}"] = "UKUPNO:"
+    ws[f"A{total_row}"].font = bold
+    ws[f"A{total_row}"].alignment = Alignment(horizontal="right")
+    c = ws.cell(row=total_row, column=6, value=form.ukupno_duguje)
+    c.font = bold
+    c.number_format = "#,##0.00"
+    c.border = border
+    c = ws.cell(row=total_row, column=7, value=form.ukupno_potrazuje)
+    c.font = bold
+    c.number_format = "#,##0.00"
+    c.border = border
+
+    saldo_row = total_row + 1
+    ws.merge_cells(f"A{saldo_row}:E{saldo_row}")
+    ws[f"A{saldo_row}"] = "SALDO:"
+    ws[f"A{saldo_row}"].font = Font(bold=True, size=12)
+    ws[f"A{saldo_row}"].alignment = Alignment(horizontal="right")
+    c = ws.cell(row=saldo_row, column=6, value=form.saldo)
+    c.font = Font(bold=True, size=12, color="FF0000" if form.saldo != 0 else "000000")
+    c.number_format = "#,##0.00"
+
+    # Confirmation section
+    conf_row = saldo_row + 3
+    ws[f"A{conf_row}"] = "POTVRDA USKLAĐENJA:"
+    ws[f"A{conf_row}"].font = bold
+    ws[f"A{conf_row + 1}"] = "□ Potvrđujem gornji saldo"
+    ws[f"A{conf_row + 2}"] = "□ Osporavam — priložen korigirani IOS"
+    ws[f"A{conf_row + 4}"] = "Potpis i pečat: ___________________"
+    ws[f"A{conf_row + 5}"] = "Datum: ___________________"
+
+    # Column widths
+    widths = [6, 18, 16, 16, 30, 15, 15]
+    for i, w in enumerate(widths, 1):
+        ws.column_dimensions[chr(64 + i)].width = w
+
+    wb.save(filepath)
+
+
+def run_benchmark(clients: int = 20, partners: int = 50, items: int = 8,
+                  workers: int = 0) -> Dict[str, Dict]:
+    from nyx_light.modules.ios_reconciliation.campaign import (
+        IOSCampaign, IOSStore, group_open_items,
+    )
+    from nyx_light.storage.sqlite_store import SQLiteStorage
+
+    workers = workers or os.cpu_count() or 1
+    tmp = Path(tempfile.mkdtemp(prefix="nyx_ios_"))
+    storage = SQLiteStorage(str(tmp / "nyx.db"))
+    n_items = _seed(storage, clients, partners, items)
+    results = {}
+
+    # Legacy: upit po (klijent, partner), obrazac po obrazac, forme u dictu
+    t0 = time.perf_counter()
+    forms_mem = {}
+    legacy_dir = tmp / "legacy"
+    legacy_dir.mkdir()
+    pairs = storage._conn.execute(
+        "SELECT DISTINCT client_id, oib FROM bookings WHERE status='approved'").fetchall()
+    for cid, oib in pairs:
+        its = [{"client_id": cid, "partner_oib": oib, "broj_dokumenta": r[0],
+                "datum_dokumenta": r[1], "opis": r[2],
+                "duguje": r[4] if r[3] == "izlazni_racun" else 0.0,
+                "potrazuje": 0.0 if r[3] == "izlazni_racun" else r[4]}
+               for r in storage._conn.execute(
+                   "SELECT id, datum_dokumenta, opis, document_type, iznos FROM bookings "
+                   "WHERE client_id=? AND oib=? AND status='approved' ORDER BY datum_dokumenta",
+                   (cid, oib))]
+        form = group_open_items(its, "2026-01-01", "2026-12-31")[(cid, oib)]
+        fid = f"IOS-{cid}-{oib}-2026-12-31"
+        forms_mem[fid] = form
+        _legacy_excel(form, legacy_dir / f"{fid}.xlsx")
+    sec = time.perf_counter() - t0
+    results["legacy"] = {"seconds": round(sec, 3), "forms_per_s": round(len(pairs) / sec, 1)}
+
+    for mode, w in (("campaign_1", 1), (f"campaign_{workers}", workers)):
+        if mode in results:
+            continue
+        store = IOSStore(str(tmp / f"{mode}.db"))
+        rez = IOSCampaign(store, str(tmp / mode)).run_from_storage(
+            storage, "2026-12-31", "2026-01-01", workers=w)
+        results[mode] = {"seconds": rez["seconds"], "forms_per_s": rez["forms_per_s"],
+                         "render_s": rez["render_seconds"]}
+
+    results["meta"] = {"clients": clients, "forms": len(pairs), "items": n_items,
+                       "cpus": os.cpu_count()}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light IOS campaign benchmark")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--partners", type=int, default=50)
+    parser.add_argument("--items", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=0, help="0 = os.cpu_count()")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.clients, args.partners, args.items, args.workers)
+    meta = res.pop("meta")
+    print(f"{meta['clients']} klijenata, {meta['forms']} IOS obrazaca, {meta['items']} stavki, "
+          f"{meta['cpus']} CPU")
+    for mode, r in res.items():
+        print(f"{mode:<14} {r['seconds']:>8}s  {r['forms_per_s']:>7} obrazaca/s")
+
+
+if __name__ == "__main__":
+    main()
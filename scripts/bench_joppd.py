@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark JOPPD XML generiranja
+
+Uspoređuje dosadašnji put (ElementTree → string → minidom pretty-print)
+sa streaming writerom — iz punog obrasca i direktno iz vektoriziranog
+payroll batcha (stavke se ne drže u memoriji).
+
+Svaki scenarij se vrti u zasebnom procesu da ru_maxrss bude čist.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_joppd
+    PYTHONPATH=src python -m scripts.bench_joppd --stavke 10000
+"""
+
+import argparse
+import multiprocessing as mp
+import resource
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict
+from xml.dom import minidom
+
+from scripts.bench_payroll import _employees
+
+
+def _legacy_to_xml(obrazac) -> str:
+    root = ET.Element("JOPPD")
+    stranica_b = ET.SubElement(root, "StranicaB")
+    for s in obrazac.stavke:
+        st = ET.SubElement(stranica_b, "Stavka")
+        ET.SubElement(st, "RedniBroj").text = str(s.redni_broj)
+        ET.SubElement(st, "ImePrezime").text = s.ime_prezime
+        for tag, v in (("BrutoIznos", s.bruto), ("MIO1", s.mio_stup_1), ("MIO2", s.mio_stup_2),
+                       ("Dohodak", s.dohodak), ("OsobniOdbitak", s.osobni_odbitak),
+                       ("PoreznaOsnovica", s.porezna_osnovica), ("Porez", s.porez),
+                       ("Prirez", s.prirez), ("Neto", s.neto), ("Zdravstveno", s.zdravstveno)):
+            ET.SubElement(st, tag).text = f"{v:.2f}"
+        ET.SubElement(st, "DatumOd").text = s.datum_od
+        ET.SubElement(st, "DatumDo").text = s.datum_do
+    return minidom.parseString(ET.tostring(root, encoding="unicode")).toprettyxml(indent="  ")
+
+
+def _run(mode: str, n: int, out_dir: str, queue):
+    from nyx_light.modules.joppd import JOPPDGenerator
+    from nyx_light.modules.payroll import PayrollEngine
+
+    batch = PayrollEngine().calculate_batch(_employees(n))
+    gen = JOPPDGenerator()
+    obrazac = gen.new_obrazac("12345678903", "Bench d.o.o.", period_month=2, period_year=2026)
+    out = Path(out_dir) / f"{mode}.xml"
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        gen.add_payroll_batch(obrazac, batch)
+        out.write_text(_legacy_to_xml(obrazac), encoding="utf-8")
+        records = len(obrazac.stavke)
+    elif mode == "stream_obrazac":
+        gen.add_payroll_batch(obrazac, batch)
+        records = gen.export_xml(obrazac, str(out))["records"]
+    else:
+        records = gen.export_xml(obrazac, str(out), stavke=gen.stavke_from_batch(batch, 2026, 2))["records"]
+    elapsed = time.perf_counter() - t0
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    bruto = (obrazac.ukupno_bruto if obrazac.stavke       # streaming: obrazac se ne mijenja
+             else float(ET.parse(out).getroot().findtext(".//{*}UkupnoBruto")))
+
+    queue.put({
+        "mode": mode,
+        "records": records,
+        "seconds": round(elapsed, 3),
+        "stavki_per_s": int(records / elapsed) if elapsed else 0,
+        "py_peak_mb": round(py_peak / 1e6, 1),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "ukupno_bruto": bruto,
+    })
+
+
+def run_benchmark(stavke: int = 10_000) -> Dict[str, Dict]:
+    tmp = tempfile.mkdtemp(prefix="nyx_bench_joppd_")
+    results = {}
+    ctx = mp.get_context("spawn")
+    for mode in ("legacy", "stream_obrazac", "stream_batch"):
+        q = ctx.Queue()
+        p = ctx.Process(target=_run, args=(mode, stavke, tmp, q))
+        p.start()
+        results[mode] = q.get()
+        p.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light JOPPD XML benchmark")
+    parser.add_argument("--stavke", type=int, default=10_000)
+    args = parser.parse_args()
+
+    results = run_benchmark(args.stavke)
+    print(f"{'mode':<15} {'stavki':>7} {'sec':>7} {'stavki/s':>9} {'py_peak':>8} {'max_rss':>8} {'bruto':>14}")
+    for r in results.values():
+        print(f"{r['mode']:<15} {r['records']:>7} {r['seconds']:>7} {r['stavki_per_s']:>9} "
+              f"{r['py_peak_mb']:>7}M {r['max_rss_mb']:>7}M {r['ukupno_bruto']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
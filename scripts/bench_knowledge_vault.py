@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark integritetnih manifesta (KnowledgeVault)
+
+Privremeno stablo u obliku data/: puno malih datoteka (memorija, DPO
+JSONL, RAG segmenti) + nekoliko velikih LoRA adaptera. Mjeri se ono
+što safe_swap radi: create_manifest() prije zamjene i verify_manifest()
+nakon nje.
+
+  • legacy        — dosadašnji kod: SHA-256, 64 KB čitanja, sve ispočetka
+  • sha256_cold   — prvi manifest (prazan cache, paralelno, 1 MB čitanja)
+  • sha256_warm   — sljedeća zamjena: promijenjena 1 datoteka, ostalo iz cachea
+  • blake2b_cold  — kao sha256_cold, ali BLAKE2b
+
+Datoteke su nakon pisanja u page cacheu, pa je mjerenje CPU-bound
+(na disku bez cachea paralelno čitanje dobiva još više).
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_knowledge_vault
+    PYTHONPATH=src python -m scripts.bench_knowledge_vault --small 5000 --large 16 --large-mb 64
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+def _legacy_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _legacy_manifest(base: Path) -> Dict[str, str]:
+    """Dosadašnji create_manifest (redoslijed i hashiranje)."""
+    from nyx_light.silicon.knowledge_vault import KNOWLEDGE_PATHS
+
+    hashes = {}
+    for kp in KNOWLEDGE_PATHS:
+        path = base / kp
+        if path.is_file():
+            hashes[kp] = _legacy_sha256(path)
+        elif path.is_dir():
+            for f in sorted(path.rglob("*")):
+                if f.is_file():
+                    hashes[str(f.relative_to(base))] = _legacy_sha256(f)
+    return hashes
+
+
+def _legacy_verify(base: Path, hashes: Dict[str, str]) -> List[str]:
+    return [rel for rel, h in hashes.items()
+            if not (base / rel).exists() or _legacy_sha256(base / rel) != h]
+
+
+def _build_tree(base: Path, small: int, large: int, large_mb: int, seed: int) -> Tuple[int, Path]:
+    """Knowledge stablo s mtime u prošlosti → (ukupno bajtova, mala datoteka za izmjenu)."""
+    rnd = random.Random(seed)
+    dirs = ["data/memory_db", "data/dpo_datasets", "data/rag_db/collection/segments",
+            "data/laws", "data/exports/2026", "data/logs"]
+    total, touched = 0, None
+    for i in range(small):
+        path = base / rnd.choice(dirs) / f"part_{i:05d}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = rnd.randbytes(rnd.randint(2, 64) * 1024)
+        path.write_bytes(data)
+        total += len(data)
+        touched = touched or path
+    block = rnd.randbytes(1 << 20)
+    for i in range(large):
+        path = base / f"data/models/lora/adapter_v{i}/adapters.safetensors"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            for _ in range(large_mb):
+                f.write(block)
+        total += large_mb << 20
+    old = time.time() - 3600
+    for path in base.rglob("*"):
+        if path.is_file():
+            os.utime(path, (old, old))
+    return total, touched
+
+
+def _touch(path: Path):
+    data = bytearray(path.read_bytes())
+    data[0] ^= 0xFF
+    path.write_bytes(bytes(data))
+    old = time.time() - 60
+    os.utime(path, (old, old))
+
+
+def run_benchmark(small: int = 2000, large: int = 8, large_mb: int = 24,
+                  seed: int = 5) -> Dict[str, Dict]:
+    from nyx_light.silicon.knowledge_vault import HASH_WORKERS, KnowledgeVault
+
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory(prefix="nyx_vault_bench_") as tmp:
+        base = Path(tmp)
+        total, touched = _build_tree(base, small, large, large_mb, seed)
+        _legacy_manifest(base)                       # zagrijavanje page cachea
+
+        t0 = time.perf_counter()
+        hashes = _legacy_manifest(base)
+        t1 = time.perf_counter()
+        bad = _legacy_verify(base, hashes)
+        results["legacy"] = {"create_s": round(t1 - t0, 3),
+                             "verify_s": round(time.perf_counter() - t1, 3),
+                             "read_mb": round(2 * total / 2 ** 20, 1), "ok": not bad}
+
+        for mode, algo in (("sha256_cold", "sha256"), ("sha256_warm", "sha256"),
+                           ("blake2b_cold", "blake2b")):
+            if mode == "sha256_warm":
+                _touch(touched)
+            else:
+                (base / "data/models/manifest_hash_cache.json").unlink(missing_ok=True)
+            vault = KnowledgeVault(base_dir=tmp, hash_algorithm=algo)
+            t0 = time.perf_counter()
+            manifest = vault.create_manifest()
+            read = vault.last_hash_stats["rehashed_bytes"]
+            t1 = time.perf_counter()
+            ok, _ = vault.verify_manifest(manifest)
+            read += vault.last_hash_stats["rehashed_bytes"]
+            results[mode] = {"create_s": round(t1 - t0, 3),
+                             "verify_s": round(time.perf_counter() - t1, 3),
+                             "read_mb": round(read / 2 ** 20, 1), "ok": ok}
+            if mode == "sha256_cold":
+                results[mode]["same_hashes"] = manifest.file_hashes == hashes
+
+    results["meta"] = {"files": small + large, "total_mb": round(total / 2 ** 20, 1),
+                       "workers": HASH_WORKERS, "cpus": os.cpu_count()}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light KnowledgeVault manifest benchmark")
+    parser.add_argument("--small", type=int, default=2000, help="broj malih datoteka (2-64 KB)")
+    parser.add_argument("--large", type=int, default=8, help="broj LoRA adaptera")
+    parser.add_argument("--large-mb", type=int, default=24, help="veličina adaptera (MB)")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.small, args.large, args.large_mb)
+    meta = res.pop("meta")
+    print(f"{meta['files']} datoteka, {meta['total_mb']} MB, "
+          f"{meta['workers']} hash dretvi ({meta['cpus']} CPU)")
+    for mode, r in res.items():
+        print(f"{mode:<13} create {r['create_s']:>7}s  verify {r['verify_s']:>7}s  "
+              f"pročitano {r['read_mb']:>7} MB  ok {r['ok']}"
+              + (f"  isti hashevi kao legacy: {r['same_hashes']}" if "same_hashes" in r else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark multilateralne kompenzacije
+
+Slučajni graf dugova (N tvrtki, ~K dugova po tvrtki, kao FINA sesija):
+dosadašnji DFS (prvi pronađeni ciklus, max 5 članova) naspram
+pohlepnog poništavanja ciklusa i optimalnog rješavača (SCC + min-cost
+tok). Uspoređuje se udio zatvorenih obveza i vrijeme.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_kompenzacije
+    PYTHONPATH=src python -m scripts.bench_kompenzacije --companies 5000 --degree 5
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, Tuple
+
+
+def _random_debts(companies: int, degree: int, seed: int) -> Dict[Tuple[str, str], int]:
+    rnd = random.Random(seed)
+    debts: Dict[Tuple[str, str], int] = {}
+    for a in range(companies):
+        for _ in range(degree):
+            b = rnd.randrange(companies)
+            if b != a:
+                key = (f"{a:011d}", f"{b:011d}")
+                debts[key] = debts.get(key, 0) + rnd.randint(100, 10_000_000)
+    return debts
+
+
+def _legacy_first_cycle(debts: Dict[Tuple[str, str], int]) -> int:
+    """Stari KompenzacijeEngine.find_multilateral: prvi DFS ciklus (3-5 članova)."""
+    graph: Dict[str, Dict[str, int]] = {}
+    for (a, b), c in debts.items():
+        graph.setdefault(a, {})[b] = c
+
+    def find(current, target, path, visited):
+        if len(path) > 5:
+            return False
+        for nb in graph.get(current, {}):
+            if nb == target and len(path) > 2:
+                path.append(target)
+                return True
+            if nb not in visited:
+                visited.add(nb)
+                path.append(nb)
+                if find(nb, target, path, visited):
+                    return True
+                path.pop()
+                visited.discard(nb)
+        return False
+
+    for start in graph:
+        path = [start]
+        if find(start, start, path, {start}):
+            amt = min(graph[path[i]][path[i + 1]] for i in range(len(path) - 1))
+            return amt * (len(path) - 1)
+    return 0
+
+
+def run_benchmark(companies: int = 2000, degree: int = 5, seed: int = 7) -> Dict[str, Dict]:
+    from nyx_light.modules.kompenzacije import multilateral
+    from nyx_light.modules.kompenzacije.multilateral import solve_multilateral
+
+    debts = _random_debts(companies, degree, seed)
+    total = sum(debts.values())
+    results = {}
+
+    t0 = time.perf_counter()
+    closed = _legacy_first_cycle(debts)
+    results["legacy_dfs"] = {"seconds": round(time.perf_counter() - t0, 3),
+                             "closed_pct": round(100 * closed / total, 2), "cycles": int(closed > 0)}
+
+    # Samo pohlepna faza: min-cost optimizacija odmah "istječe"
+    orig = multilateral._Component.optimize
+    multilateral._Component.optimize = lambda self, deadline: False
+    try:
+        t0 = time.perf_counter()
+        rez = solve_multilateral(debts)
+    finally:
+        multilateral._Component.optimize = orig
+    results["greedy"] = {"seconds": round(time.perf_counter() - t0, 3),
+                         "closed_pct": round(100 * rez["zatvoreno_c"] / total, 2),
+                         "cycles": len(rez["ciklusi"])}
+
+    t0 = time.perf_counter()
+    rez = solve_multilateral(debts)
+    results["optimal"] = {"seconds": round(time.perf_counter() - t0, 3),
+                          "closed_pct": round(100 * rez["zatvoreno_c"] / total, 2),
+                          "cycles": len(rez["ciklusi"])}
+
+    results["meta"] = {"companies": companies, "debts": len(debts),
+                       "components": rez["stats"]["komponenti"], "optimal": rez["optimalno"]}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light multilateral netting benchmark")
+    parser.add_argument("--companies", type=int, default=2000)
+    parser.add_argument("--degree", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.companies, args.degree, args.seed)
+    meta = res.pop("meta")
+    print(f"{meta['companies']} tvrtki, {meta['debts']} dugova, "
+          f"{meta['components']} netrivijalnih SCC, optimalno={meta['optimal']}")
+    for mode, r in res.items():
+        print(f"{mode:<12} {r['seconds']:>8}s  zatvoreno {r['closed_pct']:>6}%  ciklusa {r['cycles']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark KPI trenda (svi klijenti × 5 godina)
+
+Dosadašnji put: za svaki (klijent, godina) zaseban upit za salda konta,
+FinancialData složen u Pythonu i KPIDashboard.calculate_all. Naspram
+KPIEngine: jedan grupirani upit, NumPy nad poljem klijent × mjesec × polje,
+te ponovljeni upit iz cachea zatvorenih perioda.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_kpi
+    PYTHONPATH=src python -m scripts.bench_kpi --clients 200 --bookings 500
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+KONTA = ["0220", "1000", "1200", "1230", "1400", "1500", "2000", "3000", "4000",
+         "4200", "5000", "5200", "5300", "6000", "6020", "6200", "7610", "8300"]
+
+
+def _seed(storage, clients: int, bookings: int, years: int, seed: int = 7) -> int:
+    rnd = random.Random(seed)
+    last = 2025
+    rows = []
+    for c in range(clients):
+        for i in range(bookings):
+            d, p = rnd.sample(KONTA, 2)
+            rows.append((f"b{c}-{i}", f"K{c:04d}", "temeljnica", d, p,
+                         round(rnd.uniform(10, 50_000), 2),
+                         f"{rnd.randint(last - years + 1, last)}-{rnd.randint(1, 12):02d}-"
+                         f"{rnd.randint(1, 28):02d}"))
+    storage._conn.executemany(
+        "INSERT INTO bookings (id, client_id, document_type, konto_duguje, konto_potrazuje, "
+        "iznos, datum_dokumenta, status) VALUES (?, ?, ?, ?, ?, ?, ?, 'approved')", rows)
+    storage._conn.commit()
+    return len(rows)
+
+
+def _legacy(storage, clients, years):
+    """Upit po (klijent, godina) + FinancialData + calculate_all."""
+    from nyx_light.modules.kpi import FinancialData, KPIDashboard
+    from nyx_light.modules.kpi.engine import STANJA, TOKOVI
+    dash = KPIDashboard()
+    out = {}
+    for client in clients:
+        for year in years:
+            salda: Dict[str, float] = {}
+            stanja: Dict[str, float] = {}
+            for konto, strana, iznos, u_godini in storage._conn.execute(
+                    """SELECT konto_duguje, 1, SUM(iznos), datum_dokumenta >= ? FROM bookings
+                       WHERE client_id=? AND status='approved' AND datum_dokumenta < ?
+                       GROUP BY 1, 4
+                       UNION ALL
+                       SELECT konto_potrazuje, -1, SUM(iznos), datum_dokumenta >= ? FROM bookings
+                       WHERE client_id=? AND status='approved' AND datum_dokumenta < ?
+                       GROUP BY 1, 4""",
+                    (f"{year}-01-01", client, f"{year + 1}-01-01") * 2):
+                stanja[konto] = stanja.get(konto, 0) + strana * iznos
+                if u_godini:
+                    salda[konto] = salda.get(konto, 0) + strana * iznos
+
+            def zbroj(pravila, izvor):
+                return sum(znak * v for k, v in izvor.items()
+                           for prefiks, znak in pravila if k.startswith(prefiks))
+
+            v = {p: zbroj(r, stanja) for p, r in STANJA.items()}
+            v.update({p: zbroj(r, salda) for p, r in TOKOVI.items()})
+            dobit = v["prihodi"] - v["rashodi"]
+            neto = dobit - v.pop("porez_na_dobit")
+            v["kapital"] += neto
+            data = FinancialData(**v, ukupne_obveze=v["kratkorocne_obveze"] + v["dugorocne_obveze"],
+                                 dobit_prije_oporezivanja=dobit, neto_dobit=neto)
+            out[(client, str(year))] = dash.calculate_all(data)
+    return out
+
+
+def run_benchmark(clients: int = 1000, bookings: int = 400, years: int = 5,
+                  legacy: bool = True) -> Dict[str, Dict]:
+    from nyx_light.modules.kpi.engine import KPIEngine
+    from nyx_light.storage.sqlite_store import SQLiteStorage
+
+    tmp = Path(tempfile.mkdtemp(prefix="nyx_kpi_"))
+    storage = SQLiteStorage(str(tmp / "nyx.db"))
+    n = _seed(storage, clients, bookings, years)
+    periods = [str(y) for y in range(2025 - years + 1, 2026)]
+    client_ids = storage.list_booking_clients()
+    results = {}
+
+    if legacy:
+        t0 = time.perf_counter()
+        _legacy(storage, client_ids, range(2025 - years + 1, 2026))
+        results["legacy"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    engine = KPIEngine()
+    t0 = time.perf_counter()
+    engine.compute(storage, periods)
+    results["engine"] = {"seconds": round(time.perf_counter() - t0, 3)}
+    t0 = time.perf_counter()
+    engine.trend(storage, periods)
+    results["engine_trend_cold"] = {"seconds": round(time.perf_counter() - t0, 3)}
+    t0 = time.perf_counter()
+    engine.trend(storage, periods)
+    results["engine_trend_cached"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    results["meta"] = {"clients": clients, "bookings": n, "periods": len(periods)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light KPI engine benchmark")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=400, help="knjiženja po klijentu")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--no-legacy", action="store_true")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.clients, args.bookings, args.years, not args.no_legacy)
+    meta = res.pop("meta")
+    print(f"{meta['clients']} klijenata × {meta['periods']} godina, {meta['bookings']} knjiženja")
+    for mode, r in res.items():
+        print(f"{mode:<20} {r['seconds']:>8}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark micro-batchinga chat upita
+
+Stub vllm-mlx servera s jednim "GPU-om": prolazi se izvršavaju serijski,
+a prolaz s n promptova traje ``base + n × per_item`` (težine se čitaju
+jednom po koraku dekodiranja, pa batch amortizira ``base``).
+15 korisnika istovremeno šalje upite kroz ChatBridge.chat:
+dosadašnji put (novi AsyncClient i zaseban /v1/chat/completions po upitu)
+naspram RequestCoalescera (prozor od nekoliko ms, jedan batch completion).
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_llm_batch
+    PYTHONPATH=src python -m scripts.bench_llm_batch --users 15 --rounds 5
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+
+def _last_user(prompt: str) -> str:
+    """Zadnja korisnička poruka iz ChatML prompta (ili cijeli prompt)."""
+    if "<|im_start|>user\n" not in prompt:
+        return prompt
+    return prompt.rsplit("<|im_start|>user\n", 1)[1].split("<|im_end|>", 1)[0]
+
+
+class BatchStubServer:
+    """OpenAI-kompatibilan stub: /v1/completions (str ili lista) i /v1/chat/completions."""
+
+    def __init__(self, base: float = 0.08, per_item: float = 0.01, accept_lists: bool = True,
+                 list_error: str = "prompt must be a string"):
+        stub = self
+        self.base = base
+        self.per_item = per_item
+        self.accept_lists = accept_lists
+        self.list_error = list_error         # tekst 400 odgovora na listu promptova
+        self.calls: List[int] = []           # broj promptova po HTTP pozivu
+        self._gpu = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code: int, payload: Dict):
+                body = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if self.path == "/v1/chat/completions":
+                    prompts = [body["messages"][-1]["content"]]
+                else:
+                    prompts = body["prompt"] if isinstance(body["prompt"], list) else [body["prompt"]]
+                    if isinstance(body["prompt"], list) and not stub.accept_lists:
+                        self._send(400, {"error": stub.list_error})
+                        return
+                stub.calls.append(len(prompts))
+                with stub._gpu:
+                    time.sleep(stub.base + stub.per_item * len(prompts))
+                texts = [f"odgovor na: {_last_user(p)}" for p in prompts]
+                if self.path == "/v1/chat/completions":
+                    self._send(200, {"choices": [{"message": {"content": texts[0]}}],
+                                     "usage": {"total_tokens": len(texts[0].split())}})
+                else:
+                    completion = sum(len(t.split()) for t in texts)
+                    prompt = sum(len(p.split()) for p in prompts)
+                    self._send(200, {"choices": [{"index": i, "text": t}
+                                                 for i, t in enumerate(texts)],
+                                     "usage": {"prompt_tokens": prompt,
+                                               "completion_tokens": completion,
+                                               "total_tokens": prompt + completion}})
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 256
+
+        self.httpd = Server(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+async def _legacy_chat(url: str, messages) -> str:
+    """Dosadašnji ChatBridge.chat: AsyncClient po upitu, zaseban HTTP poziv."""
+    import httpx
+    async with httpx.AsyncClient(timeout=120) as client:
+        resp = await client.post(f"{url}/v1/chat/completions", json={
+            "model": "default", "messages": messages, "temperature": 0.3,
+            "max_tokens": 2048, "stream": False})
+        return resp.json()["choices"][0]["message"]["content"]
+
+
+def _pct(values: List[float], p: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))] if s else 0.0
+
+
+async def _rounds(call, users: int, rounds: int) -> Dict[str, float]:
+    lat: List[float] = []
+
+    async def one(u: int, r: int):
+        t = time.perf_counter()
+        out = await call(u, r)
+        assert f"upit {u}/{r}" in out, out
+        lat.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    for r in range(rounds):
+        await asyncio.gather(*(one(u, r) for u in range(users)))
+    return {"seconds": round(time.perf_counter() - t0, 3),
+            "p50_ms": round(_pct(lat, 50) * 1000, 1),
+            "p99_ms": round(_pct(lat, 99) * 1000, 1)}
+
+
+def run_benchmark(users: int = 15, rounds: int = 3, base: float = 0.08,
+                  per_item: float = 0.01) -> Dict[str, Dict]:
+    from nyx_light.llm.chat_bridge import ChatBridge
+
+    results: Dict[str, Dict] = {}
+    for mode in ("legacy", "coalesced"):
+        with BatchStubServer(base, per_item) as stub:
+            async def main():
+                if mode == "legacy":
+                    return await _rounds(lambda u, r: _legacy_chat(
+                        stub.url, [{"role": "user", "content": f"upit {u}/{r}"}]), users, rounds)
+                bridge = ChatBridge(llm_url=stub.url)
+
+                async def call(u, r):
+                    return (await bridge.chat(f"upit {u}/{r}", f"s{u}-{r}")).content
+                out = await _rounds(call, users, rounds)
+                out["batching"] = bridge.get_stats()["batching"]
+                await bridge.aclose()
+                return out
+
+            results[mode] = asyncio.run(main())
+            results[mode]["http_calls"] = len(stub.calls)
+    results["meta"] = {"users": users, "rounds": rounds, "base_s": base, "per_item_s": per_item}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light LLM micro-batching benchmark")
+    parser.add_argument("--users", type=int, default=15)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--base", type=float, default=0.08, help="fiksna cijena prolaza (s)")
+    parser.add_argument("--per-item", type=float, default=0.01, help="cijena po promptu (s)")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.users, args.rounds, args.base, args.per_item)
+    meta = res.pop("meta")
+    print(f"{meta['users']} korisnika × {meta['rounds']} krugova, prolaz = "
+          f"{meta['base_s']}s + n × {meta['per_item_s']}s")
+    for mode, r in res.items():
+        print(f"{mode:<10} {r['seconds']:>7}s  p50 {r['p50_ms']:>8} ms  p99 {r['p99_ms']:>8} ms"
+              f"  HTTP poziva {r['http_calls']}")
+        if r.get("batching"):
+            b = r["batching"]
+            print(f"{'':<10} batch={b['batch_size']}  prosj. batch {b['avg_batch']}  "
+                  f"pipeline poziva {b['pipelined_calls']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Load test HTTP klijenta prema vLLM-MLX serveru
+
+Lokalni stub OpenAI-kompatibilnog servera (/health, /v1/completions, SSE
+stream) s umjetnom latencijom. Istovremeni zahtjevi iz jednog event loopa:
+dosadašnji put (blokirajući urllib unutar async def + health probe prije
+svakog poziva) naspram NyxLightLLM s dijeljenim httpx.AsyncClientom.
+Mjeri se ukupno vrijeme i najveće kašnjenje event loopa (heartbeat 10 ms).
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_llm_http
+    PYTHONPATH=src python -m scripts.bench_llm_http --concurrency 32 --delay 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+
+class StubServer:
+    """OpenAI-kompatibilan stub: svaki completion traje ``delay`` sekundi."""
+
+    def __init__(self, delay: float = 0.2, tokens: int = 10):
+        stub = self
+        self.delay = delay
+        self.tokens = tokens
+        self.requests = 0
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body: bytes, ctype: str = "application/json"):
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._send(b"{}")
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests += 1
+                words = [f"tok{i} " for i in range(stub.tokens)]
+                if not body.get("stream"):
+                    time.sleep(stub.delay)
+                    self._send(json.dumps({
+                        "choices": [{"text": "".join(words)}],
+                        "usage": {"completion_tokens": len(words)},
+                    }).encode())
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                events = [json.dumps({"choices": [{"text": w}]}) for w in words] + ["[DONE]"]
+                for ev in events:
+                    time.sleep(stub.delay / len(events))
+                    data = f"data: {ev}\n\n".encode()
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 256   # default 5 odbacuje istovremene konekcije
+
+        self.httpd = Server(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+async def _legacy_generate(host: str, port: int, prompt: str) -> str:
+    """Dosadašnji _is_vllm_running + _vllm_generate (blokirajući urllib)."""
+    import urllib.request
+    urllib.request.urlopen(f"http://{host}:{port}/health", timeout=2)
+    req = urllib.request.Request(
+        f"http://{host}:{port}/v1/completions",
+        data=json.dumps({"prompt": prompt, "max_tokens": 16}).encode(),
+        headers={"Content-Type": "application/json"}, method="POST")
+    data = json.loads(urllib.request.urlopen(req, timeout=120).read().decode())
+    return data["choices"][0]["text"]
+
+
+async def _timed(coros_factory, concurrency: int) -> Dict[str, float]:
+    lag = 0.0
+    stop = False
+
+    async def heartbeat():
+        nonlocal lag
+        while not stop:
+            t = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lag = max(lag, time.perf_counter() - t - 0.01)
+
+    hb = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.02)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(coros_factory(i) for i in range(concurrency)))
+    sec = time.perf_counter() - t0
+    stop = True
+    await hb
+    return {"seconds": round(sec, 3), "max_loop_lag_ms": round(lag * 1000, 1)}
+
+
+def run_benchmark(concurrency: int = 16, delay: float = 0.2) -> Dict[str, Dict]:
+    from nyx_light.llm.provider import LLMConfig, NyxLightLLM
+
+    results: Dict[str, Dict] = {}
+    with StubServer(delay=delay) as stub:
+        msgs = [{"role": "user", "content": "Kontiraj račun za struju"}]
+
+        async def main():
+            results["legacy_urllib"] = await _timed(
+                lambda i: _legacy_generate("127.0.0.1", stub.port, f"upit {i}"), concurrency)
+
+            llm = NyxLightLLM(LLMConfig(vllm_port=stub.port))
+            results["httpx_generate"] = await _timed(
+                lambda i: llm.generate(msgs), concurrency)
+
+            async def stream(i):
+                return [t async for t in llm.generate_stream(msgs)]
+            results["httpx_stream"] = await _timed(stream, concurrency)
+            results["meta"] = {"concurrency": concurrency, "delay_s": delay,
+                               "server_requests": stub.requests, "http": llm.get_stats()["http"]}
+            await llm.aclose()
+
+        asyncio.run(main())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light vLLM HTTP client load test")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--delay", type=float, default=0.2, help="latencija stub servera (s)")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.concurrency, args.delay)
+    meta = res.pop("meta")
+    print(f"{meta['concurrency']} istovremenih zahtjeva, latencija servera {meta['delay_s']}s "
+          f"(idealno ≈ {meta['delay_s']}s, serijski ≈ {meta['concurrency'] * meta['delay_s']:.1f}s)")
+    for mode, r in res.items():
+        print(f"{mode:<16} {r['seconds']:>7}s  max lag event loopa {r['max_loop_lag_ms']:>7} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Simulacija LLM reda čekanja pod miješanim opterećenjem
+
+Tri LLM slota, simulirani pozivi (sleep). Opterećenje:
+  - jedan "težak" korisnik odjednom pošalje 60 upita
+  - 12 korisnika interaktivnog chata, po 4 upita s razmakom ~150 ms
+  - 20 pozadinskih poslova (noćni DPO eval, batch ekstrakcija) na početku
+
+Dosadašnji red (asyncio.Semaphore, FIFO, prioritet se ignorira) naspram
+LLMRequestQueue (strogi prioritetni redovi + DRR po korisnicima).
+Mjeri se čekanje na slot (p50/p99) po skupini.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_llm_queue
+    PYTHONPATH=src python -m scripts.bench_llm_queue --unit 0.01 --light 14
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+
+class _LegacyQueue:
+    """Dosadašnji LLMRequestQueue.submit: Semaphore(max_concurrent), priority se ignorira."""
+
+    def __init__(self, max_concurrent: int = 3):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def submit(self, user_id, func, *args, priority: int = 0, **kwargs):
+        async with self._semaphore:
+            return await func(*args, **kwargs)
+
+
+def _pct(values: List[float], p: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))] if s else 0.0
+
+
+async def _simulate(queue, unit: float, heavy: int, light: int, background: int,
+                    seed: int) -> Dict[str, Dict[str, float]]:
+    from nyx_light.llm.request_queue import PRIORITY_BACKGROUND
+
+    rnd = random.Random(seed)
+    waits: Dict[str, List[float]] = {"heavy": [], "interactive": [], "background": []}
+
+    def job(group: str, submitted: float, service: float):
+        async def llm_call():
+            waits[group].append(time.perf_counter() - submitted)
+            await asyncio.sleep(service)
+        return llm_call
+
+    async def one(user: str, group: str, priority: int = 0):
+        service = unit * rnd.uniform(0.5, 1.5)
+        await queue.submit(user, job(group, time.perf_counter(), service), priority=priority)
+
+    async def light_user(i: int):
+        for _ in range(4):
+            await asyncio.sleep(rnd.expovariate(1 / (15 * unit)))
+            await one(f"light{i}", "interactive")
+
+    t0 = time.perf_counter()
+    await asyncio.gather(
+        *(one("heavy", "heavy") for _ in range(heavy)),
+        *(one(f"bg{j}", "background", PRIORITY_BACKGROUND) for j in range(background)),
+        *(light_user(i) for i in range(light)),
+    )
+    out = {g: {"n": len(w), "p50_ms": round(_pct(w, 50) * 1000, 1),
+               "p99_ms": round(_pct(w, 99) * 1000, 1)} for g, w in waits.items()}
+    out["total"] = {"seconds": round(time.perf_counter() - t0, 3)}
+    return out
+
+
+def run_benchmark(unit: float = 0.02, heavy: int = 60, light: int = 12,
+                  background: int = 20, seed: int = 7) -> Dict[str, Dict]:
+    from nyx_light.llm import request_queue
+    from nyx_light.llm.request_queue import LLMRequestQueue
+
+    request_queue.QUEUE_MAX_SIZE = 10_000     # simulacija mjeri raspodjelu, ne odbijanje
+    results = {}
+    for name, factory in (("legacy_semaphore", lambda: _LegacyQueue(3)),
+                          ("fair_scheduler", lambda: LLMRequestQueue(3, max_per_minute=10_000))):
+        results[name] = asyncio.run(_simulate(factory(), unit, heavy, light, background, seed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light LLM queue simulation")
+    parser.add_argument("--unit", type=float, default=0.02, help="prosječno trajanje poziva (s)")
+    parser.add_argument("--heavy", type=int, default=60)
+    parser.add_argument("--light", type=int, default=12)
+    parser.add_argument("--background", type=int, default=20)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.unit, args.heavy, args.light, args.background)
+    for name, r in res.items():
+        print(f"{name}  (ukupno {r.pop('total')['seconds']}s)")
+        for group, g in r.items():
+            print(f"  {group:<12} n={g['n']:<4} p50 {g['p50_ms']:>8} ms  p99 {g['p99_ms']:>8} ms")
+
+
+if __name__ == "__main__":
+    main()
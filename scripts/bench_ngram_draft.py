@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Offline evaluacija n-gram speculative draftinga
+
+Odgovori (snimljeni transkripti ili sintetički odgovori kontiranja s
+citatima zakona) se reproduciraju token po token: drafter predloži K
+tokena, "target" prihvati najdulji prefiks koji se poklapa sa snimkom i
+doda jedan svoj token. Tokeni/korak = koliko tokena daje jedan prolaz
+velikog modela (1.0 = bez speculative decodinga).
+
+  • legacy     — dosadašnji NgramDraftCache (dict po kontekstu), prazan
+  • trie       — array trie, prazan (kao nakon restarta)
+  • trie_warm  — pre-warm iz data/laws, kontnog plana i odobrenih odgovora
+  • trie_tree  — pre-warm + 3 kandidata po koraku (tree draft)
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_ngram_draft
+    PYTHONPATH=src python -m scripts.bench_ngram_draft --transcripts odgovori.jsonl --k 5
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import time
+import tracemalloc
+from typing import Dict, List
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+class WordTokenizer:
+    """Riječ = token (id-ovi se dodjeljuju redom pojavljivanja)."""
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+
+    def encode(self, text: str) -> List[int]:
+        return [self.vocab.setdefault(w, len(self.vocab)) for w in _WORD_RE.findall(text)]
+
+
+class LegacyNgramCache:
+    """Dosadašnji NgramDraftCache (dict konteksta → dict sljedećih tokena)."""
+
+    def __init__(self, n: int = 4, min_freq: int = 3):
+        self._n = n
+        self._min_freq = min_freq
+        self._ngrams: Dict[tuple, Dict[int, int]] = {}
+        self._min_context = n
+
+    def update(self, tokens: List[int], start: int = 0):
+        for i in range(max(0, start - self._n), len(tokens) - self._n):
+            ctx = self._ngrams.setdefault(tuple(tokens[i:i + self._n]), {})
+            nxt = tokens[i + self._n]
+            ctx[nxt] = ctx.get(nxt, 0) + 1
+
+    def draft(self, context: List[int], k: int):
+        from nyx_light.silicon.speculative_decoder import DraftResult
+        if len(context) < self._n:
+            return None
+        tokens, current = [], list(context)
+        for _ in range(k):
+            cands = self._ngrams.get(tuple(current[-self._n:]))
+            if not cands:
+                break
+            best = max(cands, key=cands.get)
+            if cands[best] < self._min_freq:
+                break
+            tokens.append(best)
+            current.append(best)
+        return DraftResult(tokens=tokens, log_probs=[math.log(.5)] * len(tokens)) if tokens else None
+
+
+def _synthetic_answers(count: int, seed: int) -> List[str]:
+    """Odgovori u stilu Nyx Light: prijedlog kontiranja + citat zakona."""
+    from nyx_light.modules.kontiranje.kontni_plan import get_full_kontni_plan
+
+    rnd = random.Random(seed)
+    konta = [(k, v) for k, v in get_full_kontni_plan().items() if len(k) == 4]
+    citati = ["čl. 30. st. 1. Zakona o PDV-u", "čl. 7. Zakona o porezu na dobit",
+              "čl. 12. Pravilnika o amortizaciji", "čl. 15. Zakona o računovodstvu",
+              "čl. 4. Pravilnika o JOPPD obrascu"]
+    out = []
+    for _ in range(count):
+        (d, dn), (p, pn) = rnd.sample(konta, 2)
+        iznos = f"{rnd.randint(10, 99999)},{rnd.randint(0, 99):02d}"
+        out.append(
+            f"Prijedlog kontiranja: Duguje {d} {dn}, Potražuje {p} {pn}, iznos {iznos} EUR. "
+            f"Pretporez se priznaje sukladno {rnd.choice(citati)}, ako je račun "
+            f"izdan u skladu s propisima. Molim potvrdu prije knjiženja.")
+    return out
+
+
+def _load_transcripts(path: str) -> List[str]:
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            text = row.get("chosen") or row.get("text") or row.get("content")
+            if text:
+                texts.append(text)
+    return texts
+
+
+def run_benchmark(transcripts: List[str] = None, k: int = 5, n: int = 4,
+                  seed: int = 11) -> Dict[str, Dict]:
+    from nyx_light.silicon.speculative_decoder import (
+        NgramDraftCache, evaluate_ngram_drafts, iter_warm_texts)
+
+    tok = WordTokenizer()
+    corpus = [tok.encode(t) for t in iter_warm_texts()]
+    answers = [tok.encode(t) for t in (transcripts or _synthetic_answers(200, seed))]
+    corpus_tokens = sum(map(len, corpus))
+
+    results: Dict[str, Dict] = {}
+
+    def build(factory, warm):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        cache = factory()
+        if warm:
+            for seq in corpus:
+                cache.update(seq)
+        build_s = time.perf_counter() - t0
+        mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return cache, build_s, mem
+
+    runs = {
+        "legacy": (lambda: LegacyNgramCache(n, 3), False, 1),
+        "legacy_warm": (lambda: LegacyNgramCache(n, 3), True, 1),
+        "trie": (lambda: NgramDraftCache(n, 3), False, 1),
+        "trie_warm": (lambda: NgramDraftCache(n, 3), True, 1),
+        "trie_tree": (lambda: NgramDraftCache(n, 3), True, 3),
+    }
+    for mode, (factory, warm, branches) in runs.items():
+        cache, build_s, mem = build(factory, warm)
+        t0 = time.perf_counter()
+        res = evaluate_ngram_drafts(cache, answers, k=k, branches=branches)
+        res["eval_us_per_step"] = round((time.perf_counter() - t0) / max(1, res["steps"]) * 1e6, 1)
+        res["warm_s"] = round(build_s, 3)
+        res["warm_mb"] = round(mem / 1024 ** 2, 2) if warm else 0.0
+        results[mode] = res
+    results["meta"] = {"corpus_tokens": corpus_tokens, "answers": len(answers),
+                       "answer_tokens": sum(map(len, answers)), "k": k, "n": n}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light n-gram draft evaluation")
+    parser.add_argument("--transcripts", help="JSONL sa snimljenim odgovorima (chosen/text)")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n", type=int, default=4)
+    args = parser.parse_args()
+
+    texts = _load_transcripts(args.transcripts) if args.transcripts else None
+    res = run_benchmark(texts, args.k, args.n)
+    meta = res.pop("meta")
+    print(f"korpus {meta['corpus_tokens']} tokena, {meta['answers']} odgovora "
+          f"({meta['answer_tokens']} tokena), K={meta['k']}, n={meta['n']}")
+    for mode, r in res.items():
+        print(f"{mode:<12} tokeni/korak {r['tokens_per_step']:>5}  draft/korak "
+              f"{r['drafted_tokens_per_step']:>5}  prihvaćeno {r['acceptance_rate']:>5}%  "
+              f"draft pogodak {r['draft_hit_rate']:>5}%  warm {r['warm_mb']:>6} MB "
+              f"{r['warm_s']:>6}s  {r['eval_us_per_step']} µs/korak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark sigurnosnog filtra (AccountingOverseer.evaluate)
+
+Dosadašnji evaluate (lower() pa zaseban ``in`` za svaku ključnu riječ,
+~70 prolaza kroz poruku) naspram jednog prolaza Aho–Corasick automata.
+"legacy_folded" = dosadašnji pristup proširen svođenjem dijakritika
+(ono što bi trebalo za "tuzba"/"tužba" bez automata).
+
+Poruke: kratki upiti iz chata, dulji upiti s opisom i opisi knjiženja.
+Provjerava se i da su odluke iste (razlike samo zbog dijakritika).
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_overseer
+    PYTHONPATH=src python -m scripts.bench_overseer --rounds 5000
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List, Optional
+
+
+def _legacy_checker(fold: bool = False):
+    """Dosadašnji evaluate (redoslijed i ``in`` provjere) → boundary_type ili None.
+
+    fold=True: ista logika nad tekstom i frazama bez dijakritika (fraze se
+    svode jednom, unaprijed).
+    """
+    from nyx_light.safety import overseer as ov
+    from nyx_light.safety.keyword_automaton import fold_text
+
+    prep = (lambda ks: [fold_text(k) for k in ks]) if fold else (lambda ks: list(ks))
+    labor, ctx = prep(ov.RADNO_PRAVO_ALWAYS_FORBIDDEN), prep(ov.RADNO_PRAVO_PAYROLL_CONTEXT)
+    legal, warn = prep(ov.FORBIDDEN_DOMAINS), prep(ov.WARNING_KEYWORDS)
+    cloud = prep(ov.CLOUD_KEYWORDS)
+    norm = fold_text if fold else str.lower
+
+    def check(content: str) -> Optional[str]:
+        content_lower = norm(content)
+        for forbidden_rp in labor:
+            if forbidden_rp in content_lower:
+                return "labor_law"
+        is_payroll_context = any(kw in content_lower for kw in ctx)
+        payroll_indicators = [
+            "obračun", "plaća", "neto", "bruto", "doprinos",
+            "JOPPD", "isplata", "naknada", "kalkulacija",
+        ]
+        has_payroll_indicator = any(
+            norm(ind) in content_lower for ind in payroll_indicators
+        )
+        for forbidden in legal:
+            if forbidden in content_lower:
+                if is_payroll_context and has_payroll_indicator:
+                    continue
+                return "legal_domain"
+        for warning in warn:
+            if warning in content_lower:
+                return "autonomous_booking"
+        for kw in cloud:
+            if kw in content_lower:
+                return "privacy"
+        return None
+
+    return check
+
+
+def _messages(n: int, seed: int) -> List[str]:
+    rnd = random.Random(seed)
+    short = ["Koji konto za uredski materijal?", "Kako obračunati otpremninu?",
+             "Koja je stopa PDV-a za ugostiteljstvo?", "Kako knjižiti predujam dobavljaču?",
+             "Pomozi mi sastaviti tužbu protiv klijenta", "Obracun bolovanja za neto placu",
+             "automatski proknjiži sve račune", "Može li se koristiti ChatGPT za ovo?"]
+    words = ("račun dobavljač isporuka roba usluga pdv pretporez konto knjiženje iznos "
+             "eur datum dospijeće plaćanje žiro banka izvod stavka popust").split()
+    out = []
+    for i in range(n):
+        if i % 3 == 0:
+            out.append(rnd.choice(short))
+        else:
+            body = " ".join(rnd.choice(words) for _ in range(rnd.randint(20, 90)))
+            out.append(f"{rnd.choice(short)} {body}")
+    return out
+
+
+def run_benchmark(rounds: int = 2000, messages: int = 60, seed: int = 7) -> Dict[str, Dict]:
+    from nyx_light.safety import AccountingOverseer
+
+    msgs = _messages(messages, seed)
+    overseer = AccountingOverseer()
+    new = lambda m: overseer.evaluate(m).get("boundary_type")
+    modes = {"legacy": _legacy_checker(),
+             "legacy_folded": _legacy_checker(fold=True),
+             "automaton": new}
+    results: Dict[str, Dict] = {}
+    for mode, fn in modes.items():
+        decisions = [fn(m) for m in msgs]
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for m in msgs:
+                fn(m)
+        results[mode] = {"us_per_msg": round((time.perf_counter() - t0) / rounds / len(msgs) * 1e6, 2),
+                         "blocked": sum(d is not None for d in decisions),
+                         "decisions": decisions}
+    ref = results["legacy_folded"]["decisions"]
+    for mode, r in results.items():
+        r["differs_from_folded"] = sum(a != b for a, b in zip(r.pop("decisions"), ref))
+    results["meta"] = {"messages": len(msgs), "avg_chars": round(sum(map(len, msgs)) / len(msgs)),
+                       "rounds": rounds}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light overseer benchmark")
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=60)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.rounds, args.messages)
+    meta = res.pop("meta")
+    print(f"{meta['messages']} poruka (prosj. {meta['avg_chars']} znakova) × {meta['rounds']}")
+    for mode, r in res.items():
+        print(f"{mode:<14} {r['us_per_msg']:>7} µs/poruka  blokirano {r['blocked']:>3}  "
+              f"različito od folded {r['differs_from_folded']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark obračuna plaća (skalarni vs vektorizirani)
+
+Simulira mjesečni run računovodstvenog servisa (npr. 40 klijenata ×
+200 zaposlenika) i mjeri propusnost PayrollEngine.calculate (petlja)
+naspram PayrollEngine.calculate_batch (NumPy), uz provjeru da su svi
+iznosi identični u centima.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_payroll
+    PYTHONPATH=src python -m scripts.bench_payroll --clients 40 --employees 200
+"""
+
+import argparse
+import random
+import time
+from dataclasses import asdict
+from datetime import date
+from typing import Dict, List
+
+from nyx_light.modules.payroll import Employee, PayrollEngine
+
+CITIES = ["Zagreb", "Split", "Rijeka", "Osijek", "Zadar", "Pula"]
+
+
+def _employees(n: int, seed: int = 42) -> List[Employee]:
+    rnd = random.Random(seed)
+    return [
+        Employee(
+            name=f"Radnik {i}",
+            oib=f"{10_000_000_000 + i}",
+            birth_date=date(rnd.randint(1960, 2005), rnd.randint(1, 12), rnd.randint(1, 28)),
+            city=rnd.choice(CITIES),
+            uzdrzavani_clanovi=rnd.randint(0, 2),
+            djeca=rnd.randint(0, 4),
+            invalid=rnd.random() < 0.05,
+            mio_stup_2=rnd.random() < 0.85,
+            bruto_placa=round(rnd.uniform(970, 9000), 2),
+        )
+        for i in range(n)
+    ]
+
+
+def run_benchmark(clients: int = 40, employees: int = 200) -> Dict[str, Dict]:
+    engine = PayrollEngine()
+    companies = [_employees(employees, seed=c) for c in range(clients)]
+    total = clients * employees
+
+    engine.calculate_batch(companies[0][:10])  # import + zagrijavanje
+
+    t0 = time.perf_counter()
+    scalar = [[engine.calculate(e) for e in emps] for emps in companies]
+    t_scalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batches = [engine.calculate_batch(emps) for emps in companies]
+    totals = [b.joppd_totals() for b in batches]
+    t_batch = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    converted = [b.to_results() for b in batches]
+    t_convert = time.perf_counter() - t0
+
+    # Cijeli servis kao jedna tablica (svi klijenti odjednom)
+    t0 = time.perf_counter()
+    engine.calculate_batch([e for emps in companies for e in emps]).joppd_totals()
+    t_bureau = time.perf_counter() - t0
+
+    mismatches = sum(
+        asdict(s) != asdict(v)
+        for ss, vv in zip(scalar, converted) for s, v in zip(ss, vv)
+    )
+    return {
+        "scalar": {"seconds": round(t_scalar, 3), "per_s": int(total / t_scalar)},
+        "batch": {"seconds": round(t_batch, 3), "per_s": int(total / t_batch)},
+        "batch_bureau": {"seconds": round(t_bureau, 3), "per_s": int(total / t_bureau)},
+        "batch+results": {"seconds": round(t_batch + t_convert, 3),
+                          "per_s": int(total / (t_batch + t_convert))},
+        "meta": {"employees": total, "mismatches": mismatches,
+                 "joppd_bruto": round(sum(t["bruto"] for t in totals), 2)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light payroll benchmark")
+    parser.add_argument("--clients", type=int, default=40)
+    parser.add_argument("--employees", type=int, default=200)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.clients, args.employees)
+    meta = res.pop("meta")
+    print(f"{meta['employees']} zaposlenika, razlika u centima: {meta['mismatches']}")
+    print(f"{'mode':<14} {'sec':>8} {'obračuna/s':>12}")
+    for mode, r in res.items():
+        print(f"{mode:<14} {r['seconds']:>8} {r['per_s']:>12}")
+
+
+if __name__ == "__main__":
+    main()
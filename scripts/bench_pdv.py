@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark PDV prijave (PPO) za cijeli ured
+
+Mjesečni batch: N klijenata × M odobrenih računa u SQLite bazi.
+Uspoređuje dosadašnji put (dohvat svih redaka → lista PDVStavka →
+calculate po klijentu) s grupiranom SQL agregacijom, hladno i iz
+cachea zatvorenog perioda.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_pdv
+    PYTHONPATH=src python -m scripts.bench_pdv --clients 150 --invoices 1000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+
+def _seed(st, clients: int, invoices: int, period: str = "2025-02"):
+    rnd = random.Random(1)
+    rows = []
+    for c in range(clients):
+        for i in range(invoices):
+            stopa = rnd.choice([25, 25, 25, 13, 5, 0])
+            osn = round(rnd.uniform(10, 5000), 2)
+            pdv = round(osn * stopa / 100, 2)
+            eu = rnd.random() < 0.05
+            rows.append((f"K{c:03d}_{i}", f"K{c:03d}",
+                         rnd.choice(["ulazni_racun", "izlazni_racun"]),
+                         osn + pdv, osn, stopa, pdv, int(eu), int(eu),
+                         f"{period}-{rnd.randint(1, 28):02d}"))
+    st._conn.executemany(
+        """INSERT INTO bookings (id, client_id, document_type, iznos, osnovica, pdv_stopa,
+               pdv_iznos, eu_transakcija, reverse_charge, datum_dokumenta, status)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'approved')""", rows)
+    st._conn.commit()
+
+
+def _legacy(engine, st, client_ids, period):
+    from nyx_light.modules.pdv_prijava import PDVStavka
+
+    date_from, date_to, _ = engine.period_bounds(period)
+    out = {}
+    for cid in client_ids:
+        rows = st._conn.execute(
+            "SELECT * FROM bookings WHERE client_id=? AND status='approved' "
+            "AND datum_dokumenta >= ? AND datum_dokumenta < ?", (cid, date_from, date_to),
+        ).fetchall()
+        stavke = [PDVStavka(
+            tip="izlazni" if r["document_type"] == "izlazni_racun" else "ulazni",
+            osnovica=r["osnovica"], pdv_stopa=r["pdv_stopa"], pdv_iznos=r["pdv_iznos"],
+            eu_transakcija=bool(r["eu_transakcija"]), reverse_charge=bool(r["reverse_charge"]),
+        ) for r in rows]
+        out[cid] = engine.calculate(stavke, period=period)
+    return out
+
+
+def run_benchmark(clients: int = 150, invoices: int = 1000) -> Dict[str, Dict]:
+    from nyx_light.modules.pdv_prijava import PDVPrijavaEngine
+    from nyx_light.storage.sqlite_store import SQLiteStorage
+
+    st = SQLiteStorage(str(Path(tempfile.mkdtemp(prefix="nyx_bench_pdv_")) / "bench.db"))
+    _seed(st, clients, invoices)
+    engine = PDVPrijavaEngine()
+    ids = [f"K{c:03d}" for c in range(clients)]
+    batch_clients = [{"client_id": cid} for cid in ids]
+    results = {}
+
+    t0 = time.perf_counter()
+    legacy = _legacy(engine, st, ids, "2025-02")
+    results["legacy"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    t0 = time.perf_counter()
+    sql = engine.calculate_batch_from_storage(st, batch_clients, "2025-02")
+    results["sql_cold"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    t0 = time.perf_counter()
+    engine.calculate_batch_from_storage(st, batch_clients, "2025-02")
+    results["sql_cached"] = {"seconds": round(time.perf_counter() - t0, 3)}
+
+    diff = max(abs(legacy[c].za_uplatu - sql[c].za_uplatu) + abs(legacy[c].za_povrat - sql[c].za_povrat)
+               for c in ids)
+    results["meta"] = {"clients": clients, "rows": clients * invoices, "max_diff_eur": round(diff, 2)}
+    st.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light PPO batch benchmark")
+    parser.add_argument("--clients", type=int, default=150)
+    parser.add_argument("--invoices", type=int, default=1000)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.clients, args.invoices)
+    meta = res.pop("meta")
+    print(f"{meta['clients']} klijenata, {meta['rows']} računa, "
+          f"max razlika za_uplatu/za_povrat: {meta['max_diff_eur']} EUR")
+    for mode, r in res.items():
+        print(f"{mode:<12} {r['seconds']:>8}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark slaganja prompta (budžet tokena + prefix cache)
+
+Simulirani dan: 15 korisnika, 5 klijenata, sesije od više pitanja. Svaki
+upit ima RAG isječke iz zajedničkog skupa zakona, pravila klijenta i
+bilješke routera/modula koje vrijede samo za taj upit.
+
+Dosadašnji ChatBridge.build_messages (kontekst upita odmah iza system
+prompta, bez brojanja tokena) naspram PromptBuildera. Za oba se koristi
+isti model prefix cachea servera: segment je "pogodak" ako je cijeli
+prefiks do njega već poslan. Prefill = tokeni prompta − pogoci.
+history_first = isti builder s historijom ispred zakona (order=...).
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_prompt
+    PYTHONPATH=src python -m scripts.bench_prompt --users 15 --turns 8
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+
+def _legacy_messages(system_prompt: str, user_msg: str, history: List[Dict[str, str]],
+                     context) -> List[Dict[str, str]]:
+    """Dosadašnji ChatBridge.build_messages."""
+    messages = [{"role": "system", "content": system_prompt}]
+    ctx_parts = []
+    if context.rag_results:
+        ctx_parts.append("RELEVANTNI ZAKONI:")
+        for r in context.rag_results[:5]:
+            ctx_parts.append(f"  [{r.get('source', '')}] {r.get('text', '')[:500]}")
+    if context.semantic_facts or context.request_notes:
+        ctx_parts.append("\nPRAVILA KONTIRANJA (naučeno iz prakse):")
+        for fact in (context.semantic_facts + context.request_notes)[:10]:
+            ctx_parts.append(f"  • {fact}")
+    if context.client_info:
+        ci = context.client_info
+        ctx_parts.append(f"\nKLIJENT: {ci.get('name', 'N/A')} (OIB: {ci.get('oib', 'N/A')}, "
+                         f"Tip: {ci.get('type', 'N/A')})")
+    if context.pipeline_context:
+        ctx_parts.append(f"\nTRENUTNI RAD: {context.pipeline_context}")
+    if ctx_parts:
+        messages.append({"role": "system",
+                         "content": "KONTEKST ZA OVAJ UPIT:\n" + "\n".join(ctx_parts)})
+    messages += history[-10:]
+    messages.append({"role": "user", "content": user_msg})
+    return messages
+
+
+def _workload(users: int, turns: int, seed: int):
+    """Generator (session_id, user_msg, context, answer) redom kako stižu."""
+    from nyx_light.llm.chat_bridge import ChatContext
+
+    rnd = random.Random(seed)
+    words = ("porez dobit pdv obveznik isporuka račun predujam konto knjiženje amortizacija "
+             "obračun razdoblje stopa oslobođenje članak stavak zakon pravilnik").split()
+    text = lambda n: " ".join(rnd.choice(words) for _ in range(n))
+    laws = [{"source": f"Zakon {i} čl. {rnd.randint(1, 90)}", "text": text(rnd.randint(60, 160))}
+            for i in range(20)]
+    clients = [{"name": f"Klijent {c} d.o.o.", "oib": f"{10000000000 + c}", "type": "d.o.o.",
+                "facts": [f"Konto {rnd.randint(4000, 4999)} za {text(4)}" for _ in range(6)]}
+               for c in range(5)]
+    sessions = [(f"u{u}", clients[u % len(clients)], rnd.sample(range(20), 5))
+                for u in range(users)]
+    for turn in range(turns):
+        for sid, client, topic in sessions:
+            ctx = ChatContext(
+                rag_results=[laws[i] for i in sorted(rnd.sample(topic, 3))],
+                semantic_facts=list(client["facts"]),
+                client_info={k: client[k] for k in ("name", "oib", "type")},
+                request_notes=[f"[Router: moguć modul 'pdv' ({rnd.randint(40, 60)}%)]"],
+                pipeline_context=f"Modul izvršen: {text(rnd.randint(10, 40))}" if rnd.random() < .5 else "",
+            )
+            yield sid, f"Pitanje {turn}: {text(rnd.randint(8, 30))}?", ctx, text(rnd.randint(80, 300))
+
+
+def run_benchmark(users: int = 15, turns: int = 6, seed: int = 3) -> Dict[str, Dict]:
+    from nyx_light.llm.chat_bridge import SYSTEM_PROMPT
+    from nyx_light.llm.prompt_builder import PromptBudget, PromptBuilder
+
+    results: Dict[str, Dict] = {}
+    orders = {"legacy": None, "budgeted": None,
+              "history_first": ("client", "history", "law", "request")}
+    for mode, order in orders.items():
+        builder = PromptBuilder(SYSTEM_PROMPT, PromptBudget(total=8192 - 2048), order=order)
+        histories: Dict[str, List[Dict[str, str]]] = {}
+        tokens = hits = n = 0
+        build_s = 0.0
+        for sid, msg, ctx, answer in _workload(users, turns, seed):
+            hist = histories.setdefault(sid, [])
+            t0 = time.perf_counter()
+            if mode == "legacy":
+                msgs = _legacy_messages(SYSTEM_PROMPT, msg, hist, ctx)
+                build_s += time.perf_counter() - t0
+                tokens += sum(builder._msg_tokens(m["content"]) for m in msgs)
+                hits += builder._prefix_hits([(m["role"], m["content"], builder._msg_tokens(m["content"]))
+                                              for m in msgs])
+            else:
+                built = builder.build(msg, hist, ctx)
+                build_s += time.perf_counter() - t0
+                tokens += built.tokens
+                hits += built.prefix_hit_tokens
+            n += 1
+            hist += [{"role": "user", "content": msg}, {"role": "assistant", "content": answer}]
+            del hist[:-20]
+        results[mode] = {"prompts": n, "prompt_tokens": tokens, "prefix_hit_tokens": hits,
+                         "prefill_tokens": tokens - hits,
+                         "hit_pct": round(hits / tokens * 100, 1),
+                         "build_us": round(build_s / n * 1e6, 1)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light prompt assembly benchmark")
+    parser.add_argument("--users", type=int, default=15)
+    parser.add_argument("--turns", type=int, default=6)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.users, args.turns)
+    for mode, r in res.items():
+        print(f"{mode:<14} {r['prompts']} promptova  tokeni {r['prompt_tokens']:>8}  "
+              f"prefix pogoci {r['prefix_hit_tokens']:>8} ({r['hit_pct']}%)  "
+              f"prefill {r['prefill_tokens']:>8}  slaganje {r['build_us']} µs")
+    for mode in ("budgeted", "history_first"):
+        saved = 1 - res[mode]["prefill_tokens"] / res["legacy"]["prefill_tokens"]
+        print(f"{mode}: prefill tokena manje {saved:.0%}")
+
+
+if __name__ == "__main__":
+    main()
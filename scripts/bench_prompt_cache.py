@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark prefix KV cachea (VLLMMLXEngine.PromptCache)
+
+Simulirani dan: 15 korisnika, 5 klijenata, 8 modula. Prompt je
+system → klijent → modul → historija sesije → pitanje (token id-ovi).
+Nakon svakog upita KV stanje cijelog prompta se sprema u cache.
+
+Dosadašnji PromptCache (dict po hashu cijelog prompta, bez limita) naspram
+radix cachea (najdulji cachirani prefiks, KV na točkama grananja, budžet
+bajtova, spill na disk).
+Prefill = tokeni prompta − tokeni pročitani iz cachea.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_prompt_cache
+    PYTHONPATH=src python -m scripts.bench_prompt_cache --users 15 --turns 8 --budget-mb 256
+"""
+
+import argparse
+import hashlib
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+KV_BYTES_PER_TOKEN = 2 * 28 * 8 * 128 * 2 // 4     # K+V × slojevi × glave × dim × fp16, 4-bit
+
+
+class FakeKV:
+    """KV stanje koje samo zna svoju veličinu."""
+
+    def __init__(self, n_tokens: int):
+        self.n_tokens = n_tokens
+        self.nbytes = n_tokens * KV_BYTES_PER_TOKEN
+
+
+def _trim(kv: FakeKV, n: int) -> FakeKV:
+    return FakeKV(kv.n_tokens - n)
+
+
+def _workload(users: int, turns: int, seed: int):
+    """Generator token id-ova promptova redom kako stižu."""
+    rnd = random.Random(seed)
+    block = lambda n: [rnd.randrange(1000, 50000) for _ in range(n)]
+    system = block(600)
+    clients = [block(rnd.randint(150, 300)) for _ in range(5)]
+    modules = [block(rnd.randint(60, 140)) for _ in range(8)]
+    sessions = {u: [] for u in range(users)}
+    for _ in range(turns):
+        for u, history in sessions.items():
+            prefix = system + clients[u % len(clients)] + modules[rnd.randrange(len(modules))]
+            question = block(rnd.randint(20, 60))
+            yield prefix + history + question
+            history += question + block(rnd.randint(80, 200))
+            del history[:-1500]
+
+
+def _legacy(prompts: List[List[int]]) -> Dict:
+    cache: Dict[str, FakeKV] = {}
+    hits = tokens = saved = 0
+    for toks in prompts:
+        key = hashlib.sha256(bytes(str(toks), "ascii")).hexdigest()[:32]
+        tokens += len(toks)
+        if key in cache:
+            hits += 1
+            saved += len(toks)
+        cache[key] = FakeKV(len(toks))
+    return {"hits": hits, "saved_prefill_tokens": saved, "prompt_tokens": tokens,
+            "bytes": sum(kv.nbytes for kv in cache.values())}
+
+
+def _radix(prompts: List[List[int]], budget: int, spill: bool) -> Dict:
+    from nyx_light.silicon.vllm_mlx_engine import PromptCache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PromptCache(tmp, max_bytes=budget, spill_to_disk=spill, trim_kv=_trim)
+        tokens = 0
+        t0 = time.perf_counter()
+        for toks in prompts:
+            tokens += len(toks)
+            cache.match(toks)
+            cache.insert(toks, FakeKV(len(toks)))
+        elapsed = time.perf_counter() - t0
+        s = cache.stats()
+        cache.clear()
+    return {**s, "prompt_tokens": tokens,
+            "op_us": round(elapsed / max(1, len(prompts)) * 1e6, 1)}
+
+
+def run_benchmark(users: int = 15, turns: int = 6, budget_mb: int = 512,
+                  seed: int = 5) -> Dict[str, Dict]:
+    prompts = list(_workload(users, turns, seed))
+    budget = budget_mb * 1024 * 1024
+    results = {"legacy": _legacy(prompts),
+               "radix": _radix(prompts, budget, spill=False),
+               "radix_spill": _radix(prompts, budget, spill=True)}
+    for r in results.values():
+        r["prefill_tokens"] = r["prompt_tokens"] - r["saved_prefill_tokens"]
+        r["hit_pct"] = round(r["hits"] / len(prompts) * 100, 1)
+        r["saved_pct"] = round(r["saved_prefill_tokens"] / r["prompt_tokens"] * 100, 1)
+    results["meta"] = {"prompts": len(prompts), "budget_mb": budget_mb}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light prefix KV cache benchmark")
+    parser.add_argument("--users", type=int, default=15)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--budget-mb", type=int, default=512)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.users, args.turns, args.budget_mb)
+    meta = res.pop("meta")
+    print(f"{meta['prompts']} promptova, budžet {meta['budget_mb']} MB")
+    for mode, r in res.items():
+        print(f"{mode:<12} pogoci {r['hit_pct']:>5}%  ušteđeni prefill {r['saved_prefill_tokens']:>7} "
+              f"({r['saved_pct']}%)  prefill {r['prefill_tokens']:>7}  "
+              f"memorija {r['bytes'] / 1024 ** 2:>7.1f} MB"
+              + (f"  spill {r['spills']}  s diska {r['disk_hits']}  {r['op_us']} µs/upit"
+                 if "spills" in r else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark renderiranja izvještaja (kartica konta)
+
+Kartica od 100k stavki: dosadašnji ReportGenerator (obični openpyxl workbook,
+ćelija po ćelija + _auto_width preko svih ćelija) naspram write-only
+ReportSheet (redovi iz generatora, širine iz uzorka, zajednički NamedStyle)
+i CSV puta. Mjeri vrijeme i vršnu alokaciju (tracemalloc, zaseban prolaz).
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_reports
+    PYTHONPATH=src python -m scripts.bench_reports --rows 20000 --no-legacy
+"""
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Iterator
+
+
+def _stavke(n: int, seed: int = 7) -> Iterator[Dict]:
+    rnd = random.Random(seed)
+    opisi = ["Nabava materijala", "Plaćanje dobavljaču", "Storno", "Povrat robe",
+             "Ulazni račun — usluge održavanja", "Kompenzacija"]
+    for i in range(n):
+        iznos = round(rnd.uniform(1, 20000), 2)
+        duguje = rnd.random() < 0.5
+        yield {"datum": f"2026-{i * 12 // n + 1:02d}-{rnd.randint(1, 28):02d}",
+               "dokument": f"{'UR' if duguje else 'BN'}-{i}",
+               "opis": rnd.choice(opisi),
+               "duguje": iznos if duguje else 0, "potrazuje": 0 if duguje else iznos}
+
+
+def _legacy_generator():
+    """Dosadašnji ReportGenerator (obični workbook) — za usporedbu."""
+    import openpyxl
+    from openpyxl.styles import Alignment
+    from openpyxl.utils import get_column_letter
+    from nyx_light.modules.reports import ReportStyles
+
+    class LegacyKartica:
+        styles = ReportStyles()
+
+        def generate(self, konto, naziv, stavke, path):
+            wb = openpyxl.Workbook()
+            ws = wb.active
+            ws.title = f"Konto {konto}"
+            st = self.styles
+            ws.cell(row=1, column=1, value="Nyx Light").font = st.HEADER_FONT
+            ws.cell(row=3, column=1, value=f"KARTICA KONTA {konto} — {naziv}")
+            for col, h in enumerate(["Datum", "Dokument", "Opis", "Duguje", "Potražuje", "Saldo"], 1):
+                c = ws.cell(row=6, column=col, value=h)
+                c.fill = st.HEADER_FILL
+                c.font = st.HEADER_FONT_WHITE
+                c.alignment = Alignment(horizontal="center")
+            row = 7
+            saldo = 0
+            for i, s in enumerate(stavke):
+                d, p = s.get("duguje", 0), s.get("potrazuje", 0)
+                saldo += d - p
+                for col, v in enumerate([s.get("datum", ""), s.get("dokument", ""),
+                                         s.get("opis", ""), d, p, saldo], 1):
+                    c = ws.cell(row=row, column=col, value=v)
+                    c.font = st.NORMAL_FONT
+                    if col >= 4:
+                        c.number_format = st.MONEY_FORMAT
+                    if i % 2 == 1:
+                        c.fill = st.ALT_ROW_FILL
+                    c.border = st.THIN_BORDER
+                row += 1
+            for col in ws.columns:
+                max_len = max(len(str(cell.value or "")) for cell in col)
+                ws.column_dimensions[get_column_letter(col[0].column)].width = min(max_len + 3, 40)
+            wb.save(path)
+            return path
+
+    return LegacyKartica()
+
+
+def _measure(fn, memory: bool) -> Dict:
+    t0 = time.perf_counter()
+    fn()
+    out = {"seconds": round(time.perf_counter() - t0, 2)}
+    if memory:
+        tracemalloc.start()
+        fn()
+        out["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.stop()
+    return out
+
+
+def run_benchmark(rows: int = 100_000, legacy: bool = True,
+                  memory: bool = True) -> Dict[str, Dict]:
+    from nyx_light.modules.reports import ReportGenerator
+
+    tmp = Path(tempfile.mkdtemp(prefix="nyx_reports_"))
+    gen = ReportGenerator("Benchmark d.o.o.", "12345678901")
+    modes = {
+        "write_only": lambda: gen.generate_kartica(
+            "2200", "Dobavljači", _stavke(rows), "2026", str(tmp / "kartica.xlsx")),
+        "csv": lambda: gen.generate_kartica(
+            "2200", "Dobavljači", _stavke(rows), "2026", str(tmp / "kartica.csv"), format="csv"),
+    }
+    if legacy:
+        old = _legacy_generator()
+        modes = {"legacy": lambda: old.generate(
+            "2200", "Dobavljači", list(_stavke(rows)), str(tmp / "legacy.xlsx")), **modes}
+
+    results = {}
+    for mode, fn in modes.items():
+        results[mode] = _measure(fn, memory)
+        results[mode]["rows_per_s"] = round(rows / results[mode]["seconds"])
+    files = {"legacy": "legacy.xlsx", "write_only": "kartica.xlsx", "csv": "kartica.csv"}
+    for mode in results:
+        results[mode]["size_mb"] = round((tmp / files[mode]).stat().st_size / 2 ** 20, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light report rendering benchmark")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--no-legacy", action="store_true")
+    parser.add_argument("--no-memory", action="store_true", help="bez tracemalloc prolaza")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.rows, not args.no_legacy, not args.no_memory)
+    print(f"Kartica konta, {args.rows} stavki")
+    for mode, r in res.items():
+        peak = f"{r['peak_mb']:>7} MB peak" if "peak_mb" in r else ""
+        print(f"{mode:<11} {r['seconds']:>7}s  {r['rows_per_s']:>7} redaka/s  "
+              f"{r['size_mb']:>5} MB  {peak}")
+
+
+if __name__ == "__main__":
+    main()
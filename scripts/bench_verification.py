@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Nyx Light — Benchmark TripleVerifier.verify_batch
+
+Uvoz od 5.000 redaka (izvod/knjiga ulaznih računa): svaki redak ima OIB
+partnera, IBAN i PDV iznos. Partneri se ponavljaju (~300 različitih),
+pa se isti OIB/IBAN provjerava mnogo puta.
+
+Dosadašnji batch (verify() po stavci, INFO log po stavci) naspram
+grupiranog batcha (memo po vrijednosti + NumPy kontrolne znamenke).
+Logging je na INFO (kao u aplikaciji), ispis ide u memorijski buffer.
+
+Korištenje:
+    PYTHONPATH=src python -m scripts.bench_verification
+    PYTHONPATH=src python -m scripts.bench_verification --rows 20000 --partners 2000
+"""
+
+import argparse
+import io
+import logging
+import random
+import time
+from typing import Dict, List, Tuple
+
+
+def _oib(rnd: random.Random) -> str:
+    digits = [rnd.randint(0, 9) for _ in range(10)]
+    remainder = 10
+    for d in digits:
+        remainder = (remainder + d) % 10 or 10
+        remainder = remainder * 2 % 11
+    check = (11 - remainder) % 10
+    return "".join(map(str, digits)) + str(check)
+
+
+def _iban(rnd: random.Random) -> str:
+    bank = rnd.choice(["2340009", "2360000", "2484008", "2402006", "2407000", "2390001"])
+    account = "".join(str(rnd.randint(0, 9)) for _ in range(10))
+    bban = bank + account
+    check = 98 - int(bban + "172700") % 97       # "HR" = 17 27, "00"
+    return f"HR{check:02d}{bban}"
+
+
+def _rows(rows: int, partners: int, seed: int) -> List[Tuple[str, object, Dict]]:
+    rnd = random.Random(seed)
+    book = [(_oib(rnd), _iban(rnd)) for _ in range(partners)]
+    items = []
+    for _ in range(rows):
+        oib, iban = rnd.choice(book)
+        if rnd.random() < 0.02:                      # tipfeler u uvozu
+            oib = oib[:-1] + str((int(oib[-1]) + 1) % 10)
+        osnovica = round(rnd.uniform(10, 5000), 2)
+        items += [("oib", oib, {}),
+                  ("iban", iban, {}),
+                  ("pdv_iznos", round(osnovica * 0.25, 2), {"osnovica": osnovica,
+                                                            "pdv_stopa": 0.25})]
+    return items
+
+
+def run_benchmark(rows: int = 5000, partners: int = 300, seed: int = 9) -> Dict[str, Dict]:
+    from nyx_light.verification import TripleVerifier
+
+    items = _rows(rows, partners, seed)
+    log = logging.getLogger("nyx_light.verification.triple_check")
+    handler = logging.StreamHandler(io.StringIO())
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+    results: Dict[str, Dict] = {}
+    try:
+        for mode in ("legacy", "batch"):
+            verifier = TripleVerifier()
+            t0 = time.perf_counter()
+            if mode == "legacy":
+                out = [verifier.verify(ft, v, ctx) for ft, v, ctx in items]
+            else:
+                out = verifier.verify_batch(items)
+            elapsed = time.perf_counter() - t0
+            results[mode] = {"seconds": round(elapsed, 3),
+                             "us_per_field": round(elapsed / len(items) * 1e6, 2),
+                             "review": sum(r.needs_human_review for r in out),
+                             "dicts": [r.to_dict() for r in out]}
+    finally:
+        log.removeHandler(handler)
+        log.propagate = True
+    results["batch"]["identical"] = results["batch"].pop("dicts") == results["legacy"].pop("dicts")
+    results["meta"] = {"rows": rows, "fields": len(items), "partners": partners}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nyx Light TripleVerifier batch benchmark")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--partners", type=int, default=300)
+    args = parser.parse_args()
+
+    res = run_benchmark(args.rows, args.partners)
+    meta = res.pop("meta")
+    print(f"{meta['rows']} redaka, {meta['fields']} polja, {meta['partners']} partnera")
+    for mode, r in res.items():
+        print(f"{mode:<8} {r['seconds']:>7}s  {r['us_per_field']:>7} µs/polje  "
+              f"za ljudsku provjeru {r['review']}"
+              + (f"  isti rezultati: {r['identical']}" if "identical" in r else ""))
+
+
+if __name__ == "__main__":
+    main()
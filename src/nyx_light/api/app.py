@@ -12,10 +12,10 @@ import os
 import sqlite3
 import time
 import uuid
-from contextlib import asynccontextmanager
-from datetime import datetime, timezone
+from contextlib import asynccontextmanager, nullcontext
+from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
@@ -24,15 +24,17 @@ from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 # Internal imports
-from nyx_light.auth import AuthManager as AuthSystem, Role
+from nyx_light.auth import AuthManager as AuthSystem, Role, ROLE_PERMISSIONS
 from nyx_light.storage.sqlite_store import SQLiteStorage
 from nyx_light.memory.system import MemorySystem
 from nyx_light.llm.chat_bridge import ChatBridge, ChatContext
 from nyx_light.llm.provider import NyxLightLLM
+from nyx_light.llm.request_queue import QueueFullError, RateLimitError
 from nyx_light.safety.overseer import AccountingOverseer
 from nyx_light.sessions.manager import SessionManager
 from nyx_light.monitoring.health import SystemMonitor
 from nyx_light.backup import BackupManager
+from nyx_light.export.streaming import open_export, write_csv_rows, write_xml_document
 
 logger = logging.getLogger("nyx_light.api")
 
@@ -95,6 +97,8 @@ class AppState:
         self.llm_queue = None  # LLMRequestQueue
         self.nyx_app = None    # NyxLightApp — centralni orchestrator
         self.executor = None   # ModuleExecutor — most router↔moduli
+        self.audit = None      # AuditLogger — dijeljeni (vidi _audit_logger)
+        self.audit_archive = None  # AuditArchive — hladni segmenti audit traga
         self.start_time = datetime.now(timezone.utc)
         self.ws_connections: Dict[str, WebSocket] = {}
 
@@ -113,6 +117,7 @@ async def lifespan(app: FastAPI):
     state.auth = AuthSystem()
     state.memory = MemorySystem()
     state.llm = NyxLightLLM()
+    state.llm.start_health_monitor()
     state.chat_bridge = ChatBridge()
     state.overseer = AccountingOverseer()
     state.sessions = SessionManager()
@@ -125,6 +130,7 @@ async def lifespan(app: FastAPI):
         from nyx_light.app import NyxLightApp
         state.nyx_app = NyxLightApp(db_path="data/nyx.db")
         logger.info("NyxLightApp inicijaliziran (svi moduli spojeni)")
+        _sync_deadline_clients()
     except Exception as e:
         logger.warning("NyxLightApp not started: %s", e)
 
@@ -152,9 +158,11 @@ async def lifespan(app: FastAPI):
         state._scheduler = setup_default_scheduler(
             dpo_trainer=state.dpo_trainer,
             backup_manager=state.backup,
+            audit_archive=_audit_archive(),
+            ngram_warmer=_prewarm_ngram_cache,
         )
         asyncio.create_task(state._scheduler.start())
-        logger.info("Noćni scheduler pokrenut (DPO @ 02:00, Backup @ 03:00)")
+        logger.info("Noćni scheduler pokrenut (DPO @ 02:00, Backup @ 03:00, n-gram @ 04:00)")
     except Exception as e:
         logger.warning("Scheduler not started: %s", e)
 
@@ -165,6 +173,10 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    if state.llm:
+        await state.llm.aclose()
+    if state.chat_bridge:
+        await state.chat_bridge.aclose()
     if state.storage:
         state.storage.close()
     logger.info("🌙 Nyx Light — zaustavljeno")
@@ -249,14 +261,10 @@ if static_dir.exists():
 # AUTH DEPENDENCY
 # ═══════════════════════════════════════════
 
-async def get_current_user(request: Request) -> Dict:
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        raise HTTPException(401, "Niste prijavljeni")
-    token = auth_header[7:]
+def _user_from_token(token: str) -> Optional[Dict]:
     auth_token = state.auth.verify_token(token)
     if not auth_token:
-        raise HTTPException(401, "Nevažeći token — prijavite se ponovo")
+        return None
     return {
         "user_id": auth_token.user_id,
         "username": auth_token.username,
@@ -264,9 +272,19 @@ async def get_current_user(request: Request) -> Dict:
         "token": token,
     }
 
+async def get_current_user(request: Request) -> Dict:
+    auth_header = request.headers.get("Authorization", "")
+    if not auth_header.startswith("Bearer "):
+        raise HTTPException(401, "Niste prijavljeni")
+    user = _user_from_token(auth_header[7:])
+    if not user:
+        raise HTTPException(401, "Nevažeći token — prijavite se ponovo")
+    return user
+
 def require_permission(permission: str):
     async def checker(user=Depends(get_current_user)):
-        if not state.auth.has_permission(user["token"], permission):
+        # Token je već verificiran u get_current_user — samo provjera role
+        if permission not in ROLE_PERMISSIONS.get(Role(user["role"]), set()):
             raise HTTPException(403, f"Nemate dozvolu: {permission}")
         return user
     return checker
@@ -288,11 +306,16 @@ async def root():
 
 @app.post("/api/auth/login")
 async def login(req: LoginRequest):
-    result = state.auth.login(req.username, req.password)
+    result = await state.auth.login_async(req.username, req.password)
     if not result or not result.get("ok"):
         raise HTTPException(401, result.get("error", "Neispravno korisničko ime ili lozinka") if result else "Greška pri prijavi")
     return {"token": result["token"], "user": result["user"]}
 
+@app.post("/api/auth/logout")
+async def logout(user=Depends(get_current_user)):
+    state.auth.revoke_token(user["token"])
+    return {"ok": True}
+
 @app.get("/api/auth/me")
 async def auth_me(user=Depends(get_current_user)):
     return user
@@ -363,7 +386,7 @@ async def chat(req: ChatRequest, user=Depends(get_current_user)):
 
             # Dodaj rezultat modula kao kontekst za LLM
             if module_result and module_result.llm_context:
-                context.semantic_facts.append(
+                context.request_notes.append(
                     f"[Modul {route.module} ({route.confidence:.0%}): "
                     f"{module_result.llm_context}]"
                 )
@@ -374,7 +397,7 @@ async def chat(req: ChatRequest, user=Depends(get_current_user)):
                 )
         elif route.confidence > 0.4 and route.module != "general":
             # Srednja confidence — dodaj hint ali ne izvršavaj
-            context.semantic_facts.append(
+            context.request_notes.append(
                 f"[Router: moguć modul '{route.module}' "
                 f"(confidence: {route.confidence:.0%}) — korisnik možda želi ovaj modul]"
             )
@@ -604,7 +627,7 @@ async def ws_chat(ws: WebSocket):
     user = None
     if token and state.auth:
         try:
-            user = state.auth.verify_token(token)
+            user = _user_from_token(token)
         except Exception:
             pass
 
@@ -686,7 +709,7 @@ async def ws_chat(ws: WebSocket):
                         user_id=user_id,
                     )
                     if module_result and module_result.llm_context:
-                        context.semantic_facts.append(
+                        context.request_notes.append(
                             f"[Modul {route.module} ({route.confidence:.0%}): "
                             f"{module_result.llm_context}]"
                         )
@@ -711,18 +734,26 @@ async def ws_chat(ws: WebSocket):
                             })
 
                 elif route.confidence > 0.4 and route.module != "general":
-                    context.semantic_facts.append(
+                    context.request_notes.append(
                         f"[Router: moguć modul '{route.module}' "
                         f"(confidence: {route.confidence:.0%})]"
                     )
             except Exception as e:
                 logger.debug("WS module routing: %s", e)
 
-            # ── 4. Stream LLM response s kontekstom ──
+            # ── 4. Stream LLM response s kontekstom (slot iz reda; pozicija → klijent) ──
             full = ""
-            async for token_str in state.chat_bridge.chat_stream(msg, session_id, context):
-                full += token_str
-                await ws.send_json({"type": "token", "content": token_str})
+            slot = (state.llm_queue.slot(
+                        user_id, on_position=lambda info: ws.send_json({"type": "queue", **info}))
+                    if state.llm_queue else nullcontext())
+            try:
+                async with slot:
+                    async for token_str in state.chat_bridge.chat_stream(msg, session_id, context):
+                        full += token_str
+                        await ws.send_json({"type": "token", "content": token_str})
+            except (RateLimitError, QueueFullError, TimeoutError) as e:
+                await ws.send_json({"type": "error", "content": str(e)})
+                continue
 
             done_msg = {"type": "done", "content": full}
             if module_result:
@@ -814,6 +845,8 @@ async def approve(booking_id: str, user=Depends(require_permission("approve"))):
     ok = state.storage.approve_booking(booking_id, user["user_id"])
     if not ok:
         raise HTTPException(404, "Knjiženje nije pronađeno ili već obrađeno")
+    if state.nyx_app:
+        state.nyx_app.settle_depreciation(booking_id, approved=True)
 
     # Record DPO pair: approval = AI was correct (chosen = rejected = same)
     try:
@@ -856,6 +889,8 @@ async def reject(booking_id: str, req: ApprovalRequest = ApprovalRequest(), user
     ok = state.storage.reject_booking(booking_id, user["user_id"], req.reason)
     if not ok:
         raise HTTPException(404, "Knjiženje nije pronađeno ili već obrađeno")
+    if state.nyx_app:
+        state.nyx_app.settle_depreciation(booking_id, approved=False)
 
     # DPO pair: rejection = AI was completely wrong
     try:
@@ -911,6 +946,8 @@ async def correct(booking_id: str, req: CorrectionRequest, user=Depends(require_
          user["user_id"], booking_id)
     )
     state.storage._conn.commit()
+    if state.nyx_app:
+        state.nyx_app.settle_depreciation(booking_id, approved=True)
 
     # Record in memory system
     state.memory.record_correction(
@@ -992,6 +1029,7 @@ async def create_client(req: ClientRequest, user=Depends(require_permission("man
             (cid, req.name, req.oib or "", req.erp_system)
         )
         state.storage._conn.commit()
+    _sync_deadline_clients([cid])
     return {"id": cid, "name": req.name}
 
 # ═══════════════════════════════════════════
@@ -1062,57 +1100,69 @@ async def upload_document(
 
 @app.post("/api/export")
 async def export_bookings(req: ExportRequest, user=Depends(require_permission("export"))):
-    bookings = state.storage.get_approved_bookings(req.client_id, exported=False)
-    if not bookings:
+    total = state.storage.count_approved_bookings(req.client_id, exported=False)
+    if not total:
         return {"count": 0, "filename": None, "message": "Nema novih odobrenih knjiženja za export"}
 
     export_dir = Path("data/exports") / req.client_id
     export_dir.mkdir(parents=True, exist_ok=True)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
 
+    # Stream iz baze → datoteka; skupljamo samo ID-eve za mark_exported
+    ids: List[str] = []
+
+    def _rows():
+        for b in state.storage.iter_approved_bookings(req.client_id, exported=False):
+            ids.append(b["id"])
+            yield b
+
     if req.format == "cpp_xml":
         filename = f"cpp_export_{ts}.xml"
-        _export_cpp_xml(bookings, export_dir / filename)
+        _export_cpp_xml(_rows(), export_dir / filename)
     elif req.format == "synesis_csv":
         filename = f"synesis_export_{ts}.csv"
-        _export_synesis_csv(bookings, export_dir / filename)
-    elif req.format == "json":
-        filename = f"export_{ts}.json"
-        (export_dir / filename).write_text(json.dumps(bookings, indent=2, ensure_ascii=False, default=str))
+        _export_synesis_csv(_rows(), export_dir / filename)
     else:
         filename = f"export_{ts}.json"
-        (export_dir / filename).write_text(json.dumps(bookings, indent=2, ensure_ascii=False, default=str))
+        _export_json(_rows(), export_dir / filename)
 
     # Mark as exported
-    ids = [b["id"] for b in bookings]
     state.storage.mark_exported(ids)
-    state.storage._log_audit("export", user["user_id"], details=f"{len(bookings)} bookings → {filename}")
+    state.storage._log_audit("export", user["user_id"], details=f"{len(ids)} bookings → {filename}")
 
-    return {"count": len(bookings), "filename": filename, "format": req.format}
+    return {"count": len(ids), "filename": filename, "format": req.format}
 
-def _export_cpp_xml(bookings: List[Dict], path: Path):
+def _export_cpp_xml(bookings: Iterable[Dict], path: Path):
     """Generate CPP-compatible XML export."""
-    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<CPPImport>']
-    for b in bookings:
-        lines.append('  <Knjizenje>')
-        lines.append(f'    <DatumDokumenta>{b.get("datum_dokumenta", "")}</DatumDokumenta>')
-        lines.append(f'    <KontoDuguje>{b.get("konto_duguje", "")}</KontoDuguje>')
-        lines.append(f'    <KontoPotrazuje>{b.get("konto_potrazuje", "")}</KontoPotrazuje>')
-        lines.append(f'    <Iznos>{b.get("iznos", 0):.2f}</Iznos>')
-        lines.append(f'    <Opis>{b.get("opis", "")}</Opis>')
-        lines.append(f'    <OIB>{b.get("oib", "")}</OIB>')
-        lines.append('  </Knjizenje>')
-    lines.append('</CPPImport>')
-    path.write_text('\n'.join(lines), encoding='utf-8')
-
-def _export_synesis_csv(bookings: List[Dict], path: Path):
+    fields = [
+        ("DatumDokumenta", lambda i, b: b.get("datum_dokumenta", "")),
+        ("KontoDuguje", lambda i, b: b.get("konto_duguje", "")),
+        ("KontoPotrazuje", lambda i, b: b.get("konto_potrazuje", "")),
+        ("Iznos", lambda i, b: f"{b.get('iznos', 0):.2f}"),
+        ("Opis", lambda i, b: b.get("opis", "")),
+        ("OIB", lambda i, b: b.get("oib", "")),
+    ]
+    with open_export(path) as f:
+        write_xml_document(f, "CPPImport", bookings, "Knjizenje", fields)
+
+def _export_synesis_csv(bookings: Iterable[Dict], path: Path):
     """Generate Synesis-compatible CSV export."""
-    lines = ['DatumDok;KontoDug;KontoPot;Iznos;Opis;OIB']
-    for b in bookings:
-        lines.append(f'{b.get("datum_dokumenta","")};{b.get("konto_duguje","")};'
-                     f'{b.get("konto_potrazuje","")};{b.get("iznos",0):.2f};'
-                     f'{b.get("opis","")};{b.get("oib","")}')
-    path.write_text('\n'.join(lines), encoding='utf-8')
+    header = ["DatumDok", "KontoDug", "KontoPot", "Iznos", "Opis", "OIB"]
+    with open_export(path) as f:
+        write_csv_rows(f, header, bookings, lambda i, b: [
+            b.get("datum_dokumenta", ""), b.get("konto_duguje", ""),
+            b.get("konto_potrazuje", ""), f"{b.get('iznos', 0):.2f}",
+            b.get("opis", ""), b.get("oib", ""),
+        ])
+
+def _export_json(bookings: Iterable[Dict], path: Path):
+    """Generate plain JSON array export (one booking at a time)."""
+    with open_export(path) as f:
+        f.write("[")
+        for i, b in enumerate(bookings):
+            f.write(",\n  " if i else "\n  ")
+            f.write(json.dumps(b, ensure_ascii=False, default=str))
+        f.write("\n]")
 
 # ═══════════════════════════════════════════
 # DASHBOARD & STATUS
@@ -1225,6 +1275,12 @@ async def create_weekly_backup(user=Depends(require_permission("backup"))):
         return state.backup.create_backup("weekly")
     raise HTTPException(500, "Backup manager nije inicijaliziran")
 
+@app.post("/api/backups/incremental")
+async def create_incremental_backup(user=Depends(require_permission("backup"))):
+    if state.backup:
+        return await asyncio.to_thread(state.backup.create_backup, "manual", "incremental")
+    raise HTTPException(500, "Backup manager nije inicijaliziran")
+
 @app.post("/api/backups/restore/{backup_name}")
 async def restore_backup(backup_name: str, user=Depends(require_permission("backup"))):
     if state.backup:
@@ -1521,6 +1577,33 @@ async def generate_ios(request: Request, user=Depends(get_current_user)):
         data.get("client_id", ""), data.get("partner_oib", ""),
         data.get("datum_od", ""), data.get("datum_do", ""))
 
+@app.post("/api/ios/campaign")
+async def ios_campaign(data: dict, user=Depends(require_permission("export"))):
+    """IOS za sve partnere svih aktivnih klijenata (godišnje usklađivanje)."""
+    from nyx_light.modules.ios_reconciliation.ios import IOSReconciliation
+    datum_do = data.get("datum_do", "")
+    if not datum_do:
+        raise HTTPException(400, "Potreban datum_do (npr. 2026-12-31)")
+    try:
+        date.fromisoformat(datum_do)
+    except (TypeError, ValueError):
+        raise HTTPException(400, "datum_do mora biti datum YYYY-MM-DD")
+    workers = data.get("workers")
+    if workers is not None:
+        try:
+            workers = int(workers)
+        except (TypeError, ValueError):
+            raise HTTPException(400, "workers mora biti cijeli broj")
+    ios = IOSReconciliation(db_path=str(state.storage.db_path))
+    try:
+        # Grupiranje + Excel (process pool) traje — izvan event loopa
+        return await asyncio.to_thread(
+            ios.run_campaign_from_storage, state.storage, datum_do, data.get("datum_od", ""),
+            client_ids=data.get("client_ids"), clients=state.storage.get_active_clients(),
+            workers=workers)
+    finally:
+        ios.close()
+
 @app.post("/api/blagajna/validate")
 async def validate_blagajna(request: Request, user=Depends(get_current_user)):
     data = await request.json()
@@ -1735,6 +1818,14 @@ async def generate_pdv_prijava(data: dict, user=Depends(get_current_user)):
                 pdv_iznos=s.get("pdv_iznos", 0),
                 oib_partnera=s.get("oib_partnera", ""),
             ))
+        # Bez stavki, a zadan klijent → PPO iz odobrenih knjiženja (SQL agregacija)
+        if not stavke and data.get("client_id") and data.get("period"):
+            ppo = engine.calculate_from_storage(
+                state.storage, data["client_id"], data["period"],
+                oib_obveznika=data.get("oib_obveznik", ""),
+                naziv_obveznika=data.get("naziv_obveznik", ""),
+            )
+            return engine.to_dict(ppo)
         # If no stavke but has top-level fields (quick mode)
         if not stavke and data.get("isporuke_25"):
             stavke.append(PDVStavka(
@@ -1752,6 +1843,29 @@ async def generate_pdv_prijava(data: dict, user=Depends(get_current_user)):
     except Exception as e:
         return {"error": str(e), "status": "fallback", "oib": data.get("oib_obveznik", "")}
 
+@app.post("/api/pdv-prijava/batch")
+async def pdv_prijava_batch(data: dict, user=Depends(require_permission("export"))):
+    """PPO za sve aktivne klijente (ili zadane client_ids) za jedan period."""
+    from nyx_light.modules.pdv_prijava import PDVPrijavaEngine
+    period = data.get("period", "")
+    if not period:
+        raise HTTPException(400, "Potreban period (npr. 2026-02 ili 2026-Q1)")
+    rows = state.storage._conn.execute(
+        "SELECT id, name, oib FROM clients WHERE active=1").fetchall()
+    wanted = set(data.get("client_ids") or [])
+    clients = [{"client_id": r[0], "naziv": r[1], "oib": r[2] or ""}
+               for r in rows if not wanted or r[0] in wanted]
+    clients += [{"client_id": c} for c in wanted - {c["client_id"] for c in clients}]
+    engine = PDVPrijavaEngine()
+    t0 = time.perf_counter()
+    results = engine.calculate_batch_from_storage(state.storage, clients, period)
+    return {
+        "period": period,
+        "count": len(results),
+        "seconds": round(time.perf_counter() - t0, 3),
+        "prijave": {cid: engine.to_dict(ppo) for cid, ppo in results.items()},
+    }
+
 # ── JOPPD XML ──
 
 @app.post("/api/joppd/generate-xml")
@@ -1771,7 +1885,7 @@ async def generate_joppd_xml(data: dict, user=Depends(get_current_user)):
             naziv_obveznika=data.get("obveznik_naziv", ""),
         )
         for i, r in enumerate(radnici, 1):
-            obrazac.stavke.append(JOPPDStavka(
+            obrazac.add_stavka(JOPPDStavka(
                 redni_broj=i,
                 oib_primatelja=r.get("oib", ""),
                 ime_prezime=r.get("ime_prezime", ""),
@@ -1842,7 +1956,8 @@ async def report_rdg(data: dict, user=Depends(get_current_user)):
 async def report_bruto_bilanca(data: dict, user=Depends(get_current_user)):
     from nyx_light.modules.reports import ReportGenerator
     gen = ReportGenerator(data.get("firma", ""), data.get("oib", ""))
-    path = gen.generate_bruto_bilanca(data.get("stavke", []), data.get("period", ""))
+    path = gen.generate_bruto_bilanca(data.get("stavke", []), data.get("period", ""),
+                                      format=data.get("format", "xlsx"))
     return {"path": path, "status": "generated"}
 
 @app.post("/api/reports/pdv-recap")
@@ -1859,15 +1974,22 @@ async def audit_export(format: str = "json", period_from: str = "",
                        period_to: str = "", user_filter: str = "",
                        user=Depends(get_current_user)):
     from nyx_light.audit.export import AuditExporter
-    exporter = AuditExporter()
+    # Arhiva čita hladne segmente + vruće baze svih audit izvora
+    exporter = AuditExporter(audit_store=_audit_archive())
+    if format in ("csv", "json_file"):
+        # Streaming: zapisi idu iz baze direktno u datoteku
+        entries = exporter.iter_entries(period_from=period_from, period_to=period_to,
+                                        user=user_filter)
+        if format == "csv":
+            path = exporter.export_csv(entries)
+        else:
+            path = exporter.export_json(entries)
+        return {"path": path, "count": exporter.last_export_count}
     entries = exporter.get_entries(period_from=period_from, period_to=period_to,
                                    user=user_filter)
     if format == "xlsx":
         path = exporter.export_excel(entries)
         return {"path": path, "count": len(entries)}
-    elif format == "csv":
-        path = exporter.export_csv(entries)
-        return {"path": path, "count": len(entries)}
     else:
         return {"entries": entries, "count": len(entries),
                 "summary": exporter.summary(entries)}
@@ -1998,29 +2120,61 @@ async def dashboard_chart_data(period: str = "week", user=Depends(get_current_us
 
 # ── Audit Query ──
 
+def _audit_logger():
+    """Dijeljeni AuditLogger (dugoživuće konekcije, batched appendovi)."""
+    if state.audit is None:
+        from nyx_light.audit import AuditLogger
+        state.audit = AuditLogger()
+    return state.audit
+
+async def _prewarm_ngram_cache():
+    """Noćno: n-gram trie (zakoni, kontni plan, odobreni odgovori) → data/models."""
+    from nyx_light.silicon.speculative_decoder import prewarm_ngram_cache
+    return await asyncio.to_thread(prewarm_ngram_cache)
+
+def _audit_archive():
+    """Dijeljena AuditArchive (segmenti zatvorenih mjeseci svih audit tablica)."""
+    if state.audit_archive is None:
+        from nyx_light.audit.archive import AuditArchive
+        state.audit_archive = AuditArchive()
+    return state.audit_archive
+
+@app.get("/api/audit/archive")
+async def audit_archive_status(user=Depends(require_permission("view_audit"))):
+    """Stanje audit arhive + provjera hash lanca."""
+    archive = _audit_archive()
+    return {"stats": archive.get_stats(), "verify": archive.verify()}
+
+@app.post("/api/audit/archive/roll")
+async def audit_archive_roll(user=Depends(require_permission("backup"))):
+    """Ručno arhiviranje zatvorenih mjeseci (inače noćno u 02:30)."""
+    return await asyncio.to_thread(_audit_archive().roll)
+
 @app.get("/api/audit/query")
 async def audit_query(event_type: str = "", user_filter: str = "",
                       date_from: str = "", date_to: str = "",
                       severity: str = "", limit: int = 50,
-                      offset: int = 0, user=Depends(get_current_user)):
-    """Pretraži audit trail."""
+                      offset: int = 0, before_id: int = 0,
+                      user=Depends(get_current_user)):
+    """Pretraži audit trail. Za sljedeću stranicu proslijedi ``before_id=next_before_id``."""
     try:
-        from nyx_light.audit import AuditLogger
-        audit = AuditLogger()
+        audit = _audit_logger()
         entries = audit.query(
             event_type=event_type, user=user_filter,
             date_from=date_from, date_to=date_to,
-            severity=severity, limit=limit, offset=offset)
+            severity=severity, limit=limit, offset=offset,
+            before_id=before_id)
         stats = audit.get_stats()
-        return {"entries": entries, "total": stats["total_entries"], "stats": stats}
+        next_before_id = entries[-1]["id"] if len(entries) == limit else None
+        return {"entries": entries, "total": stats["total_entries"], "stats": stats,
+                "next_before_id": next_before_id}
     except Exception as e:
         return {"entries": [], "total": 0, "error": str(e)}
 
 @app.get("/api/audit/stats")
 async def audit_stats(user=Depends(get_current_user)):
     try:
-        from nyx_light.audit import AuditLogger
-        return AuditLogger().get_stats()
+        return _audit_logger().get_stats()
     except Exception as e:
         return {"total_entries": 0, "error": str(e)}
 
@@ -2039,7 +2193,9 @@ async def kompenzacije_multilateral(data: dict, user=Depends(get_current_user)):
     result = engine.find_multilateral(stavke_po_tvrtki)
     if result:
         return {"found": True, "sudionici": result.sudionici,
-                "ukupno": result.ukupno_kompenzirano, "lanac": result.lanac}
+                "ukupno": result.ukupno_kompenzirano, "lanac": result.lanac,
+                "ciklusi": result.ciklusi, "ukupno_zatvoreno": result.ukupno_zatvoreno,
+                "optimalno": result.optimalno}
     return {"found": False}
 
 # ═══════════════════════════════════════════
@@ -2160,6 +2316,20 @@ async def gfi_rdg(request: Request, user=Depends(get_current_user)):
     )
     return {"izvjestaj": gen.to_dict(izvj), "xml": gen.to_xml(izvj)}
 
+@app.post("/api/gfi/godisnji")
+async def gfi_godisnji(data: dict, user=Depends(require_permission("export"))):
+    """Bilanca + RDG (XML) za sve aktivne klijente iz bruto bilance knjiženja."""
+    from nyx_light.modules.gfi_xml.aop_mapping import GFIBatch
+    try:
+        godina = int(data.get("godina", 0) or date.today().year - 1)
+    except (TypeError, ValueError):
+        raise HTTPException(400, "godina mora biti cijeli broj")
+    batch = GFIBatch(str(Path("data/exports") / "gfi" / str(godina)))
+    # Bruto bilanca + XML za sve klijente traje — izvan event loopa
+    return await asyncio.to_thread(
+        batch.run_from_storage, state.storage, godina, data.get("client_ids"),
+        clients=state.storage.get_active_clients())
+
 # ═══════════════════════════════════════════
 # LLM QUEUE STATS (Admin)
 # ═══════════════════════════════════════════
@@ -2235,6 +2405,31 @@ async def calculate_depreciation(request: Request, user=Depends(get_current_user
     )
     return result
 
+@app.get("/api/osnovna-sredstva/stanje")
+async def fixed_assets_as_of(datum: str = "", client_id: str = "", user=Depends(get_current_user)):
+    """Stanje registra OS na kraju mjeseca zadanog datuma."""
+    if not state.nyx_app:
+        raise HTTPException(503, "NyxLightApp nije inicijaliziran")
+    datum = datum or datetime.now().strftime("%Y-%m-%d")
+    return state.nyx_app.osnovna_sredstva.get_as_of(datum, client_id or None)
+
+@app.get("/api/osnovna-sredstva/projekcija")
+async def fixed_assets_projection(godina: int = 0, client_id: str = "", user=Depends(get_current_user)):
+    """Projekcija amortizacije do kraja godine (po mjesecima)."""
+    if not state.nyx_app:
+        raise HTTPException(503, "NyxLightApp nije inicijaliziran")
+    return state.nyx_app.osnovna_sredstva.project_year_end(godina, client_id or None)
+
+@app.post("/api/osnovna-sredstva/amortizacija-mjesec")
+async def fixed_assets_monthly(data: dict, user=Depends(get_current_user)):
+    """Amortizacija mjeseca za klijenta → jedan skupni prijedlog knjiženja."""
+    if not state.nyx_app:
+        raise HTTPException(503, "NyxLightApp nije inicijaliziran")
+    client_id = data.get("client_id", "")
+    if not client_id:
+        raise HTTPException(400, "Potreban client_id")
+    return state.nyx_app.run_monthly_depreciation(client_id, data.get("period", ""))
+
 # ═══════════════════════════════════════════
 # MODUL: PAYROLL (full engine)
 # ═══════════════════════════════════════════
@@ -2250,6 +2445,26 @@ async def payroll_full(request: Request, user=Depends(get_current_user)):
         return result if isinstance(result, dict) else {"raw": str(result)}
     return {"error": "Potrebni podaci zaposlenika (bruto, osobni_odbitak, prirez...)"}
 
+@app.post("/api/payroll/batch-calculate")
+async def payroll_batch(request: Request, user=Depends(get_current_user)):
+    """Obračun cijele tvrtke: {"employees": [...]} ili {"columns": {...}}."""
+    data = await request.json()
+    from nyx_light.modules.payroll import PayrollEngine, Employee
+    engine = PayrollEngine()
+    if data.get("columns"):
+        batch = engine.calculate_batch(data["columns"])
+    elif data.get("employees"):
+        batch = engine.calculate_batch([Employee(**e) for e in data["employees"]])
+    else:
+        return {"error": "Potrebna lista zaposlenika (employees) ili stupci (columns)"}
+    return {
+        "count": len(batch),
+        "results": batch.rows(),
+        "joppd_totals": batch.joppd_totals(),
+        "warnings": batch.warnings,
+        "requires_approval": True,
+    }
+
 # ═══════════════════════════════════════════
 # MODUL: FAKTURIRANJE
 # ═══════════════════════════════════════════
@@ -2417,6 +2632,22 @@ async def kpi_calculate(request: Request, user=Depends(get_current_user)):
     result = dashboard.calculate(data)
     return result if isinstance(result, dict) else {"raw": str(result)}
 
+@app.get("/api/kpi/trend")
+async def kpi_trend(periods: str = "", years: int = 5, client_id: str = "",
+                    user=Depends(get_current_user)):
+    """KPI trend iz knjiženja — zadani periodi ("2024,2025-Q1") ili zadnjih N zatvorenih godina."""
+    from nyx_light.modules.kpi.engine import KPIEngine
+    if periods:
+        lista = [p.strip() for p in periods.split(",") if p.strip()]
+    else:
+        god = date.today().year
+        lista = [str(y) for y in range(god - years, god)]
+    t0 = time.perf_counter()
+    engine = KPIEngine()
+    trend = engine.trend(state.storage, lista, [client_id] if client_id else None)
+    return {"periods": lista, "clients": trend, "count": len(trend),
+            "seconds": round(time.perf_counter() - t0, 3), "stats": engine.get_stats()}
+
 # ═══════════════════════════════════════════
 # MODUL: MANAGEMENT ACCOUNTING
 # ═══════════════════════════════════════════
@@ -2485,10 +2716,45 @@ async def client_mgmt_list(user=Depends(get_current_user)):
 @app.get("/api/deadlines/upcoming")
 async def deadlines_upcoming(days: int = 30, user=Depends(get_current_user)):
     from nyx_light.modules.deadlines import DeadlineTracker
-    tracker = DeadlineTracker()
-    result = tracker.get_upcoming(days=days)
+    tracker = state.nyx_app.deadlines if state.nyx_app else DeadlineTracker()
+    result = tracker.get_upcoming(days_ahead=days)
     return result if isinstance(result, dict) else {"deadlines": result if isinstance(result, list) else []}
 
+def _sync_deadline_clients(client_ids: Optional[List[str]] = None):
+    """Klijenti iz baze → kalendar rokova (pri pokretanju i kad se klijent doda)."""
+    if not state.nyx_app:
+        return
+    if client_ids is None:
+        client_ids = list(state.storage.get_active_clients())
+    state.nyx_app.deadline_calendar.sync_clients({cid: None for cid in client_ids})
+
+@app.get("/api/deadlines/calendar")
+async def deadlines_calendar(days: int = 7, client_id: str = "", user=Depends(get_current_user)):
+    """Rokovi svih klijenata ureda u idućih N dana — jedan indeksirani upit."""
+    if not state.nyx_app:
+        raise HTTPException(503, "NyxLightApp nije inicijaliziran")
+    items = state.nyx_app.get_office_deadlines(days, [client_id] if client_id else None)
+    return {"days": days, "count": len(items), "items": items}
+
+@app.get("/api/deadlines/overdue")
+async def deadlines_overdue(user=Depends(get_current_user)):
+    if not state.nyx_app:
+        raise HTTPException(503, "NyxLightApp nije inicijaliziran")
+    items = state.nyx_app.get_overdue_deadlines()
+    return {"count": len(items), "items": items}
+
+@app.post("/api/deadlines/complete")
+async def deadlines_complete(data: dict, user=Depends(get_current_user)):
+    """Označi rok klijenta ispunjenim (ažurira jedan redak kalendara)."""
+    if not state.nyx_app:
+        raise HTTPException(503, "NyxLightApp nije inicijaliziran")
+    client_id, deadline = data.get("client_id", ""), data.get("deadline", "")
+    if not client_id or not deadline:
+        raise HTTPException(400, "Potrebni client_id i deadline")
+    state.nyx_app.client_deadlines.mark_completed(
+        client_id, deadline, data.get("completed_date") or datetime.now().strftime("%Y-%m-%d"))
+    return {"status": "completed", "client_id": client_id, "deadline": deadline}
+
 # ═══════════════════════════════════════════
 # MODUL: ERACUNI PARSER
 # ═══════════════════════════════════════════
@@ -18,6 +18,8 @@ Svaki tip dokumenta ima svoj put:
 """
 
 import logging
+from datetime import datetime
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 # Core
@@ -77,7 +79,8 @@ from nyx_light.modules.fakturiranje import FakturiranjeEngine
 from nyx_light.modules.likvidacija import LikvidacijaEngine
 
 # Moduli — Grupa F
-from nyx_light.modules.deadlines import DeadlineTracker
+from nyx_light.modules.deadlines import DeadlineTracker, ClientDeadlineManager
+from nyx_light.modules.deadlines.calendar import DeadlineCalendar, client_profile
 
 # Parseri za sekundarne ERP sustave
 from nyx_light.modules.eracuni_parser import ERacuniParser, PantheonParser
@@ -134,9 +137,9 @@ class NyxLightApp:
         self.bank_parser = BankStatementParser()        # A4
         self.blagajna = BlagajnaValidator()             # A5
         self.putni_nalozi = PutniNalogChecker()         # A6
-        self.osnovna_sredstva = OsnovnaSredstvaEngine()  # A7
+        self.osnovna_sredstva = OsnovnaSredstvaEngine(db_path or ":memory:")  # A7
         self.accruals = AccrualsChecklist()              # A8
-        self.ios = IOSReconciliation()                  # A9
+        self.ios = IOSReconciliation(str(Path(export_dir) / "ios"), db_path=db_path)  # A9
 
         # ── Grupa B — Plaće ──
         self.payroll = PayrollEngine()
@@ -175,6 +178,8 @@ class NyxLightApp:
 
         # ── Grupa F — Rokovi ──
         self.deadlines = DeadlineTracker()
+        self.deadline_calendar = DeadlineCalendar(db_path or ":memory:", tracker=self.deadlines)
+        self.client_deadlines = ClientDeadlineManager(calendar=self.deadline_calendar)
 
         # ── Parseri za sekundarne ERP ──
         self.eracuni_parser = ERacuniParser()
@@ -196,7 +201,9 @@ class NyxLightApp:
     # ════════════════════════════════════════════════════
 
     def register_client(self, config: ClientConfig) -> Dict[str, Any]:
-        return self.registry.register(config)
+        result = self.registry.register(config)
+        self.deadline_calendar.sync_client(config.id, client_profile(config))
+        return result
 
     def get_client_erp(self, client_id: str) -> str:
         return self.registry.get_erp_target(client_id)
@@ -375,22 +382,28 @@ class NyxLightApp:
     # A7: OSNOVNA SREDSTVA
     # ════════════════════════════════════════════════════
 
-    def add_fixed_asset(self, asset_data: Dict) -> Dict[str, Any]:
+    def add_fixed_asset(self, asset_data: Dict, client_id: str = "") -> Dict[str, Any]:
+        if client_id:
+            asset_data = {**asset_data, "client_id": client_id}
         return self.osnovna_sredstva.add_asset(asset_data)
 
-    def run_monthly_depreciation(self, client_id: str) -> Dict[str, Any]:
-        """Mjesečna amortizacija → Pipeline za svako sredstvo."""
+    def run_monthly_depreciation(self, client_id: str, period: str = "") -> Dict[str, Any]:
+        """Mjesečna amortizacija svih sredstava klijenta → jedan prijedlog u Pipeline."""
         erp = self.get_client_erp(client_id)
-        depr = self.osnovna_sredstva.calculate_monthly_depreciation()
-        proposals = []
-        for d in depr:
-            p = self.pipeline.from_depreciation(
-                d["naziv"], d["mjesecna_amortizacija"], client_id, erp
-            )
-            proposals.append(p)
-        if proposals:
-            return self.pipeline.submit_batch(proposals)
-        return {"status": "empty", "message": "Nema sredstava za amortizaciju"}
+        period = period or datetime.now().strftime("%Y-%m")
+        posting = self.osnovna_sredstva.prepare_monthly_posting(period, client_id)
+        if posting["already_posted"]:
+            return {"status": "already_posted", "period": period,
+                    "id": posting["proposal_id"],
+                    "message": f"Amortizacija za {period} je već predložena"}
+        if not posting["stavke"]:
+            return {"status": "empty", "message": "Nema sredstava za amortizaciju"}
+        proposal = self.pipeline.from_depreciation_batch(posting, client_id, erp)
+        result = self._submit(proposal)
+        # Mjesec je rezerviran; ispravak se knjiži tek kad računovođa odobri
+        self.osnovna_sredstva.reserve_posting(posting, client_id, proposal.id)
+        return {**result, "period": period, "submitted": 1,
+                "batch_size": len(posting["stavke"])}
 
     # ════════════════════════════════════════════════════
     # A8: OBRAČUNSKE STAVKE
@@ -408,6 +421,15 @@ class NyxLightApp:
         proposal = self.pipeline.from_ios(ios_data, client_id, erp)
         return self._submit(proposal)
 
+    def run_ios_campaign(self, datum_do: str, datum_od: str = "",
+                         workers: Optional[int] = None) -> Dict[str, Any]:
+        """Godišnji IOS za sve partnere svih klijenata iz spremljenih knjiženja."""
+        if not self._persistent:
+            return {"error": "IOS kampanja zahtijeva perzistentni pipeline (db_path)"}
+        clients = {c.id: {"naziv": c.naziv, "oib": c.oib} for c in self.registry.list_all()}
+        items = self._persistent.db.iter_open_items(datum_do, datum_od=datum_od)
+        return self.ios.run_campaign(items, datum_do, datum_od, clients=clients, workers=workers)
+
     # ════════════════════════════════════════════════════
     # B: PLAĆE
     # ════════════════════════════════════════════════════
@@ -422,13 +444,8 @@ class NyxLightApp:
         erp = self.get_client_erp(client_id)
         client = self.registry.get(client_id)
 
-        results = []
-        proposals = []
-        for emp in employees:
-            pr = self.payroll.calculate(emp)
-            results.append(pr)
-            p = self.pipeline.from_payroll(pr, client_id, erp)
-            proposals.append(p)
+        results = self.payroll.calculate_batch(employees).to_results()
+        proposals = [self.pipeline.from_payroll(pr, client_id, erp) for pr in results]
 
         batch_result = self.pipeline.submit_batch(proposals)
 
@@ -465,6 +482,22 @@ class NyxLightApp:
         ppo = self.pdv.calculate(stavke, oib, naziv, mjesecna=mjesecna)
         return self.pdv.to_dict(ppo)
 
+    def prepare_pdv_prijave_batch(self, period: str) -> Dict[str, Any]:
+        """PPO za sve PDV obveznike iz registra, iz spremljenih knjiženja.
+
+        ``period`` "2026-02" → mjesečni obveznici, "2026-Q1" → tromjesečni.
+        """
+        if not self._persistent:
+            return {"error": "PPO iz knjiženja zahtijeva perzistentni pipeline (db_path)"}
+        clients = self.registry.list_pdv_quarterly() if "-Q" in period \
+            else self.registry.list_pdv_monthly()
+        results = self.pdv.calculate_batch_from_storage(
+            self._persistent.db,
+            [{"client_id": c.id, "oib": c.oib, "naziv": c.naziv} for c in clients],
+            period,
+        )
+        return {cid: self.pdv.to_dict(ppo) for cid, ppo in results.items()}
+
     # ════════════════════════════════════════════════════
     # C: POREZ NA DOBIT (PD obrazac)
     # ════════════════════════════════════════════════════
@@ -613,6 +646,17 @@ class NyxLightApp:
             novcani_tokovi=novcani_tokovi,
         )
 
+    def generate_gfi_batch(self, godina: int,
+                           client_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Godišnji GFI (bilanca + RDG XML) za sve klijente iz spremljenih knjiženja."""
+        from nyx_light.modules.gfi_xml.aop_mapping import GFIBatch
+
+        if not self._persistent:
+            return {"error": "GFI batch zahtijeva perzistentni pipeline (db_path)"}
+        clients = {c.id: {"naziv": c.naziv, "oib": c.oib} for c in self.registry.list_all()}
+        batch = GFIBatch(str(self.exporter.export_dir / "gfi" / str(godina)))
+        return batch.run_from_storage(self._persistent.db, godina, client_ids, clients=clients)
+
     # ════════════════════════════════════════════════════
     # C6: INTRASTAT
     # ════════════════════════════════════════════════════
@@ -671,6 +715,13 @@ class NyxLightApp:
         """Izračunaj KPI pokazatelje za klijenta."""
         return self.kpi.calculate_all(financial_data)
 
+    def kpi_trend(self, periods: List[str], client_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """KPI trend za sve (ili zadane) klijente iz spremljenih knjiženja, s cacheom perioda."""
+        if not self._persistent:
+            return {"error": "KPI iz knjiženja zahtijeva perzistentni pipeline (db_path)"}
+        from nyx_light.modules.kpi.engine import KPIEngine
+        return KPIEngine().trend(self._persistent.db, periods, client_ids)
+
     # ════════════════════════════════════════════════════
     # D: GFI PRIPREMA
     # ════════════════════════════════════════════════════
@@ -692,21 +743,43 @@ class NyxLightApp:
     def approve(self, proposal_id: str, user_id: str) -> Dict[str, Any]:
         """Računovođa odobrava prijedlog."""
         if self._persistent:
-            return self._persistent.approve(proposal_id, user_id)
-        return self.pipeline.approve(proposal_id, user_id)
+            result = self._persistent.approve(proposal_id, user_id)
+        else:
+            result = self.pipeline.approve(proposal_id, user_id)
+        if "error" not in result:
+            self.settle_depreciation(proposal_id, approved=True)
+        return result
 
     def approve_batch(self, proposal_ids: List[str], user_id: str) -> List[Dict]:
         return [self.approve(pid, user_id) for pid in proposal_ids]
 
     def correct(self, proposal_id: str, user_id: str, corrections: Dict) -> Dict:
         if self._persistent:
-            return self._persistent.correct(proposal_id, user_id, corrections)
-        return self.pipeline.correct(proposal_id, user_id, corrections)
+            result = self._persistent.correct(proposal_id, user_id, corrections)
+        else:
+            result = self.pipeline.correct(proposal_id, user_id, corrections)
+        if "error" not in result:
+            self.settle_depreciation(proposal_id, approved=True)
+        return result
 
     def reject(self, proposal_id: str, user_id: str, reason: str = "") -> Dict:
         if self._persistent:
-            return self._persistent.reject(proposal_id, user_id, reason)
-        return self.pipeline.reject(proposal_id, user_id, reason)
+            result = self._persistent.reject(proposal_id, user_id, reason)
+        else:
+            result = self.pipeline.reject(proposal_id, user_id, reason)
+        if "error" not in result:
+            self.settle_depreciation(proposal_id, approved=False)
+        return result
+
+    def settle_depreciation(self, proposal_id: str, approved: bool) -> bool:
+        """Zaključi rezervirani mjesec amortizacije nakon odluke računovođe.
+
+        Odobreno → ispravak po sredstvu se ažurira; odbijeno → mjesec se
+        oslobađa za novi prijedlog. Ostali prijedlozi se ignoriraju.
+        """
+        if approved:
+            return self.osnovna_sredstva.confirm_posting(proposal_id)
+        return self.osnovna_sredstva.release_posting(proposal_id)
 
     def export_to_erp(
         self, client_id: str, fmt: str = ""
@@ -839,6 +912,15 @@ class NyxLightApp:
     def get_upcoming_deadlines(self, days: int = 14) -> List[Dict]:
         return self.deadlines.get_upcoming(days)
 
+    def get_office_deadlines(self, days: int = 7,
+                             client_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Rokovi svih klijenata u idućih N dana (materijalizirani kalendar)."""
+        return self.deadline_calendar.upcoming(days, client_ids=client_ids)
+
+    def get_overdue_deadlines(self, client_ids: Optional[List[str]] = None) -> List[Dict]:
+        return self.client_deadlines.get_all_overdue(
+            client_ids if client_ids is not None else self.deadline_calendar.client_ids)
+
     def search_konto(self, keyword: str) -> List[Dict]:
         return suggest_konto_by_keyword(keyword)
 
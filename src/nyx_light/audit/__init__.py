@@ -11,31 +11,68 @@ Zahtjevi:
   - Export za reviziju (Excel, CSV, JSON)
 """
 
+import atexit
+import itertools
 import json
 import logging
 import sqlite3
+import threading
 import time
 from datetime import datetime, date, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 logger = logging.getLogger("nyx_light.audit")
 
 # Re-export
 from .export import AuditExporter
+from .archive import AuditArchive, AuditSource
 
 
 class AuditLogger:
-    """Append-only audit trail za sve operacije."""
+    """Append-only audit trail za sve operacije.
 
-    def __init__(self, db_path: str = "data/audit.db"):
+    Konekcije su dugoživuće (jedna po dretvi, WAL). ``log`` puni buffer
+    koji se commita u batchu (svakih ``flush_interval`` s ili kad se
+    skupi ``batch_size`` zapisa); security/critical eventi i svako
+    čitanje (query/count/stats) prvo sinkrono flushaju buffer.
+    """
+
+    SYNC_EVENT_TYPES = {"security"}
+    SYNC_SEVERITIES = {"critical"}
+
+    def __init__(self, db_path: str = "data/audit.db",
+                 batch_size: int = 200, flush_interval: float = 1.0):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._buffer: List[tuple] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
         self._init_db()
+        atexit.register(self.flush)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Dugoživuća konekcija za trenutnu dretvu."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")  # Append-only
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
 
     def _init_db(self):
-        conn = sqlite3.connect(str(self.db_path))
-        conn.execute("PRAGMA journal_mode=WAL")  # Append-only
+        conn = self._conn()
         conn.execute("""
             CREATE TABLE IF NOT EXISTS audit_log (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -55,34 +92,94 @@ class AuditLogger:
             CREATE INDEX IF NOT EXISTS idx_audit_time ON audit_log(timestamp)
         """)
         conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_audit_type ON audit_log(event_type)
+            CREATE INDEX IF NOT EXISTS idx_audit_type_time ON audit_log(event_type, timestamp)
         """)
         conn.execute("""
-            CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_log(user)
+            CREATE INDEX IF NOT EXISTS idx_audit_user_time ON audit_log(user, timestamp)
         """)
+        # Stari jednostupčani indeksi su prefiksi kompozitnih
+        conn.execute("DROP INDEX IF EXISTS idx_audit_type")
+        conn.execute("DROP INDEX IF EXISTS idx_audit_user")
         conn.commit()
-        conn.close()
 
     def log(self, event_type: str, action: str, user: str = "system",
             client_id: str = "", details: Optional[Dict] = None,
             ip_address: str = "", session_id: str = "",
             booking_id: str = "", severity: str = "info"):
-        """Zapiši audit event."""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.execute(
-            """INSERT INTO audit_log
-               (timestamp, event_type, user, client_id, action, details,
-                ip_address, session_id, booking_id, severity)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                datetime.now(timezone.utc).isoformat(),
-                event_type, user, client_id, action,
-                json.dumps(details or {}, ensure_ascii=False),
-                ip_address, session_id, booking_id, severity,
-            )
+        """Zapiši audit event (buffered; security/critical odmah)."""
+        row = (
+            datetime.now(timezone.utc).isoformat(),
+            event_type, user, client_id, action,
+            json.dumps(details or {}, ensure_ascii=False),
+            ip_address, session_id, booking_id, severity,
         )
-        conn.commit()
-        conn.close()
+        with self._lock:
+            self._buffer.append(row)
+            pending = len(self._buffer)
+
+        if (event_type in self.SYNC_EVENT_TYPES or severity in self.SYNC_SEVERITIES
+                or pending >= self.batch_size or self.flush_interval <= 0):
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def flush(self) -> int:
+        """Commitaj sve bufferirane zapise u jednoj transakciji.
+
+        Ako INSERT/commit ne uspije, zapisi se vraćaju na početak buffera
+        (redoslijed ostaje) i greška se prosljeđuje — ništa se ne gubi.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            conn = self._conn()
+            try:
+                conn.executemany(
+                    """INSERT INTO audit_log
+                       (timestamp, event_type, user, client_id, action, details,
+                        ip_address, session_id, booking_id, severity)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    rows,
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                with self._lock:
+                    self._buffer[:0] = rows
+                raise
+            return len(rows)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None or self._closed:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="audit-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error("Audit flush: %s", e)
+
+    def close(self):
+        """Flushaj buffer i zatvori sve konekcije."""
+        self._closed = True
+        self._wakeup.set()
+        self.flush()
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+        atexit.unregister(self.flush)
 
     def log_login(self, user: str, ip: str = "", success: bool = True):
         self.log("auth", "login_success" if success else "login_failed",
@@ -111,16 +208,11 @@ class AuditLogger:
     def log_security(self, action: str, user: str = "", details: Optional[Dict] = None):
         self.log("security", action, user=user, details=details, severity="critical")
 
-    def query(self, event_type: str = "", user: str = "",
-              date_from: str = "", date_to: str = "",
-              severity: str = "", limit: int = 100,
-              offset: int = 0) -> List[Dict]:
-        """Pretraži audit log."""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row
-
+    @staticmethod
+    def _where(event_type: str = "", user: str = "", date_from: str = "",
+               date_to: str = "", severity: str = "", before_id: int = 0):
         conditions = []
-        params = []
+        params: List[Any] = []
 
         if event_type:
             conditions.append("event_type = ?")
@@ -137,41 +229,73 @@ class AuditLogger:
         if severity:
             conditions.append("severity = ?")
             params.append(severity)
+        if before_id:
+            conditions.append("id < ?")
+            params.append(before_id)
 
         where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
-        sql = f"SELECT * FROM audit_log {where} ORDER BY id DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
+        return where, params
+
+    def query(self, event_type: str = "", user: str = "",
+              date_from: str = "", date_to: str = "",
+              severity: str = "", limit: int = 100,
+              offset: int = 0, before_id: int = 0) -> List[Dict]:
+        """Pretraži audit log.
 
-        rows = conn.execute(sql, params).fetchall()
-        conn.close()
+        Za duboke stranice koristi keyset paginaciju: ``before_id`` = id
+        zadnjeg zapisa s prethodne stranice (``id < ?`` umjesto OFFSET).
+        """
+        self.flush()
+        where, params = self._where(event_type, user, date_from, date_to,
+                                    severity, before_id)
+        sql = f"SELECT * FROM audit_log {where} ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        if offset and not before_id:
+            sql += " OFFSET ?"
+            params.append(offset)
 
+        rows = self._conn().execute(sql, params).fetchall()
         return [dict(r) for r in rows]
 
+    def iter_entries(self, event_type: str = "", user: str = "",
+                     date_from: str = "", date_to: str = "",
+                     severity: str = "", chunk_size: int = 1000) -> Iterator[Dict]:
+        """Streaming čitanje (najnoviji prvi) u keyset chunkovima."""
+        before_id = 0
+        while True:
+            chunk = self.query(event_type, user, date_from, date_to, severity,
+                               limit=chunk_size, before_id=before_id)
+            yield from chunk
+            if len(chunk) < chunk_size:
+                return
+            before_id = chunk[-1]["id"]
+
+    def get_entries(self, period_from: str = "", period_to: str = "",
+                    user: str = "", action: str = "", client_id: str = "",
+                    module: str = "", limit: int = 10000) -> List[Dict]:
+        """Sučelje za AuditExporter (audit_store); modul = event_type."""
+        entries = self.iter_entries(event_type=module, user=user,
+                                    date_from=period_from, date_to=period_to)
+        if action or client_id:
+            entries = (e for e in entries
+                       if (not action or e["action"] == action)
+                       and (not client_id or e["client_id"] == client_id))
+        return list(itertools.islice(entries, limit))
+
     def count(self, event_type: str = "", date_from: str = "", date_to: str = "") -> int:
-        conn = sqlite3.connect(str(self.db_path))
-        conditions = []
-        params = []
-        if event_type:
-            conditions.append("event_type = ?")
-            params.append(event_type)
-        if date_from:
-            conditions.append("timestamp >= ?")
-            params.append(date_from)
-        if date_to:
-            conditions.append("timestamp <= ?")
-            params.append(date_to)
-        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
-        result = conn.execute(f"SELECT COUNT(*) FROM audit_log {where}", params).fetchone()
-        conn.close()
+        self.flush()
+        where, params = self._where(event_type, date_from=date_from, date_to=date_to)
+        result = self._conn().execute(
+            f"SELECT COUNT(*) FROM audit_log {where}", params).fetchone()
         return result[0]
 
     def get_stats(self) -> Dict[str, Any]:
-        conn = sqlite3.connect(str(self.db_path))
+        self.flush()
+        conn = self._conn()
         total = conn.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0]
         types = conn.execute(
             "SELECT event_type, COUNT(*) as cnt FROM audit_log GROUP BY event_type"
         ).fetchall()
-        conn.close()
         return {
             "total_entries": total,
             "by_type": {t[0]: t[1] for t in types},
@@ -0,0 +1,343 @@
+"""
+Nyx Light — Vremenski particionirana arhiva audit traga
+
+Audit tablice (AuditLogger, SQLiteStorage.audit_log, AuthManager audit_log)
+rastu zauvijek u "vrućim" bazama koje BackupManager svaku noć kopira.
+Arhiva zatvorene mjesece seli u komprimirane, read-only segmente; u vrućoj
+bazi ostaje samo tekući period.
+
+Struktura:
+    data/audit_archive/
+      index.json                      ← popis segmenata + hash lanac
+      <izvor>/<YYYY-MM>_<nnn>.jsonl.gz
+
+Svaki segment u indeksu ima raspon vremena/ID-eva, skup korisnika i
+akcija (za preskakanje segmenata pri filtriranju), SHA-256 sadržaja i
+``chain`` = SHA-256(prethodni_chain + sha256) — izmjena ili brisanje
+bilo kojeg segmenta lomi lanac (``verify``).
+
+Prema Zakonu o računovodstvu (NN 78/15-114/22), čl. 10 — revizijski trag
+se čuva, samo se premješta u hladnu pohranu.
+"""
+
+import collections
+import gzip
+import hashlib
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import stat
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("nyx_light.audit.archive")
+
+ARCHIVE_DIR = Path("data/audit_archive")
+GENESIS = "0" * 64
+
+
+@dataclass
+class AuditSource:
+    """Jedna audit tablica: gdje je i kako se njeni stupci mapiraju."""
+    name: str
+    db_path: str
+    table: str = "audit_log"
+    id_col: str = "id"
+    ts_col: str = "timestamp"
+    # unified ključ → stupac u izvornoj tablici
+    columns: Dict[str, str] = field(default_factory=dict)
+
+    def normalize(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {"source": self.name, "id": row.get(self.id_col),
+                 "timestamp": row.get(self.ts_col, "")}
+        for key, col in self.columns.items():
+            entry[key] = row.get(col, "")
+        return entry
+
+
+DEFAULT_SOURCES = [
+    AuditSource("audit", "data/audit.db", columns={
+        "user": "user", "action": "action", "module": "event_type",
+        "client_id": "client_id", "details": "details",
+        "ip_address": "ip_address", "session_id": "session_id",
+        "risk_level": "severity",
+    }),
+    AuditSource("storage", "data/memory_db/nyx_light.db", ts_col="created_at", columns={
+        "user": "user_id", "action": "action", "details": "details",
+    }),
+    AuditSource("auth", "data/auth.db", columns={
+        "user": "username", "action": "action", "details": "details",
+        "ip_address": "ip_address",
+    }),
+]
+# GeneralLedger.audit_log nije izvor: aplikacija ledger drži samo u :memory:
+# (nema datoteke koju backup kopira). Ledger s datotekom dodaje se preko
+# ``sources=`` kao AuditSource("ledger", path, id_col="audit_id", ...).
+
+
+def _sort_key(ts: str) -> str:
+    """Usporedivi ključ za ISO i SQLite datetime formate."""
+    return (ts or "")[:19].replace("T", " ")
+
+
+class AuditArchive:
+    """Rolanje zatvorenih mjeseci u segmente + transparentno čitanje preko svih."""
+
+    def __init__(self, archive_dir: str = str(ARCHIVE_DIR),
+                 sources: Optional[List[AuditSource]] = None):
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.sources = list(sources if sources is not None else DEFAULT_SOURCES)
+        self._index_path = self.archive_dir / "index.json"
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    # ── Indeks ──
+
+    def _load_index(self) -> Dict[str, Any]:
+        if self._index_path.exists():
+            return json.loads(self._index_path.read_text())
+        return {"segments": []}
+
+    def _save_index(self):
+        tmp = self._index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._index, indent=2, ensure_ascii=False))
+        os.replace(tmp, self._index_path)
+
+    @property
+    def segments(self) -> List[Dict[str, Any]]:
+        return self._index["segments"]
+
+    def add_source(self, source: AuditSource):
+        self.sources.append(source)
+
+    # ── Rolanje ──
+
+    def roll(self, current_period: str = "") -> Dict[str, Any]:
+        """Arhiviraj sve zatvorene mjesece (< current_period, default tekući mjesec)."""
+        current_period = current_period or datetime.now().strftime("%Y-%m")
+        created = []
+        with self._lock:
+            for source in self.sources:
+                if not Path(source.db_path).exists():
+                    continue
+                try:
+                    created.extend(self._roll_source(source, current_period))
+                except sqlite3.Error as e:
+                    logger.error("Audit arhiva %s: %s", source.name, e)
+
+        rows = sum(s["rows"] for s in created)
+        logger.info("Audit arhiva: %d segmenata, %d zapisa premješteno", len(created), rows)
+        return {"segments_created": len(created), "rows_archived": rows,
+                "periods": sorted({s["period"] for s in created})}
+
+    def _roll_source(self, source: AuditSource, current_period: str) -> List[Dict]:
+        conn = sqlite3.connect(source.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+                                (source.table,)).fetchone():
+                return []
+            periods = [r[0] for r in conn.execute(
+                f"SELECT DISTINCT substr({source.ts_col}, 1, 7) FROM {source.table} "
+                f"WHERE substr({source.ts_col}, 1, 7) < ? AND {source.ts_col} != '' "
+                f"ORDER BY 1", (current_period,))]
+            # Indeks se sprema PRIJE brisanja iz vruće baze; ako je prošli roll
+            # pao između, ovdje se već arhivirani redovi samo počiste.
+            for seg in self.segments:
+                if seg["source"] == source.name:
+                    self._delete_archived(conn, source, seg)
+            created = []
+            for period in periods:
+                seg = self._write_segment(conn, source, period)
+                if seg:
+                    self._save_index()
+                    self._delete_archived(conn, source, seg)
+                    created.append(seg)
+            return created
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _delete_archived(conn: sqlite3.Connection, source: AuditSource, seg: Dict):
+        conn.execute(
+            f"DELETE FROM {source.table} WHERE substr({source.ts_col}, 1, 7) = ? "
+            f"AND {source.id_col} BETWEEN ? AND ?",
+            (seg["period"], seg["min_id"], seg["max_id"]))
+        conn.commit()
+
+    def _write_segment(self, conn: sqlite3.Connection, source: AuditSource,
+                       period: str) -> Optional[Dict[str, Any]]:
+        seq = sum(1 for s in self.segments
+                  if s["source"] == source.name and s["period"] == period)
+        rel = f"{source.name}/{period}_{seq:03d}.jsonl.gz"
+        path = self.archive_dir / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():  # siroče od prekinutog rolla (nije u indeksu)
+            path.unlink()
+
+        cursor = conn.execute(
+            f"SELECT * FROM {source.table} WHERE substr({source.ts_col}, 1, 7) = ? "
+            f"ORDER BY {source.id_col}", (period,))
+        digest = hashlib.sha256()
+        rows, min_id, max_id = 0, None, None
+        min_ts, max_ts = "", ""
+        users, actions = set(), set()
+        with gzip.open(path, "wb") as f:
+            while True:
+                batch = cursor.fetchmany(1000)
+                if not batch:
+                    break
+                for r in batch:
+                    row = dict(r)
+                    line = (json.dumps(row, ensure_ascii=False, default=str) + "\n").encode()
+                    digest.update(line)
+                    f.write(line)
+                    rows += 1
+                    rid, ts = row[source.id_col], _sort_key(row[source.ts_col])
+                    min_id = rid if min_id is None else min(min_id, rid)
+                    max_id = rid if max_id is None else max(max_id, rid)
+                    min_ts = ts if not min_ts else min(min_ts, ts)
+                    max_ts = max(max_ts, ts)
+                    entry = source.normalize(row)
+                    users.add(str(entry.get("user") or ""))
+                    actions.add(str(entry.get("action") or ""))
+        if not rows:
+            path.unlink()
+            return None
+        os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+        sha = digest.hexdigest()
+        prev = self.segments[-1]["chain"] if self.segments else GENESIS
+        seg = {
+            "source": source.name, "period": period, "file": rel,
+            "rows": rows, "min_id": min_id, "max_id": max_id,
+            "min_ts": min_ts, "max_ts": max_ts,
+            "users": sorted(users), "actions": sorted(actions),
+            "sha256": sha, "prev": prev,
+            "chain": hashlib.sha256((prev + sha).encode()).hexdigest(),
+            "size_bytes": path.stat().st_size,
+            "created_at": datetime.now().isoformat(),
+        }
+        self.segments.append(seg)
+        return seg
+
+    # ── Provjera ──
+
+    def verify(self) -> Dict[str, Any]:
+        """Provjeri hash lanac i sadržaj svih segmenata."""
+        prev = GENESIS
+        errors = []
+        for seg in self.segments:
+            path = self.archive_dir / seg["file"]
+            if not path.exists():
+                errors.append(f"{seg['file']}: nedostaje")
+                prev = seg["chain"]
+                continue
+            digest = hashlib.sha256()
+            with gzip.open(path, "rb") as f:
+                for line in f:
+                    digest.update(line)
+            sha = digest.hexdigest()
+            if sha != seg["sha256"]:
+                errors.append(f"{seg['file']}: sadržaj izmijenjen")
+            if seg["prev"] != prev:
+                errors.append(f"{seg['file']}: prekinut lanac")
+            if hashlib.sha256((prev + sha).encode()).hexdigest() != seg["chain"]:
+                errors.append(f"{seg['file']}: neispravan chain hash")
+            prev = seg["chain"]
+        return {"valid": not errors, "segments": len(self.segments), "errors": errors}
+
+    # ── Čitanje (segmenti + vruća baza) ──
+
+    def _iter_source(self, source: AuditSource, date_from: str, date_to: str,
+                     filters: Dict[str, str], chunk_size: int) -> Iterator[Dict[str, Any]]:
+        lo, hi = _sort_key(date_from), _sort_key(date_to)
+        for seg in self.segments:
+            if seg["source"] != source.name:
+                continue
+            if (lo and seg["max_ts"] < lo) or (hi and seg["min_ts"] > hi):
+                continue
+            if filters.get("user") and filters["user"] not in seg["users"]:
+                continue
+            if filters.get("action") and filters["action"] not in seg["actions"]:
+                continue
+            with gzip.open(self.archive_dir / seg["file"], "rt", encoding="utf-8") as f:
+                for line in f:
+                    entry = source.normalize(json.loads(line))
+                    if self._match(entry, lo, hi, filters):
+                        yield entry
+
+        if not Path(source.db_path).exists():
+            return
+        conn = sqlite3.connect(source.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(
+                f"SELECT * FROM {source.table} ORDER BY {source.id_col}")
+            while True:
+                batch = cursor.fetchmany(chunk_size)
+                if not batch:
+                    break
+                for r in batch:
+                    entry = source.normalize(dict(r))
+                    if self._match(entry, lo, hi, filters):
+                        yield entry
+        except sqlite3.Error as e:
+            logger.warning("Audit izvor %s: %s", source.name, e)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _match(entry: Dict[str, Any], lo: str, hi: str, filters: Dict[str, str]) -> bool:
+        ts = _sort_key(entry["timestamp"])
+        if lo and ts < lo:
+            return False
+        if hi and ts > hi:
+            return False
+        # Izvor bez stupca (npr. auth nema client_id) ne prolazi taj filter
+        return all(entry.get(key) == value for key, value in filters.items())
+
+    def iter_entries(self, user: str = "", date_from: str = "", date_to: str = "",
+                     action: str = "", client_id: str = "", module: str = "",
+                     chunk_size: int = 1000,
+                     sources: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Kronološki (najstariji prvi) stream preko segmenata i vrućih baza svih izvora."""
+        filters = {k: v for k, v in (("user", user), ("action", action),
+                                     ("client_id", client_id), ("module", module)) if v}
+        streams = [
+            self._iter_source(s, date_from, date_to, filters, chunk_size)
+            for s in self.sources if not sources or s.name in sources
+        ]
+        yield from heapq.merge(*streams, key=lambda e: _sort_key(e["timestamp"]))
+
+    def get_entries(self, period_from: str = "", period_to: str = "",
+                    user: str = "", action: str = "", client_id: str = "",
+                    module: str = "", limit: int = 10000) -> List[Dict]:
+        """Najnovijih ``limit`` zapisa (najnoviji prvi) — sučelje za AuditExporter."""
+        tail = collections.deque(
+            self.iter_entries(user=user, date_from=period_from, date_to=period_to,
+                              action=action, client_id=client_id, module=module),
+            maxlen=limit)
+        return list(reversed(tail))
+
+    def get_stats(self) -> Dict[str, Any]:
+        by_source: Dict[str, Dict[str, int]] = {}
+        for seg in self.segments:
+            s = by_source.setdefault(seg["source"], {"segments": 0, "rows": 0, "bytes": 0})
+            s["segments"] += 1
+            s["rows"] += seg["rows"]
+            s["bytes"] += seg["size_bytes"]
+        return {
+            "archive_dir": str(self.archive_dir),
+            "segments": len(self.segments),
+            "rows": sum(s["rows"] for s in self.segments),
+            "size_mb": round(sum(s["size_bytes"] for s in self.segments) / 1e6, 2),
+            "by_source": by_source,
+            "chain_head": self.segments[-1]["chain"] if self.segments else GENESIS,
+        }
@@ -13,11 +13,12 @@ Filteri: po korisniku, periodu, tipu operacije, klijentu.
 """
 
 import csv
+import itertools
 import json
 import logging
 from datetime import date, datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
 logger = logging.getLogger("nyx_light.audit.export")
 
@@ -48,6 +49,7 @@ class AuditExporter:
         Ako None, koristi dummy podatke za testiranje.
         """
         self._store = audit_store
+        self.last_export_count = 0
 
     def get_entries(self, period_from: str = "", period_to: str = "",
                     user: str = "", action: str = "", client_id: str = "",
@@ -59,16 +61,34 @@ class AuditExporter:
                 user=user, action=action, client_id=client_id,
                 module=module, limit=limit
             )
+        return list(itertools.islice(self.iter_entries(
+            period_from=period_from, period_to=period_to, user=user,
+            action=action, client_id=client_id, module=module), limit))
+
+    def iter_entries(self, period_from: str = "", period_to: str = "",
+                     user: str = "", action: str = "", client_id: str = "",
+                     module: str = "", chunk_size: int = 1000) -> Iterator[Dict]:
+        """Streaming dohvat audit zapisa (fetchmany po chunk_size) — za velike exporte."""
+        if self._store and hasattr(self._store, "iter_entries"):
+            yield from self._filter_entries(self._store.iter_entries(
+                user=user, date_from=period_from, date_to=period_to,
+                chunk_size=chunk_size,
+            ), action, client_id, module)
+            return
+        if self._store and hasattr(self._store, "get_entries"):
+            yield from self.get_entries(period_from, period_to, user, action,
+                                        client_id, module)
+            return
 
         # Fallback: čitaj iz SQLite audit log
-        try:
-            import sqlite3
-            db_path = Path("data/memory_db/audit.db")
-            if not db_path.exists():
-                return []
+        import sqlite3
+        db_path = Path("data/memory_db/audit.db")
+        if not db_path.exists():
+            return
 
-            conn = sqlite3.connect(str(db_path))
-            conn.row_factory = sqlite3.Row
+        conn = sqlite3.connect(str(db_path))
+        conn.row_factory = sqlite3.Row
+        try:
             query = "SELECT * FROM audit_log WHERE 1=1"
             params = []
 
@@ -91,13 +111,32 @@ class AuditExporter:
                 query += " AND module = ?"
                 params.append(module)
 
-            query += f" ORDER BY timestamp DESC LIMIT {limit}"
-            rows = conn.execute(query, params).fetchall()
-            conn.close()
-            return [dict(r) for r in rows]
+            query += " ORDER BY timestamp DESC"
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for r in rows:
+                    yield dict(r)
         except Exception as e:
             logger.warning(f"Audit DB read error: {e}")
-            return []
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _filter_entries(entries: Iterable[Dict], action: str = "", client_id: str = "",
+                        module: str = "") -> Iterator[Dict]:
+        """Filteri koje store.iter_entries ne prima primjenjuju se na streamu."""
+        for e in entries:
+            if action and e.get("action") != action:
+                continue
+            if client_id and e.get("client_id") != client_id:
+                continue
+            # AuditLogger zapisi nemaju "module" — modul je njihov event_type
+            if module and e.get("module", e.get("event_type")) != module:
+                continue
+            yield e
 
     def export_excel(self, entries: List[Dict], output_path: str = "",
                      title: str = "Revizijski trag") -> str:
@@ -149,16 +188,17 @@ class AuditExporter:
         logger.info(f"Audit export: {path} ({len(entries)} zapisa)")
         return path
 
-    def export_csv(self, entries: List[Dict], output_path: str = "") -> str:
-        """Export u CSV (za vanjskog revizora)."""
+    def export_csv(self, entries: Iterable[Dict], output_path: str = "") -> str:
+        """Export u CSV (za vanjskog revizora). ``entries`` može biti generator."""
         path = output_path or f"data/exports/audit_{date.today().isoformat()}.csv"
         Path(path).parent.mkdir(parents=True, exist_ok=True)
 
+        count = 0
         with open(path, "w", newline="", encoding="utf-8-sig") as f:
             w = csv.DictWriter(f, fieldnames=self.COLUMNS, delimiter=";",
                                extrasaction="ignore")
             w.writeheader()
-            for entry in entries:
+            for count, entry in enumerate(entries, 1):
                 clean = {}
                 for k in self.COLUMNS:
                     v = entry.get(k, "")
@@ -167,21 +207,26 @@ class AuditExporter:
                     clean[k] = str(v)[:500]
                 w.writerow(clean)
 
-        logger.info(f"Audit CSV: {path} ({len(entries)} zapisa)")
+        self.last_export_count = count
+        logger.info(f"Audit CSV: {path} ({count} zapisa)")
         return path
 
-    def export_json(self, entries: List[Dict], output_path: str = "") -> str:
-        """Export u JSON."""
+    def export_json(self, entries: Iterable[Dict], output_path: str = "") -> str:
+        """Export u JSON. ``entries`` može biti generator — piše se zapis po zapis."""
         path = output_path or f"data/exports/audit_{date.today().isoformat()}.json"
         Path(path).parent.mkdir(parents=True, exist_ok=True)
 
+        count = 0
         with open(path, "w", encoding="utf-8") as f:
-            json.dump({
-                "generated": datetime.now().isoformat(),
-                "count": len(entries),
-                "entries": entries
-            }, f, ensure_ascii=False, indent=2, default=str)
-
+            f.write('{\n  "generated": ' + json.dumps(datetime.now().isoformat()))
+            f.write(',\n  "entries": [')
+            for count, entry in enumerate(entries, 1):
+                f.write(",\n    " if count > 1 else "\n    ")
+                f.write(json.dumps(entry, ensure_ascii=False, default=str))
+            f.write("\n  ]" if count else "]")
+            f.write(f',\n  "count": {count}\n}}\n')
+
+        self.last_export_count = count
         return path
 
     def summary(self, entries: List[Dict]) -> Dict[str, Any]:
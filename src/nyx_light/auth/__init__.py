@@ -9,6 +9,7 @@ Lokalni auth sustav (ZERO CLOUD):
   - Audit log svakog pristupa
 """
 
+import asyncio
 import hashlib
 import hmac
 import json
@@ -16,12 +17,15 @@ import logging
 import os
 import secrets
 import sqlite3
+import threading
 import time
 from base64 import urlsafe_b64decode, urlsafe_b64encode
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger("nyx_light.auth")
@@ -159,6 +163,74 @@ def decode_jwt(token: str, secret: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+# ═══════════════════════════════════════════════════
+# TOKEN CACHE (LRU verificiranih JWT-ova)
+# ═══════════════════════════════════════════════════
+
+def token_digest(token: str) -> str:
+    """Ključ cachea — SHA-256 tokena (sirovi token se ne drži u memoriji)."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenCache:
+    """Ograničeni LRU verificiranih tokena s istekom po ``exp``.
+
+    Pogodak je jedan SHA-256 + dict lookup umjesto base64 + HMAC + JSON
+    parsiranja. Istekli unosi se izbacuju pri dohvatu, a najstariji kad
+    se prijeđe ``max_size``.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, AuthToken]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str) -> Optional[AuthToken]:
+        with self._lock:
+            auth = self._items.get(digest)
+            if auth is None:
+                self.misses += 1
+                return None
+            if auth.expires_at < time.time():
+                del self._items[digest]
+                self.misses += 1
+                return None
+            self._items.move_to_end(digest)
+            self.hits += 1
+            return auth
+
+    def put(self, digest: str, auth: AuthToken):
+        with self._lock:
+            self._items[digest] = auth
+            self._items.move_to_end(digest)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def discard(self, digest: str):
+        with self._lock:
+            self._items.pop(digest, None)
+
+    def discard_user(self, username: str) -> int:
+        with self._lock:
+            stale = [d for d, a in self._items.items() if a.username == username]
+            for d in stale:
+                del self._items[d]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"size": len(self._items), "max_size": self.max_size,
+                "hits": self.hits, "misses": self.misses}
+
+
 # ═══════════════════════════════════════════════════
 # AUTH MANAGER
 # ═══════════════════════════════════════════════════
@@ -168,10 +240,18 @@ class AuthManager:
 
     MAX_FAILED_ATTEMPTS = 5
     LOCKOUT_MINUTES = 15
+    # PBKDF2 (100k iteracija) pušta GIL — najviše toliko loginova paralelno
+    HASH_WORKERS = 2
 
-    def __init__(self, db_path: str = "data/auth.db"):
+    def __init__(self, db_path: str = "data/auth.db", token_cache_size: int = 4096):
         self.db_path = db_path
         self._secret = ""
+        self._token_cache = TokenCache(token_cache_size)
+        # Opoziv (samo u memoriji): digest → exp, username → vrijeme opoziva
+        self._revoked: Dict[str, float] = {}
+        self._revoked_before: Dict[str, float] = {}
+        self._revoke_lock = threading.Lock()
+        self._hash_pool: Optional[ThreadPoolExecutor] = None
         self._init_db()
 
     def _init_db(self):
@@ -311,6 +391,8 @@ class AuthManager:
         conn.execute(f"UPDATE users SET {','.join(sets)} WHERE username=?", vals)
         conn.commit()
         conn.close()
+        if "role" in kwargs or "is_active" in kwargs:
+            self.revoke_user(username)
         return True
 
     def change_password(self, username: str, new_password: str) -> bool:
@@ -322,6 +404,7 @@ class AuthManager:
         )
         conn.commit()
         conn.close()
+        self.revoke_user(username)
         return True
 
     def delete_user(self, username: str) -> bool:
@@ -329,6 +412,7 @@ class AuthManager:
         conn.execute("DELETE FROM users WHERE username=?", (username,))
         conn.commit()
         conn.close()
+        self.revoke_user(username)
         return True
 
     # ════════════════════════════════════════
@@ -399,18 +483,54 @@ class AuthManager:
             },
         }
 
+    async def login_async(self, username: str, password: str,
+                          ip: str = "") -> Dict[str, Any]:
+        """login() u zasebnom poolu — PBKDF2 ne blokira event loop."""
+        if self._hash_pool is None:
+            self._hash_pool = ThreadPoolExecutor(
+                max_workers=self.HASH_WORKERS, thread_name_prefix="nyx-auth")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._hash_pool, self.login, username, password, ip)
+
     def verify_token(self, token: str) -> Optional[AuthToken]:
-        """Verificiraj JWT → AuthToken ili None."""
+        """Verificiraj JWT → AuthToken ili None (LRU cache verificiranih)."""
+        digest = token_digest(token)
+        auth = self._token_cache.get(digest)
+        if auth is not None:
+            return auth
+        if digest in self._revoked:
+            return None
         payload = decode_jwt(token, self._secret)
         if not payload:
             return None
-        return AuthToken(
+        auth = AuthToken(
             user_id=payload.get("sub", ""),
             username=payload.get("username", ""),
             role=Role(payload.get("role", "asistent")),
             issued_at=payload.get("iat", 0),
             expires_at=payload.get("exp", 0),
         )
+        if auth.issued_at < self._revoked_before.get(auth.username, 0):
+            return None
+        self._token_cache.put(digest, auth)
+        return auth
+
+    def revoke_token(self, token: str):
+        """Opozovi pojedinačni token (logout)."""
+        digest = token_digest(token)
+        payload = decode_jwt(token, self._secret)
+        now = time.time()
+        with self._revoke_lock:
+            self._revoked = {d: exp for d, exp in self._revoked.items() if exp > now}
+            self._revoked[digest] = payload.get("exp", now) if payload else now
+        self._token_cache.discard(digest)
+
+    def revoke_user(self, username: str):
+        """Opozovi sve dosad izdane tokene korisnika."""
+        with self._revoke_lock:
+            self._revoked_before[username] = time.time()
+        self._token_cache.discard_user(username)
 
     def has_permission(self, token: str, permission: str) -> bool:
         """Provjeri ima li token-holder dozvolu."""
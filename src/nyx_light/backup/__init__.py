@@ -34,12 +34,26 @@ PROTECTED_PATHS = [
     "data/exports",
     "data/backups",
     "data/logs",
+    "data/audit_archive",
     "config.json",
 ]
 
 BACKUP_DIR = Path("data/backups")
 MAX_BACKUPS = 30  # Keep last 30 backups
 
+DATABASES = [
+    ("nyx_light.db", "data/memory_db/nyx_light.db"),
+    ("auth.db", "data/memory_db/auth.db"),
+    ("dpo_training.db", "data/dpo_training.db"),
+]
+
+# Inkrementalni mod: (direktorij, glob) koji idu u chunk store
+INCREMENTAL_GLOBS = [
+    ("data/dpo_datasets", "*.jsonl"),
+    ("data/exports", "*"),
+    ("data/audit_archive", "*"),
+]
+
 
 class BackupManager:
     """Backup i restore za Nyx Light."""
@@ -49,8 +63,18 @@ class BackupManager:
         self.backup_dir.mkdir(parents=True, exist_ok=True)
         self._backup_count = 0
 
-    def create_backup(self, label: str = "") -> Dict[str, Any]:
-        """Full backup svih kritičnih podataka."""
+    def create_backup(self, label: str = "", mode: str = "full") -> Dict[str, Any]:
+        """Backup svih kritičnih podataka.
+
+        mode="full" — VACUUM INTO + kopije datoteka u novi direktorij.
+        mode="incremental" — SQLite online backup + deduplicirani chunk store
+        (vidi ``nyx_light.backup.incremental``); sprema se samo ono što se
+        promijenilo od prošlog backupa.
+        """
+        if mode == "incremental":
+            return self._create_incremental(label)
+
+        started = time.perf_counter()
         ts = datetime.now().strftime("%Y%m%d_%H%M%S")
         name = f"backup_{ts}" + (f"_{label}" if label else "")
         backup_path = self.backup_dir / name
@@ -61,11 +85,7 @@ class BackupManager:
         errors = []
 
         # Backup SQLite databases (safe copy with WAL checkpoint)
-        for db_name, db_path in [
-            ("nyx_light.db", "data/memory_db/nyx_light.db"),
-            ("auth.db", "data/memory_db/auth.db"),
-            ("dpo_training.db", "data/dpo_training.db"),
-        ]:
+        for db_name, db_path in DATABASES:
             src = Path(db_path)
             if src.exists():
                 dst = backup_path / db_name
@@ -95,6 +115,24 @@ class BackupManager:
                 files_backed += 1
                 total_size += f.stat().st_size
 
+        # Audit arhiva — segmenti su read-only, pa se hard-linkaju (bez kopiranja)
+        archive_src = Path("data/audit_archive")
+        if archive_src.exists():
+            archive_dst = backup_path / "audit_archive"
+            for f in archive_src.rglob("*"):
+                if not f.is_file():
+                    continue
+                dst = archive_dst / f.relative_to(archive_src)
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    if f.suffix == ".gz":
+                        os.link(f, dst)
+                    else:
+                        shutil.copy2(str(f), str(dst))
+                except OSError:
+                    shutil.copy2(str(f), str(dst))
+                files_backed += 1
+
         # Backup LoRA adapters (only metadata, not full weights for speed)
         lora_src = Path("data/models/lora")
         if lora_src.exists():
@@ -117,9 +155,12 @@ class BackupManager:
         manifest = {
             "timestamp": datetime.now().isoformat(),
             "label": label,
+            "mode": "full",
             "files_backed": files_backed,
             "total_size_bytes": total_size,
             "total_size_mb": round(total_size / 1e6, 2),
+            "metrics": {"duration_s": round(time.perf_counter() - started, 3),
+                        "bytes_written": total_size},
             "errors": errors,
         }
         (backup_path / "manifest.json").write_text(
@@ -138,21 +179,67 @@ class BackupManager:
             **manifest,
         }
 
-    def restore_backup(self, backup_name: str) -> Dict[str, Any]:
-        """Restore iz backupa — OPREZNO, prepisuje podatke."""
+    def _create_incremental(self, label: str = "") -> Dict[str, Any]:
+        from nyx_light.backup.incremental import create_snapshot
+
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = f"backup_{ts}" + (f"_{label}" if label else "")
+        backup_path = self.backup_dir / name
+        backup_path.mkdir(parents=True, exist_ok=True)
+
+        snapshot = create_snapshot(self._chunk_store(), DATABASES, INCREMENTAL_GLOBS,
+                                   extra_files=["config.json"])
+        metrics = snapshot["metrics"]
+        manifest = {
+            "timestamp": datetime.now().isoformat(),
+            "label": label,
+            "mode": "incremental",
+            "files_backed": metrics["files"],
+            "total_size_bytes": metrics["bytes_written"],
+            "total_size_mb": round(metrics["bytes_written"] / 1e6, 2),
+            "metrics": metrics,
+            "errors": snapshot["errors"],
+        }
+        (backup_path / "manifest.json").write_text(json.dumps(
+            {**manifest, "codec": snapshot["codec"], "files": snapshot["files"]},
+            indent=2, ensure_ascii=False))
+
+        self._cleanup_old()
+        self._backup_count += 1
+        logger.info("Inkrementalni backup: %s (%d datoteka, %d/%d novih chunkova, "
+                    "%.1f MB zapisano, %.2fs)", name, metrics["files"], metrics["chunks_new"],
+                    metrics["chunks_total"], metrics["bytes_written"] / 1e6,
+                    metrics["duration_s"])
+        return {"name": name, "path": str(backup_path), **manifest}
+
+    def _chunk_store(self):
+        from nyx_light.backup.incremental import ChunkStore
+        return ChunkStore(self.backup_dir / "chunks")
+
+    def restore_backup(self, backup_name: str, target_root: str = "") -> Dict[str, Any]:
+        """Restore iz backupa — OPREZNO, prepisuje podatke.
+
+        Inkrementalni backup se rekonstruira iz chunk storea u stanje tog
+        trenutka; ``target_root`` ga restaurira pod drugi direktorij.
+        """
         backup_path = self.backup_dir / backup_name
         if not backup_path.exists():
             return {"status": "error", "message": f"Backup {backup_name} ne postoji"}
 
+        manifest_path = backup_path / "manifest.json"
+        if manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text())
+            if manifest.get("mode") == "incremental":
+                from nyx_light.backup.incremental import restore_snapshot
+                result = restore_snapshot(self._chunk_store(), manifest, target_root)
+                logger.info("Restore završen: %s (%d files)", backup_name, result["restored"])
+                return {"status": "ok" if not result["errors"] else "partial", **result}
+
         restored = 0
         errors = []
 
         # Restore SQLite databases
-        for db_name, db_path in [
-            ("nyx_light.db", "data/memory_db/nyx_light.db"),
-            ("auth.db", "data/memory_db/auth.db"),
-            ("dpo_training.db", "data/dpo_training.db"),
-        ]:
+        for db_name, db_path in DATABASES:
             src = backup_path / db_name
             if src.exists():
                 Path(db_path).parent.mkdir(parents=True, exist_ok=True)
@@ -171,6 +258,18 @@ class BackupManager:
                 shutil.copy2(str(f), str(dpo_dst / f.name))
                 restored += 1
 
+        # Restore audit arhive (postojeći read-only segmenti se ne prepisuju)
+        archive_src = backup_path / "audit_archive"
+        if archive_src.exists():
+            archive_dst = Path("data/audit_archive")
+            for f in archive_src.rglob("*"):
+                dst = archive_dst / f.relative_to(archive_src)
+                if not f.is_file() or (dst.exists() and f.suffix == ".gz"):
+                    continue
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(str(f), str(dst))
+                restored += 1
+
         # Restore config
         cfg = backup_path / "config.json"
         if cfg.exists():
@@ -196,6 +295,8 @@ class BackupManager:
                     "files": manifest.get("files_backed", 0),
                     "size_mb": manifest.get("total_size_mb", 0),
                     "label": manifest.get("label", ""),
+                    "mode": manifest.get("mode", "full"),
+                    "metrics": manifest.get("metrics", {}),
                 })
         return backups
 
@@ -210,6 +311,21 @@ class BackupManager:
             shutil.rmtree(str(old), ignore_errors=True)
             logger.info("Stari backup obrisan: %s", old.name)
 
+        # Chunkovi koje više ne referencira nijedan inkrementalni snapshot
+        chunks_dir = self.backup_dir / "chunks"
+        if backups[MAX_BACKUPS:] and chunks_dir.exists():
+            referenced = set()
+            for d in backups[:MAX_BACKUPS]:
+                mp = d / "manifest.json"
+                if not mp.exists():
+                    continue
+                manifest = json.loads(mp.read_text())
+                for entry in manifest.get("files", {}).values():
+                    referenced.update(entry["chunks"])
+            gc = self._chunk_store().gc(referenced)
+            logger.info("Chunk store GC: %d chunkova, %.1f MB",
+                        gc["chunks_removed"], gc["bytes_freed"] / 1e6)
+
     def get_stats(self) -> Dict[str, Any]:
         backups = self.list_backups()
         total_size = sum(b.get("size_mb", 0) for b in backups)
@@ -0,0 +1,255 @@
+"""
+Nyx Light — Inkrementalni, deduplicirani backup
+
+Content-addressed chunk store: svaka datoteka (SQLite snapshot, DPO
+dataset, export) dijeli se na chunkove fiksne veličine (višekratnik
+SQLite stranice), chunk se adresira SHA-256 hashom i sprema samo ako
+već ne postoji. Nepromijenjene stranice baze i već backupirani dijelovi
+append-only .jsonl datoteka ne troše ni vrijeme ni disk.
+
+  - SQLite: online backup API (``Connection.backup``) → konzistentan
+    snapshot bez zaključavanja pisaca
+  - Kompresija: paralelno (ThreadPoolExecutor — zlib/zstd puštaju GIL),
+    zstd ako je ``zstandard`` instaliran, inače gzip
+  - Snapshot manifest: putanja → lista chunk hasheva; restore bilo kojeg
+    snapshota rekonstruira stanje u tom trenutku
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger("nyx_light.backup.incremental")
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB = 256 SQLite stranica od 4 KiB
+
+
+def _iter_chunks(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                return
+            yield data
+
+
+class ChunkStore:
+    """Content-addressed pohrana komprimiranih chunkova (``chunks/ab/abcd….gz|.zst``)."""
+
+    def __init__(self, root: Path, codec: str = "", workers: int = 0):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.codec = codec or ("zst" if HAS_ZSTD else "gz")
+        self.workers = workers or min(8, (os.cpu_count() or 2))
+        # Najviše 4 chunka po workeru čeka na kompresiju (ograničen RAM)
+        self._inflight = threading.BoundedSemaphore(self.workers * 4)
+
+    def _path(self, digest: str, codec: Optional[str] = None) -> Path:
+        return self.root / digest[:2] / f"{digest}.{codec or self.codec}"
+
+    def find(self, digest: str) -> Optional[Path]:
+        for codec in ("zst", "gz"):
+            p = self._path(digest, codec)
+            if p.exists():
+                return p
+        return None
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zst":
+            return zstandard.ZstdCompressor(level=3).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    @staticmethod
+    def _decompress(path: Path) -> bytes:
+        raw = path.read_bytes()
+        if path.suffix == ".zst":
+            if not HAS_ZSTD:
+                raise RuntimeError("Chunk je zstd — pip install zstandard")
+            return zstandard.ZstdDecompressor().decompress(raw)
+        return gzip.decompress(raw)
+
+    def _write(self, digest: str, data: bytes) -> int:
+        try:
+            path = self._path(digest)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            blob = self._compress(data)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(blob)
+            os.replace(tmp, path)
+            return len(blob)
+        finally:
+            self._inflight.release()
+
+    def put_file(self, path: Path, pool: ThreadPoolExecutor,
+                 pending: Set[str]) -> Tuple[Dict[str, Any], List]:
+        """Razbij datoteku na chunkove; nove šalje na kompresiju u pool.
+
+        Vraća (zapis za manifest, lista futurea). ``pending`` su hashevi
+        već poslani u ovom backupu (dedup unutar istog runa).
+        """
+        file_hash = hashlib.sha256()
+        chunks, futures = [], []
+        size = 0
+        for data in _iter_chunks(path):
+            digest = hashlib.sha256(data).hexdigest()
+            file_hash.update(data)
+            size += len(data)
+            chunks.append(digest)
+            if digest in pending or self.find(digest):
+                continue
+            pending.add(digest)
+            self._inflight.acquire()
+            futures.append(pool.submit(self._write, digest, data))
+        return {"size": size, "sha256": file_hash.hexdigest(), "chunks": chunks}, futures
+
+    def restore_file(self, entry: Dict[str, Any], dst: Path):
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        tmp = dst.with_name(dst.name + ".restore")
+        with open(tmp, "wb") as f:
+            for h in entry["chunks"]:
+                p = self.find(h)
+                if p is None:
+                    raise FileNotFoundError(f"Chunk {h[:12]} nedostaje u chunk storeu")
+                data = self._decompress(p)
+                digest.update(data)
+                f.write(data)
+        if digest.hexdigest() != entry["sha256"]:
+            tmp.unlink()
+            raise ValueError(f"{dst}: checksum ne odgovara manifestu")
+        os.replace(tmp, dst)
+
+    def gc(self, referenced: Set[str]) -> Dict[str, int]:
+        """Obriši chunkove koje ne referencira nijedan snapshot."""
+        removed, freed = 0, 0
+        for p in self.root.glob("*/*.*"):
+            if p.stem not in referenced:
+                freed += p.stat().st_size
+                p.unlink()
+                removed += 1
+        return {"chunks_removed": removed, "bytes_freed": freed}
+
+
+def sqlite_snapshot(src: Path, tmp_dir: Path) -> Path:
+    """Konzistentna kopija baze preko SQLite online backup API-ja."""
+    dst = tmp_dir / (src.name + ".snapshot")
+    source = sqlite3.connect(str(src))
+    target = sqlite3.connect(str(dst))
+    try:
+        source.backup(target, pages=1024)
+    finally:
+        target.close()
+        source.close()
+    return dst
+
+
+def create_snapshot(
+    store: ChunkStore,
+    databases: Iterable[Tuple[str, str]],
+    file_globs: Iterable[Tuple[str, str]],
+    extra_files: Iterable[str] = (),
+) -> Dict[str, Any]:
+    """
+    Napravi inkrementalni snapshot.
+
+    databases: (ime_u_backupu, putanja) — preko online backup API-ja
+    file_globs: (direktorij, glob) — npr. ("data/dpo_datasets", "*.jsonl")
+    """
+    t0 = time.perf_counter()
+    files: Dict[str, Dict[str, Any]] = {}
+    futures = []
+    pending: Set[str] = set()
+    errors = []
+
+    with tempfile.TemporaryDirectory(prefix="nyx_snap_") as tmp, \
+            ThreadPoolExecutor(max_workers=store.workers) as pool:
+        tmp_dir = Path(tmp)
+        for name, db_path in databases:
+            src = Path(db_path)
+            if not src.exists():
+                continue
+            try:
+                snap = sqlite_snapshot(src, tmp_dir)
+                entry, futs = store.put_file(snap, pool, pending)
+                entry["restore_to"] = db_path
+                entry["kind"] = "sqlite"
+                files[f"db/{name}"] = entry
+                futures.extend(futs)
+                # Snapshot se briše tek nakon što su chunkovi pročitani (put_file je sinkron)
+                snap.unlink()
+            except (sqlite3.Error, OSError) as e:
+                errors.append(f"{name}: {e}")
+
+        paths = [Path(p) for p in extra_files]
+        for directory, pattern in file_globs:
+            d = Path(directory)
+            if d.exists():
+                paths.extend(sorted(p for p in d.rglob(pattern) if p.is_file()))
+        for p in paths:
+            if not p.exists():
+                continue
+            try:
+                entry, futs = store.put_file(p, pool, pending)
+                entry["restore_to"] = str(p)
+                entry["kind"] = "file"
+                files[str(p)] = entry
+                futures.extend(futs)
+            except OSError as e:
+                errors.append(f"{p}: {e}")
+
+        written = 0
+        for fut in futures:
+            try:
+                written += fut.result()
+            except OSError as e:
+                errors.append(str(e))
+
+    scanned = sum(f["size"] for f in files.values())
+    chunks_total = sum(len(f["chunks"]) for f in files.values())
+    elapsed = time.perf_counter() - t0
+    return {
+        "mode": "incremental",
+        "codec": store.codec,
+        "files": files,
+        "metrics": {
+            "duration_s": round(elapsed, 3),
+            "files": len(files),
+            "bytes_scanned": scanned,
+            "chunks_total": chunks_total,
+            "chunks_new": len(pending),
+            "bytes_written": written,
+            "dedup_ratio": round(1 - len(pending) / chunks_total, 3) if chunks_total else 0.0,
+            "throughput_mb_s": round(scanned / 1e6 / elapsed, 1) if elapsed else 0.0,
+        },
+        "errors": errors,
+    }
+
+
+def restore_snapshot(store: ChunkStore, manifest: Dict[str, Any],
+                     target_root: str = "") -> Dict[str, Any]:
+    """Rekonstruiraj sve datoteke snapshota (opcionalno pod ``target_root``)."""
+    restored, errors = 0, []
+    for key, entry in manifest.get("files", {}).items():
+        dst = Path(entry["restore_to"])
+        if target_root:
+            dst = Path(target_root) / dst.relative_to(dst.anchor)
+        try:
+            store.restore_file(entry, dst)
+            restored += 1
+        except (OSError, ValueError, RuntimeError) as e:
+            errors.append(f"{key}: {e}")
+    return {"restored": restored, "errors": errors}
@@ -0,0 +1,39 @@
+"""
+Nyx Light — Zajedničke numeričke pomoćne funkcije (NumPy)
+
+``round2`` je vektorizirani ``round(x, 2)``, bit-identičan Pythonovom
+round() — koriste ga obračun plaća i plan amortizacije, pa su iznosi u
+centima jednaki skalarnom izračunu.
+"""
+
+import numpy as np
+
+
+def two_prod(a: np.ndarray, b: float):
+    """Dekker: a*b = p + err točno (bez FMA)."""
+    p = a * b
+    c = 134217729.0 * a  # 2**27 + 1
+    ah = c - (c - a)
+    al = a - ah
+    c = 134217729.0 * b
+    bh = c - (c - b)
+    bl = b - bh
+    err = ((ah * bh - p) + ah * bl + al * bh) + al * bl
+    return p, err
+
+
+def round2(a: np.ndarray) -> np.ndarray:
+    """``round(x, 2)`` nad nizom, bit-identično Pythonovom round().
+
+    ``np.round`` množi sa 100 pa krivo zaokružuje iznose koji su binarno
+    tik ispod/iznad pola centa (npr. 15% od bruta s neparnim centima).
+    Ovdje se x·200 računa bez greške (x·8 je egzaktno, ×25 preko
+    Dekkerovog produkta) i uspoređuje s granicom pola centa — kao
+    Pythonov correctly-rounded round, uključujući half-even.
+    """
+    p, err = two_prod(a * 8.0, 25.0)
+    cents = np.floor(p / 2.0)
+    d = (p - (2.0 * cents + 1.0)) + err
+    odd = np.fmod(cents, 2.0) != 0
+    cents = cents + ((d > 0) | ((d == 0) & odd))
+    return cents / 100.0
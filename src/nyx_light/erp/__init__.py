@@ -28,7 +28,8 @@ import sqlite3
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
-from xml.etree import ElementTree as ET
+
+from nyx_light.export.streaming import open_export, write_csv_rows, write_xml_document
 
 logger = logging.getLogger("nyx_light.erp.connector")
 
@@ -239,50 +240,45 @@ class ERPConnector:
             return self._write_synesis_csv(bookings, client_id, export_dir, ts)
 
     def _write_cpp_xml(self, bookings, client_id, export_dir, ts) -> Dict:
-        root = ET.Element("KnjizenjaImport")
-        header = ET.SubElement(root, "Zaglavlje")
-        ET.SubElement(header, "Klijent").text = client_id
-        ET.SubElement(header, "Datum").text = datetime.now().strftime("%Y-%m-%d")
-        ET.SubElement(header, "Generator").text = "NyxLight-v2.0"
-
-        stavke = ET.SubElement(root, "Stavke")
-        for i, b in enumerate(bookings, 1):
-            s = ET.SubElement(stavke, "Stavka")
-            ET.SubElement(s, "Rb").text = str(i)
-            ET.SubElement(s, "KontoDuguje").text = str(b.get("konto_duguje", ""))
-            ET.SubElement(s, "KontoPotrazuje").text = str(b.get("konto_potrazuje", ""))
-            ET.SubElement(s, "Iznos").text = f"{b.get('iznos', 0):.2f}"
-            ET.SubElement(s, "Opis").text = str(b.get("opis", ""))
-            ET.SubElement(s, "Datum").text = str(b.get("datum_dokumenta", ""))
-            ET.SubElement(s, "OIB").text = str(b.get("oib", ""))
-
         filename = f"nyx_cpp_{client_id}_{ts}.xml"
         filepath = export_dir / filename
-        tree = ET.ElementTree(root)
-        tree.write(str(filepath), encoding="unicode", xml_declaration=True)
+        header = [
+            ("Klijent", client_id),
+            ("Datum", datetime.now().strftime("%Y-%m-%d")),
+            ("Generator", "NyxLight-v2.0"),
+        ]
+        fields = [
+            ("Rb", lambda i, b: i),
+            ("KontoDuguje", lambda i, b: b.get("konto_duguje", "")),
+            ("KontoPotrazuje", lambda i, b: b.get("konto_potrazuje", "")),
+            ("Iznos", lambda i, b: f"{b.get('iznos', 0):.2f}"),
+            ("Opis", lambda i, b: b.get("opis", "")),
+            ("Datum", lambda i, b: b.get("datum_dokumenta", "")),
+            ("OIB", lambda i, b: b.get("oib", "")),
+        ]
+        with open_export(filepath) as f:
+            records = write_xml_document(
+                f, "KnjizenjaImport", bookings, "Stavka", fields,
+                header=header, items_tag="Stavke",
+            )
 
         return {"status": "exported", "erp": "CPP", "file": str(filepath),
-                "records": len(bookings)}
+                "records": records}
 
     def _write_synesis_csv(self, bookings, client_id, export_dir, ts) -> Dict:
         filename = f"nyx_synesis_{client_id}_{ts}.csv"
         filepath = export_dir / filename
         fields = ["Rb", "KontoDuguje", "KontoPotrazuje", "Iznos", "Opis", "Datum", "OIB"]
 
-        with open(filepath, "w", newline="", encoding="utf-8-sig") as f:
-            w = csv.DictWriter(f, fieldnames=fields, delimiter=";")
-            w.writeheader()
-            for i, b in enumerate(bookings, 1):
-                w.writerow({
-                    "Rb": i, "KontoDuguje": b.get("konto_duguje", ""),
-                    "KontoPotrazuje": b.get("konto_potrazuje", ""),
-                    "Iznos": f"{b.get('iznos', 0):.2f}",
-                    "Opis": b.get("opis", ""), "Datum": b.get("datum_dokumenta", ""),
-                    "OIB": b.get("oib", ""),
-                })
+        with open_export(filepath, encoding="utf-8-sig") as f:
+            records = write_csv_rows(f, fields, bookings, lambda i, b: [
+                i, b.get("konto_duguje", ""), b.get("konto_potrazuje", ""),
+                f"{b.get('iznos', 0):.2f}", b.get("opis", ""),
+                b.get("datum_dokumenta", ""), b.get("oib", ""),
+            ])
 
         return {"status": "exported", "erp": "Synesis", "file": str(filepath),
-                "records": len(bookings)}
+                "records": records}
 
     def _pull_file_kontni_plan(self) -> List[Dict]:
         import_dir = Path(self.config.import_dir) if self.config.import_dir else None
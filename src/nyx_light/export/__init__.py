@@ -9,19 +9,86 @@ Svaki klijent može koristiti različiti ERP sustav.
 Izvoz se generira TEK NAKON odobrenja knjiženja (Human-in-the-Loop).
 """
 
-import csv
-import json
 import logging
 import time
-import xml.etree.ElementTree as ET
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-from xml.dom import minidom
+from typing import Any, Dict, Iterable, List, Optional
+
+from nyx_light.export.streaming import (
+    export_path,
+    open_export,
+    write_csv_rows,
+    write_json_document,
+    write_xml_document,
+)
 
 logger = logging.getLogger("nyx_light.export")
 
 
+def _today(b: Dict[str, Any], key: str) -> str:
+    return str(b.get(key, datetime.now().strftime("%Y-%m-%d")))
+
+
+CPP_STAVKA_FIELDS = [
+    ("RedniBroj", lambda i, b: i),
+    ("KontoDuguje", lambda i, b: b.get("konto_duguje", "")),
+    ("KontoPotrazuje", lambda i, b: b.get("konto_potrazuje", "")),
+    ("Iznos", lambda i, b: f"{b.get('iznos', 0):.2f}"),
+    ("Valuta", lambda i, b: b.get("valuta", "EUR")),
+    ("Opis", lambda i, b: b.get("opis", "")),
+    ("DatumDokumenta", lambda i, b: _today(b, "datum_dokumenta")),
+    ("DatumKnjizenja", lambda i, b: _today(b, "datum_knjizenja")),
+    ("OIB", lambda i, b: b.get("oib", "")),
+    ("PDVStopa", lambda i, b: b.get("pdv_stopa", "25")),
+    ("PDVIznos", lambda i, b: f"{b.get('pdv_iznos', 0):.2f}"),
+]
+
+SYNESIS_CSV_FIELDS = [
+    "RedniBroj", "KontoDuguje", "KontoPotrazuje", "Iznos",
+    "Opis", "DatumDokumenta", "DatumKnjizenja", "OIB",
+    "PDVStopa", "PDVIznos", "PozivNaBroj",
+]
+
+
+def _synesis_csv_row(i: int, b: Dict[str, Any]) -> List[Any]:
+    return [
+        i,
+        b.get("konto_duguje", ""),
+        b.get("konto_potrazuje", ""),
+        f"{b.get('iznos', 0):.2f}",
+        b.get("opis", ""),
+        b.get("datum_dokumenta", ""),
+        b.get("datum_knjizenja", ""),
+        b.get("oib", ""),
+        b.get("pdv_stopa", "25"),
+        f"{b.get('pdv_iznos', 0):.2f}",
+        b.get("poziv_na_broj", ""),
+    ]
+
+
+def _synesis_json_item(i: int, b: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "redni_broj": i,
+        "konto_duguje": b.get("konto_duguje", ""),
+        "konto_potrazuje": b.get("konto_potrazuje", ""),
+        "iznos": round(b.get("iznos", 0), 2),
+        "opis": b.get("opis", ""),
+        "datum_dokumenta": b.get("datum_dokumenta", ""),
+        "datum_knjizenja": b.get("datum_knjizenja", ""),
+        "oib": b.get("oib", ""),
+        "pdv_stopa": b.get("pdv_stopa", 25),
+        "pdv_iznos": round(b.get("pdv_iznos", 0), 2),
+    }
+
+
+def _known_count(bookings: Iterable[Any], count: Optional[int]) -> Optional[int]:
+    """Broj stavki ako je poznat unaprijed (lista ili eksplicitni count)."""
+    if count is not None:
+        return count
+    return len(bookings) if hasattr(bookings, "__len__") else None
+
+
 class ERPExporter:
     """Generira izvozne datoteke za CPP i Synesis."""
 
@@ -33,9 +100,11 @@ class ERPExporter:
 
     def export_cpp_xml(
         self,
-        bookings: List[Dict[str, Any]],
+        bookings: Iterable[Dict[str, Any]],
         client_id: str,
         period: str = "",
+        compress: bool = False,
+        count: Optional[int] = None,
     ) -> Dict[str, Any]:
         """
         Generiraj XML datoteku za uvoz u CPP.
@@ -58,68 +127,51 @@ class ERPExporter:
             </Stavka>
           </Stavke>
         </KnjizenjaImport>
-        """
-        root = ET.Element("KnjizenjaImport")
-
-        # Zaglavlje
-        header = ET.SubElement(root, "Zaglavlje")
-        ET.SubElement(header, "Klijent").text = client_id
-        ET.SubElement(header, "Datum").text = datetime.now().strftime("%Y-%m-%d")
-        ET.SubElement(header, "Period").text = period or datetime.now().strftime("%Y-%m")
-        ET.SubElement(header, "BrojStavki").text = str(len(bookings))
-        ET.SubElement(header, "Generator").text = "NyxLight-Racunovodja-v1.0"
-
-        # Stavke
-        stavke = ET.SubElement(root, "Stavke")
-        for i, booking in enumerate(bookings, 1):
-            stavka = ET.SubElement(stavke, "Stavka")
-            ET.SubElement(stavka, "RedniBroj").text = str(i)
-            ET.SubElement(stavka, "KontoDuguje").text = str(booking.get("konto_duguje", ""))
-            ET.SubElement(stavka, "KontoPotrazuje").text = str(booking.get("konto_potrazuje", ""))
-            ET.SubElement(stavka, "Iznos").text = f"{booking.get('iznos', 0):.2f}"
-            ET.SubElement(stavka, "Valuta").text = booking.get("valuta", "EUR")
-            ET.SubElement(stavka, "Opis").text = str(booking.get("opis", ""))
-            ET.SubElement(stavka, "DatumDokumenta").text = str(
-                booking.get("datum_dokumenta", datetime.now().strftime("%Y-%m-%d"))
-            )
-            ET.SubElement(stavka, "DatumKnjizenja").text = str(
-                booking.get("datum_knjizenja", datetime.now().strftime("%Y-%m-%d"))
-            )
-            ET.SubElement(stavka, "OIB").text = str(booking.get("oib", ""))
-            ET.SubElement(stavka, "PDVStopa").text = str(booking.get("pdv_stopa", "25"))
-            ET.SubElement(stavka, "PDVIznos").text = f"{booking.get('pdv_iznos', 0):.2f}"
 
-            if booking.get("poziv_na_broj"):
-                ET.SubElement(stavka, "PozivNaBroj").text = str(booking["poziv_na_broj"])
+        ``bookings`` može biti i generator (npr. iz
+        ``SQLiteStorage.iter_approved_bookings``) — stavke se pišu
+        inkrementalno. Za generator proslijedi ``count`` za BrojStavki.
+        """
+        count = _known_count(bookings, count)
+        today = datetime.now().strftime("%Y-%m-%d")
 
-        # Pretty print
-        xml_str = minidom.parseString(ET.tostring(root, encoding="unicode")).toprettyxml(
-            indent="  ", encoding=None
-        )
+        header = [
+            ("Klijent", client_id),
+            ("Datum", today),
+            ("Period", period or datetime.now().strftime("%Y-%m")),
+        ]
+        if count is not None:
+            header.append(("BrojStavki", count))
+        header.append(("Generator", "NyxLight-Racunovodja-v1.0"))
 
-        # Save
         filename = f"cpp_{client_id}_{int(time.time())}.xml"
-        filepath = self.export_dir / filename
-        filepath.write_text(xml_str, encoding="utf-8")
+        filepath = export_path(self.export_dir / filename, compress)
+        with open_export(filepath, compress) as f:
+            records = write_xml_document(
+                f, "KnjizenjaImport", bookings, "Stavka",
+                fields=CPP_STAVKA_FIELDS, header=header, items_tag="Stavke",
+                optional_fields=[("PozivNaBroj", lambda i, b: b.get("poziv_na_broj"))],
+            )
 
         self._export_count += 1
-        logger.info("CPP XML export: %s (%d stavki)", filename, len(bookings))
+        logger.info("CPP XML export: %s (%d stavki)", filepath.name, records)
 
         return {
             "status": "exported",
             "erp": "CPP",
             "format": "XML",
             "file": str(filepath),
-            "filename": filename,
-            "records": len(bookings),
+            "filename": filepath.name,
+            "records": records,
             "client_id": client_id,
         }
 
     def export_synesis_csv(
         self,
-        bookings: List[Dict[str, Any]],
+        bookings: Iterable[Dict[str, Any]],
         client_id: str,
         delimiter: str = ";",
+        compress: bool = False,
     ) -> Dict[str, Any]:
         """
         Generiraj CSV datoteku za uvoz u Synesis.
@@ -128,79 +180,45 @@ class ERPExporter:
         RedniBroj;KontoDuguje;KontoPotrazuje;Iznos;Opis;Datum;OIB;PDVStopa
         """
         filename = f"synesis_{client_id}_{int(time.time())}.csv"
-        filepath = self.export_dir / filename
-
-        fieldnames = [
-            "RedniBroj", "KontoDuguje", "KontoPotrazuje", "Iznos",
-            "Opis", "DatumDokumenta", "DatumKnjizenja", "OIB",
-            "PDVStopa", "PDVIznos", "PozivNaBroj",
-        ]
+        filepath = export_path(self.export_dir / filename, compress)
 
-        with open(filepath, "w", newline="", encoding="utf-8-sig") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames, delimiter=delimiter)
-            writer.writeheader()
-
-            for i, booking in enumerate(bookings, 1):
-                writer.writerow({
-                    "RedniBroj": i,
-                    "KontoDuguje": booking.get("konto_duguje", ""),
-                    "KontoPotrazuje": booking.get("konto_potrazuje", ""),
-                    "Iznos": f"{booking.get('iznos', 0):.2f}",
-                    "Opis": booking.get("opis", ""),
-                    "DatumDokumenta": booking.get("datum_dokumenta", ""),
-                    "DatumKnjizenja": booking.get("datum_knjizenja", ""),
-                    "OIB": booking.get("oib", ""),
-                    "PDVStopa": booking.get("pdv_stopa", "25"),
-                    "PDVIznos": f"{booking.get('pdv_iznos', 0):.2f}",
-                    "PozivNaBroj": booking.get("poziv_na_broj", ""),
-                })
+        with open_export(filepath, compress, encoding="utf-8-sig") as f:
+            records = write_csv_rows(
+                f, SYNESIS_CSV_FIELDS, bookings, _synesis_csv_row, delimiter=delimiter,
+            )
 
         self._export_count += 1
-        logger.info("Synesis CSV export: %s (%d stavki)", filename, len(bookings))
+        logger.info("Synesis CSV export: %s (%d stavki)", filepath.name, records)
 
         return {
             "status": "exported",
             "erp": "Synesis",
             "format": "CSV",
             "file": str(filepath),
-            "filename": filename,
-            "records": len(bookings),
+            "filename": filepath.name,
+            "records": records,
             "client_id": client_id,
         }
 
     def export_synesis_json(
         self,
-        bookings: List[Dict[str, Any]],
+        bookings: Iterable[Dict[str, Any]],
         client_id: str,
+        compress: bool = False,
+        count: Optional[int] = None,
     ) -> Dict[str, Any]:
         """Generiraj JSON datoteku za Synesis API import."""
-        payload = {
-            "meta": {
-                "client_id": client_id,
-                "export_date": datetime.now().isoformat(),
-                "generator": "NyxLight-Racunovodja-v1.0",
-                "record_count": len(bookings),
-            },
-            "bookings": [
-                {
-                    "redni_broj": i,
-                    "konto_duguje": b.get("konto_duguje", ""),
-                    "konto_potrazuje": b.get("konto_potrazuje", ""),
-                    "iznos": round(b.get("iznos", 0), 2),
-                    "opis": b.get("opis", ""),
-                    "datum_dokumenta": b.get("datum_dokumenta", ""),
-                    "datum_knjizenja": b.get("datum_knjizenja", ""),
-                    "oib": b.get("oib", ""),
-                    "pdv_stopa": b.get("pdv_stopa", 25),
-                    "pdv_iznos": round(b.get("pdv_iznos", 0), 2),
-                }
-                for i, b in enumerate(bookings, 1)
-            ],
+        meta = {
+            "client_id": client_id,
+            "export_date": datetime.now().isoformat(),
+            "generator": "NyxLight-Racunovodja-v1.0",
+            "record_count": _known_count(bookings, count),
         }
 
         filename = f"synesis_{client_id}_{int(time.time())}.json"
-        filepath = self.export_dir / filename
-        filepath.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+        filepath = export_path(self.export_dir / filename, compress)
+        with open_export(filepath, compress) as f:
+            records = write_json_document(f, meta, bookings, _synesis_json_item)
 
         self._export_count += 1
         return {
@@ -208,26 +226,27 @@ class ERPExporter:
             "erp": "Synesis",
             "format": "JSON",
             "file": str(filepath),
-            "filename": filename,
-            "records": len(bookings),
+            "filename": filepath.name,
+            "records": records,
         }
 
     def export(
         self,
-        bookings: List[Dict[str, Any]],
+        bookings: Iterable[Dict[str, Any]],
         client_id: str,
         erp: str = "CPP",
         fmt: str = "XML",
+        compress: bool = False,
     ) -> Dict[str, Any]:
         """Univerzalni export — automatski odabir formata."""
         erp_upper = erp.upper()
 
         if erp_upper == "CPP":
-            return self.export_cpp_xml(bookings, client_id)
+            return self.export_cpp_xml(bookings, client_id, compress=compress)
         elif erp_upper == "SYNESIS" and fmt.upper() == "CSV":
-            return self.export_synesis_csv(bookings, client_id)
+            return self.export_synesis_csv(bookings, client_id, compress=compress)
         elif erp_upper == "SYNESIS":
-            return self.export_synesis_json(bookings, client_id)
+            return self.export_synesis_json(bookings, client_id, compress=compress)
         else:
             return {"status": "error", "message": f"Nepodržani ERP: {erp}"}
 
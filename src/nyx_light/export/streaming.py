@@ -0,0 +1,159 @@
+"""
+Nyx Light — Streaming ERP writeri
+
+Inkrementalno pisanje izvoznih datoteka (CPP XML, Synesis CSV/JSON)
+direktno u file handle — bez gradnje cijelog ElementTree stabla,
+serijalizacije u string i ponovnog parsiranja (minidom) samo radi
+uvlačenja. Memorija je O(1) po stavci, pa godišnji izvoz od 50k
+stavki ne drži cijeli dokument u RAM-u.
+
+Ulaz je bilo koji iterable knjiženja (lista ili generator iz
+``SQLiteStorage.iter_approved_bookings``). Opcionalno gzip.
+"""
+
+import csv
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, Iterable, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+# Polje u XML-u → funkcija (redni_broj, knjiženje) → vrijednost
+FieldSpec = Sequence[Tuple[str, Callable[[int, Dict[str, Any]], Any]]]
+
+
+def open_export(path: Path, compress: bool = False, encoding: str = "utf-8") -> IO[str]:
+    """Otvori izvoznu datoteku za tekstualno pisanje (opcionalno gzip)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if compress:
+        return gzip.open(path, "wt", encoding=encoding, newline="")
+    return open(path, "w", encoding=encoding, newline="")
+
+
+def export_path(path: Path, compress: bool = False) -> Path:
+    """Dodaj .gz sufiks ako je izvoz komprimiran."""
+    path = Path(path)
+    if compress and path.suffix != ".gz":
+        return path.with_name(path.name + ".gz")
+    return path
+
+
+class StreamingXMLWriter:
+    """
+    Minimalni xmlwriter: start/end/element pišu direktno u stream.
+
+    Uvlačenje (indent) odgovara dosadašnjem minidom pretty-printu,
+    a tekst se escapea (&, <, >) — ručno slaganje stringova to nije radilo.
+    """
+
+    def __init__(self, fh: IO[str], indent: str = "  "):
+        self._fh = fh
+        self._indent = indent
+        self._stack: List[str] = []
+
+    def declaration(self, encoding: str = "UTF-8"):
+        self._fh.write(f'<?xml version="1.0" encoding="{encoding}"?>\n')
+
+    def start(self, tag: str, attrs: Optional[Dict[str, str]] = None):
+        extra = "".join(f" {k}={quoteattr(str(v))}" for k, v in (attrs or {}).items())
+        self._fh.write(f"{self._indent * len(self._stack)}<{tag}{extra}>\n")
+        self._stack.append(tag)
+
+    def end(self, tag: Optional[str] = None):
+        open_tag = self._stack.pop()
+        if tag is not None and tag != open_tag:
+            raise ValueError(f"XML: zatvaranje <{tag}>, a otvoren je <{open_tag}>")
+        self._fh.write(f"{self._indent * len(self._stack)}</{open_tag}>\n")
+
+    def element(self, tag: str, text: Any = ""):
+        pad = self._indent * len(self._stack)
+        value = "" if text is None else escape(str(text))
+        if value:
+            self._fh.write(f"{pad}<{tag}>{value}</{tag}>\n")
+        else:
+            self._fh.write(f"{pad}<{tag}/>\n")
+
+    def close(self):
+        while self._stack:
+            self.end()
+
+
+def write_xml_document(
+    fh: IO[str],
+    root_tag: str,
+    bookings: Iterable[Dict[str, Any]],
+    item_tag: str,
+    fields: FieldSpec,
+    header: Optional[Sequence[Tuple[str, Any]]] = None,
+    items_tag: Optional[str] = None,
+    optional_fields: FieldSpec = (),
+) -> int:
+    """
+    Zapiši XML dokument stavku po stavku. Vraća broj zapisanih stavki.
+
+    ``fields`` su uvijek prisutni; ``optional_fields`` se pišu samo ako
+    funkcija vrati neprazan rezultat (npr. PozivNaBroj).
+    """
+    xw = StreamingXMLWriter(fh)
+    xw.declaration()
+    xw.start(root_tag)
+    if header:
+        xw.start("Zaglavlje")
+        for tag, value in header:
+            xw.element(tag, value)
+        xw.end("Zaglavlje")
+    if items_tag:
+        xw.start(items_tag)
+
+    count = 0
+    for count, booking in enumerate(bookings, 1):
+        xw.start(item_tag)
+        for tag, getter in fields:
+            xw.element(tag, getter(count, booking))
+        for tag, getter in optional_fields:
+            value = getter(count, booking)
+            if value:
+                xw.element(tag, value)
+        xw.end(item_tag)
+
+    xw.close()
+    return count
+
+
+def write_csv_rows(
+    fh: IO[str],
+    header: Sequence[str],
+    bookings: Iterable[Dict[str, Any]],
+    row: Callable[[int, Dict[str, Any]], Sequence[Any]],
+    delimiter: str = ";",
+) -> int:
+    """Zapiši CSV preko csv.writer direktno u handle. Vraća broj redaka."""
+    writer = csv.writer(fh, delimiter=delimiter)
+    writer.writerow(header)
+    count = 0
+    for count, booking in enumerate(bookings, 1):
+        writer.writerow(row(count, booking))
+    return count
+
+
+def write_json_document(
+    fh: IO[str],
+    meta: Dict[str, Any],
+    bookings: Iterable[Dict[str, Any]],
+    item: Callable[[int, Dict[str, Any]], Dict[str, Any]],
+    items_key: str = "bookings",
+) -> int:
+    """
+    Zapiši ``{"meta": ..., "<items_key>": [...]}`` element po element.
+
+    Format je isti kao ``json.dumps(payload, indent=2)``.
+    """
+    meta_json = json.dumps(meta, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+    fh.write('{\n  "meta": ' + meta_json + ",\n" + f'  "{items_key}": [')
+    count = 0
+    for count, booking in enumerate(bookings, 1):
+        obj = json.dumps(item(count, booking), indent=2, ensure_ascii=False)
+        fh.write(("\n    " if count == 1 else ",\n    ") + obj.replace("\n", "\n    "))
+    fh.write("\n  ]\n}" if count else "]\n}")
+    return count
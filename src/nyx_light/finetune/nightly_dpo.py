@@ -27,6 +27,10 @@ from datetime import date, datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from nyx_light.memory.dpo import (
+    EXPORT_CHUNK_SIZE, ShardedJSONLWriter, dpo_content_key, iter_unused_chunks,
+)
+
 logger = logging.getLogger("nyx_light.finetune")
 
 
@@ -81,6 +85,8 @@ class NightlyDPOTrainer:
             pairs_count INTEGER, duration_seconds REAL,
             loss_start REAL, loss_end REAL,
             lora_path TEXT, status TEXT, error TEXT)""")
+        conn.execute("""CREATE INDEX IF NOT EXISTS idx_pairs_unused
+            ON preference_pairs(used_in_run, date, id)""")
         conn.commit()
         conn.close()
 
@@ -101,52 +107,92 @@ class NightlyDPOTrainer:
         conn.close()
         return [PreferencePair(prompt=r[0],chosen=r[1],rejected=r[2],client_id=r[3],module=r[4],correction_type=r[5]) for r in rows]
 
-    def collect_unused_pairs(self, limit=500):
+    _PAIR_COLUMNS = "id, prompt, chosen, rejected, client_id, module, date, correction_type"
+
+    def _iter_unused_chunks(self, conn, chunk_size, limit=None, run_id=None):
+        """Neiskorišteni parovi po (date, id), najnoviji prvi; uz run_id blok se označava."""
+        return iter_unused_chunks(
+            conn, "preference_pairs", self._PAIR_COLUMNS, ("date", "id"),
+            "used_in_run IS NULL", chunk_size, limit,
+            mark=("used_in_run = ?", (run_id,)) if run_id else None)
+
+    def collect_unused_pairs(self, limit=MAX_PAIRS_PER_RUN):
         conn = sqlite3.connect(str(self.db_path))
-        rows = conn.execute(
-            "SELECT id,prompt,chosen,rejected,client_id,module,correction_type,date FROM preference_pairs WHERE used_in_run IS NULL ORDER BY date DESC LIMIT ?",
-            (limit,)).fetchall()
-        conn.close()
-        pairs = []
-        for r in rows:
-            p = PreferencePair(prompt=r[1],chosen=r[2],rejected=r[3],client_id=r[4],module=r[5],correction_type=r[6],timestamp=r[7])
-            p._row_id = r[0]  # Attach row ID for marking
-            pairs.append(p)
-        return pairs
+        try:
+            return [PreferencePair(prompt=r[1], chosen=r[2], rejected=r[3], client_id=r[4],
+                                   module=r[5], timestamp=r[6], correction_type=r[7])
+                    for chunk in self._iter_unused_chunks(conn, EXPORT_CHUNK_SIZE, limit)
+                    for r in chunk]
+        finally:
+            conn.close()
 
     def export_dataset(self, pairs):
-        filename = f"dpo_{date.today().isoformat()}_{int(time.time())}.jsonl"
-        filepath = self.dpo_dir / filename
-        with open(filepath, "w") as f:
-            for pair in pairs:
-                json.dump({"prompt": pair.prompt, "chosen": pair.chosen,
-                           "rejected": pair.rejected,
-                           "metadata": {"client_id": pair.client_id, "module": pair.module}},
-                          f, ensure_ascii=False)
-                f.write("\n")
+        filepath = self.dpo_dir / f"dpo_{date.today().isoformat()}_{int(time.time())}.jsonl"
+        writer = ShardedJSONLWriter(str(filepath), max_bytes=None)
+        for pair in pairs:
+            writer.write(self._dpo_record(pair.prompt, pair.chosen, pair.rejected,
+                                          pair.client_id, pair.module))
+        if not writer.commit():  # bez parova → prazna datoteka
+            filepath.touch()
         return str(filepath)
 
-    def _mark_pairs_used(self, pairs, run_id: str):
-        """Mark specific pairs as used in a training run."""
-        row_ids = [getattr(p, '_row_id', None) for p in pairs]
-        row_ids = [r for r in row_ids if r is not None]
-        if not row_ids:
-            return
-        conn = sqlite3.connect(str(self.db_path))
-        placeholders = ",".join("?" * len(row_ids))
-        conn.execute(
-            f"UPDATE preference_pairs SET used_in_run=? WHERE id IN ({placeholders})",
-            [run_id] + row_ids)
-        conn.commit()
-        conn.close()
+    @staticmethod
+    def _dpo_record(prompt, chosen, rejected, client_id, module):
+        return {"prompt": prompt, "chosen": chosen, "rejected": rejected,
+                "metadata": {"client_id": client_id, "module": module}}
+
+    def export_unused(self, run_id: str, limit=MAX_PAIRS_PER_RUN,
+                      min_pairs=MIN_PAIRS_FOR_TRAINING, chunk_size=EXPORT_CHUNK_SIZE):
+        """Streaming export neiskorištenih parova + označavanje u istoj transakciji.
+
+        Parovi se čitaju u blokovima (keyset po date/id), duplikati sadržaja
+        se preskaču (ali označavaju). Manje od min_pairs jedinstvenih → ništa
+        se ne zapisuje ni ne označava. Vraća dict sa statistikom exporta.
+        """
+        t0 = time.perf_counter()
+        filepath = self.dpo_dir / f"dpo_{date.today().isoformat()}_{int(time.time())}.jsonl"
+        writer = ShardedJSONLWriter(str(filepath), max_bytes=None)  # mlx_lm.lora: jedna datoteka
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        seen, duplicates = set(), 0
+        committed = False
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for chunk in self._iter_unused_chunks(conn, chunk_size, limit, run_id=run_id):
+                for r in chunk:
+                    key = dpo_content_key(r[1], r[2], r[3])
+                    if key in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(key)
+                    writer.write(self._dpo_record(r[1], r[2], r[3], r[4], r[5]))
+
+            if writer.records < min_pairs:
+                writer.abort()
+                conn.execute("ROLLBACK")
+                return {"exported": False, "pairs_count": writer.records,
+                        "duplicates_skipped": duplicates}
+            path = writer.commit()[0]
+            committed = True
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            writer.abort(committed=committed)
+            raise
+        finally:
+            conn.close()
+        return {"exported": True, "path": path, "pairs_count": writer.records,
+                "duplicates_skipped": duplicates, "bytes": writer.bytes_written,
+                "seconds": round(time.perf_counter() - t0, 3)}
 
     async def train_nightly(self):
-        pairs = self.collect_unused_pairs(self.MAX_PAIRS_PER_RUN)
-        if len(pairs) < self.MIN_PAIRS_FOR_TRAINING:
-            return {"status": "skipped", "reason": f"Premalo parova ({len(pairs)} < {self.MIN_PAIRS_FOR_TRAINING})", "pairs_available": len(pairs)}
-
         run_id = f"run_{date.today().isoformat()}_{int(time.time())}"
-        dataset_path = self.export_dataset(pairs)
+        export = self.export_unused(run_id)
+        if not export["exported"]:
+            n = export["pairs_count"]
+            return {"status": "skipped", "reason": f"Premalo parova ({n} < {self.MIN_PAIRS_FOR_TRAINING})", "pairs_available": n}
+
+        dataset_path = export["path"]
         lora_output = self.lora_dir / run_id
         lora_output.mkdir(exist_ok=True)
         start = time.time()
@@ -165,17 +211,17 @@ class NightlyDPOTrainer:
             status = "skipped_no_mlx"
             error = str(e)
 
-        # Mark ONLY the exported pairs as used (not all unused — race safe)
-        self._mark_pairs_used(pairs, run_id)
-
+        # Exportirani parovi su već označeni (export_unused, ista transakcija)
         conn = sqlite3.connect(str(self.db_path))
         conn.execute("INSERT INTO training_runs (run_id,date,pairs_count,duration_seconds,loss_start,loss_end,lora_path,status,error) VALUES (?,?,?,?,?,?,?,?,?)",
-            (run_id, date.today().isoformat(), len(pairs), duration, 0, 0, str(lora_output), status, error))
+            (run_id, date.today().isoformat(), export["pairs_count"], duration, 0, 0, str(lora_output), status, error))
         conn.commit()
         conn.close()
 
         self._training_runs += 1
-        return {"status": status, "run_id": run_id, "pairs_used": len(pairs),
+        return {"status": status, "run_id": run_id, "pairs_used": export["pairs_count"],
+                "duplicates_skipped": export["duplicates_skipped"],
+                "export_s": export["seconds"],
                 "duration_s": round(duration, 1), "lora_path": str(lora_output), "error": error or None}
 
     def get_stats(self):
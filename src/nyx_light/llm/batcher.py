@@ -0,0 +1,308 @@
+"""
+Nyx Light — Micro-batching LLM upita prema vllm-mlx serveru
+
+Upiti koji stignu unutar nekoliko ms (15 korisnika istovremeno) skupljaju
+se u jedan prozor i šalju zajedno:
+
+  • batch    — jedan /v1/completions s listom promptova (OpenAI format
+               dopušta ``"prompt": [...]``); odgovori se vraćaju pozivateljima
+               po ``choices[].index``
+  • pipeline — nalet pojedinačnih zahtjeva kroz isti keep-alive pool
+               (grupa od jednog upita ili server koji ne prima listu)
+
+Veličinu prozora i gornju granicu max_tokens određuje živa odluka
+AdaptiveBatchController-a (SiliconRuntime: memory pressure + thermal).
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+logger = logging.getLogger("nyx_light.llm.batcher")
+
+COALESCE_WINDOW_MS = 4.0    # koliko dugo skupljati upite prije slanja
+DECISION_TTL_S = 2.0        # koliko često ponovo čitati pressure/thermal
+# Tekst 400 odgovora po kojem se vidi da server ne prima listu promptova
+LIST_PROMPT_ERRORS = ("must be a string", "valid string", "list", "array")
+
+
+def format_chatml(messages: List[Dict[str, str]]) -> str:
+    """Chat poruke → ChatML prompt (isti format kao NyxLightLLM)."""
+    parts = [f"<|im_start|>{m.get('role', 'user')}\n{m.get('content', '')}<|im_end|>"
+             for m in messages]
+    parts.append("<|im_start|>assistant\n")
+    return "\n".join(parts)
+
+
+class LLMServerError(Exception):
+    """vllm-mlx je vratio HTTP grešku (detail = početak tijela odgovora)."""
+
+    def __init__(self, status_code: int, message: str = "", detail: str = ""):
+        super().__init__(message or f"LLM server greška ({status_code})")
+        self.status_code = status_code
+        self.detail = detail
+
+    @property
+    def rejects_prompt_list(self) -> bool:
+        """Server ne podržava ``"prompt": [...]`` (nepoznat endpoint/shema)."""
+        if self.status_code in (404, 422):
+            return True
+        detail = self.detail.lower()
+        return (self.status_code == 400 and "prompt" in detail
+                and any(m in detail for m in LIST_PROMPT_ERRORS))
+
+
+def _usage_tokens(usage: Dict[str, Any], text: str) -> int:
+    """Tokeni upita + odgovora (usage.total_tokens), bez usage broj riječi odgovora."""
+    total = usage.get("total_tokens")
+    if total is None and ("prompt_tokens" in usage or "completion_tokens" in usage):
+        total = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+    return int(total) if total is not None else len(text.split())
+
+
+@dataclass
+class _Pending:
+    params: Dict[str, Any]                      # model, temperature, max_tokens
+    future: asyncio.Future
+    prompt: str = ""
+    messages: Optional[List[Dict[str, str]]] = None
+    queued_at: float = field(default_factory=time.monotonic)
+
+    def key(self) -> Tuple:
+        return tuple(sorted(self.params.items()))
+
+
+class RequestCoalescer:
+    """Skuplja istovremene upite u batch / pipelined nalet prema jednom serveru."""
+
+    def __init__(self, base_url: str = "http://localhost:8080", model: str = "default",
+                 window_ms: float = COALESCE_WINDOW_MS, max_batch: Optional[int] = None,
+                 runtime: Any = None, batch_prompts: bool = True,
+                 timeout_s: float = 120.0, max_connections: int = 32):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.batch_prompts = batch_prompts
+        self.timeout_s = timeout_s
+        self.max_connections = max_connections
+        self._runtime = runtime
+
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._client = None
+        self._client_loop = None
+
+        self._batch_size = max_batch or 1
+        self._max_tokens_cap: Optional[int] = None
+        self._decided_at = 0.0
+        self._ready: Optional[asyncio.Task] = None     # prva odluka (čekaju je svi)
+        self._refresh: Optional[asyncio.Task] = None
+
+        self._stats = {"requests": 0, "http_calls": 0, "batched_calls": 0,
+                       "batched_requests": 0, "pipelined_calls": 0,
+                       "largest_batch": 0, "errors": 0}
+
+    # ── Odluka SiliconRuntime ──
+
+    async def _refresh_decision(self):
+        self._decided_at = time.monotonic()
+        try:
+            runtime = self._runtime
+            if runtime is None:
+                from nyx_light.silicon.apple_silicon import get_runtime
+                runtime = self._runtime = await asyncio.to_thread(get_runtime)
+            cfg = await asyncio.to_thread(runtime.batch_decision)
+            size = max(1, cfg.current_batch_size)
+            self._batch_size = min(size, self.max_batch) if self.max_batch else size
+            self._max_tokens_cap = cfg.current_max_tokens
+        except Exception as e:
+            logger.debug("Batch odluka nedostupna: %s", e)
+
+    def _limits(self) -> Tuple[int, Optional[int]]:
+        if (time.monotonic() - self._decided_at > DECISION_TTL_S
+                and (self._refresh is None or self._refresh.done())):
+            self._refresh = asyncio.get_running_loop().create_task(self._refresh_decision())
+        return self._batch_size, self._max_tokens_cap
+
+    # ── HTTP ──
+
+    def _http(self) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(max_connections=self.max_connections),
+                timeout=httpx.Timeout(self.timeout_s, connect=2.0),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def _post(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        self._stats["http_calls"] += 1
+        resp = await self._http().post(path, json=body)
+        if resp.status_code != 200:
+            raise LLMServerError(resp.status_code, detail=resp.text[:500])
+        return resp.json()
+
+    # ── Javni API ──
+
+    async def chat(self, messages: List[Dict[str, str]], temperature: float = 0.3,
+                   max_tokens: int = 2048, model: Optional[str] = None) -> Tuple[str, int]:
+        """Chat upit → (tekst, tokeni upita + odgovora). U batchu ide kao ChatML prompt."""
+        return await self._submit(messages=messages, prompt=format_chatml(messages),
+                                  temperature=temperature, max_tokens=max_tokens, model=model)
+
+    async def complete(self, prompt: str, temperature: float = 0.3,
+                       max_tokens: int = 2048, model: Optional[str] = None) -> Tuple[str, int]:
+        """Completion upit → (tekst, tokeni upita + odgovora)."""
+        return await self._submit(messages=None, prompt=prompt, temperature=temperature,
+                                  max_tokens=max_tokens, model=model)
+
+    async def _submit(self, messages, prompt, temperature, max_tokens, model) -> Tuple[str, int]:
+        if not HAS_HTTPX:
+            raise ImportError("httpx nije instaliran")
+        loop = asyncio.get_running_loop()
+        if self._ready is None or self._ready.get_loop() is not loop:
+            self._ready = loop.create_task(self._refresh_decision())
+        if not self._ready.done():
+            await self._ready
+        batch_size, cap = self._limits()
+        item = _Pending(
+            params={"model": model or self.model, "temperature": temperature,
+                    "max_tokens": min(max_tokens, cap) if cap else max_tokens},
+            future=loop.create_future(), prompt=prompt, messages=messages,
+        )
+        self._stats["requests"] += 1
+        self._pending.append(item)
+        if len(self._pending) >= batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await item.future
+
+    # ── Slanje ──
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            group = self._pending[:self._batch_size]
+            self._pending = self._pending[self._batch_size:]
+            task = loop.create_task(self._dispatch(group))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, group: List[_Pending]):
+        by_params: Dict[Tuple, List[_Pending]] = {}
+        for item in group:
+            if not item.future.done():          # pozivatelj odustao dok je čekao prozor
+                by_params.setdefault(item.key(), []).append(item)
+        calls = []
+        for items in by_params.values():
+            if len(items) > 1 and self.batch_prompts:
+                calls.append(self._batched(items))
+            else:
+                calls.extend(self._single(item) for item in items)
+        await asyncio.gather(*calls)
+
+    async def _batched(self, items: List[_Pending]):
+        body = {**items[0].params, "prompt": [i.prompt for i in items]}
+        try:
+            data = await self._post("/v1/completions", body)
+        except LLMServerError as e:
+            if e.rejects_prompt_list:
+                # Server ne prima listu promptova — dalje samo pipeline
+                logger.info("vllm-mlx odbija batch promptove (%d) — pipeline", e.status_code)
+                self.batch_prompts = False
+            elif e.status_code != 400:
+                self._fail(items, e)
+                return
+            # Ostali 400 (npr. jedan predug prompt) — ovaj batch pojedinačno,
+            # tako da grešku dobije samo upit koji ju je izazvao
+            await asyncio.gather(*(self._single(i) for i in items))
+            return
+        except Exception as e:
+            self._fail(items, e)
+            return
+
+        self._stats["batched_calls"] += 1
+        self._stats["batched_requests"] += len(items)
+        self._stats["largest_batch"] = max(self._stats["largest_batch"], len(items))
+        choices = {c.get("index", n): c.get("text", "")
+                   for n, c in enumerate(data.get("choices", []))}
+        # usage je zbirni — odgovor raspodijeli prema duljini odgovora, upit
+        # prema duljini prompta (isto značenje kao total_tokens pojedinačnog upita)
+        usage = data.get("usage", {})
+        completion = usage.get("completion_tokens", 0)
+        prompt = usage.get("prompt_tokens", 0)
+        words = [len(choices.get(n, "").split()) for n in range(len(items))]
+        chars = [len(i.prompt) for i in items]
+        for n, item in enumerate(items):
+            if n not in choices:
+                self._fail([item], ValueError(f"batch odgovor bez choices[{n}]"))
+                continue
+            tokens = round(completion * words[n] / max(1, sum(words))) if completion else words[n]
+            tokens += round(prompt * chars[n] / max(1, sum(chars)))
+            self._resolve(item, (choices[n], tokens))
+
+    async def _single(self, item: _Pending):
+        self._stats["pipelined_calls"] += 1
+        try:
+            if item.messages is not None:
+                data = await self._post("/v1/chat/completions",
+                                        {**item.params, "messages": item.messages,
+                                         "stream": False})
+                text = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+            else:
+                data = await self._post("/v1/completions", {**item.params, "prompt": item.prompt})
+                text = data.get("choices", [{}])[0].get("text", "")
+        except Exception as e:
+            self._fail([item], e)
+            return
+        self._resolve(item, (text, _usage_tokens(data.get("usage", {}), text)))
+
+    @staticmethod
+    def _resolve(item: _Pending, result: Tuple[str, int]):
+        if not item.future.done():
+            item.future.set_result(result)
+
+    def _fail(self, items: List[_Pending], exc: Exception):
+        self._stats["errors"] += len(items)
+        for item in items:
+            if not item.future.done():
+                item.future.set_exception(exc)
+
+    async def aclose(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        s = self._stats
+        return {
+            **s,
+            "window_ms": self.window_ms,
+            "batch_size": self._batch_size,
+            "max_tokens_cap": self._max_tokens_cap,
+            "batch_prompts": self.batch_prompts,
+            "avg_batch": round(s["batched_requests"] / s["batched_calls"], 2)
+            if s["batched_calls"] else 0.0,
+        }
@@ -10,8 +10,9 @@ Tijek obrade upita:
      b) L2 Semantic Memory — pravila kontiranja za klijenta
      c) L1 Episodic Memory — danas korisnikove interakcije
      d) Working context — trenutni pipeline
-  3. Gradi system prompt + user kontekst
-  4. Šalje na vllm-mlx (lokalni OpenAI-kompatibilan endpoint)
+  3. Gradi prompt u budžetu tokena, dijeljeni dijelovi prvi (prefix cache)
+  4. Šalje na vllm-mlx (lokalni OpenAI-kompatibilan endpoint); istovremeni
+     upiti idu kroz RequestCoalescer (micro-batching, vidi llm/batcher.py)
   5. Streama odgovor natrag korisniku
   6. Sprema interakciju u L1 memoriju
 
@@ -25,6 +26,9 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any, AsyncIterator, Dict, List, Optional
 
+from nyx_light.llm.batcher import LLMServerError, RequestCoalescer
+from nyx_light.llm.prompt_builder import BuiltPrompt, PromptBudget, PromptBuilder
+
 logger = logging.getLogger("nyx_light.llm.chat_bridge")
 
 
@@ -63,6 +67,7 @@ class ChatContext:
     episodic_recent: List[str] = field(default_factory=list)
     client_info: Dict[str, Any] = field(default_factory=dict)
     pipeline_context: str = ""
+    request_notes: List[str] = field(default_factory=list)   # router/modul — samo ovaj upit
 
 
 @dataclass
@@ -88,62 +93,35 @@ class ChatBridge:
                  model_name: str = "default",
                  max_context_tokens: int = 8192,
                  temperature: float = 0.3,
-                 max_tokens: int = 2048):
+                 max_tokens: int = 2048,
+                 coalesce_ms: float = 4.0):
         self.llm_url = llm_url.rstrip("/")
         self.model_name = model_name
         self.max_context_tokens = max_context_tokens
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.coalesce_ms = coalesce_ms
+        self._coalescer = None
+        self.prompt_builder = PromptBuilder(
+            SYSTEM_PROMPT, PromptBudget(total=max_context_tokens - max_tokens))
 
         # Chat historije po sesiji
         self._histories: Dict[str, List[ChatMessage]] = {}
         self._stats = {"total_queries": 0, "total_tokens": 0,
                        "avg_latency_ms": 0.0}
 
+    def build_prompt(self, user_msg: str, session_id: str,
+                     context: Optional[ChatContext] = None) -> BuiltPrompt:
+        """Prompt za LLM — system → klijent → zakoni → history → upit (s budžetom)."""
+        history = [{"role": m.role, "content": m.content}
+                   for m in self._histories.get(session_id, [])]
+        return self.prompt_builder.build(user_msg, history, context)
+
     def build_messages(self, user_msg: str, session_id: str,
                        context: Optional[ChatContext] = None
                        ) -> List[Dict[str, str]]:
-        """Izgradi messages array za LLM — system + context + history + user."""
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-
-        # Dodaj RAG kontekst
-        if context:
-            ctx_parts = []
-
-            if context.rag_results:
-                ctx_parts.append("RELEVANTNI ZAKONI:")
-                for r in context.rag_results[:5]:
-                    ctx_parts.append(f"  [{r.get('source', '')}] {r.get('text', '')[:500]}")
-
-            if context.semantic_facts:
-                ctx_parts.append("\nPRAVILA KONTIRANJA (naučeno iz prakse):")
-                for fact in context.semantic_facts[:10]:
-                    ctx_parts.append(f"  • {fact}")
-
-            if context.client_info:
-                ci = context.client_info
-                ctx_parts.append(f"\nKLIJENT: {ci.get('name', 'N/A')} "
-                                 f"(OIB: {ci.get('oib', 'N/A')}, "
-                                 f"Tip: {ci.get('type', 'N/A')})")
-
-            if context.pipeline_context:
-                ctx_parts.append(f"\nTRENUTNI RAD: {context.pipeline_context}")
-
-            if ctx_parts:
-                messages.append({
-                    "role": "system",
-                    "content": "KONTEKST ZA OVAJ UPIT:\n" + "\n".join(ctx_parts),
-                })
-
-        # Chat history (zadnjih 10 poruka za sesiju)
-        history = self._histories.get(session_id, [])
-        for msg in history[-10:]:
-            messages.append({"role": msg.role, "content": msg.content})
-
-        # User poruka
-        messages.append({"role": "user", "content": user_msg})
-
-        return messages
+        """Izgradi messages array za LLM."""
+        return self.build_prompt(user_msg, session_id, context).messages
 
     async def chat(self, user_msg: str, session_id: str,
                    context: Optional[ChatContext] = None
@@ -153,36 +131,19 @@ class ChatBridge:
         start = time.time()
 
         try:
-            import httpx
-            async with httpx.AsyncClient(timeout=120) as client:
-                resp = await client.post(
-                    f"{self.llm_url}/v1/chat/completions",
-                    json={
-                        "model": self.model_name,
-                        "messages": messages,
-                        "temperature": self.temperature,
-                        "max_tokens": self.max_tokens,
-                        "stream": False,
-                    },
-                )
-
-                if resp.status_code != 200:
-                    return ChatResponse(
-                        content=f"⚠️ LLM server greška ({resp.status_code}). "
-                                f"Provjerite da je vllm-mlx pokrenut na {self.llm_url}",
-                        latency_ms=(time.time() - start) * 1000,
-                    )
-
-                data = resp.json()
-                choice = data.get("choices", [{}])[0]
-                content = choice.get("message", {}).get("content", "")
-                tokens = data.get("usage", {}).get("total_tokens", 0)
-
+            content, tokens = await self.coalescer.chat(
+                messages, temperature=self.temperature, max_tokens=self.max_tokens)
         except ImportError:
             return ChatResponse(
                 content="⚠️ httpx nije instaliran. Pokrenite: pip install httpx",
                 latency_ms=(time.time() - start) * 1000,
             )
+        except LLMServerError as e:
+            return ChatResponse(
+                content=f"⚠️ LLM server greška ({e.status_code}). "
+                        f"Provjerite da je vllm-mlx pokrenut na {self.llm_url}",
+                latency_ms=(time.time() - start) * 1000,
+            )
         except Exception as e:
             # Fallback: simulirani odgovor za razvoj
             content = self._fallback_response(user_msg)
@@ -264,6 +225,18 @@ class ChatBridge:
         self._histories[session_id].append(
             ChatMessage("assistant", full_response, time.time()))
 
+    @property
+    def coalescer(self) -> RequestCoalescer:
+        """Dijeljeni micro-batcher prema vllm-mlx (lazy — prvi chat upit)."""
+        if self._coalescer is None:
+            self._coalescer = RequestCoalescer(self.llm_url, self.model_name,
+                                               window_ms=self.coalesce_ms)
+        return self._coalescer
+
+    async def aclose(self):
+        if self._coalescer is not None:
+            await self._coalescer.aclose()
+
     def clear_history(self, session_id: str):
         """Obriši chat historiju za sesiju."""
         self._histories.pop(session_id, None)
@@ -272,6 +245,8 @@ class ChatBridge:
         return {
             **self._stats,
             "active_sessions": len(self._histories),
+            "batching": self._coalescer.get_stats() if self._coalescer else None,
+            "prompt": self.prompt_builder.get_stats(),
         }
 
     def _fallback_response(self, user_msg: str) -> str:
@@ -0,0 +1,287 @@
+"""
+Nyx Light — Slaganje prompta s budžetom tokena
+
+Prompt se slaže od najdijeljenijeg prema najmanje dijeljenom segmentu,
+da server (prefix caching) i PromptCache mogu ponovo iskoristiti KV stanje:
+
+    system → klijent (statično) → zakoni → historija → bilješke upita → upit
+
+  • system   — isti za sve korisnike
+  • klijent  — podaci o klijentu + naučena pravila kontiranja
+  • zakoni   — RAG isječci (isti za slična pitanja)
+  • historija— zadnje poruke sesije (rastu s razgovorom)
+  • bilješke — rezultat modula/routera i trenutni rad (samo ovaj upit)
+
+Svaka sekcija ima budžet tokena, a ukupno je max_context_tokens − max_tokens.
+Tokeni se broje tokenizerom (ako je dan) ili brzim procjeniteljem.
+"""
+
+import hashlib
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("nyx_light.llm.prompt_builder")
+
+MSG_OVERHEAD_TOKENS = 4     # <|im_start|>role\n … <|im_end|>\n
+CONTEXT_HEADER = "KONTEKST:\n"
+PREFIX_CACHE_SIZE = 4096    # koliko prefiksa pamtiti za procjenu pogodaka
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_WORD_RE = re.compile(r"\w+")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text: str) -> int:
+    """Brza procjena BPE tokena: riječ ≈ 1 + 1 na svaka 4 znaka, interpunkcija 1."""
+    words = _WORD_RE.findall(text)
+    return len(words) + (sum(map(len, words)) - len(words)) // 4 + len(_PUNCT_RE.findall(text))
+
+
+@lru_cache(maxsize=1024)
+def _truncate_estimated(text: str, budget: int) -> str:
+    if estimate_tokens(text) <= budget:
+        return text
+    n = 0
+    for m in _TOKEN_RE.finditer(text):
+        n += 1 + (m.end() - m.start() - 1) / 4
+        if n > budget:
+            return text[:m.start()].rstrip() + " …"
+    return text
+
+
+@dataclass
+class PromptBudget:
+    """Budžeti tokena po sekciji."""
+    total: int = 6144               # max_context_tokens − max_tokens odgovora
+    client: int = 400
+    law: int = 800
+    law_snippet: int = 160          # po isječku (≈ 600 znakova)
+    history: int = 2500
+    request: int = 600
+    max_law_snippets: int = 5
+    max_facts: int = 10
+    max_history_messages: int = 10
+
+
+@dataclass
+class BuiltPrompt:
+    messages: List[Dict[str, str]]
+    sections: Dict[str, int] = field(default_factory=dict)     # tokeni po sekciji
+    tokens: int = 0
+    trimmed_tokens: int = 0          # odrezano budžetom
+    prefix_hit_tokens: int = 0       # vodeći segmenti već viđeni (prefix cache)
+    shared_prefix: str = ""          # system + klijent (ključ za PromptCache)
+
+
+class PromptBuilder:
+    """Slaže chat poruke u budžetu tokena, s redoslijedom za prefix caching."""
+
+    # Od najdijeljenijeg prema najmanje dijeljenom (system je uvijek prvi, upit zadnji)
+    SECTION_ORDER = ("client", "law", "history", "request")
+
+    def __init__(self, system_prompt: str, budget: Optional[PromptBudget] = None,
+                 tokenizer: Any = None, prompt_cache: Any = None,
+                 order: Optional[Tuple[str, ...]] = None):
+        self.system_prompt = system_prompt
+        self.budget = budget or PromptBudget()
+        self.order = tuple(order or self.SECTION_ORDER)
+        if sorted(self.order) != sorted(self.SECTION_ORDER):
+            raise ValueError(f"order mora sadržavati točno {self.SECTION_ORDER}")
+        self.tokenizer = tokenizer
+        self.prompt_cache = prompt_cache
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._stats = {"prompts": 0, "prompt_tokens": 0, "trimmed_tokens": 0,
+                       "prefix_hit_tokens": 0}
+
+    # ── Brojanje ──
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text))
+        return estimate_tokens(text)
+
+    def truncate(self, text: str, budget: int) -> str:
+        """Skrati tekst na ``budget`` tokena."""
+        if budget <= 0:
+            return ""
+        if self.tokenizer is not None:
+            ids = self.tokenizer.encode(text)
+            return text if len(ids) <= budget else self.tokenizer.decode(ids[:budget]) + " …"
+        return _truncate_estimated(text, budget)
+
+    def _msg_tokens(self, content: str) -> int:
+        return self.count(content) + MSG_OVERHEAD_TOKENS
+
+    # ── Sekcije ──
+
+    def _fit_lines(self, header: str, lines: List[str], budget: int) -> Tuple[str, int, int]:
+        """Redci redom dok stanu u budžet → (tekst, tokeni, odrezano)."""
+        if not lines:
+            return "", 0, 0
+        used = self._msg_tokens(header)
+        kept, trimmed = [header], 0
+        for line in lines:
+            t = self.count(line) + 1
+            if used + t > budget:
+                trimmed += t
+                continue
+            kept.append(line)
+            used += t
+        if len(kept) == 1:
+            return "", 0, trimmed
+        return "\n".join(kept), used, trimmed
+
+    def _client_section(self, ctx, budget: int) -> Tuple[str, int, int]:
+        lines = []
+        if ctx.client_info:
+            ci = ctx.client_info
+            lines.append(f"{ci.get('name', 'N/A')} (OIB: {ci.get('oib', 'N/A')}, "
+                         f"Tip: {ci.get('type', 'N/A')})")
+        for fact in ctx.semantic_facts[:self.budget.max_facts]:
+            lines.append(f"  • {fact}")
+        return self._fit_lines("KLIJENT I PRAVILA KONTIRANJA (naučeno iz prakse):",
+                               lines, budget)
+
+    def _law_section(self, ctx, budget: int) -> Tuple[str, int, int]:
+        lines, trimmed = [], 0
+        # Stalan redoslijed (po izvoru) — isti skup zakona daje isti prefiks
+        top = sorted(ctx.rag_results[:self.budget.max_law_snippets],
+                     key=lambda r: (str(r.get("source", "")), str(r.get("text", ""))[:64]))
+        for r in top:
+            line = f"  [{r.get('source', '')}] {r.get('text', '')}"
+            short = self.truncate(line, self.budget.law_snippet)
+            trimmed += self.count(line) - self.count(short) if short != line else 0
+            lines.append(short)
+        text, used, cut = self._fit_lines("RELEVANTNI ZAKONI:", lines, budget)
+        return text, used, trimmed + cut
+
+    def _request_section(self, ctx, budget: int) -> Tuple[str, int, int]:
+        lines = [f"  • {n}" for n in getattr(ctx, "request_notes", [])]
+        if ctx.pipeline_context:
+            lines.append(f"TRENUTNI RAD: {ctx.pipeline_context}")
+        full = self.count("\n".join(lines)) if lines else 0
+        text, used, trimmed = self._fit_lines("KONTEKST ZA OVAJ UPIT:", lines, budget)
+        if not text and lines and budget > MSG_OVERHEAD_TOKENS * 2:
+            # jedan predugačak redak — skrati ga umjesto da ispadne
+            text = self.truncate("KONTEKST ZA OVAJ UPIT:\n" + "\n".join(lines),
+                                 budget - MSG_OVERHEAD_TOKENS)
+            used = self._msg_tokens(text)
+            trimmed = max(0, full - used)
+        return text, used, trimmed
+
+    def _history_section(self, history: List[Dict[str, str]],
+                         budget: int) -> Tuple[List[Dict[str, str]], int, int]:
+        """Najnovije poruke unatrag dok stanu u budžet."""
+        recent = history[-self.budget.max_history_messages:]
+        kept: List[Dict[str, str]] = []
+        used = trimmed = 0
+        for i in range(len(recent) - 1, -1, -1):
+            t = self._msg_tokens(recent[i]["content"])
+            if used + t > budget:
+                trimmed += sum(self._msg_tokens(m["content"]) for m in recent[:i + 1])
+                break
+            kept.append(recent[i])
+            used += t
+        kept.reverse()
+        return kept, used, trimmed
+
+    # ── Slaganje ──
+
+    def build(self, user_msg: str, history: Optional[List[Dict[str, str]]] = None,
+              context: Any = None) -> BuiltPrompt:
+        b = self.budget
+        history = history or []
+        system_t = self._msg_tokens(self.system_prompt)
+        user_t = self._msg_tokens(user_msg)
+        header_t = self.count(CONTEXT_HEADER)
+        left = max(0, b.total - system_t - user_t - header_t)
+        sections = {"system": system_t}
+        trimmed = 0
+        client = law = request = ""
+
+        if context is not None:
+            request, t, cut = self._request_section(context, min(b.request, left))
+            left -= t
+            sections["request"], trimmed = t, trimmed + cut
+            client, t, cut = self._client_section(context, min(b.client, left))
+            left -= t
+            sections["client"], trimmed = t, trimmed + cut
+            law, t, cut = self._law_section(context, min(b.law, left))
+            left -= t
+            sections["law"], trimmed = t, trimmed + cut
+
+        hist, t, cut = self._history_section(history, min(b.history, left))
+        sections["history"], trimmed = t, trimmed + cut
+        sections["user"] = user_t
+
+        # Segmenti redom za prefix cache; susjedni klijent + zakoni idu u jednu poruku
+        parts = {"client": [("system", client, sections.get("client", 0))] if client else [],
+                 "law": [("system", law, sections.get("law", 0))] if law else [],
+                 "history": [(m["role"], m["content"], self._msg_tokens(m["content"]))
+                             for m in hist],
+                 "request": [("system", request, sections.get("request", 0))] if request else []}
+        segments = [("system", self.system_prompt, system_t)]
+        messages = [{"role": "system", "content": self.system_prompt}]
+        prev = ""
+        for section in self.order:
+            for role, text, tokens in parts[section]:
+                if section in ("client", "law") and prev in ("client", "law"):
+                    text = "\n\n" + text
+                    messages[-1]["content"] += text
+                else:
+                    if section in ("client", "law"):
+                        text = CONTEXT_HEADER + text
+                        tokens += header_t
+                        sections[section] += header_t
+                    messages.append({"role": role, "content": text})
+                segments.append((role, text, tokens))
+                prev = section
+        segments.append(("user", user_msg, user_t))
+        messages.append({"role": "user", "content": user_msg})
+
+        shared = self.system_prompt + (segments[1][1] if self.order[0] == "client" and client
+                                       else "")
+        if self.prompt_cache is not None and self.prompt_cache.get(shared) is None:
+            self.prompt_cache.put(shared, self.count(shared))
+
+        built = BuiltPrompt(messages=messages, sections=sections,
+                            tokens=sum(sections.values()), trimmed_tokens=trimmed,
+                            prefix_hit_tokens=self._prefix_hits(segments),
+                            shared_prefix=shared)
+        s = self._stats
+        s["prompts"] += 1
+        s["prompt_tokens"] += built.tokens
+        s["trimmed_tokens"] += trimmed
+        s["prefix_hit_tokens"] += built.prefix_hit_tokens
+        return built
+
+    def _prefix_hits(self, segments: List[Tuple[str, str, int]]) -> int:
+        """Tokeni vodećih segmenata čiji je prefiks već poslan (model prefix cachea)."""
+        h = hashlib.sha1()
+        hits, hitting = 0, True
+        for role, text, tokens in segments:
+            h.update(f"{role}\x00{text}\x01".encode())
+            key = h.hexdigest()
+            if hitting and key in self._seen:
+                hits += tokens
+                self._seen.move_to_end(key)
+            else:
+                hitting = False
+                self._seen[key] = None
+        while len(self._seen) > PREFIX_CACHE_SIZE:
+            self._seen.popitem(last=False)
+        return hits
+
+    def get_stats(self) -> Dict[str, Any]:
+        s = self._stats
+        return {
+            **s,
+            "avg_prompt_tokens": round(s["prompt_tokens"] / s["prompts"], 1) if s["prompts"] else 0,
+            "prefix_hit_pct": round(s["prefix_hit_tokens"] / s["prompt_tokens"] * 100, 1)
+            if s["prompt_tokens"] else 0.0,
+        }
@@ -13,6 +13,13 @@ Memory Budget (peak):
   OS + servisi:                      ~12–18 GB
   Slobodno:                          ~56–78 GB od 256 GB
 
+HTTP prema vLLM-MLX serveru:
+  Jedan dijeljeni httpx.AsyncClient (keep-alive pool, ograničen broj
+  konekcija, timeout po zahtjevu) — generiranje i SSE streaming ne
+  blokiraju event loop FastAPI-ja. Stanje /health se cachira
+  (health_ttl_s) i osvježava u pozadini; neuspjela konekcija ga odmah
+  spušta.
+
 Adaptirano iz Nyx 47.0 VLLMMLXProvider.
 """
 
@@ -30,6 +37,12 @@ from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 logger = logging.getLogger("nyx_light.llm")
 
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
 
 class InferenceBackend(Enum):
     DIRECT = "direct"
@@ -80,6 +93,15 @@ class LLMConfig:
     wired_memory_pct: float = 0.83
     total_memory_gb: float = 256.0
 
+    # HTTP klijent prema vLLM-MLX serveru
+    http_max_connections: int = 32       # > vllm_max_concurrency, rezerva za health/stream
+    http_max_keepalive: int = 16
+    http_keepalive_expiry_s: float = 30.0
+    connect_timeout_s: float = 2.0
+    request_timeout_s: float = 120.0     # čitanje odgovora (dugi completioni)
+    health_ttl_s: float = 10.0
+    health_timeout_s: float = 2.0
+
 
 class NyxLightLLM:
     """
@@ -105,6 +127,14 @@ class NyxLightLLM:
         self._vision_call_count = 0
         self._total_tokens = 0
         self._active_experts_history: List[int] = []
+        # HTTP: klijent je vezan uz event loop u kojem je kreiran
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._vllm_up: Optional[bool] = None
+        self._health_checked_at = 0.0
+        self._health_task: Optional[asyncio.Task] = None
+        self._health_probe: Optional[asyncio.Task] = None
+        self._http_stats = {"requests": 0, "errors": 0, "in_flight": 0, "health_checks": 0}
         logger.info(
             "NyxLightLLM V1.3 initialized: model=%s (MoE %dB/%dB), backend=%s",
             self.config.default_model,
@@ -113,14 +143,112 @@ class NyxLightLLM:
             self.config.backend.value,
         )
 
+    # ── HTTP klijent i health ──
+
+    @property
+    def _base_url(self) -> str:
+        return f"http://{self.config.vllm_host}:{self.config.vllm_port}"
+
+    def _http(self) -> "httpx.AsyncClient":
+        """Dijeljeni AsyncClient za tekući event loop (novi loop → novi pool)."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop or self._client.is_closed:
+            cfg = self.config
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                limits=httpx.Limits(max_connections=cfg.http_max_connections,
+                                    max_keepalive_connections=cfg.http_max_keepalive,
+                                    keepalive_expiry=cfg.http_keepalive_expiry_s),
+                timeout=httpx.Timeout(cfg.request_timeout_s, connect=cfg.connect_timeout_s),
+            )
+            self._client_loop = loop
+        return self._client
+
+    def _set_health(self, up: bool):
+        if up != self._vllm_up:
+            logger.info("vLLM-MLX server %s", "dostupan" if up else "nedostupan")
+        self._vllm_up = up
+        self._health_checked_at = time.monotonic()
+
+    def _health_fresh(self) -> bool:
+        return (self._vllm_up is not None
+                and time.monotonic() - self._health_checked_at < self.config.health_ttl_s)
+
+    async def refresh_health(self) -> bool:
+        """Asinkroni /health probe; rezultat vrijedi health_ttl_s.
+
+        Istovremeni pozivi čekaju isti probe umjesto da svaki šalje svoj.
+        """
+        if not HAS_HTTPX:
+            self._set_health(False)
+            return False
+        probe = self._health_probe
+        if probe is None or probe.done() or probe.get_loop() is not asyncio.get_running_loop():
+            probe = self._health_probe = asyncio.ensure_future(self._probe_health())
+        return await asyncio.shield(probe)
+
+    async def _probe_health(self) -> bool:
+        self._http_stats["health_checks"] += 1
+        try:
+            resp = await self._http().get("/health", timeout=self.config.health_timeout_s)
+            up = resp.status_code == 200
+        except httpx.HTTPError:
+            up = False
+        self._set_health(up)
+        return up
+
+    async def _vllm_available(self) -> bool:
+        if self._health_fresh():
+            return bool(self._vllm_up)
+        return await self.refresh_health()
+
+    def start_health_monitor(self) -> Optional[asyncio.Task]:
+        """Pozadinsko osvježavanje health stanja (poziva se iz lifespana)."""
+        if self._health_task and not self._health_task.done():
+            return self._health_task
+
+        async def _loop():
+            while True:
+                await self.refresh_health()
+                await asyncio.sleep(self.config.health_ttl_s / 2)
+
+        self._health_task = asyncio.get_running_loop().create_task(_loop())
+        return self._health_task
+
+    async def aclose(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
     def _is_vllm_running(self) -> bool:
+        """Sinkrona provjera (statistike): cachirano stanje ili blokirajući probe."""
+        if self._health_fresh():
+            return bool(self._vllm_up)
         try:
             import urllib.request
-            url = f"http://{self.config.vllm_host}:{self.config.vllm_port}/health"
-            resp = urllib.request.urlopen(url, timeout=2)
-            return resp.status == 200
+            resp = urllib.request.urlopen(f"{self._base_url}/health",
+                                          timeout=self.config.health_timeout_s)
+            up = resp.status == 200
         except Exception:
-            return False
+            up = False
+        self._set_health(up)
+        return up
+
+    def _payload(self, prompt: str, max_tokens: int, temperature: float,
+                 stream: bool = False) -> Dict[str, Any]:
+        payload = {
+            "model": self.config.default_model,
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": self.config.top_p,
+        }
+        if stream:
+            payload["stream"] = True
+        return payload
 
     async def generate(
         self,
@@ -139,7 +267,7 @@ class NyxLightLLM:
 
         prompt = self._format_messages(messages)
 
-        if self._is_vllm_running():
+        if await self._vllm_available():
             content, tokens = await self._vllm_generate(prompt, max_tok, temp)
         else:
             content, tokens = self._fallback_generate(messages, max_tok)
@@ -165,7 +293,7 @@ class NyxLightLLM:
         max_tok = max_tokens or self.config.max_tokens
         prompt = self._format_messages(messages)
 
-        if self._is_vllm_running():
+        if await self._vllm_available():
             async for token in self._vllm_stream(prompt, max_tok, temp):
                 yield token
         else:
@@ -177,60 +305,55 @@ class NyxLightLLM:
     async def _vllm_generate(
         self, prompt: str, max_tokens: int, temperature: float
     ) -> Tuple[str, int]:
+        stats = self._http_stats
+        stats["requests"] += 1
+        stats["in_flight"] += 1
         try:
-            import urllib.request
-            url = f"http://{self.config.vllm_host}:{self.config.vllm_port}/v1/completions"
-            payload = json.dumps({
-                "model": self.config.default_model,
-                "prompt": prompt,
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "top_p": self.config.top_p,
-            }).encode()
-            req = urllib.request.Request(
-                url, data=payload,
-                headers={"Content-Type": "application/json"},
-                method="POST",
-            )
-            resp = urllib.request.urlopen(req, timeout=120)
-            data = json.loads(resp.read().decode())
+            resp = await self._http().post(
+                "/v1/completions", json=self._payload(prompt, max_tokens, temperature))
+            resp.raise_for_status()
+            data = resp.json()
             text = data["choices"][0]["text"]
             tokens = data.get("usage", {}).get("completion_tokens", len(text.split()))
             return text, tokens
         except Exception as e:
+            stats["errors"] += 1
+            if isinstance(e, httpx.TransportError):
+                self._set_health(False)
             logger.warning("vLLM request failed: %s — using fallback", e)
             return self._fallback_generate([], max_tokens)
+        finally:
+            stats["in_flight"] -= 1
 
     async def _vllm_stream(
         self, prompt: str, max_tokens: int, temperature: float
     ) -> AsyncIterator[str]:
+        stats = self._http_stats
+        stats["requests"] += 1
+        stats["in_flight"] += 1
         try:
-            import urllib.request
-            url = f"http://{self.config.vllm_host}:{self.config.vllm_port}/v1/completions"
-            payload = json.dumps({
-                "model": self.config.default_model,
-                "prompt": prompt,
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "stream": True,
-            }).encode()
-            req = urllib.request.Request(
-                url, data=payload,
-                headers={"Content-Type": "application/json"},
-            )
-            resp = urllib.request.urlopen(req, timeout=120)
-            for line in resp:
-                line = line.decode().strip()
-                if line.startswith("data: ") and line != "data: [DONE]":
+            async with self._http().stream(
+                "POST", "/v1/completions",
+                json=self._payload(prompt, max_tokens, temperature, stream=True),
+            ) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line.startswith("data: ") or line == "data: [DONE]":
+                        continue
                     try:
                         chunk = json.loads(line[6:])
                         text = chunk["choices"][0].get("text", "")
                         if text:
                             yield text
-                    except (json.JSONDecodeError, KeyError):
+                    except (json.JSONDecodeError, KeyError, IndexError):
                         pass
         except Exception as e:
+            stats["errors"] += 1
+            if isinstance(e, httpx.TransportError):
+                self._set_health(False)
             yield f"[Stream error: {e}]"
+        finally:
+            stats["in_flight"] -= 1
 
     def _fallback_generate(
         self, messages: List[Dict], max_tokens: int
@@ -326,6 +449,7 @@ class NyxLightLLM:
             "vision_call_count": self._vision_call_count,
             "total_tokens": self._total_tokens,
             "vllm_running": self._is_vllm_running(),
+            "http": dict(self._http_stats),
             "backend": self.config.backend.value,
             "vision_loaded": self._vision_loaded,
             "memory": memory,
@@ -2,27 +2,34 @@
 Nyx Light — LLM Request Queue za 15 konkurentnih korisnika
 
 Problemi koje rješava:
-1. Max 3 istovremena LLM poziva (Semaphore) — sprječava OOM
-2. Fair scheduling — FIFO red, nijedan korisnik ne monopolizira
+1. Max 3 istovremena LLM poziva — sprječava OOM
+2. Fair scheduling — svaki korisnik ima svoj virtualni red, slotovi se
+   dijele deficit round robinom (DRR) s težinom po korisniku i cijenom
+   zahtjeva, pa jedan korisnik s 50 upita ne monopolizira slotove
 3. Per-user rate limit — max 10 req/min po korisniku
-4. Timeout — request ne visi zauvijek
-5. Priority — admin/hitni upiti idu prvo
+4. Timeout / rok — zahtjev kojem procijenjeno čekanje premašuje rok
+   odbija se odmah (deadline-aware admission), inače čeka najviše do roka
+5. Priority — strogi prioritetni redovi: hitno > admin > interaktivni chat
+   > pozadinski poslovi (noćni DPO eval, batch ekstrakcija)
+6. Povratna informacija o poziciji u redu (WebSocket klijent)
 
 Arhitektura:
-  Korisnik → RequestQueue → Semaphore(3) → LLM Provider → Response
-                ↓
-           Rate Limiter (10/min/user)
-                ↓
-           Metrics (avg wait, queue depth)
+  Korisnik → Rate Limiter (10/min/user) → prioritetni red (lane)
+                → DRR po korisnicima → slot (3) → LLM Provider → Response
+                                ↓
+           Metrics (p50/p99 čekanja po redu, dubina reda)
 """
 
 import asyncio
+import inspect
 import logging
+import math
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Callable, Coroutine, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Coroutine, Deque, Dict, List, Optional
 
 logger = logging.getLogger("nyx_light.llm.queue")
 
@@ -31,6 +38,18 @@ MAX_CONCURRENT_LLM = 3          # Max istovremenih LLM poziva
 MAX_REQUESTS_PER_MIN = 10       # Per-user rate limit
 REQUEST_TIMEOUT_SEC = 120       # Max čekanje u redu
 QUEUE_MAX_SIZE = 50             # Max veličina reda
+DRR_QUANTUM = 1.0               # Kredit po krugu (× težina korisnika)
+SERVICE_TIME_EST_SEC = 5.0      # Početna procjena trajanja LLM poziva (EWMA)
+WAIT_SAMPLES = 1000             # Zadnjih N čekanja po redu za p50/p99
+
+# ── Prioriteti (strogi redovi) ──
+PRIORITY_BACKGROUND = -1        # noćni DPO eval, batch ekstrakcija
+PRIORITY_NORMAL = 0             # interaktivni chat
+PRIORITY_HIGH = 1               # admin
+PRIORITY_URGENT = 2
+
+LANE_NAMES = {PRIORITY_BACKGROUND: "background", PRIORITY_NORMAL: "interactive",
+              PRIORITY_HIGH: "high", PRIORITY_URGENT: "urgent"}
 
 
 @dataclass
@@ -38,12 +57,16 @@ class QueuedRequest:
     """Jedan zahtjev u redu čekanja."""
     request_id: str
     user_id: str
-    priority: int = 0           # 0=normal, 1=high (admin), 2=urgent
+    priority: int = 0           # -1=background, 0=normal, 1=high (admin), 2=urgent
     created_at: float = field(default_factory=time.time)
     future: asyncio.Future = field(default=None)
     func: Callable = None
     args: tuple = ()
     kwargs: dict = field(default_factory=dict)
+    cost: float = 1.0           # cijena u DRR (npr. procjena tokena / 1000)
+    deadline: float = 0.0       # time.monotonic() do kada mora dobiti slot
+    on_position: Optional[Callable[[Dict[str, Any]], Any]] = None
+    last_position: int = 0
 
     def __lt__(self, other):
         """Za PriorityQueue — viši priority ide prvi, pa FIFO."""
@@ -52,6 +75,69 @@ class QueuedRequest:
         return self.created_at < other.created_at
 
 
+class _Lane:
+    """Jedan prioritetni red: virtualni red po korisniku + DRR."""
+
+    def __init__(self):
+        self.queues: Dict[str, Deque[QueuedRequest]] = {}
+        self.deficit: Dict[str, float] = defaultdict(float)
+        self.active: Deque[str] = deque()     # korisnici s nepraznim redom (round robin)
+        self.size = 0
+
+    def push(self, req: QueuedRequest):
+        q = self.queues.get(req.user_id)
+        if q is None:
+            q = self.queues[req.user_id] = deque()
+        if not q:
+            self.active.append(req.user_id)
+        q.append(req)
+        self.size += 1
+
+    def pop(self, weight: Callable[[str], float]) -> Optional[QueuedRequest]:
+        while self.active:
+            uid = self.active[0]
+            q = self.queues[uid]
+            while q and q[0].future.done():       # otkazani / istekli
+                q.popleft()
+            if not q:
+                self.active.popleft()
+                self.deficit[uid] = 0.0
+                continue
+            if self.deficit[uid] < q[0].cost:
+                self.deficit[uid] += DRR_QUANTUM * weight(uid)
+                self.active.rotate(-1)
+                continue
+            req = q.popleft()
+            self.size -= 1
+            self.deficit[uid] -= req.cost
+            if not q:
+                self.active.popleft()
+                self.deficit[uid] = 0.0
+            return req
+        return None
+
+    def discard(self, req: QueuedRequest):
+        """Zahtjev je napustio red (timeout/cancel); fizički se uklanja u pop()."""
+        self.size -= 1
+
+    def live(self, user_id: str) -> List[QueuedRequest]:
+        return [r for r in self.queues.get(user_id, ()) if not r.future.done()]
+
+    def ahead_of(self, user_id: str, idx: int, weight: Callable[[str], float]) -> int:
+        """
+        Procjena broja zahtjeva u ovom redu koji idu prije idx-tog zahtjeva
+        korisnika (idx = broj njegovih ranijih zahtjeva) — DRR s težinama:
+        svaki drugi korisnik u to vrijeme dobije ~ (idx+1)·w_v/w_u slotova.
+        """
+        w_u = weight(user_id)
+        ahead = idx
+        for uid in self.active:
+            if uid != user_id:
+                n = len(self.live(uid))
+                ahead += min(n, math.ceil((idx + 1) * weight(uid) / w_u))
+        return ahead
+
+
 class UserRateLimiter:
     """Sliding window rate limiter po korisniku."""
 
@@ -102,6 +188,11 @@ class LLMRequestQueue:
             messages=[...],
             temperature=0.3,
         )
+
+        # Streaming (WebSocket) — slot za cijelo trajanje streama:
+        async with queue.slot(user_id, on_position=obavijesti_klijenta):
+            async for token in bridge.chat_stream(...):
+                ...
     """
 
     def __init__(
@@ -109,11 +200,15 @@ class LLMRequestQueue:
         max_concurrent: int = MAX_CONCURRENT_LLM,
         max_per_minute: int = MAX_REQUESTS_PER_MIN,
         timeout: float = REQUEST_TIMEOUT_SEC,
+        weights: Optional[Dict[str, float]] = None,
     ):
-        self._semaphore = asyncio.Semaphore(max_concurrent)
         self._rate_limiter = UserRateLimiter(max_per_minute)
         self._timeout = timeout
         self._max_concurrent = max_concurrent
+        self._lanes: Dict[int, _Lane] = {}
+        self._weights: Dict[str, float] = dict(weights or {})
+        self._service_est = SERVICE_TIME_EST_SEC
+        self._seq = 0
 
         # Metrike
         self._total_requests = 0
@@ -123,6 +218,7 @@ class LLMRequestQueue:
         self._total_wait_time = 0.0
         self._active_requests = 0
         self._queue_depth = 0
+        self._waits: Dict[int, Deque[float]] = defaultdict(lambda: deque(maxlen=WAIT_SAMPLES))
         self._user_stats: Dict[str, Dict[str, int]] = defaultdict(
             lambda: {"requests": 0, "completed": 0, "errors": 0}
         )
@@ -132,33 +228,86 @@ class LLMRequestQueue:
             max_concurrent, max_per_minute, timeout,
         )
 
-    async def submit(
-        self,
-        user_id: str,
-        func: Callable[..., Coroutine],
-        *args,
-        priority: int = 0,
-        **kwargs,
-    ) -> Any:
-        """
-        Submit LLM request s rate limiting i fair scheduling.
-
-        Args:
-            user_id: ID korisnika
-            func: Async funkcija za poziv (npr. llm.generate)
-            priority: 0=normal, 1=high, 2=urgent
-            *args, **kwargs: Argumenti za func
-
-        Returns:
-            Rezultat func poziva
-
-        Raises:
-            RateLimitError: Previše requestova
-            QueueFullError: Red je pun
-            TimeoutError: Predugo čekanje
-        """
-        # 1. Rate limit check
-        if not self._rate_limiter.check(user_id):
+    # ── Težine i procjene ──
+
+    def set_weight(self, user_id: str, weight: float):
+        """Udio korisnika u DRR-u (default 1.0; 2.0 = dvostruko više slotova)."""
+        self._weights[user_id] = max(weight, 0.01)
+
+    def _weight(self, user_id: str) -> float:
+        return self._weights.get(user_id, 1.0)
+
+    def _ahead(self, user_id: str, priority: int, req: Optional[QueuedRequest] = None) -> int:
+        """Zahtjeva ispred req (ili ispred novog zahtjeva ako req=None)."""
+        ahead = sum(lane.size for p, lane in self._lanes.items() if p > priority)
+        lane = self._lanes.get(priority)
+        if lane is None:
+            return ahead
+        live = lane.live(user_id)
+        idx = live.index(req) if req in live else len(live)
+        return ahead + lane.ahead_of(user_id, idx, self._weight)
+
+    def _eta(self, ahead: int) -> float:
+        return (ahead + 1) / self._max_concurrent * self._service_est
+
+    def position(self, req: QueuedRequest) -> Dict[str, Any]:
+        ahead = self._ahead(req.user_id, req.priority, req)
+        return {"position": ahead + 1, "ahead": ahead,
+                "eta_seconds": round(self._eta(ahead), 1),
+                "lane": LANE_NAMES.get(req.priority, str(req.priority))}
+
+    def _notify_positions(self):
+        for lane in self._lanes.values():
+            for q in lane.queues.values():
+                for req in q:
+                    if req.on_position is None or req.future.done():
+                        continue
+                    info = self.position(req)
+                    if info["position"] != req.last_position:
+                        req.last_position = info["position"]
+                        self._call_position(req, info)
+
+    @staticmethod
+    def _call_position(req: QueuedRequest, info: Dict[str, Any]):
+        try:
+            res = req.on_position(info)
+            if inspect.isawaitable(res):
+                asyncio.ensure_future(res)
+        except Exception as e:
+            logger.debug("on_position za %s: %s", req.user_id, e)
+
+    # ── Slotovi ──
+
+    def _dispatch(self):
+        """Predaj slobodne slotove sljedećim zahtjevima (strogi prioritet, DRR)."""
+        dispatched = False
+        while self._active_requests < self._max_concurrent:
+            req = None
+            for prio in sorted(self._lanes, reverse=True):
+                req = self._lanes[prio].pop(self._weight)
+                if req is not None:
+                    break
+            if req is None:
+                break
+            self._queue_depth -= 1
+            self._active_requests += 1
+            req.future.set_result(True)
+            dispatched = True
+        if dispatched:
+            self._notify_positions()
+
+    def _release(self, service_time: float):
+        self._active_requests -= 1
+        self._service_est = 0.8 * self._service_est + 0.2 * service_time
+        self._dispatch()
+
+    async def _acquire(self, user_id: str, priority: int, cost: float,
+                       deadline_s: Optional[float],
+                       on_position: Optional[Callable[[Dict[str, Any]], Any]],
+                       rate_limited: bool) -> float:
+        """Čekaj slot; vraća vrijeme čekanja. Iznimke kao submit()."""
+        # 1. Rate limit check (pozadinski poslovi nisu korisnički zahtjevi)
+        if rate_limited and not self._rate_limiter.check(user_id):
             remaining_sec = self._rate_limiter.reset_in(user_id)
             self._total_rejected += 1
             logger.warning("Rate limit: %s (reset za %.0fs)", user_id, remaining_sec)
@@ -172,55 +321,152 @@ class LLMRequestQueue:
             self._total_rejected += 1
             raise QueueFullError("Sustav je preopterećen. Pokušajte za minutu.")
 
-        # 3. Record & track
-        self._rate_limiter.record(user_id)
+        loop = asyncio.get_running_loop()
+        self._seq += 1
+        limit = min(self._timeout, deadline_s) if deadline_s else self._timeout
+        req = QueuedRequest(request_id=f"{user_id}-{self._seq}", user_id=user_id,
+                            priority=priority, future=loop.create_future(), cost=cost,
+                            deadline=time.monotonic() + limit, on_position=on_position)
+
+        # 3. Deadline-aware admission — slot odmah ili procjena čekanja unutar roka
+        free = (self._active_requests < self._max_concurrent and self._queue_depth == 0)
+        if not free and deadline_s is not None:
+            ahead = self._ahead(user_id, priority)
+            if self._eta(ahead) > deadline_s:
+                self._total_rejected += 1
+                raise DeadlineExceededError(
+                    f"Sustav je preopterećen — procijenjeno čekanje {self._eta(ahead):.0f}s "
+                    f"premašuje rok od {deadline_s:.0f}s.",
+                    retry_after=self._eta(ahead) - deadline_s,
+                )
+
+        # 4. Record & track
+        if rate_limited:
+            self._rate_limiter.record(user_id)
         self._total_requests += 1
-        self._queue_depth += 1
         self._user_stats[user_id]["requests"] += 1
+        start_wait = time.monotonic()
 
-        start_wait = time.time()
-
-        try:
-            # 4. Acquire semaphore (fair FIFO through asyncio)
-            async with asyncio.timeout(self._timeout):
-                await self._semaphore.acquire()
-
-            wait_time = time.time() - start_wait
-            self._total_wait_time += wait_time
-            self._queue_depth -= 1
+        if free:
             self._active_requests += 1
+            return 0.0
 
-            if wait_time > 2:
-                logger.info(
-                    "Request %s čekao %.1fs u redu (active=%d)",
-                    user_id, wait_time, self._active_requests,
-                )
-
-            try:
-                # 5. Execute LLM call
-                result = await func(*args, **kwargs)
-                self._total_completed += 1
-                self._user_stats[user_id]["completed"] += 1
-                return result
-
-            except Exception as e:
-                self._user_stats[user_id]["errors"] += 1
-                logger.error("LLM error za %s: %s", user_id, e)
-                raise
-
-            finally:
-                self._active_requests -= 1
-                self._semaphore.release()
+        self._queue_depth += 1
+        lane = self._lanes.get(priority)
+        if lane is None:
+            lane = self._lanes[priority] = _Lane()
+        lane.push(req)
+        if on_position is not None:
+            info = self.position(req)
+            req.last_position = info["position"]
+            self._call_position(req, info)
 
-        except asyncio.TimeoutError:
-            self._queue_depth -= 1
+        try:
+            done, _ = await asyncio.wait({req.future}, timeout=limit)
+        except asyncio.CancelledError:
+            self._abandon(req, lane)
+            raise
+        if not done:
+            self._abandon(req, lane)
             self._total_timeouts += 1
-            logger.warning("Timeout za %s nakon %.0fs", user_id, self._timeout)
+            logger.warning("Timeout za %s nakon %.0fs", user_id, limit)
             raise TimeoutError(
-                f"Zahtjev je istekao nakon {int(self._timeout)}s. "
+                f"Zahtjev je istekao nakon {int(limit)}s. "
                 "Sustav je zauzet — pokušajte ponovo."
             )
 
+        wait_time = time.monotonic() - start_wait
+        self._waits[priority].append(wait_time)
+        if wait_time > 2:
+            logger.info(
+                "Request %s čekao %.1fs u redu (active=%d)",
+                user_id, wait_time, self._active_requests,
+            )
+        return wait_time
+
+    def _abandon(self, req: QueuedRequest, lane: _Lane):
+        if req.future.done() and not req.future.cancelled():
+            # Slot je dodijeljen baš prije odustajanja — vrati ga
+            self._release(self._service_est)
+            return
+        req.future.cancel()
+        lane.discard(req)
+        self._queue_depth -= 1
+        self._notify_positions()
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: str,
+        priority: int = PRIORITY_NORMAL,
+        cost: float = 1.0,
+        deadline_s: Optional[float] = None,
+        on_position: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    ) -> AsyncIterator[float]:
+        """Zauzmi LLM slot za blok koda (npr. cijeli stream); yield = vrijeme čekanja."""
+        wait_time = await self._acquire(user_id, priority, cost, deadline_s, on_position,
+                                        rate_limited=priority != PRIORITY_BACKGROUND)
+        self._total_wait_time += wait_time
+        started = time.monotonic()
+        try:
+            yield wait_time
+            self._total_completed += 1
+            self._user_stats[user_id]["completed"] += 1
+        except Exception as e:
+            self._user_stats[user_id]["errors"] += 1
+            logger.error("LLM error za %s: %s", user_id, e)
+            raise
+        finally:
+            self._release(time.monotonic() - started)
+
+    async def submit(
+        self,
+        user_id: str,
+        func: Callable[..., Coroutine],
+        *args,
+        priority: int = PRIORITY_NORMAL,
+        cost: float = 1.0,
+        deadline_s: Optional[float] = None,
+        on_position: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        Submit LLM request s rate limiting i fair scheduling.
+
+        Args:
+            user_id: ID korisnika
+            func: Async funkcija za poziv (npr. llm.generate)
+            priority: -1=background, 0=normal, 1=high, 2=urgent (strogi redovi)
+            cost: cijena zahtjeva u DRR-u (veći upiti troše više kredita)
+            deadline_s: rok za dobivanje slota; ako procjena čekanja premašuje
+                rok, zahtjev se odmah odbija (DeadlineExceededError)
+            on_position: callback(dict) s pozicijom u redu (može biti async)
+            *args, **kwargs: Argumenti za func
+
+        Returns:
+            Rezultat func poziva
+
+        Raises:
+            RateLimitError: Previše requestova
+            QueueFullError: Red je pun (DeadlineExceededError: rok nedostižan)
+            TimeoutError: Predugo čekanje
+        """
+        async with self.slot(user_id, priority, cost, deadline_s, on_position):
+            return await func(*args, **kwargs)
+
+    async def submit_background(self, job_id: str, func: Callable[..., Coroutine],
+                                *args, cost: float = 1.0, **kwargs) -> Any:
+        """Pozadinski posao (DPO eval, batch ekstrakcija) — samo kad nema interaktivnih."""
+        return await self.submit(job_id, func, *args, priority=PRIORITY_BACKGROUND,
+                                 cost=cost, **kwargs)
+
+    @staticmethod
+    def _percentile(values: List[float], pct: float) -> float:
+        if not values:
+            return 0.0
+        s = sorted(values)
+        return s[min(len(s) - 1, int(round(pct / 100 * (len(s) - 1))))]
+
     def get_stats(self) -> Dict[str, Any]:
         """Statistike reda čekanja."""
         avg_wait = (
@@ -228,6 +474,16 @@ class LLMRequestQueue:
             if self._total_completed > 0
             else 0
         )
+        lanes = {}
+        for prio in sorted(set(self._lanes) | set(self._waits), reverse=True):
+            waits = list(self._waits.get(prio, ()))
+            lane = self._lanes.get(prio)
+            lanes[LANE_NAMES.get(prio, str(prio))] = {
+                "queued": lane.size if lane else 0,
+                "users_waiting": len(lane.active) if lane else 0,
+                "p50_wait_seconds": round(self._percentile(waits, 50), 3),
+                "p99_wait_seconds": round(self._percentile(waits, 99), 3),
+            }
         return {
             "active_requests": self._active_requests,
             "max_concurrent": self._max_concurrent,
@@ -237,9 +493,11 @@ class LLMRequestQueue:
             "total_rejected": self._total_rejected,
             "total_timeouts": self._total_timeouts,
             "avg_wait_seconds": round(avg_wait, 2),
+            "service_time_est_seconds": round(self._service_est, 2),
             "utilization_pct": round(
                 self._active_requests / self._max_concurrent * 100, 1
             ),
+            "lanes": lanes,
         }
 
     def get_user_stats(self, user_id: str) -> Dict[str, Any]:
@@ -250,6 +508,7 @@ class LLMRequestQueue:
             "requests": stats["requests"],
             "completed": stats["completed"],
             "errors": stats["errors"],
+            "weight": self._weight(user_id),
             "rate_remaining": self._rate_limiter.remaining(user_id),
             "rate_reset_in": round(self._rate_limiter.reset_in(user_id), 0),
         }
@@ -265,3 +524,11 @@ class RateLimitError(Exception):
 
 class QueueFullError(Exception):
     pass
+
+
+class DeadlineExceededError(QueueFullError):
+    """Procijenjeno čekanje premašuje rok zahtjeva — odbijeno pri prijemu."""
+
+    def __init__(self, message: str, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
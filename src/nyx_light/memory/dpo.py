@@ -35,10 +35,132 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger("nyx_light.memory.dpo")
 
+EXPORT_CHUNK_SIZE = 500                # redaka po SELECT-u pri streaming exportu
+DPO_SHARD_BYTES = 64 * 1024 * 1024     # max veličina jednog JSONL sharda
+
+
+def dpo_content_key(prompt: str, chosen: str, rejected: str) -> bytes:
+    """Hash sadržaja trojke za deduplikaciju.
+
+    Razlike samo u razmacima i velikim/malim slovima daju isti ključ.
+    """
+    text = f"{' '.join(prompt.split())}\0{' '.join(chosen.split())}\0{' '.join(rejected.split())}"
+    return hashlib.blake2b(text.casefold().encode("utf-8"), digest_size=16).digest()
+
+
+class ShardedJSONLWriter:
+    """JSONL izlaz podijeljen u shardove od najviše max_bytes.
+
+    Piše se u .tmp datoteke; commit() ih preimenuje u konačna imena,
+    abort() ih briše. Jedan shard dobiva točno output_path, više njih
+    <ime>.part0001.jsonl, <ime>.part0002.jsonl, ...
+    max_bytes=None → bez dijeljenja.
+    """
+
+    def __init__(self, output_path: str, max_bytes: Optional[int] = DPO_SHARD_BYTES):
+        self.output_path = output_path
+        self.max_bytes = max_bytes
+        self.records = 0
+        self.bytes_written = 0
+        self._stem, self._ext = os.path.splitext(output_path)
+        self._tmp_paths: List[str] = []
+        self._file = None
+        self._size = 0
+
+    def write(self, record: Dict[str, Any]):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        if self._file is None or (
+                self.max_bytes and self._size and self._size + len(line) > self.max_bytes):
+            self._open_next()
+        self._file.write(line)
+        self._size += len(line)
+        self.records += 1
+        self.bytes_written += len(line)
+
+    def _open_next(self):
+        if self._file is not None:
+            self._file.close()
+        path = f"{self._stem}.part{len(self._tmp_paths) + 1:04d}{self._ext}.tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._tmp_paths.append(path)
+        self._file = open(path, "wb", buffering=1024 * 1024)
+        self._size = 0
+
+    def _final_paths(self) -> List[str]:
+        if len(self._tmp_paths) == 1:
+            return [self.output_path]
+        return [p[:-len(".tmp")] for p in self._tmp_paths]
+
+    def commit(self) -> List[str]:
+        """Zatvori i preimenuj shardove → konačne putanje."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        final = self._final_paths()
+        for tmp, path in zip(self._tmp_paths, final):
+            os.replace(tmp, path)
+        return final
+
+    def abort(self, committed: bool = False):
+        """Obriši sve shardove (i već preimenovane ako je committed=True)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        for path in (self._final_paths() if committed else self._tmp_paths):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def iter_unused_chunks(conn: sqlite3.Connection, table: str, columns: str,
+                       key: Tuple[str, str], unused: str, chunk_size: int,
+                       limit: Optional[int] = None,
+                       mark: Optional[Tuple[str, tuple]] = None) -> Iterator[List[tuple]]:
+    """Neiskorišteni redovi tablice (najnoviji prvi) u blokovima po chunk_size.
+
+    Keyset paginacija po key = (vrijeme, id) umjesto OFFSET-a: svaki blok
+    je jedan indeksirani range scan, a redovi označeni korištenima unutar
+    iste transakcije ne pomiču sljedeći blok. Oba key stupca moraju biti
+    u columns; unused je SQL uvjet neiskorištenog retka.
+
+    mark = (SET izraz, parametri) → obrađeni blok se označava jednim range
+    UPDATE-om. Pozivatelj drži BEGIN IMMEDIATE, pa je raspon isto što i
+    UPDATE po id-u.
+    """
+    keyset = f"({key[0]}, {key[1]})"
+    select = f"SELECT {columns} FROM {table} WHERE {unused}"
+    order = f"ORDER BY {key[0]} DESC, {key[1]} DESC LIMIT ?"
+    key_idx: Optional[Tuple[int, int]] = None
+    last: Optional[tuple] = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        if last is None:
+            cur = conn.execute(f"{select} {order}", (size,))
+        else:
+            cur = conn.execute(f"{select} AND {keyset} < (?, ?) {order}", (*last, size))
+        rows = cur.fetchall()
+        if not rows:
+            return
+        if key_idx is None:
+            names = [d[0] for d in cur.description]
+            key_idx = (names.index(key[0]), names.index(key[1]))
+        first = (rows[0][key_idx[0]], rows[0][key_idx[1]])
+        last = (rows[-1][key_idx[0]], rows[-1][key_idx[1]])
+        if remaining is not None:
+            remaining -= len(rows)
+        yield rows
+        if mark is not None:
+            conn.execute(
+                f"UPDATE {table} SET {mark[0]} WHERE {unused} "
+                f"AND {keyset} >= (?, ?) AND {keyset} <= (?, ?)",
+                (*mark[1], *last, *first))
+
 
 class CorrectionType(str, Enum):
     """Tip ispravka koji računovođa napravi."""
@@ -101,6 +223,14 @@ class DPORunResult:
     checkpoint_path: str = ""
     status: str = "pending"  # pending, running, completed, failed, rolled_back
 
+    # Trajanje faza (s) i statistika exporta
+    export_seconds: float = 0.0
+    train_seconds: float = 0.0
+    eval_seconds: float = 0.0
+    duplicates_skipped: int = 0
+    dataset_shards: int = 0
+    dataset_bytes: int = 0
+
 
 class DPODatasetBuilder:
     """
@@ -113,11 +243,16 @@ class DPODatasetBuilder:
 
     Filtriranje:
     - Min 50 parova za training
-    - Deduplikacija po hash-u prompt+chosen
+    - Deduplikacija po hash-u sadržaja (prompt, chosen, rejected)
     - Balanced sampling po correction_type
+
+    Export je streaming: parovi se čitaju u blokovima (keyset paginacija),
+    pišu u JSONL shardove i označavaju korištenima u ISTOJ transakciji —
+    memorija ne raste s brojem ispravaka, a prekid ne gubi parove.
     """
 
     MIN_PAIRS_FOR_TRAINING = 50
+    MAX_PAIRS_PER_EXPORT = 1000
 
     def __init__(self, db_path: str = ""):
         self.db_path = db_path or os.path.join(
@@ -158,6 +293,10 @@ class DPODatasetBuilder:
                     status TEXT DEFAULT 'pending'
                 )
             """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_corrections_unused
+                ON corrections(used_in_training, timestamp, pair_id)
+            """)
             conn.commit()
 
     def record_correction(self, prompt: str, chosen: str, rejected: str,
@@ -197,64 +336,135 @@ class DPODatasetBuilder:
         logger.info("DPO correction recorded: %s (type: %s)", pair_id, correction_type.value)
         return pair
 
+    _PAIR_COLUMNS = """pair_id, timestamp, user_id, client_id, prompt, chosen,
+                          rejected, correction_type, metadata_json"""
+
+    @staticmethod
+    def _row_to_pair(row) -> CorrectionPair:
+        return CorrectionPair(
+            pair_id=row[0], timestamp=row[1], user_id=row[2],
+            client_id=row[3], prompt=row[4], chosen=row[5],
+            rejected=row[6],
+            correction_type=CorrectionType(row[7]),
+            metadata=json.loads(row[8]) if row[8] else {},
+        )
+
+    def _iter_unused_chunks(self, conn: sqlite3.Connection, chunk_size: int,
+                            limit: Optional[int] = None,
+                            mark: bool = False) -> Iterator[List[CorrectionPair]]:
+        """Neiskorišteni parovi u blokovima; mark=True → blok se označava korištenim."""
+        for rows in iter_unused_chunks(
+                conn, "corrections", self._PAIR_COLUMNS, ("timestamp", "pair_id"),
+                "used_in_training = 0", chunk_size, limit,
+                mark=("used_in_training = 1", ()) if mark else None):
+            yield [self._row_to_pair(r) for r in rows]
+
+    def iter_unused_pairs(self, limit: Optional[int] = None,
+                          chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[CorrectionPair]:
+        """Streaming dohvat neiskorištenih parova (ograničena memorija)."""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for chunk in self._iter_unused_chunks(conn, chunk_size, limit):
+                yield from chunk
+        finally:
+            conn.close()
+
     def get_unused_pairs(self, limit: int = 1000) -> List[CorrectionPair]:
         """Dohvati parove koji još nisu korišteni u treningu."""
-        with sqlite3.connect(self.db_path) as conn:
-            rows = conn.execute(
-                """SELECT pair_id, timestamp, user_id, client_id, prompt, chosen,
-                          rejected, correction_type, metadata_json
-                   FROM corrections WHERE used_in_training = 0
-                   ORDER BY timestamp DESC LIMIT ?""", (limit,)
-            ).fetchall()
-
-        pairs = []
-        for row in rows:
-            pairs.append(CorrectionPair(
-                pair_id=row[0], timestamp=row[1], user_id=row[2],
-                client_id=row[3], prompt=row[4], chosen=row[5],
-                rejected=row[6],
-                correction_type=CorrectionType(row[7]),
-                metadata=json.loads(row[8]) if row[8] else {},
-            ))
-        return pairs
+        return list(self.iter_unused_pairs(limit=limit))
 
     def export_dataset(self, output_path: str = "",
-                       min_pairs: int = None) -> Dict[str, Any]:
-        """Eksportiraj DPO dataset u JSONL format."""
+                       min_pairs: int = None,
+                       max_pairs: int = None,
+                       shard_bytes: Optional[int] = DPO_SHARD_BYTES,
+                       chunk_size: int = EXPORT_CHUNK_SIZE) -> Dict[str, Any]:
+        """Eksportiraj DPO dataset u JSONL (streaming, dedup, shardovi).
+
+        Duplikati (isti sadržaj trojke) se ne pišu, ali se označavaju
+        korištenima. Ako je jedinstvenih parova manje od min_pairs, ništa
+        se ne zapisuje niti označava. max_pairs=0 → bez ograničenja.
+        """
+        t0 = time.perf_counter()
         min_pairs = min_pairs or self.MIN_PAIRS_FOR_TRAINING
-        pairs = self.get_unused_pairs()
-
-        if len(pairs) < min_pairs:
-            return {
-                "exported": False,
-                "reason": f"Nedovoljno parova: {len(pairs)} < {min_pairs}",
-                "current_count": len(pairs),
-                "needed": min_pairs,
-            }
+        max_pairs = self.MAX_PAIRS_PER_EXPORT if max_pairs is None else max_pairs
+        limit = max_pairs or None
 
         output_path = output_path or os.path.join(
             os.path.dirname(self.db_path),
             f"dpo_dataset_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
 
-        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
-        with open(output_path, "w", encoding="utf-8") as f:
-            for pair in pairs:
-                f.write(json.dumps(pair.to_dpo_format(), ensure_ascii=False) + "\n")
-
-        # Mark as used
-        pair_ids = [p.pair_id for p in pairs]
-        with sqlite3.connect(self.db_path) as conn:
-            placeholders = ",".join("?" * len(pair_ids))
-            conn.execute(
-                f"UPDATE corrections SET used_in_training = 1 WHERE pair_id IN ({placeholders})",
-                pair_ids)
-            conn.commit()
+        # Čitanje, pisanje i označavanje u jednoj transakciji
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        writer = ShardedJSONLWriter(output_path, shard_bytes)
+        committed = False
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            available = conn.execute(
+                "SELECT COUNT(*) FROM corrections WHERE used_in_training = 0"
+            ).fetchone()[0]
+            if limit is not None:
+                available = min(available, limit)
+            if available < min_pairs:
+                conn.execute("ROLLBACK")
+                return {
+                    "exported": False,
+                    "reason": f"Nedovoljno parova: {available} < {min_pairs}",
+                    "current_count": available,
+                    "needed": min_pairs,
+                }
+
+            seen = set()
+            by_type: Dict[str, int] = {}
+            scanned = duplicates = 0
+            for chunk in self._iter_unused_chunks(conn, chunk_size, limit, mark=True):
+                for pair in chunk:
+                    key = dpo_content_key(pair.prompt, pair.chosen, pair.rejected)
+                    if key in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(key)
+                    writer.write(pair.to_dpo_format())
+                    ctype = pair.correction_type.value
+                    by_type[ctype] = by_type.get(ctype, 0) + 1
+                scanned += len(chunk)
+
+            if writer.records < min_pairs:
+                writer.abort()
+                conn.execute("ROLLBACK")
+                return {
+                    "exported": False,
+                    "reason": (f"Nedovoljno jedinstvenih parova: "
+                               f"{writer.records} < {min_pairs}"),
+                    "current_count": writer.records,
+                    "needed": min_pairs,
+                    "duplicates_skipped": duplicates,
+                }
+
+            shards = writer.commit()
+            committed = True
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            writer.abort(committed=committed)
+            raise
+        finally:
+            conn.close()
 
+        elapsed = time.perf_counter() - t0
+        logger.info("DPO export: %d parova (%d duplikata) → %d shard(ova), %.1f MB, %.2fs",
+                    writer.records, duplicates, len(shards),
+                    writer.bytes_written / (1024 * 1024), elapsed)
         return {
             "exported": True,
-            "path": output_path,
-            "pairs_count": len(pairs),
-            "by_type": self._count_by_type(pairs),
+            "path": shards[0],
+            "shards": shards,
+            "pairs_count": writer.records,
+            "scanned": scanned,
+            "duplicates_skipped": duplicates,
+            "bytes": writer.bytes_written,
+            "seconds": round(elapsed, 3),
+            "by_type": by_type,
         }
 
     def _count_by_type(self, pairs: List[CorrectionPair]) -> Dict[str, int]:
@@ -313,8 +523,11 @@ class NightlyDPORunner:
         )
 
         try:
-            # 1. Export dataset
-            export = self.builder.export_dataset()
+            # 1. Export dataset — jedna datoteka: LoRA trening čita jedan --data,
+            #    a export označava korištenima sve parove koje zapiše
+            t0 = time.perf_counter()
+            export = self.builder.export_dataset(shard_bytes=None)
+            run.export_seconds = round(time.perf_counter() - t0, 3)
             if not export.get("exported"):
                 run.status = "skipped"
                 run.finished_at = datetime.now().isoformat()
@@ -322,14 +535,21 @@ class NightlyDPORunner:
                 return run
 
             run.pairs_count = export["pairs_count"]
+            run.duplicates_skipped = export["duplicates_skipped"]
+            run.dataset_shards = len(export["shards"])
+            run.dataset_bytes = export["bytes"]
             dataset_path = export["path"]
 
             # 2. Run LoRA finetuning
+            t0 = time.perf_counter()
             checkpoint = self._run_lora_finetune(dataset_path, run.run_id)
+            run.train_seconds = round(time.perf_counter() - t0, 3)
             run.checkpoint_path = checkpoint
 
             # 3. Evaluate
+            t0 = time.perf_counter()
             baseline, new_acc = self._evaluate(checkpoint)
+            run.eval_seconds = round(time.perf_counter() - t0, 3)
             run.baseline_accuracy = baseline
             run.new_accuracy = new_acc
             run.improvement_pct = ((new_acc - baseline) / max(baseline, 0.01)) * 100
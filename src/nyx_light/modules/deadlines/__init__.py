@@ -3,12 +3,15 @@ Nyx Light — Modul F: Praćenje zakonskih rokova
 
 Kalendar svih zakonskih rokova za porezne prijave i izvještaje.
 Proaktivna obavijest zaposlenicima o predstojećim rokovima.
+
+Za cijeli ured (svi klijenti × svi rokovi) postoji materijalizirani
+kalendar u SQLite-u — ``calendar.DeadlineCalendar``.
 """
 
 import logging
 from dataclasses import dataclass
 from datetime import date, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Mapping, Optional, Tuple
 
 logger = logging.getLogger("nyx_light.modules.deadlines")
 
@@ -70,11 +73,45 @@ ZAKONSKI_ROKOVI = [
 ]
 
 
+# Zadani profil klijenta (kao DeadlineNotifier.get_client_deadlines)
+DEFAULT_PROFILE = {
+    "pdv_obveznik": True,
+    "pdv_mjesecna": True,
+    "intrastat_obveza": False,
+    "revizijski_obveznik": False,
+    "ima_place": True,
+}
+
+
+def applies_to(name: str, profile: Optional[Mapping[str, bool]] = None) -> bool:
+    """Odnosi li se rok na klijenta s danim profilom."""
+    p = {**DEFAULT_PROFILE, **(profile or {})}
+    if name.startswith("PDV prijava"):
+        if not p["pdv_obveznik"]:
+            return False
+        return ("tromjesečna" in name) != bool(p["pdv_mjesecna"])
+    if "Intrastat" in name and not p["intrastat_obveza"]:
+        return False
+    if "revizija" in name and not p["revizijski_obveznik"]:
+        return False
+    if name.startswith("JOPPD") and not p["ima_place"]:
+        return False
+    return True
+
+
 class DeadlineTracker:
     """Praćenje rokova po klijentima."""
 
     def __init__(self):
         self.deadlines = ZAKONSKI_ROKOVI
+        # Sljedeći datumi za zadnji upitani dan (get_upcoming se zove često)
+        self._next_cache: Tuple[Optional[date], List[Tuple[Deadline, date]]] = (None, [])
+
+    def _next_all(self, today: date) -> List[Tuple[Deadline, date]]:
+        if self._next_cache[0] != today:
+            self._next_cache = (today, [(dl, self._next_occurrence(dl, today))
+                                        for dl in self.deadlines])
+        return self._next_cache[1]
 
     def get_upcoming(self, days_ahead: int = 14, today: date = None) -> List[Dict]:
         """Dohvati rokove u sljedećih N dana."""
@@ -82,8 +119,7 @@ class DeadlineTracker:
         end = today + timedelta(days=days_ahead)
         upcoming = []
 
-        for dl in self.deadlines:
-            next_date = self._next_occurrence(dl, today)
+        for dl, next_date in self._next_all(today):
             if next_date and today <= next_date <= end:
                 days_left = (next_date - today).days
                 upcoming.append({
@@ -126,6 +162,20 @@ class DeadlineTracker:
 
         return sorted(result, key=lambda x: x["date"])
 
+    def occurrences_between(self, start: date, end: date) -> List[Tuple[Deadline, date]]:
+        """Svi datumi rokova u [start, end] (za materijalizirani kalendar)."""
+        result = []
+        y, m = start.year, start.month
+        while date(y, m, 1) <= end:
+            for dl in self.deadlines:
+                if dl.frequency != "monthly" and not (dl.months and m in dl.months):
+                    continue
+                d = date(y, m, min(dl.day_of_month, self._last_day(y, m)))
+                if start <= d <= end:
+                    result.append((dl, d))
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+        return sorted(result, key=lambda x: x[1])
+
     def _next_occurrence(self, dl: Deadline, today: date) -> date:
         """Izračunaj sljedeći datum roka."""
         year, month = today.year, today.month
@@ -191,23 +241,34 @@ KAZNE = {
 
 
 class ClientDeadlineManager:
-    """Upravljanje rokovima po klijentima."""
+    """Upravljanje rokovima po klijentima.
 
-    def __init__(self):
+    S ``calendar`` (DeadlineCalendar) override i ispunjenja se upisuju u
+    materijalizirani kalendar, a get_all_overdue je jedan indeksirani upit.
+    """
+
+    def __init__(self, calendar=None):
         self._client_overrides = {}   # {client_id: {deadline_name: custom_date}}
         self._completed = {}          # {client_id: {deadline_name: completed_date}}
+        self.calendar = calendar
 
     def set_client_deadline(self, client_id: str, deadline_name: str, custom_date: str):
         """Postavi klijent-specifični rok (npr. tromjesečni PDV umjesto mjesečnog)."""
         if client_id not in self._client_overrides:
             self._client_overrides[client_id] = {}
         self._client_overrides[client_id][deadline_name] = custom_date
+        if self.calendar:
+            self.calendar.sync_client(client_id)
+            self.calendar.set_override(client_id, deadline_name, custom_date)
 
     def mark_completed(self, client_id: str, deadline_name: str, completed_date: str):
         """Označi rok kao ispunjen za klijenta."""
         if client_id not in self._completed:
             self._completed[client_id] = {}
         self._completed[client_id][deadline_name] = completed_date
+        if self.calendar:
+            self.calendar.sync_client(client_id)
+            self.calendar.mark_completed(client_id, deadline_name, completed_date)
 
     def get_client_status(self, client_id: str, tracker: DeadlineTracker = None) -> List[Dict]:
         """Status svih rokova za jednog klijenta."""
@@ -233,9 +294,11 @@ class ClientDeadlineManager:
 
     def get_all_overdue(self, client_ids: List[str], tracker: DeadlineTracker = None) -> List[Dict]:
         """Dohvati sve prekoračene rokove za sve klijente."""
-        from datetime import date
-        tracker = tracker or DeadlineTracker()
         today = date.today()
+        if self.calendar:
+            self.calendar.sync_clients({cid: None for cid in client_ids})
+            return self.calendar.overdue(today, client_ids)
+        tracker = tracker or DeadlineTracker()
         overdue = []
 
         for cid in client_ids:
@@ -298,22 +361,24 @@ class DeadlineNotifier:
         today = today or date.today()
         notifications = []
 
-        for days_before in self.NOTIFICATION_DAYS:
-            upcoming = self.tracker.get_upcoming(days_ahead=days_before + 1, today=today)
-            for item in upcoming:
-                if item["days_left"] == days_before:
-                    penalty = KAZNE_KASNJENJE.get(item["name"], {})
-                    notifications.append({
-                        **item,
-                        "notification_type": (
-                            "critical" if days_before <= 1
-                            else "warning" if days_before <= 3
-                            else "reminder"
-                        ),
-                        "kazna_min": penalty.get("kazna_min", 0),
-                        "kazna_max": penalty.get("kazna_max", 0),
-                        "penalty_note": penalty.get("napomena", ""),
-                    })
+        upcoming = self.tracker.get_upcoming(
+            days_ahead=max(self.NOTIFICATION_DAYS) + 1, today=today)
+        for item in upcoming:
+            days_before = item["days_left"]
+            if days_before not in self.NOTIFICATION_DAYS:
+                continue
+            penalty = KAZNE_KASNJENJE.get(item["name"], {})
+            notifications.append({
+                **item,
+                "notification_type": (
+                    "critical" if days_before <= 1
+                    else "warning" if days_before <= 3
+                    else "reminder"
+                ),
+                "kazna_min": penalty.get("kazna_min", 0),
+                "kazna_max": penalty.get("kazna_max", 0),
+                "penalty_note": penalty.get("napomena", ""),
+            })
 
         return sorted(notifications, key=lambda x: x["days_left"])
 
@@ -325,19 +390,9 @@ class DeadlineNotifier:
     ) -> List[Dict]:
         """Filtrirani rokovi za specifičnog klijenta."""
         all_deadlines = self.tracker.get_upcoming(days_ahead=60)
-        filtered = []
-        for dl in all_deadlines:
-            name = dl["name"]
-            # Filtriraj PDV
-            if "tromjesečna" in name and pdv_mjesecna:
-                continue
-            if "mjesečna" in name and not pdv_mjesecna:
-                continue
-            # Filtriraj Intrastat
-            if "Intrastat" in name and not intrastat_obveza:
-                continue
-            # Filtriraj reviziju
-            if "revizija" in name and not revizijski_obveznik:
-                continue
-            filtered.append(dl)
-        return filtered
+        profile = {
+            "pdv_mjesecna": pdv_mjesecna,
+            "intrastat_obveza": intrastat_obveza,
+            "revizijski_obveznik": revizijski_obveznik,
+        }
+        return [dl for dl in all_deadlines if applies_to(dl["name"], profile)]
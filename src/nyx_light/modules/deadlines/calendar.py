@@ -0,0 +1,313 @@
+"""
+Nyx Light — Materijalizirani kalendar rokova za cijeli ured
+
+Svi klijenti × svi zakonski rokovi × klizni horizont od 24 mjeseca,
+spremljeni u SQLite (tablica ``deadline_calendar``). Dashboard upiti
+("sve što dospijeva u idućih 7 dana za svih 150 klijenata") su jedan
+range scan po indeksu (due_date, status) umjesto petlje klijenti × rokovi.
+
+  - Datumi se generiraju jednom za sve klijente (DeadlineTracker), a po
+    klijentu se filtriraju profilom (PDV mjesečno/tromjesečno, Intrastat,
+    revizija, plaće) — ``applies_to``
+  - Inkrementalno: promjena profila briše samo buduće otvorene rokove
+    bez ručne izmjene; override i ispunjenje mijenjaju jedan redak
+  - Horizont se produžuje lijeno (INSERT OR IGNORE novih mjeseci)
+
+Korištenje:
+    cal = DeadlineCalendar("data/nyx.db")
+    cal.sync_client("K001", {"pdv_mjesecna": False})
+    cal.upcoming(days=7)                 → svi klijenti, jedan upit
+    cal.mark_completed("K001", "JOPPD obrazac", "2026-03-14")
+    cal.overdue()
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from nyx_light.modules.deadlines import (
+    DEFAULT_PROFILE, KAZNE, DeadlineTracker, applies_to,
+)
+
+logger = logging.getLogger("nyx_light.modules.deadlines.calendar")
+
+HORIZON_MONTHS = 24
+
+
+def client_profile(config: Any) -> Dict[str, bool]:
+    """Profil rokova iz ClientConfig (registry)."""
+    return {
+        "pdv_obveznik": bool(getattr(config, "pdv_obveznik", True)),
+        "pdv_mjesecna": getattr(config, "pdv_period", "monthly") == "monthly",
+        "intrastat_obveza": bool(getattr(config, "intrastat_obveza", False)),
+        "revizijski_obveznik": getattr(config, "kategorija", "") in ("srednji", "veliki"),
+        "ima_place": bool(getattr(config, "ima_place", True)),
+    }
+
+
+def _horizon_end(today: date, months: int) -> date:
+    y, m = divmod(today.year * 12 + today.month - 1 + months, 12)
+    return date(y, m + 1, 1) - timedelta(days=1)
+
+
+def _as_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class DeadlineCalendar:
+    """Kalendar rokova po klijentu u SQLite-u (klizni horizont)."""
+
+    def __init__(self, db_path: str = ":memory:", tracker: DeadlineTracker = None,
+                 horizon_months: int = HORIZON_MONTHS):
+        self.tracker = tracker or DeadlineTracker()
+        self.horizon_months = horizon_months
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_db()
+        # client_id → (profil JSON, horizon_to) — provjera "ništa za raditi" bez upita
+        self._clients: Dict[str, Tuple[str, str]] = {
+            r["client_id"]: (r["profile"], r["horizon_to"])
+            for r in self._conn.execute("SELECT * FROM deadline_clients")
+        }
+
+    def _init_db(self):
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS deadline_calendar (
+                client_id TEXT NOT NULL,
+                deadline TEXT NOT NULL,
+                original_date TEXT NOT NULL,
+                due_date TEXT NOT NULL,
+                status TEXT DEFAULT 'open',
+                completed_date TEXT DEFAULT '',
+                overridden INTEGER DEFAULT 0,
+                form TEXT DEFAULT '',
+                platform TEXT DEFAULT '',
+                PRIMARY KEY (client_id, deadline, original_date)
+            );
+            CREATE INDEX IF NOT EXISTS idx_deadline_calendar_due
+                ON deadline_calendar(due_date, status);
+            CREATE INDEX IF NOT EXISTS idx_deadline_calendar_client
+                ON deadline_calendar(client_id, due_date);
+            CREATE TABLE IF NOT EXISTS deadline_clients (
+                client_id TEXT PRIMARY KEY,
+                profile TEXT NOT NULL,
+                horizon_to TEXT NOT NULL,
+                updated_at TEXT
+            );
+        """)
+        self._conn.commit()
+
+    # ── Sinkronizacija klijenata ──
+
+    def sync_client(self, client_id: str, profile: Optional[Mapping[str, bool]] = None,
+                    today: date = None) -> int:
+        return self.sync_clients({client_id: profile}, today=today)
+
+    def sync_clients(self, clients: Mapping[str, Optional[Mapping[str, bool]]],
+                     today: date = None) -> int:
+        """
+        Materijaliziraj rokove za klijente (client_id → profil ili None).
+
+        None zadržava spremljeni profil (novi klijent dobiva DEFAULT_PROFILE).
+        Rokovi se generiraju od ``today`` — klijent dodan usred mjeseca ne
+        dobiva već prošle rokove kao zakašnjele. Vraća broj novih redaka;
+        klijenti bez promjene ne koštaju ništa.
+        """
+        today = today or date.today()
+        horizon = _horizon_end(today, self.horizon_months)
+        horizon_s = horizon.isoformat()
+
+        work = []
+        for cid, profile in clients.items():
+            stored = self._clients.get(cid)
+            if profile is None:
+                pjson = stored[0] if stored else json.dumps(DEFAULT_PROFILE, sort_keys=True)
+            else:
+                pjson = json.dumps({**DEFAULT_PROFILE, **profile}, sort_keys=True)
+            changed = stored is not None and stored[0] != pjson
+            if stored and not changed and stored[1] >= horizon_s:
+                continue
+            # Nepromijenjen klijent: samo novi mjeseci iza spremljenog horizonta
+            since = today
+            if stored and not changed:
+                since = _as_date(stored[1]) + timedelta(days=1)
+            work.append((cid, pjson, changed, since))
+        if not work:
+            return 0
+
+        occurrences = [
+            (dl.name, d, d.isoformat(), dl.form, dl.platform)
+            for dl, d in self.tracker.occurrences_between(min(w[3] for w in work), horizon)
+        ]
+        names_by_profile: Dict[str, set] = {}
+        rows, cleared = [], []
+        for cid, pjson, changed, since in work:
+            if pjson not in names_by_profile:
+                profile = json.loads(pjson)
+                names_by_profile[pjson] = {o[0] for o in occurrences if applies_to(o[0], profile)}
+            names = names_by_profile[pjson]
+            if changed:
+                cleared.append((cid, today.isoformat()))
+            rows.extend(
+                (cid, name, ds, ds, form, platform)
+                for name, d, ds, form, platform in occurrences
+                if d >= since and name in names
+            )
+        now = datetime.now().isoformat()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "DELETE FROM deadline_calendar WHERE client_id = ? AND due_date >= ? "
+                "AND status = 'open' AND overridden = 0", cleared)
+            deleted = self._conn.total_changes - before
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO deadline_calendar "
+                "(client_id, deadline, original_date, due_date, form, platform) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            inserted = self._conn.total_changes - before - deleted
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO deadline_clients VALUES (?, ?, ?, ?)",
+                [(cid, pjson, horizon_s, now) for cid, pjson, _, _ in work])
+            self._conn.commit()
+        for cid, pjson, _, _ in work:
+            self._clients[cid] = (pjson, horizon_s)
+        logger.info("Kalendar rokova: %d klijenata, +%d rokova", len(work), inserted)
+        return inserted
+
+    def refresh(self, today: date = None) -> int:
+        """Produži klizni horizont za sve poznate klijente."""
+        return self.sync_clients({cid: None for cid in self._clients}, today=today)
+
+    def remove_client(self, client_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM deadline_calendar WHERE client_id = ?", (client_id,))
+            self._conn.execute("DELETE FROM deadline_clients WHERE client_id = ?", (client_id,))
+            self._conn.commit()
+        self._clients.pop(client_id, None)
+
+    @property
+    def client_ids(self) -> List[str]:
+        return list(self._clients)
+
+    # ── Inkrementalne izmjene ──
+
+    def set_override(self, client_id: str, deadline: str, custom_date: str) -> bool:
+        """Pomakni najbliži rok (po izvornom datumu) na custom_date."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT original_date FROM deadline_calendar WHERE client_id = ? AND deadline = ? "
+                "ORDER BY ABS(julianday(original_date) - julianday(?)) LIMIT 1",
+                (client_id, deadline, custom_date)).fetchone()
+            if not row:
+                return False
+            self._conn.execute(
+                "UPDATE deadline_calendar SET due_date = ?, overridden = 1 "
+                "WHERE client_id = ? AND deadline = ? AND original_date = ?",
+                (custom_date, client_id, deadline, row["original_date"]))
+            self._conn.commit()
+        return True
+
+    def mark_completed(self, client_id: str, deadline: str, completed_date: str,
+                       due_date: str = "") -> bool:
+        """Označi rok ispunjenim — zadani due_date ili najraniji otvoreni."""
+        with self._lock:
+            sql = ("SELECT original_date FROM deadline_calendar WHERE client_id = ? "
+                   "AND deadline = ? AND status = 'open'")
+            params: Tuple = (client_id, deadline)
+            if due_date:
+                sql += " AND due_date = ?"
+                params += (due_date,)
+            row = self._conn.execute(sql + " ORDER BY due_date LIMIT 1", params).fetchone()
+            if not row:
+                return False
+            self._conn.execute(
+                "UPDATE deadline_calendar SET status = 'done', completed_date = ? "
+                "WHERE client_id = ? AND deadline = ? AND original_date = ?",
+                (completed_date, client_id, deadline, row["original_date"]))
+            self._conn.commit()
+        return True
+
+    # ── Upiti (range scan po due_date) ──
+
+    def due_between(self, date_from, date_to, client_ids: Optional[Iterable[str]] = None,
+                    status: str = "open") -> List[Dict[str, Any]]:
+        sql = ("SELECT client_id, deadline, due_date, original_date, status, completed_date, "
+               "overridden, form, platform FROM deadline_calendar "
+               "WHERE due_date BETWEEN ? AND ? AND status = ?")
+        params: List[Any] = [_as_date(date_from).isoformat(), _as_date(date_to).isoformat(), status]
+        if client_ids is not None:
+            ids = list(client_ids)
+            sql += f" AND client_id IN ({', '.join('?' * len(ids))})"
+            params.extend(ids)
+        rows = self._conn.execute(sql + " ORDER BY due_date, client_id", params).fetchall()
+        return [dict(r) for r in rows]
+
+    def _ensure_horizon(self, today: date):
+        target = _horizon_end(today, self.horizon_months).isoformat()
+        if any(h < target for _, h in self._clients.values()):
+            self.refresh(today=today)
+
+    def upcoming(self, days: int = 7, today: date = None,
+                 client_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Otvoreni rokovi u idućih N dana za sve (ili zadane) klijente."""
+        today = today or date.today()
+        end = today + timedelta(days=days)
+        self._ensure_horizon(today)
+        result = []
+        days_left_by_date: Dict[str, int] = {}
+        for r in self.due_between(today, end, client_ids):
+            days_left = days_left_by_date.get(r["due_date"])
+            if days_left is None:
+                days_left = (date.fromisoformat(r["due_date"]) - today).days
+                days_left_by_date[r["due_date"]] = days_left
+            kazna = KAZNE.get(r["deadline"], {})
+            result.append({
+                **r,
+                "name": r["deadline"],
+                "days_left": days_left,
+                "urgency": "critical" if days_left <= 3 else
+                           "warning" if days_left <= 7 else "normal",
+                "kazna_min": kazna.get("kazna_min", 0),
+                "kazna_max": kazna.get("kazna_max", 0),
+            })
+        return result
+
+    def overdue(self, today: date = None,
+                client_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Prekoračeni (neispunjeni) rokovi, najstariji prvi."""
+        today = today or date.today()
+        result = []
+        for r in self.due_between("0001-01-01", today - timedelta(days=1), client_ids):
+            days_late = (today - date.fromisoformat(r["due_date"])).days
+            result.append({
+                "client_id": r["client_id"],
+                "deadline": r["deadline"],
+                "due_date": r["due_date"],
+                "days_late": days_late,
+                "kazna_min": KAZNE.get(r["deadline"], {}).get("kazna_min", 0),
+                "severity": "critical" if days_late > 15 else "warning",
+            })
+        return sorted(result, key=lambda x: x["days_late"], reverse=True)
+
+    def get_stats(self, today: date = None) -> Dict[str, Any]:
+        today = (today or date.today()).isoformat()
+        row = self._conn.execute(
+            "SELECT COUNT(*), SUM(status = 'open' AND due_date < ?), SUM(status = 'done') "
+            "FROM deadline_calendar", (today,)).fetchone()
+        return {
+            "clients": len(self._clients),
+            "entries": row[0],
+            "overdue": row[1] or 0,
+            "completed": row[2] or 0,
+        }
+
+    def close(self):
+        self._conn.close()
@@ -8,6 +8,9 @@ Generira:
   4. Izvještaj o novčanom tijeku (indirektna metoda)
   5. XML export za FINA e-GFI
 
+AOP pozicije izravno iz bruto bilance (prefiksno stablo pravila konto → AOP)
+i godišnji batch za sve klijente: aop_mapping.AOPMapper / GFIBatch.
+
 Referenca: Pravilnik o strukturi i sadržaju GFI (NN 95/16)
 """
 
@@ -153,6 +156,9 @@ class GFIIzvjestaj:
 class GFIXMLGenerator:
     """Generira GFI izvještaje i XML za FINA."""
 
+    def __init__(self):
+        self._mapper = None   # AOPMapper, kompilira se pri prvoj bruto bilanci
+
     def generate_bilanca(
         self,
         data: Dict[str, float],
@@ -212,6 +218,31 @@ class GFIXMLGenerator:
 
         return izvjestaj
 
+    def generate_from_trial_balance(
+        self,
+        trial_balance: Any,
+        pocetno: Any = None,
+        prethodno: Optional[Dict[str, Dict[str, float]]] = None,
+        oib: str = "",
+        naziv: str = "",
+        godina: int = 0,
+    ) -> Dict[str, Any]:
+        """Bilanca i RDG izravno iz bruto bilance (GeneralLedger / ERP)."""
+        from nyx_light.modules.gfi_xml.aop_mapping import AOPMapper
+
+        if self._mapper is None:
+            self._mapper = AOPMapper()
+        aop = self._mapper.map(trial_balance, pocetno)
+        prev = prethodno or {}
+        return {
+            "bilanca": self.generate_bilanca(aop["bilanca"], prev.get("bilanca"),
+                                             oib=oib, naziv=naziv, godina=godina),
+            "rdg": self.generate_rdg(aop["rdg"], prev.get("rdg"),
+                                     oib=oib, naziv=naziv, godina=godina),
+            "nemapirano": aop["nemapirano"],
+            "balanced": aop["balanced"],
+        }
+
     def _auto_sum_bilanca(self, izvjestaj: GFIIzvjestaj, data: Dict):
         """Auto-izračun sume za agregatne AOP pozicije."""
         poz = {p.aop: p for p in izvjestaj.pozicije}
@@ -0,0 +1,439 @@
+"""
+Nyx Light — Mapiranje bruto bilance na AOP pozicije GFI-a
+
+GFIXMLGenerator.generate_bilanca/generate_rdg očekuju već zbrojene AOP
+pozicije. Ovdje se one izvode izravno iz bruto bilance:
+
+  1. Pravila konto → AOP (AOP_PRAVILA, prefiksi kontnog plana) se jednom
+     kompiliraju u prefiksno stablo (AOPTrie); konto dobiva pravilo
+     najduljeg prefiksa koji mu odgovara
+  2. AOPMapper u jednom prolazu kroz salda zbraja iznose po AOP poziciji
+     (u centima), zatim izračuna zbrojne pozicije (ZBROJEVI_*) i dobit
+  3. GFIBatch to radi za sve klijente na kraju godine — jedan upit za
+     salda svih klijenata, XML po klijentu, vrijeme po klijentu
+
+Bruto bilanca može biti u bilo kojem obliku koji sustav daje:
+  - GeneralLedger.trial_balance()          {"konta": {konto: {"saldo": ...}}}
+  - GeneralLedger.trial_balances_by_client {konto: saldo}
+  - ERPConnector.pull_bruto_bilanca()      [{"Konto", "Duguje", "Potrazuje", "Saldo"}]
+
+Korištenje:
+    rez = AOPMapper().map(ledger.trial_balance("2025-12-31"),
+                          ledger.trial_balance("2024-12-31"))
+    rez["bilanca"]["043"], rez["rdg"]["129"], rez["nemapirano"]
+
+NAPOMENA: Ovo je PRIPREMA — konačne iznose potvrđuje računovođa.
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger("nyx_light.modules.gfi_xml.aop_mapping")
+
+# Predznak: aktiva i rashodi su dugovnog salda (+), pasiva i prihodi
+# potražnog (−) — AOP iznos = predznak × (duguje − potražuje)
+AKTIVA, PASIVA = 1, -1
+RASHOD, PRIHOD = 1, -1
+
+# (prefiks konta, izvještaj, AOP, predznak); izvještaj None = konto se
+# namjerno ne prenosi (zaključni zbrojevi razreda 8)
+AOP_PRAVILA: List[Tuple[str, Optional[str], str, int]] = [
+    # ── Razred 0: dugotrajna imovina ──
+    ("01", "bilanca", "008", AKTIVA),
+    ("0100", "bilanca", "005", AKTIVA),
+    ("0110", "bilanca", "006", AKTIVA),
+    ("0120", "bilanca", "004", AKTIVA),
+    ("0190", "bilanca", "005", AKTIVA),       # ispravak vrijednosti NI
+    ("02", "bilanca", "016", AKTIVA),
+    ("0200", "bilanca", "010", AKTIVA),
+    ("0210", "bilanca", "011", AKTIVA),
+    ("0220", "bilanca", "012", AKTIVA),
+    ("0230", "bilanca", "013", AKTIVA),
+    ("0240", "bilanca", "012", AKTIVA),
+    ("0250", "bilanca", "014", AKTIVA),
+    ("0260", "bilanca", "017", AKTIVA),
+    ("0290", "bilanca", "012", AKTIVA),       # ispravak vrijednosti MI
+    ("03", "bilanca", "024", AKTIVA),
+    ("0300", "bilanca", "019", AKTIVA),
+    ("0310", "bilanca", "023", AKTIVA),
+    ("0320", "bilanca", "025", AKTIVA),
+    ("0330", "bilanca", "022", AKTIVA),
+    ("04", "bilanca", "024", AKTIVA),
+    ("05", "bilanca", "026", AKTIVA),
+    # ── Razred 1: kratkotrajna imovina ──
+    ("10", "bilanca", "029", AKTIVA),
+    ("11", "bilanca", "030", AKTIVA),
+    ("12", "bilanca", "039", AKTIVA),
+    ("120", "bilanca", "036", AKTIVA),        # kupci (i ispravak 1209)
+    ("123", "bilanca", "038", AKTIVA),
+    ("124", "bilanca", "038", AKTIVA),
+    ("13", "bilanca", "040", AKTIVA),
+    ("14", "bilanca", "041", AKTIVA),
+    ("15", "bilanca", "041", AKTIVA),
+    ("16", "bilanca", "042", AKTIVA),
+    ("19", "bilanca", "042", AKTIVA),
+    # ── Razred 2: kapital ──
+    ("20", "bilanca", "045", PASIVA),
+    ("21", "bilanca", "046", PASIVA),
+    ("22", "bilanca", "047", PASIVA),
+    ("23", "bilanca", "048", PASIVA),
+    ("24", "bilanca", "050", PASIVA),
+    ("25", "bilanca", "051", PASIVA),
+    # ── Razred 3: rezerviranja i dugoročne obveze ──
+    ("3", "bilanca", "058", PASIVA),
+    ("300", "bilanca", "055", PASIVA),
+    ("3020", "bilanca", "056", PASIVA),
+    ("31", "bilanca", "057", PASIVA),
+    ("32", "bilanca", "053", PASIVA),
+    ("33", "bilanca", "059", PASIVA),
+    # ── Razred 4: kratkoročne obveze ──
+    ("4", "bilanca", "065", PASIVA),
+    ("40", "bilanca", "061", PASIVA),
+    ("41", "bilanca", "062", PASIVA),
+    ("412", "bilanca", "061", PASIVA),        # režije i najam = dobavljači
+    ("413", "bilanca", "061", PASIVA),
+    ("414", "bilanca", "061", PASIVA),
+    ("42", "bilanca", "065", PASIVA),
+    ("4200", "bilanca", "063", PASIVA),
+    ("421", "bilanca", "064", PASIVA),
+    ("422", "bilanca", "064", PASIVA),
+    ("423", "bilanca", "064", PASIVA),
+    ("43", "bilanca", "064", PASIVA),
+    ("45", "bilanca", "066", PASIVA),
+    # ── Razred 5: troškovi po vrstama ──
+    ("5", "rdg", "116", RASHOD),
+    ("50", "rdg", "106", RASHOD),
+    ("51", "rdg", "108", RASHOD),
+    ("52", "rdg", "113", RASHOD),
+    ("5200", "rdg", "110", RASHOD),
+    ("5210", "rdg", "111", RASHOD),
+    ("53", "rdg", "112", RASHOD),
+    ("54", "rdg", "113", RASHOD),
+    ("55", "rdg", "114", RASHOD),
+    ("56", "rdg", "115", RASHOD),
+    # ── Razred 6: prihodi ──
+    ("6", "rdg", "103", PRIHOD),
+    ("600", "rdg", "102", PRIHOD),
+    ("601", "rdg", "102", PRIHOD),
+    ("602", "rdg", "102", PRIHOD),
+    ("62", "rdg", "120", PRIHOD),
+    ("6200", "rdg", "118", PRIHOD),
+    ("6210", "rdg", "119", PRIHOD),
+    # ── Razred 7: rashodi ──
+    ("7", "rdg", "116", RASHOD),
+    ("70", "rdg", "106", RASHOD),
+    ("71", "rdg", "107", RASHOD),
+    ("72", "rdg", "108", RASHOD),
+    ("73", "rdg", "112", RASHOD),
+    ("74", "rdg", "113", RASHOD),
+    ("75", "rdg", "110", RASHOD),
+    ("76", "rdg", "124", RASHOD),
+    ("7610", "rdg", "122", RASHOD),
+    ("7620", "rdg", "123", RASHOD),
+    ("77", "rdg", "114", RASHOD),
+    # ── Razred 8: porez na dobit; zaključni zbrojevi se ne prenose ──
+    ("8", None, "", 0),
+    ("83", "rdg", "128", RASHOD),
+]
+
+
+def _aop_range(od: int, do: int) -> Tuple[str, ...]:
+    return tuple(f"{i:03d}" for i in range(od, do + 1))
+
+
+# Zbrojne pozicije redom izračuna; "-" ispred AOP-a = oduzima se
+ZBROJEVI_RDG: List[Tuple[str, Tuple[str, ...]]] = [
+    ("101", ("102", "103")),
+    ("105", ("106", "107", "108")),
+    ("109", ("110", "111")),
+    ("104", ("105", "109") + _aop_range(112, 116)),
+    ("117", _aop_range(118, 120)),
+    ("121", _aop_range(122, 124)),
+    ("125", ("101", "117")),
+    ("126", ("104", "121")),
+    ("127", ("125", "-126")),
+    ("129", ("127", "-128")),
+]
+
+ZBROJEVI_BILANCA: List[Tuple[str, Tuple[str, ...]]] = [
+    ("003", _aop_range(4, 8)),
+    ("009", _aop_range(10, 17)),
+    ("018", _aop_range(19, 24)),
+    ("002", ("003", "009", "018", "025", "026")),
+    ("028", _aop_range(29, 34)),
+    ("035", _aop_range(36, 39)),
+    ("027", ("028", "035", "040", "041")),
+    ("043", ("001", "002", "027", "042")),
+    ("044", _aop_range(45, 52)),
+    ("054", _aop_range(55, 59)),
+    ("060", _aop_range(61, 65)),
+    ("067", ("044", "053", "054", "060", "066")),
+]
+
+
+# ════════════════════════════════════════════════════════
+# Prefiksno stablo pravila
+# ════════════════════════════════════════════════════════
+
+class AOPTrie:
+    """Pravila konto → AOP u prefiksnom stablu; lookup = najdulji prefiks."""
+
+    _RULE = ""   # ključ pravila u čvoru (djeca su znamenke)
+
+    def __init__(self, pravila: Iterable[Tuple[str, Optional[str], str, int]] = AOP_PRAVILA):
+        self._root: Dict[str, Any] = {}
+        self.size = 0
+        for prefiks, izvjestaj, aop, predznak in pravila:
+            node = self._root
+            for ch in prefiks:
+                node = node.setdefault(ch, {})
+            node[self._RULE] = (izvjestaj, aop, predznak)
+            self.size += 1
+
+    def lookup(self, konto: str) -> Optional[Tuple[Optional[str], str, int]]:
+        node, best = self._root, None
+        for ch in konto:
+            node = node.get(ch)
+            if node is None:
+                break
+            best = node.get(self._RULE, best)
+        return best
+
+
+def _centi(v: Any) -> int:
+    if isinstance(v, str):
+        v = v.strip().replace(" ", "")
+        if "," in v:   # "1.234,56" (hrvatski CSV iz ERP-a)
+            v = v.replace(".", "").replace(",", ".")
+        v = v or 0
+    return round(float(v or 0) * 100)
+
+
+def _row_value(row: Mapping[str, Any], *keys: str) -> Any:
+    for k in keys:
+        if k in row:
+            return row[k]
+    return None
+
+
+def iter_salda(trial_balance: Any) -> Iterator[Tuple[str, int]]:
+    """(konto, saldo duguje − potražuje u centima) iz bilo kojeg oblika bruto bilance."""
+    if not trial_balance:
+        return
+    if isinstance(trial_balance, Mapping):
+        konta = trial_balance.get("konta", trial_balance)
+        for konto, v in konta.items():
+            if isinstance(v, Mapping):
+                saldo = v.get("saldo")
+                if saldo is None:
+                    yield str(konto), _centi(v.get("duguje")) - _centi(v.get("potrazuje"))
+                    continue
+                v = saldo
+            yield str(konto), _centi(v)
+        return
+    for row in trial_balance:
+        if not isinstance(row, Mapping):
+            konto, saldo = row
+            yield str(konto), _centi(saldo)
+            continue
+        konto = _row_value(row, "konto", "Konto", "KONTO")
+        if not konto:
+            continue
+        saldo = _row_value(row, "saldo", "Saldo", "SALDO")
+        if saldo is None or saldo == "":
+            yield str(konto).strip(), (_centi(_row_value(row, "duguje", "Duguje", "DUGUJE"))
+                                       - _centi(_row_value(row, "potrazuje", "Potrazuje",
+                                                           "POTRAZUJE")))
+        else:
+            yield str(konto).strip(), _centi(saldo)
+
+
+def _zbroji(pozicije: Dict[str, int], zbrojevi: Sequence[Tuple[str, Tuple[str, ...]]]):
+    for aop, dijelovi in zbrojevi:
+        total = pozicije.get(aop, 0)
+        for d in dijelovi:
+            if d[0] == "-":
+                total -= pozicije.get(d[1:], 0)
+            else:
+                total += pozicije.get(d, 0)
+        pozicije[aop] = total
+
+
+# ════════════════════════════════════════════════════════
+# Mapiranje bruto bilance
+# ════════════════════════════════════════════════════════
+
+class AOPMapper:
+    """Bruto bilanca → AOP pozicije bilance i RDG-a u jednom prolazu."""
+
+    def __init__(self, pravila: Iterable[Tuple[str, Optional[str], str, int]] = AOP_PRAVILA):
+        self.trie = AOPTrie(pravila)
+        # Isti konta se ponavljaju kod svih klijenata — pravilo po kontu se
+        # traži u stablu samo prvi put
+        self._memo: Dict[str, Optional[Tuple[Optional[str], str, int]]] = {}
+
+    def rule(self, konto: str) -> Optional[Tuple[Optional[str], str, int]]:
+        r = self._memo.get(konto, False)
+        if r is False:
+            r = self._memo[konto] = self.trie.lookup(konto)
+        return r
+
+    def map(self, trial_balance: Any, pocetno: Any = None) -> Dict[str, Any]:
+        """
+        AOP iznosi (EUR) iz kumulativne bruto bilance na kraj godine.
+
+        ``pocetno`` je bruto bilanca na kraj prethodne godine: RDG tada
+        obuhvaća samo promet tekuće godine, a nezatvoreni rezultat ranijih
+        godina (salda razreda 5–8 na početku) ide u zadržanu dobit (AOP 050).
+        Dobit godine (051) = RDG 129 dok godina nije zatvorena na razred 25.
+        """
+        rule = self.rule
+        bilanca: Dict[str, int] = {}
+        rdg: Dict[str, int] = {}
+        nemapirano: Dict[str, int] = {}
+        n = 0
+        for konto, centi in iter_salda(trial_balance):
+            n += 1
+            r = rule(konto)
+            if r is None:
+                if centi:
+                    nemapirano[konto] = nemapirano.get(konto, 0) + centi
+                continue
+            izvjestaj, aop, predznak = r
+            if izvjestaj == "bilanca":
+                bilanca[aop] = bilanca.get(aop, 0) + predznak * centi
+            elif izvjestaj == "rdg":
+                rdg[aop] = rdg.get(aop, 0) + predznak * centi
+
+        for konto, centi in iter_salda(pocetno):
+            r = rule(konto)
+            if r is None or r[0] != "rdg" or not centi:
+                continue
+            _, aop, predznak = r
+            rdg[aop] = rdg.get(aop, 0) - predznak * centi
+            bilanca["050"] = bilanca.get("050", 0) + PASIVA * centi
+
+        _zbroji(rdg, ZBROJEVI_RDG)
+        if not bilanca.get("051"):
+            bilanca["051"] = rdg["129"]
+        _zbroji(bilanca, ZBROJEVI_BILANCA)
+
+        return {
+            "bilanca": {a: v / 100 for a, v in sorted(bilanca.items()) if v},
+            "rdg": {a: v / 100 for a, v in sorted(rdg.items()) if v},
+            "nemapirano": {k: v / 100 for k, v in sorted(nemapirano.items())},
+            "konta": n,
+            "balanced": bilanca["043"] == bilanca["067"],
+        }
+
+
+# ════════════════════════════════════════════════════════
+# Godišnji GFI za sve klijente
+# ════════════════════════════════════════════════════════
+
+def stanja_iz_storagea(storage, godina: int,
+                       client_ids: Optional[List[str]] = None) -> Tuple[Dict, Dict, Dict]:
+    """
+    Bruto bilance po klijentu iz odobrenih knjiženja (SQLiteStorage) jednim
+    upitom: stanja na kraj godine, prethodne godine i godine prije nje.
+    """
+    granice = [f"{godina - 1}-01-01", f"{godina}-01-01", f"{godina + 1}-01-01"]
+    rows = storage.aggregate_konto_flows(granice, client_ids, konto_len=4)
+    stanja: Tuple[Dict, Dict, Dict] = ({}, {}, {})
+    for cid, razred, konto, centi in rows:
+        # razred 0 = do kraja godine −2; ulazi u sva tri stanja
+        for i in range(razred, 3):
+            k = stanja[2 - i].setdefault(cid, {})
+            k[konto] = k.get(konto, 0) + centi / 100
+    for cid in client_ids or ():
+        for s in stanja:
+            s.setdefault(cid, {})
+    return stanja
+
+
+class GFIBatch:
+    """Godišnji GFI (bilanca + RDG + XML) za sve klijente odjednom."""
+
+    def __init__(self, export_dir: Optional[str] = None, mapper: Optional[AOPMapper] = None):
+        from nyx_light.modules.gfi_xml import GFIXMLGenerator
+        self.mapper = mapper or AOPMapper()
+        self.generator = GFIXMLGenerator()
+        self.export_dir = Path(export_dir) if export_dir else None
+
+    def run(self, stanja: Mapping[str, Any], godina: int,
+            stanja_prethodne: Optional[Mapping[str, Any]] = None,
+            stanja_pretprethodne: Optional[Mapping[str, Any]] = None,
+            clients: Optional[Mapping[str, Mapping[str, str]]] = None) -> Dict[str, Any]:
+        """
+        ``stanja`` = {client_id: bruto bilanca na 31.12. godine}. S
+        bruto bilancom na kraj prethodne godine RDG je samo promet godine, a
+        uz onu godinu ranije popunjava se i stupac prethodne godine.
+        """
+        t_start = time.perf_counter()
+        prev = stanja_prethodne or {}
+        prev2 = stanja_pretprethodne or {}
+        clients = clients or {}
+        gen = self.generator
+        if self.export_dir:
+            self.export_dir.mkdir(parents=True, exist_ok=True)
+
+        rezultati = []
+        for cid, tb in stanja.items():
+            t0 = time.perf_counter()
+            info = clients.get(cid, {})
+            oib, naziv = info.get("oib", ""), info.get("naziv", "")
+            tekuce = self.mapper.map(tb, prev.get(cid))
+            prethodno = (self.mapper.map(prev[cid], prev2.get(cid))
+                         if cid in prev else {"bilanca": {}, "rdg": {}})
+            bil = gen.generate_bilanca(tekuce["bilanca"], prethodno["bilanca"],
+                                       oib=oib, naziv=naziv, godina=godina)
+            rdg = gen.generate_rdg(tekuce["rdg"], prethodno["rdg"],
+                                   oib=oib, naziv=naziv, godina=godina)
+            xml = {"bilanca": gen.to_xml(bil), "rdg": gen.to_xml(rdg)}
+            rez: Dict[str, Any] = {
+                "client_id": cid,
+                "aktiva": tekuce["bilanca"].get("043", 0.0),
+                "pasiva": tekuce["bilanca"].get("067", 0.0),
+                "dobit": tekuce["rdg"].get("129", 0.0),
+                "balanced": tekuce["balanced"],
+                "nemapirano": tekuce["nemapirano"],
+            }
+            if self.export_dir:
+                rez["files"] = []
+                for vrsta, sadrzaj in xml.items():
+                    path = self.export_dir / f"GFI-{cid}-{godina}-{vrsta}.xml"
+                    path.write_text(sadrzaj, encoding="utf-8")
+                    rez["files"].append(str(path))
+            else:
+                rez["xml"] = xml
+            rez["seconds"] = round(time.perf_counter() - t0, 4)
+            rezultati.append(rez)
+            if not tekuce["balanced"]:
+                logger.warning("GFI %s/%d: aktiva %.2f ≠ pasiva %.2f",
+                               cid, godina, rez["aktiva"], rez["pasiva"])
+
+        sec = time.perf_counter() - t_start
+        logger.info("GFI %d: %d klijenata u %.2fs", godina, len(rezultati), sec)
+        return {
+            "godina": godina,
+            "clients": len(rezultati),
+            "balanced": sum(1 for r in rezultati if r["balanced"]),
+            "nemapirano": sum(1 for r in rezultati if r["nemapirano"]),
+            "seconds": round(sec, 3),
+            "clients_per_s": round(len(rezultati) / sec, 1) if sec else 0.0,
+            "rezultati": rezultati,
+        }
+
+    def run_from_ledger(self, ledger, godina: int,
+                        clients: Optional[Mapping[str, Mapping[str, str]]] = None) -> Dict[str, Any]:
+        """Iz GeneralLedgera — po jedan upit za salda svih klijenata na tri datuma."""
+        stanja = [ledger.trial_balances_by_client(f"{godina - i}-12-31") for i in range(3)]
+        return self.run(stanja[0], godina, stanja[1], stanja[2], clients=clients)
+
+    def run_from_storage(self, storage, godina: int, client_ids: Optional[List[str]] = None,
+                         clients: Optional[Mapping[str, Mapping[str, str]]] = None) -> Dict[str, Any]:
+        """Iz odobrenih knjiženja SQLiteStoragea (stanja_iz_storagea)."""
+        stanja, prethodne, pretprethodne = stanja_iz_storagea(storage, godina, client_ids)
+        return self.run(stanja, godina, prethodne, pretprethodne, clients=clients)
@@ -0,0 +1,445 @@
+"""
+Nyx Light — IOS kampanja (godišnje usklađivanje za sve partnere svih klijenata)
+
+Na kraju godine IOS ide svakom partneru svakog klijenta — tisuće obrazaca.
+
+  1. Otvorene stavke se čitaju jednim upitom (SQLiteStorage.iter_open_items)
+     i u jednom prolazu grupiraju po (klijent, partner)
+  2. Excel obrasci se renderiraju u process poolu — openpyxl write-only
+     (redak po redak, bez grida ćelija u memoriji), stilovi su zajednički
+     objekti kreirani jednom po procesu
+  3. Obrasci, statusi slanja i odgovori partnera spremaju se u SQLite
+     (IOSStore) — preživljavaju restart i dijele se između korisnika
+
+Korištenje:
+    store = IOSStore("data/nyx.db")
+    rez = IOSCampaign(store).run_from_storage(storage, datum_do="2026-12-31")
+    rez["forms"], rez["forms_per_s"]
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from nyx_light.modules.ios_reconciliation.ios import IOSObrazac, IOSStavka
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+logger = logging.getLogger("nyx_light.modules.ios.campaign")
+
+HEADERS = ["R.br.", "Broj dokumenta", "Datum dokumenta",
+           "Datum dospijeća", "Opis", "Duguje (EUR)", "Potražuje (EUR)"]
+WIDTHS = [6, 18, 16, 16, 30, 15, 15]
+AMOUNT_FORMAT = "#,##0.00"
+
+# Zajednički stilovi — objekti kreirani jednom po procesu (i po workeru u
+# poolu). U workbooku se svaki stil primijeni jednom, ostale ćelije kopiraju
+# indeksni StyleArray — bez hashiranja Font/Border objekata po ćeliji.
+if HAS_OPENPYXL:
+    _THIN = Side(border_style="thin")
+    _BORDER = Border(top=_THIN, bottom=_THIN, left=_THIN, right=_THIN)
+    _BOLD = Font(bold=True)
+    STYLES: Dict[str, Dict[str, Any]] = {
+        "title": {"font": Font(bold=True, size=14), "alignment": Alignment(horizontal="center")},
+        "label": {"font": _BOLD},
+        "header": {"font": Font(bold=True, color="FFFFFF"),
+                   "fill": PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid"),
+                   "alignment": Alignment(horizontal="center"), "border": _BORDER},
+        "cell": {"border": _BORDER},
+        "amount": {"border": _BORDER, "number_format": AMOUNT_FORMAT},
+        "total_label": {"font": _BOLD, "alignment": Alignment(horizontal="right")},
+        "total": {"font": _BOLD, "border": _BORDER, "number_format": AMOUNT_FORMAT},
+        "saldo_label": {"font": Font(bold=True, size=12), "alignment": Alignment(horizontal="right")},
+        "saldo": {"font": Font(bold=True, size=12, color="000000"), "number_format": AMOUNT_FORMAT},
+        "saldo_red": {"font": Font(bold=True, size=12, color="FF0000"),
+                      "number_format": AMOUNT_FORMAT},
+    }
+
+
+def form_id_for(client_id: str, partner_oib: str, datum_do: str) -> str:
+    return f"IOS-{client_id}-{partner_oib}-{datum_do}"
+
+
+def campaign_datum_od(datum_do: str, datum_od: str = "") -> str:
+    """Početak razdoblja kampanje — bez datum_od 1. siječnja godine datum_do."""
+    return datum_od or f"{datum_do[:4]}-01-01"
+
+
+# ════════════════════════════════════════════════════════
+# Renderiranje (write-only, poziva se i u worker procesima)
+# ════════════════════════════════════════════════════════
+
+def render_job(form: IOSObrazac, path: Path) -> Tuple:
+    """Picklable opis obrasca za worker (samo tuple/str/float)."""
+    return (
+        str(path),
+        (form.client_name, form.client_oib, form.partner_name, form.partner_oib,
+         f"{form.datum_od} — {form.datum_do}", datetime.now().strftime("%d.%m.%Y.")),
+        [(s.broj_dokumenta, s.datum_dokumenta, s.datum_dospijeca, s.opis, s.duguje, s.potrazuje)
+         for s in form.stavke],
+        (form.ukupno_duguje, form.ukupno_potrazuje, form.saldo),
+    )
+
+
+def render_ios_workbook(job: Tuple) -> str:
+    """Zapiši IOS obrazac (isti raspored kao IOSReconciliation) u write-only modu."""
+    path, info, stavke, (duguje, potrazuje, saldo) = job
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("IOS")
+    for i, w in enumerate(WIDTHS, 1):
+        ws.column_dimensions[chr(64 + i)].width = w
+    applied: Dict[str, Any] = {}
+
+    def cell(value, style):
+        c = WriteOnlyCell(ws, value=value)
+        arr = applied.get(style)
+        if arr is None:
+            for attr, obj in STYLES[style].items():
+                setattr(c, attr, obj)
+            applied[style] = c._style
+        else:
+            c._style = copy(arr)
+        return c
+
+    ws.merged_cells.add("A1:G1")
+    ws.append([cell("IZVOD OTVORENIH STAVKI (IOS)", "title")])
+    ws.append([])
+    labels = ("Tvrtka:", "OIB:", "Partner:", "Partner OIB:", "Razdoblje:", "Datum izrade:")
+    for label, value in zip(labels, info):
+        ws.append([cell(label, "label"), value])
+    ws.append([])
+    ws.append([cell(h, "header") for h in HEADERS])
+
+    for i, (broj, datum, dospijece, opis, dug, pot) in enumerate(stavke, 1):
+        ws.append([
+            cell(i, "cell"), cell(broj, "cell"), cell(datum, "cell"),
+            cell(dospijece, "cell"), cell(opis, "cell"),
+            cell(dug, "amount"), cell(pot, "amount"),
+        ])
+
+    total_row = 11 + len(stavke)
+    ws.merged_cells.add(f"A{total_row}:E{total_row}")
+    ws.merged_cells.add(f"A{total_row + 1}:E{total_row + 1}")
+    ws.append([cell("UKUPNO:", "total_label"), None, None, None, None,
+               cell(duguje, "total"), cell(potrazuje, "total")])
+    ws.append([cell("SALDO:", "saldo_label"), None, None, None, None,
+               cell(saldo, "saldo_red" if saldo != 0 else "saldo")])
+
+    ws.append([])
+    ws.append([])
+    ws.append([cell("POTVRDA USKLAĐENJA:", "label")])
+    ws.append(["□ Potvrđujem gornji saldo"])
+    ws.append(["□ Osporavam — priložen korigirani IOS"])
+    ws.append([])
+    ws.append(["Potpis i pečat: ___________________"])
+    ws.append(["Datum: ___________________"])
+
+    wb.save(path)
+    return path
+
+
+def render_all(jobs: List[Tuple], workers: int = 1) -> List[str]:
+    """Renderiraj obrasce; workers > 1 → ProcessPoolExecutor."""
+    if workers <= 1 or len(jobs) < 2 * workers:
+        return [render_ios_workbook(j) for j in jobs]
+    chunksize = max(1, len(jobs) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_ios_workbook, jobs, chunksize=chunksize))
+
+
+# ════════════════════════════════════════════════════════
+# SQLite spremište obrazaca i odgovora
+# ════════════════════════════════════════════════════════
+
+def _stavke_json(stavke: List[IOSStavka]) -> str:
+    return json.dumps([[s.broj_dokumenta, s.datum_dokumenta, s.datum_dospijeca,
+                        s.opis, s.duguje, s.potrazuje] for s in stavke], ensure_ascii=False)
+
+
+def _stavke_from_json(raw: str) -> List[IOSStavka]:
+    return [IOSStavka(*row) for row in json.loads(raw or "[]")]
+
+
+class IOSStore:
+    """IOS obrasci, statusi i odgovori partnera u SQLite-u."""
+
+    def __init__(self, db_path: str = ":memory:"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_db()
+
+    def _init_db(self):
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ios_forms (
+                form_id TEXT PRIMARY KEY,
+                campaign_id TEXT DEFAULT '',
+                client_id TEXT NOT NULL,
+                client_name TEXT DEFAULT '',
+                client_oib TEXT DEFAULT '',
+                partner_name TEXT DEFAULT '',
+                partner_oib TEXT NOT NULL,
+                datum_od TEXT, datum_do TEXT,
+                stavke TEXT NOT NULL DEFAULT '[]',
+                broj_stavki INTEGER DEFAULT 0,
+                saldo REAL DEFAULT 0,
+                status TEXT DEFAULT 'draft',
+                excel_path TEXT DEFAULT '',
+                created_at TEXT,
+                sent_at TEXT, sent_to TEXT DEFAULT '',
+                response_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_ios_forms_client ON ios_forms(client_id, status);
+            CREATE INDEX IF NOT EXISTS idx_ios_forms_campaign ON ios_forms(campaign_id);
+
+            CREATE TABLE IF NOT EXISTS ios_responses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                form_id TEXT NOT NULL,
+                confirmed INTEGER NOT NULL,
+                partner_stavke TEXT DEFAULT '[]',
+                razlike TEXT DEFAULT '[]',
+                received_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_ios_responses_form ON ios_responses(form_id);
+
+            CREATE TABLE IF NOT EXISTS ios_campaigns (
+                campaign_id TEXT PRIMARY KEY,
+                datum_od TEXT, datum_do TEXT,
+                forms INTEGER, stavke INTEGER,
+                seconds REAL, workers INTEGER,
+                created_at TEXT
+            );
+        """)
+        self._conn.commit()
+
+    def save_forms(self, forms: Iterable[Tuple[str, IOSObrazac]], campaign_id: str = "",
+                   excel_paths: Optional[Mapping[str, str]] = None) -> int:
+        """Upiši/zamijeni obrasce u jednoj transakciji."""
+        excel_paths = excel_paths or {}
+        rows = [
+            (fid, campaign_id, f.client_id, f.client_name, f.client_oib, f.partner_name,
+             f.partner_oib, f.datum_od, f.datum_do, _stavke_json(f.stavke), len(f.stavke),
+             f.saldo, f.status, excel_paths.get(fid, ""), f.created_at)
+            for fid, f in forms
+        ]
+        with self._lock:
+            self._conn.executemany(
+                """INSERT OR REPLACE INTO ios_forms
+                   (form_id, campaign_id, client_id, client_name, client_oib, partner_name,
+                    partner_oib, datum_od, datum_do, stavke, broj_stavki, saldo, status,
+                    excel_path, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+            self._conn.commit()
+        return len(rows)
+
+    @staticmethod
+    def _row_to_form(row: sqlite3.Row) -> IOSObrazac:
+        form = IOSObrazac(row["client_id"], row["client_name"], row["client_oib"],
+                          row["partner_name"], row["partner_oib"], row["datum_od"], row["datum_do"])
+        form.stavke = _stavke_from_json(row["stavke"])
+        form.status = row["status"]
+        form.created_at = row["created_at"]
+        form.sent_at = row["sent_at"]
+        form.response_at = row["response_at"]
+        if row["razlike"] is not None:          # zadnji odgovor partnera
+            form.partner_stavke = _stavke_from_json(row["partner_stavke"])
+            form.razlike = json.loads(row["razlike"] or "[]")
+        return form
+
+    _FORM_SQL = """SELECT f.*, r.partner_stavke, r.razlike FROM ios_forms f
+                   LEFT JOIN ios_responses r ON r.id = (
+                       SELECT MAX(id) FROM ios_responses WHERE form_id = f.form_id)"""
+
+    def load_form(self, form_id: str) -> Optional[IOSObrazac]:
+        row = self._conn.execute(self._FORM_SQL + " WHERE f.form_id=?", (form_id,)).fetchone()
+        return self._row_to_form(row) if row else None
+
+    def iter_forms(self, client_id: Optional[str] = None) -> Iterator[Tuple[str, IOSObrazac]]:
+        """Puni obrasci (sa stavkama i zadnjim odgovorom) jednim upitom."""
+        sql, params = self._FORM_SQL, []
+        if client_id:
+            sql += " WHERE f.client_id=?"
+            params.append(client_id)
+        for row in self._conn.execute(sql + " ORDER BY f.client_id, f.partner_oib", params):
+            yield row["form_id"], self._row_to_form(row)
+
+    def mark_sent(self, form_id: str, sent_at: str, email_to: str = "") -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE ios_forms SET status='sent', sent_at=?, sent_to=? WHERE form_id=?",
+                (sent_at, email_to, form_id))
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def save_response(self, form_id: str, confirmed: bool, partner_stavke: List[IOSStavka],
+                      razlike: List[Dict[str, Any]], received_at: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ios_responses (form_id, confirmed, partner_stavke, razlike, received_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (form_id, int(confirmed), _stavke_json(partner_stavke),
+                 json.dumps(razlike, ensure_ascii=False), received_at))
+            self._conn.execute(
+                "UPDATE ios_forms SET status=?, response_at=? WHERE form_id=?",
+                ("confirmed" if confirmed else "disputed", received_at, form_id))
+            self._conn.commit()
+
+    def list_forms(self, client_id: Optional[str] = None, status: Optional[str] = None,
+                   campaign_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Pregled obrazaca bez stavki (za listu/dashboard)."""
+        where, params = [], []
+        for col, val in (("client_id", client_id), ("status", status), ("campaign_id", campaign_id)):
+            if val:
+                where.append(f"{col}=?")
+                params.append(val)
+        sql = ("SELECT form_id, campaign_id, client_id, partner_name, partner_oib, datum_od, "
+               "datum_do, broj_stavki, saldo, status, excel_path, created_at, sent_at, response_at "
+               "FROM ios_forms")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return [dict(r) for r in self._conn.execute(sql + " ORDER BY client_id, partner_oib", params)]
+
+    def record_campaign(self, campaign_id: str, datum_od: str, datum_do: str,
+                        forms: int, stavke: int, seconds: float, workers: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ios_campaigns VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (campaign_id, datum_od, datum_do, forms, stavke, seconds, workers,
+                 datetime.now().isoformat()))
+            self._conn.commit()
+
+    def get_stats(self, campaign_id: Optional[str] = None) -> Dict[str, Any]:
+        where, params = ("WHERE campaign_id=?", [campaign_id]) if campaign_id else ("", [])
+        by_status = {r[0]: r[1] for r in self._conn.execute(
+            f"SELECT status, COUNT(*) FROM ios_forms {where} GROUP BY status", params)}
+        razlike = self._conn.execute(
+            "SELECT COALESCE(SUM(json_array_length(r.razlike)), 0) FROM ios_responses r "
+            "WHERE r.id IN (SELECT MAX(id) FROM ios_responses GROUP BY form_id)"
+            + (" AND r.form_id IN (SELECT form_id FROM ios_forms WHERE campaign_id=?)"
+               if campaign_id else ""), params).fetchone()[0]
+        return {"total_forms": sum(by_status.values()), "by_status": by_status,
+                "total_razlike": razlike}
+
+    def close(self):
+        self._conn.close()
+
+
+# ════════════════════════════════════════════════════════
+# Kampanja
+# ════════════════════════════════════════════════════════
+
+def group_open_items(items: Iterable[Mapping[str, Any]], datum_od: str, datum_do: str,
+                     clients: Optional[Mapping[str, Mapping[str, str]]] = None
+                     ) -> Dict[Tuple[str, str], IOSObrazac]:
+    """Jedan prolaz kroz otvorene stavke → IOS obrazac po (klijent, partner)."""
+    clients = clients or {}
+    forms: Dict[Tuple[str, str], IOSObrazac] = {}
+    for it in items:
+        key = (it["client_id"], it["partner_oib"])
+        form = forms.get(key)
+        if form is None:
+            client = clients.get(key[0], {})
+            form = forms[key] = IOSObrazac(
+                client_id=key[0],
+                client_name=client.get("naziv") or f"Klijent {key[0]}",
+                client_oib=client.get("oib", ""),
+                partner_name=it.get("partner_name") or f"Partner {key[1]}",
+                partner_oib=key[1],
+                datum_od=datum_od,
+                datum_do=datum_do,
+            )
+        form.stavke.append(IOSStavka(
+            broj_dokumenta=it.get("broj_dokumenta", ""),
+            datum_dokumenta=it.get("datum_dokumenta", ""),
+            datum_dospijeca=it.get("datum_dospijeca", ""),
+            opis=it.get("opis", ""),
+            duguje=float(it.get("duguje", 0)),
+            potrazuje=float(it.get("potrazuje", 0)),
+        ))
+    return forms
+
+
+class IOSCampaign:
+    """IOS za sve partnere svih klijenata u jednom prolazu."""
+
+    def __init__(self, store: IOSStore, export_dir: str = "data/exports/ios"):
+        self.store = store
+        self.export_dir = Path(export_dir)
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+
+    def run(self, open_items: Iterable[Mapping[str, Any]], datum_do: str, datum_od: str = "",
+            clients: Optional[Mapping[str, Mapping[str, str]]] = None,
+            workers: Optional[int] = None, campaign_id: str = "") -> Dict[str, Any]:
+        """
+        Generiraj, renderiraj i spremi IOS obrasce.
+
+        open_items: dictovi s client_id, partner_oib, broj_dokumenta,
+        datum_dokumenta, datum_dospijeca, opis, duguje, potrazuje.
+        clients: {client_id: {"naziv", "oib"}} za zaglavlje obrasca.
+        """
+        datum_od = campaign_datum_od(datum_do, datum_od)
+        campaign_id = campaign_id or f"IOS-KAMPANJA-{datum_do}"
+        cpus = os.cpu_count() or 1
+        workers = max(1, min(int(workers), cpus)) if workers is not None else cpus
+        t0 = time.perf_counter()
+
+        forms = group_open_items(open_items, datum_od, datum_do, clients)
+        t_group = time.perf_counter()
+
+        ids = [(form_id_for(cid, oib, datum_do), form) for (cid, oib), form in forms.items()]
+        excel_paths: Dict[str, str] = {}
+        if HAS_OPENPYXL:
+            jobs = [render_job(form, self.export_dir / f"{fid}.xlsx") for fid, form in ids]
+            for (fid, _), path in zip(ids, render_all(jobs, workers)):
+                excel_paths[fid] = path
+        else:
+            logger.warning("openpyxl nije instaliran — IOS kampanja bez Excel obrazaca")
+        t_render = time.perf_counter()
+
+        self.store.save_forms(ids, campaign_id, excel_paths)
+        seconds = time.perf_counter() - t0
+        n_stavke = sum(len(f.stavke) for f in forms.values())
+        self.store.record_campaign(campaign_id, datum_od, datum_do, len(ids), n_stavke,
+                                   round(seconds, 3), workers)
+
+        logger.info("IOS kampanja %s: %d obrazaca, %d stavki, %.1f obrazaca/s",
+                    campaign_id, len(ids), n_stavke, len(ids) / seconds if seconds else 0)
+        return {
+            "campaign_id": campaign_id,
+            "datum_od": datum_od,
+            "datum_do": datum_do,
+            "forms": len(ids),
+            "stavke": n_stavke,
+            "clients": len({cid for cid, _ in forms}),
+            "excel": len(excel_paths),
+            "workers": workers,
+            "seconds": round(seconds, 3),
+            "group_seconds": round(t_group - t0, 3),
+            "render_seconds": round(t_render - t_group, 3),
+            "forms_per_s": round(len(ids) / seconds, 1) if seconds else 0.0,
+        }
+
+    def run_from_storage(self, storage, datum_do: str, datum_od: str = "",
+                         client_ids: Optional[List[str]] = None,
+                         clients: Optional[Mapping[str, Mapping[str, str]]] = None,
+                         workers: Optional[int] = None) -> Dict[str, Any]:
+        """Kampanja iz spremljenih knjiženja (SQLiteStorage), jedan upit za sve klijente."""
+        datum_od = campaign_datum_od(datum_do, datum_od)   # isto razdoblje u upitu i zaglavlju
+        items = storage.iter_open_items(datum_do, datum_od=datum_od, client_ids=client_ids)
+        return self.run(items, datum_do, datum_od, clients=clients, workers=workers)
@@ -133,13 +133,27 @@ class IOSReconciliation:
       - track_responses() → status praćenja
       - map_differences() → lista razlika s prijedlogom knjiženja
       - generate_difference_report() → Excel s razlikama
+      - run_campaign() → IOS za sve partnere svih klijenata (campaign.py)
     """
 
-    def __init__(self, export_dir: str = "data/exports/ios"):
+    def __init__(self, export_dir: str = "data/exports/ios", db_path: Optional[str] = None):
         self.export_dir = Path(export_dir)
         self.export_dir.mkdir(parents=True, exist_ok=True)
         self._forms: Dict[str, IOSObrazac] = {}
         self._tracking: Dict[str, Dict[str, Any]] = {}
+        # Uz db_path obrasci i odgovori idu u SQLite (IOSStore), inače samo u memoriji
+        self._store = None
+        if db_path:
+            from nyx_light.modules.ios_reconciliation.campaign import IOSStore
+            self._store = IOSStore(db_path)
+
+    def _get_form(self, form_id: str) -> Optional[IOSObrazac]:
+        form = self._forms.get(form_id)
+        if form is None and self._store is not None:
+            form = self._store.load_form(form_id)
+            if form is not None:
+                self._forms[form_id] = form
+        return form
 
     def generate_ios_form(
         self,
@@ -191,126 +205,51 @@ class IOSReconciliation:
         excel_path = self._generate_excel(form, form_id)
         if excel_path:
             result["excel_path"] = str(excel_path)
+        if self._store is not None:
+            self._store.save_forms([(form_id, form)],
+                                   excel_paths={form_id: str(excel_path or "")})
 
         logger.info("IOS generiran: %s (%d stavki, saldo: %.2f EUR)",
                     form_id, len(form.stavke), form.saldo)
         return result
 
     def _generate_excel(self, form: IOSObrazac, form_id: str) -> Optional[Path]:
-        """Generiraj Excel IOS obrazac."""
-        try:
-            import openpyxl
-            from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-        except ImportError:
+        """Generiraj Excel IOS obrazac (isti renderer kao IOS kampanja)."""
+        from nyx_light.modules.ios_reconciliation.campaign import (
+            HAS_OPENPYXL, render_ios_workbook, render_job,
+        )
+        if not HAS_OPENPYXL:
             logger.warning("openpyxl nije instaliran — Excel export nedostupan")
             return None
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "IOS"
-
-        # Styles
-        bold = Font(bold=True)
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_font = Font(bold=True, color="FFFFFF")
-        center = Alignment(horizontal="center")
-        thin = Side(border_style="thin")
-        border = Border(top=thin, bottom=thin, left=thin, right=thin)
-
-        # Title
-        ws.merge_cells("A1:G1")
-        ws["A1"] = "IZVOD OTVORENIH STAVKI (IOS)"
-        ws["A1"].font = Font(bold=True, size=14)
-        ws["A1"].alignment = center
-
-        # Client info
-        ws["A3"] = "Tvrtka:"
-        ws["B3"] = form.client_name
-        ws["A4"] = "OIB:"
-        ws["B4"] = form.client_oib
-        ws["A5"] = "Partner:"
-        ws["B5"] = form.partner_name
-        ws["A6"] = "Partner OIB:"
-        ws["B6"] = form.partner_oib
-        ws["A7"] = "Razdoblje:"
-        ws["B7"] = f"{form.datum_od} — {form.datum_do}"
-        ws["A8"] = "Datum izrade:"
-        ws["B8"] = datetime.now().strftime("%d.%m.%Y.")
-
-        for r in range(3, 9):
-            ws[f"A{r}"].font = bold
-
-        # Headers
-        headers = ["R.br.", "Broj dokumenta", "Datum dokumenta",
-                   "Datum dospijeća", "Opis", "Duguje (EUR)", "Potražuje (EUR)"]
-        for col, h in enumerate(headers, 1):
-            cell = ws.cell(row=10, column=col, value=h)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = center
-            cell.border = border
-
-        # Data
-        for i, stavka in enumerate(form.stavke, 1):
-            row = 10 + i
-            ws.cell(row=row, column=1, value=i).border = border
-            ws.cell(row=row, column=2, value=stavka.broj_dokumenta).border = border
-            ws.cell(row=row, column=3, value=stavka.datum_dokumenta).border = border
-            ws.cell(row=row, column=4, value=stavka.datum_dospijeca).border = border
-            ws.cell(row=row, column=5, value=stavka.opis).border = border
-            c_dug = ws.cell(row=row, column=6, value=stavka.duguje)
-            c_dug.number_format = "#,##0.00"
-            c_dug.border = border
-            c_pot = ws.cell(row=row, column=7, value=stavka.potrazuje)
-            c_pot.number_format = "#,##0.00"
-            c_pot.border = border
-
-        # Totals
-        total_row = 11 + len(form.stavke)
-        ws.merge_cells(f"A{total_row}:E{total_row}")
-        ws[f"A{total_row}"] = "UKUPNO:"
-        ws[f"A{total_row}"].font = bold
-        ws[f"A{total_row}"].alignment = Alignment(horizontal="right")
-        c = ws.cell(row=total_row, column=6, value=form.ukupno_duguje)
-        c.font = bold
-        c.number_format = "#,##0.00"
-        c.border = border
-        c = ws.cell(row=total_row, column=7, value=form.ukupno_potrazuje)
-        c.font = bold
-        c.number_format = "#,##0.00"
-        c.border = border
-
-        saldo_row = total_row + 1
-        ws.merge_cells(f"A{saldo_row}:E{saldo_row}")
-        ws[f"A{saldo_row}"] = "SALDO:"
-        ws[f"A{saldo_row}"].font = Font(bold=True, size=12)
-        ws[f"A{saldo_row}"].alignment = Alignment(horizontal="right")
-        c = ws.cell(row=saldo_row, column=6, value=form.saldo)
-        c.font = Font(bold=True, size=12, color="FF0000" if form.saldo != 0 else "000000")
-        c.number_format = "#,##0.00"
-
-        # Confirmation section
-        conf_row = saldo_row + 3
-        ws[f"A{conf_row}"] = "POTVRDA USKLAĐENJA:"
-        ws[f"A{conf_row}"].font = bold
-        ws[f"A{conf_row + 1}"] = "□ Potvrđujem gornji saldo"
-        ws[f"A{conf_row + 2}"] = "□ Osporavam — priložen korigirani IOS"
-        ws[f"A{conf_row + 4}"] = "Potpis i pečat: ___________________"
-        ws[f"A{conf_row + 5}"] = "Datum: ___________________"
-
-        # Column widths
-        widths = [6, 18, 16, 16, 30, 15, 15]
-        for i, w in enumerate(widths, 1):
-            ws.column_dimensions[chr(64 + i)].width = w
-
-        # Save
         filepath = self.export_dir / f"{form_id}.xlsx"
-        wb.save(filepath)
+        render_ios_workbook(render_job(form, filepath))
         return filepath
 
+    def run_campaign(self, open_items, datum_do: str, datum_od: str = "",
+                     clients: Optional[Dict[str, Dict[str, str]]] = None,
+                     workers: Optional[int] = None) -> Dict[str, Any]:
+        """IOS za sve partnere svih klijenata — vidi campaign.IOSCampaign."""
+        from nyx_light.modules.ios_reconciliation.campaign import IOSCampaign, IOSStore
+        if self._store is None:
+            self._store = IOSStore()
+        return IOSCampaign(self._store, str(self.export_dir)).run(
+            open_items, datum_do, datum_od, clients=clients, workers=workers)
+
+    def run_campaign_from_storage(self, storage, datum_do: str, datum_od: str = "",
+                                  client_ids: Optional[List[str]] = None,
+                                  clients: Optional[Dict[str, Dict[str, str]]] = None,
+                                  workers: Optional[int] = None) -> Dict[str, Any]:
+        """Kampanja iz odobrenih knjiženja (SQLiteStorage.iter_open_items)."""
+        from nyx_light.modules.ios_reconciliation.campaign import IOSCampaign, IOSStore
+        if self._store is None:
+            self._store = IOSStore()
+        return IOSCampaign(self._store, str(self.export_dir)).run_from_storage(
+            storage, datum_do, datum_od, client_ids=client_ids, clients=clients,
+            workers=workers)
+
     def track_responses(self, form_id: str) -> Dict[str, Any]:
         """Prati status odgovora na IOS."""
-        form = self._forms.get(form_id)
+        form = self._get_form(form_id)
         if not form:
             return {"form_id": form_id, "status": "not_found"}
 
@@ -333,11 +272,13 @@ class IOSReconciliation:
 
     def mark_sent(self, form_id: str, email_to: str = "") -> Dict[str, Any]:
         """Označi IOS kao poslan."""
-        form = self._forms.get(form_id)
+        form = self._get_form(form_id)
         if not form:
             return {"error": f"IOS {form_id} ne postoji"}
         form.sent_at = datetime.now().isoformat()
         form.status = "sent"
+        if self._store is not None:
+            self._store.mark_sent(form_id, form.sent_at, email_to)
         self._tracking[form_id] = {
             "sent": True, "sent_to": email_to,
             "response_received": False, "reminders_sent": 0,
@@ -351,7 +292,7 @@ class IOSReconciliation:
         partner_stavke: Optional[List[Dict]] = None,
     ) -> Dict[str, Any]:
         """Zaprimi odgovor partnera na IOS."""
-        form = self._forms.get(form_id)
+        form = self._get_form(form_id)
         if not form:
             return {"error": f"IOS {form_id} ne postoji"}
 
@@ -359,6 +300,8 @@ class IOSReconciliation:
 
         if confirmed:
             form.status = "confirmed"
+            if self._store is not None:
+                self._store.save_response(form_id, True, [], [], form.response_at)
             return {"form_id": form_id, "status": "confirmed", "razlike": []}
 
         # Partner osporio — mapiranje razlika
@@ -375,11 +318,14 @@ class IOSReconciliation:
                 ))
 
         razlike = self.map_differences(form_id)
+        if self._store is not None:
+            self._store.save_response(form_id, False, form.partner_stavke, razlike,
+                                      form.response_at)
         return {"form_id": form_id, "status": "disputed", "razlike": razlike}
 
     def map_differences(self, form_id: str) -> List[Dict[str, Any]]:
         """Mapiraj razlike između naših i partnerovih stavki."""
-        form = self._forms.get(form_id)
+        form = self._get_form(form_id)
         if not form:
             return []
 
@@ -437,7 +383,7 @@ class IOSReconciliation:
 
     def generate_difference_report(self, form_id: str) -> Optional[Path]:
         """Generiraj Excel izvještaj o razlikama."""
-        form = self._forms.get(form_id)
+        form = self._get_form(form_id)
         if not form or not form.razlike:
             return None
 
@@ -504,17 +450,22 @@ class IOSReconciliation:
         return filepath
 
     def get_all_forms(self, client_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Dohvati sve IOS obrasce."""
+        """Dohvati sve IOS obrasce (isti oblik s SQLite spremištem i bez njega)."""
+        if self._store is not None:
+            items = self._store.iter_forms(client_id=client_id)
+        else:
+            items = ((fid, form) for fid, form in self._forms.items()
+                     if not client_id or form.client_id == client_id)
         forms = []
-        for fid, form in self._forms.items():
-            if client_id and form.client_id != client_id:
-                continue
+        for fid, form in items:
             d = form.to_dict()
             d["form_id"] = fid
             forms.append(d)
         return forms
 
     def get_stats(self) -> Dict[str, Any]:
+        if self._store is not None:
+            return self._store.get_stats()
         statuses = {}
         for f in self._forms.values():
             statuses[f.status] = statuses.get(f.status, 0) + 1
@@ -523,3 +474,7 @@ class IOSReconciliation:
             "by_status": statuses,
             "total_razlike": sum(len(f.razlike) for f in self._forms.values()),
         }
+
+    def close(self):
+        if self._store is not None:
+            self._store.close()
@@ -6,14 +6,21 @@ JOPPD se predaje na dan isplate plaće ili najkasnije do 15. sljedećeg mjeseca.
 
 Format: XML prema shemi Porezne uprave RH.
 Ovaj modul PRIPREMA podatke — konačna predaja je na računovođi.
+
+Obrazac se puni inkrementalno (``add_stavka`` / ``add_payroll_results``
+/ ``add_payroll_batch``) — ukupni iznosi se zbrajaju u istom prolazu,
+pa više payroll batch-eva može puniti isti obrazac. XML se piše
+streaming writerom (bez ElementTree/minidom), i za 10k+ stavki.
 """
 
+import io
 import logging
-import xml.etree.ElementTree as ET
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-from xml.dom import minidom
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from nyx_light.export.streaming import StreamingXMLWriter, export_path, open_export
 
 logger = logging.getLogger("nyx_light.modules.joppd")
 
@@ -70,6 +77,64 @@ class JOPPDObrazac:
     ukupno_neto: float = 0.0
     ukupno_zdravstveno: float = 0.0
 
+    def add_stavka(self, stavka: JOPPDStavka) -> JOPPDStavka:
+        """Dodaj stavku i ažuriraj ukupne iznose (redni broj ako nije zadan)."""
+        if not stavka.redni_broj:
+            stavka.redni_broj = len(self.stavke) + 1
+        self.stavke.append(stavka)
+        self.add_to_totals(stavka)
+        return stavka
+
+    def add_to_totals(self, s: JOPPDStavka):
+        """Pribroji stavku ukupnim iznosima (iznosi su u centima → round)."""
+        self.ukupno_bruto = round(self.ukupno_bruto + s.bruto, 2)
+        self.ukupno_mio_1 = round(self.ukupno_mio_1 + s.mio_stup_1, 2)
+        self.ukupno_mio_2 = round(self.ukupno_mio_2 + s.mio_stup_2, 2)
+        self.ukupno_porez = round(self.ukupno_porez + s.porez, 2)
+        self.ukupno_prirez = round(self.ukupno_prirez + s.prirez, 2)
+        self.ukupno_neto = round(self.ukupno_neto + s.neto, 2)
+        self.ukupno_zdravstveno = round(self.ukupno_zdravstveno + s.zdravstveno, 2)
+
+    @property
+    def period(self) -> Tuple[int, int]:
+        """(godina, mjesec) iz oznake GGGG-MMM."""
+        year, month = self.oznaka.split("-")
+        return int(year), int(month)
+
+
+# Stavka → XML (StranicaB), redoslijed kao u shemi
+STAVKA_XML_FIELDS = (
+    ("RedniBroj", lambda s: str(s.redni_broj)),
+    ("OIBStjecatelja", lambda s: s.oib_primatelja),
+    ("ImePrezime", lambda s: s.ime_prezime),
+    ("OznakaStjecatelja", lambda s: s.oznaka_stjecatelja),
+    ("OznakaPrimitka", lambda s: s.oznaka_primitka),
+    ("BrutoIznos", lambda s: f"{s.bruto:.2f}"),
+    ("MIO1", lambda s: f"{s.mio_stup_1:.2f}"),
+    ("MIO2", lambda s: f"{s.mio_stup_2:.2f}"),
+    ("Dohodak", lambda s: f"{s.dohodak:.2f}"),
+    ("OsobniOdbitak", lambda s: f"{s.osobni_odbitak:.2f}"),
+    ("PoreznaOsnovica", lambda s: f"{s.porezna_osnovica:.2f}"),
+    ("Porez", lambda s: f"{s.porez:.2f}"),
+    ("Prirez", lambda s: f"{s.prirez:.2f}"),
+    ("Neto", lambda s: f"{s.neto:.2f}"),
+    ("Zdravstveno", lambda s: f"{s.zdravstveno:.2f}"),
+    ("DatumOd", lambda s: s.datum_od),
+    ("DatumDo", lambda s: s.datum_do),
+)
+
+UKUPNO_XML_FIELDS = (
+    ("UkupnoBruto", "ukupno_bruto"),
+    ("UkupnoMIO1", "ukupno_mio_1"),
+    ("UkupnoMIO2", "ukupno_mio_2"),
+    ("UkupnoPorez", "ukupno_porez"),
+    ("UkupnoPrirez", "ukupno_prirez"),
+    ("UkupnoNeto", "ukupno_neto"),
+    ("UkupnoZdravstveno", "ukupno_zdravstveno"),
+)
+
+JOPPD_XMLNS = "http://e-porezna.porezna-uprava.hr/sheme/zahtjevi/JOPPD/v1.5"
+
 
 OZNAKE_STJECATELJA = {
     "0001": "Radnik — nesamostalni rad",
@@ -99,21 +164,19 @@ class JOPPDGenerator:
     def __init__(self):
         self._generation_count = 0
 
-    def from_payroll_results(
+    def new_obrazac(
         self,
-        payroll_results: List,
         oib_poslodavca: str,
         naziv_poslodavca: str,
         datum_isplate: str = "",
         period_month: int = 0,
         period_year: int = 0,
     ) -> JOPPDObrazac:
-        """Generiraj JOPPD iz liste payroll rezultata."""
+        """Prazan obrazac za period — stavke se dodaju inkrementalno."""
         now = datetime.now()
         month = period_month or now.month
         year = period_year or now.year
-
-        obrazac = JOPPDObrazac(
+        return JOPPDObrazac(
             oznaka=f"{year}-{month:03d}",
             datum_predaje=now.strftime("%Y-%m-%d"),
             datum_isplate=datum_isplate or now.strftime("%Y-%m-%d"),
@@ -121,10 +184,46 @@ class JOPPDGenerator:
             naziv_obveznika=naziv_poslodavca,
         )
 
-        for i, pr in enumerate(payroll_results, 1):
-            stavka = JOPPDStavka(
+    def from_payroll_results(
+        self,
+        payroll_results: List,
+        oib_poslodavca: str,
+        naziv_poslodavca: str,
+        datum_isplate: str = "",
+        period_month: int = 0,
+        period_year: int = 0,
+    ) -> JOPPDObrazac:
+        """Generiraj JOPPD iz liste payroll rezultata."""
+        obrazac = self.new_obrazac(oib_poslodavca, naziv_poslodavca,
+                                   datum_isplate, period_month, period_year)
+        self.add_payroll_results(obrazac, payroll_results)
+        self._generation_count += 1
+        return obrazac
+
+    def add_payroll_results(self, obrazac: JOPPDObrazac, payroll_results: Iterable) -> int:
+        """Dodaj PayrollResult-e u postojeći obrazac. Vraća broj dodanih stavki."""
+        count = 0
+        for count, stavka in enumerate(self.stavke_from_payroll(
+                payroll_results, *obrazac.period, start=len(obrazac.stavke) + 1), 1):
+            obrazac.add_stavka(stavka)
+        return count
+
+    def add_payroll_batch(self, obrazac: JOPPDObrazac, batch) -> int:
+        """Dodaj ``PayrollBatchResult`` (vektorizirani obračun) bez PayrollResult objekata."""
+        count = 0
+        for count, stavka in enumerate(self.stavke_from_batch(
+                batch, *obrazac.period, start=len(obrazac.stavke) + 1), 1):
+            obrazac.add_stavka(stavka)
+        return count
+
+    @staticmethod
+    def stavke_from_payroll(payroll_results: Iterable, year: int, month: int,
+                            start: int = 1) -> Iterator[JOPPDStavka]:
+        """PayrollResult → JOPPDStavka (generator)."""
+        for i, pr in enumerate(payroll_results, start):
+            yield JOPPDStavka(
                 redni_broj=i,
-                oib_primatelja=getattr(pr, "oib", "") if hasattr(pr, "oib") else "",
+                oib_primatelja=getattr(pr, "oib", ""),
                 ime_prezime=pr.employee_name,
                 bruto=pr.bruto_placa,
                 mio_stup_1=pr.mio_stup_1,
@@ -141,74 +240,99 @@ class JOPPDGenerator:
                 datum_od=f"{year}-{month:02d}-01",
                 datum_do=f"{year}-{month:02d}-28",
             )
-            obrazac.stavke.append(stavka)
 
-        # Ukupni iznosi
-        obrazac.ukupno_bruto = round(sum(s.bruto for s in obrazac.stavke), 2)
-        obrazac.ukupno_mio_1 = round(sum(s.mio_stup_1 for s in obrazac.stavke), 2)
-        obrazac.ukupno_mio_2 = round(sum(s.mio_stup_2 for s in obrazac.stavke), 2)
-        obrazac.ukupno_porez = round(sum(s.porez for s in obrazac.stavke), 2)
-        obrazac.ukupno_prirez = round(sum(s.prirez for s in obrazac.stavke), 2)
-        obrazac.ukupno_neto = round(sum(s.neto for s in obrazac.stavke), 2)
-        obrazac.ukupno_zdravstveno = round(sum(s.zdravstveno for s in obrazac.stavke), 2)
+    @staticmethod
+    def stavke_from_batch(batch, year: int, month: int,
+                          start: int = 1) -> Iterator[JOPPDStavka]:
+        """Stupci PayrollBatchResult-a → JOPPDStavka (generator)."""
+        c = {k: v.tolist() for k, v in batch.columns.items()}
+        datum_od, datum_do = f"{year}-{month:02d}-01", f"{year}-{month:02d}-28"
+        for i in range(len(batch)):
+            yield JOPPDStavka(
+                redni_broj=start + i,
+                oib_primatelja=batch.oibs[i],
+                ime_prezime=batch.names[i],
+                bruto=c["bruto_placa"][i],
+                mio_stup_1=c["mio_stup_1"][i],
+                mio_stup_2=c["mio_stup_2"][i],
+                dohodak=c["dohodak"][i],
+                osobni_odbitak=c["osobni_odbitak"][i],
+                porezna_osnovica=c["porezna_osnovica"][i],
+                porez=c["porez"][i],
+                prirez=c["prirez"][i],
+                neto=c["neto_placa"][i],
+                olaksica_mladi_pct=c["olaksica_mladi_pct"][i],
+                olaksica_iznos=c["olaksica_iznos"][i],
+                zdravstveno=c["zdravstveno"][i],
+                datum_od=datum_od,
+                datum_do=datum_do,
+            )
 
-        self._generation_count += 1
-        return obrazac
+    def write_xml(self, obrazac: JOPPDObrazac, fh: IO[str],
+                  stavke: Optional[Iterable[JOPPDStavka]] = None) -> int:
+        """
+        Zapiši XML direktno u stream. Vraća broj stavki.
 
-    def to_xml(self, obrazac: JOPPDObrazac) -> str:
-        """Generiraj XML format za predaju na ePorezna."""
-        root = ET.Element("JOPPD")
-        root.set("xmlns", "http://e-porezna.porezna-uprava.hr/sheme/zahtjevi/JOPPD/v1.5")
+        Bez ``stavke`` piše se ``obrazac.stavke``. Uz ``stavke`` (npr.
+        generator ``stavke_from_batch``) stavke se ne drže u memoriji —
+        Ukupno (na kraju) zbraja se lokalno dok se pišu; obrazac se ne mijenja.
+        """
+        xw = StreamingXMLWriter(fh)
+        xw.declaration()
+        xw.start("JOPPD", {"xmlns": JOPPD_XMLNS})
 
         # Zaglavlje
-        zag = ET.SubElement(root, "Zaglavlje")
-        ET.SubElement(zag, "OznakaIzvjesca").text = obrazac.oznaka
-        ET.SubElement(zag, "VrstaIzvjesca").text = "1"  # 1 = Izvorni
-        ET.SubElement(zag, "DatumPodnosenja").text = obrazac.datum_predaje
-        ET.SubElement(zag, "DatumIsplate").text = obrazac.datum_isplate
-
-        podnositelj = ET.SubElement(zag, "Podnositelj")
-        ET.SubElement(podnositelj, "OIB").text = obrazac.oib_obveznika
-        ET.SubElement(podnositelj, "Naziv").text = obrazac.naziv_obveznika
+        xw.start("Zaglavlje")
+        xw.element("OznakaIzvjesca", obrazac.oznaka)
+        xw.element("VrstaIzvjesca", "1")  # 1 = Izvorni
+        xw.element("DatumPodnosenja", obrazac.datum_predaje)
+        xw.element("DatumIsplate", obrazac.datum_isplate)
+        xw.start("Podnositelj")
+        xw.element("OIB", obrazac.oib_obveznika)
+        xw.element("Naziv", obrazac.naziv_obveznika)
+        xw.end("Podnositelj")
+        xw.end("Zaglavlje")
 
         # Stavke (Stranica B)
-        stranica_b = ET.SubElement(root, "StranicaB")
-        for s in obrazac.stavke:
-            st = ET.SubElement(stranica_b, "Stavka")
-            ET.SubElement(st, "RedniBroj").text = str(s.redni_broj)
-            ET.SubElement(st, "OIBStjecatelja").text = s.oib_primatelja
-            ET.SubElement(st, "ImePrezime").text = s.ime_prezime
-            ET.SubElement(st, "OznakaStjecatelja").text = s.oznaka_stjecatelja
-            ET.SubElement(st, "OznakaPrimitka").text = s.oznaka_primitka
-            ET.SubElement(st, "BrutoIznos").text = f"{s.bruto:.2f}"
-            ET.SubElement(st, "MIO1").text = f"{s.mio_stup_1:.2f}"
-            ET.SubElement(st, "MIO2").text = f"{s.mio_stup_2:.2f}"
-            ET.SubElement(st, "Dohodak").text = f"{s.dohodak:.2f}"
-            ET.SubElement(st, "OsobniOdbitak").text = f"{s.osobni_odbitak:.2f}"
-            ET.SubElement(st, "PoreznaOsnovica").text = f"{s.porezna_osnovica:.2f}"
-            ET.SubElement(st, "Porez").text = f"{s.porez:.2f}"
-            ET.SubElement(st, "Prirez").text = f"{s.prirez:.2f}"
-            ET.SubElement(st, "Neto").text = f"{s.neto:.2f}"
-            ET.SubElement(st, "Zdravstveno").text = f"{s.zdravstveno:.2f}"
-            ET.SubElement(st, "DatumOd").text = s.datum_od
-            ET.SubElement(st, "DatumDo").text = s.datum_do
-
+        streaming = stavke is not None
+        totals = JOPPDObrazac() if streaming else obrazac
+        count = 0
+        xw.start("StranicaB")
+        for count, s in enumerate(stavke if streaming else obrazac.stavke, 1):
+            if streaming:
+                if not s.redni_broj:
+                    s.redni_broj = count
+                totals.add_to_totals(s)
+            xw.start("Stavka")
+            for tag, getter in STAVKA_XML_FIELDS:
+                xw.element(tag, getter(s))
             if s.olaksica_mladi_pct > 0:
-                ET.SubElement(st, "OlaksicaMladi").text = f"{s.olaksica_iznos:.2f}"
+                xw.element("OlaksicaMladi", f"{s.olaksica_iznos:.2f}")
+            xw.end("Stavka")
+        xw.end("StranicaB")
 
         # Ukupno
-        ukupno = ET.SubElement(root, "Ukupno")
-        ET.SubElement(ukupno, "UkupnoBruto").text = f"{obrazac.ukupno_bruto:.2f}"
-        ET.SubElement(ukupno, "UkupnoMIO1").text = f"{obrazac.ukupno_mio_1:.2f}"
-        ET.SubElement(ukupno, "UkupnoMIO2").text = f"{obrazac.ukupno_mio_2:.2f}"
-        ET.SubElement(ukupno, "UkupnoPorez").text = f"{obrazac.ukupno_porez:.2f}"
-        ET.SubElement(ukupno, "UkupnoPrirez").text = f"{obrazac.ukupno_prirez:.2f}"
-        ET.SubElement(ukupno, "UkupnoNeto").text = f"{obrazac.ukupno_neto:.2f}"
-        ET.SubElement(ukupno, "UkupnoZdravstveno").text = f"{obrazac.ukupno_zdravstveno:.2f}"
-
-        return minidom.parseString(
-            ET.tostring(root, encoding="unicode")
-        ).toprettyxml(indent="  ")
+        xw.start("Ukupno")
+        for tag, attr in UKUPNO_XML_FIELDS:
+            xw.element(tag, f"{getattr(totals, attr):.2f}")
+        xw.end("Ukupno")
+        xw.close()
+        return count
+
+    def to_xml(self, obrazac: JOPPDObrazac) -> str:
+        """Generiraj XML format za predaju na ePorezna."""
+        buf = io.StringIO()
+        self.write_xml(obrazac, buf)
+        return buf.getvalue()
+
+    def export_xml(self, obrazac: JOPPDObrazac, path: str,
+                   stavke: Optional[Iterable[JOPPDStavka]] = None,
+                   compress: bool = False) -> Dict[str, Any]:
+        """Streaming izvoz XML-a u datoteku (opcionalno gzip)."""
+        out = export_path(Path(path), compress)
+        with open_export(out, compress) as fh:
+            count = self.write_xml(obrazac, fh, stavke)
+        return {"file": str(out), "records": count, "size_bytes": out.stat().st_size}
 
     def to_dict(self, obrazac: JOPPDObrazac) -> Dict[str, Any]:
         """Pretvori u dict za pregled/API."""
@@ -88,8 +88,11 @@ class MultilateralniObracun:
     """Multilateralna kompenzacija (3+ stranke)."""
     sudionici: List[Dict] = field(default_factory=list)
     # [{oib, naziv, duguje_kome: [{oib, iznos}], potrazuje_od: [{oib, iznos}]}]
-    ukupno_kompenzirano: float = 0.0
-    lanac: List[Dict] = field(default_factory=list)
+    ukupno_kompenzirano: float = 0.0   # Σ iznosa ciklusa
+    lanac: List[Dict] = field(default_factory=list)   # zatvoreno po dugu
+    ciklusi: List[Dict] = field(default_factory=list)
+    ukupno_zatvoreno: float = 0.0      # Σ zatvorenih obveza (iznos × duljina ciklusa)
+    optimalno: bool = True
 
 
 class KompenzacijeEngine:
@@ -192,68 +195,50 @@ class KompenzacijeEngine:
 
         return izjava
 
-    def find_multilateral(self, stavke_po_tvrtki: Dict[str, List[OtvorenaStavka]]
-                          ) -> Optional[MultilateralniObracun]:
+    def find_multilateral(self, stavke_po_tvrtki: Dict[str, List[OtvorenaStavka]],
+                          time_budget_s: float = 30.0) -> Optional[MultilateralniObracun]:
         """
-        Pronađi multilateralni kompenzacijski lanac (3+ stranke).
+        Optimalna multilateralna kompenzacija nad cijelim grafom dugova.
 
         stavke_po_tvrtki: {oib_tvrtke: [OtvorenaStavka, ...]}
-        Traži ciklus: A→B→C→A gdje svaki duguje sljedećem.
+        Vraća sve cikluse (A→B→…→A) s iznosima tako da je ukupno zatvorena
+        obveza maksimalna — vidi ``multilateral.solve_multilateral``.
         """
-        # Build adjacency: who owes whom
-        graph: Dict[str, Dict[str, float]] = {}
+        from nyx_light.modules.kompenzacije.multilateral import solve_multilateral
 
+        # Tko duguje kome, u centima
+        debts: Dict[Tuple[str, str], int] = {}
         for tvrtka_oib, stavke in stavke_po_tvrtki.items():
             for s in stavke:
                 if s.tip == "dugovanje" and s.preostalo > 0:
-                    if tvrtka_oib not in graph:
-                        graph[tvrtka_oib] = {}
-                    partner = s.partner_oib
-                    graph[tvrtka_oib][partner] = graph[tvrtka_oib].get(partner, 0) + s.preostalo
-
-        # Simple cycle detection (max 3-5 nodes)
-        for start in graph:
-            path = [start]
-            visited = {start}
-            if self._find_cycle(graph, start, start, path, visited, max_depth=5):
-                # Calculate minimum along cycle
-                min_amount = float("inf")
-                for i in range(len(path) - 1):
-                    a, b = path[i], path[i + 1]
-                    min_amount = min(min_amount, graph.get(a, {}).get(b, 0))
-
-                if min_amount > 0:
-                    lanac = []
-                    for i in range(len(path) - 1):
-                        lanac.append({
-                            "od": path[i],
-                            "prema": path[i + 1],
-                            "iznos": round(min_amount, 2),
-                        })
-                    return MultilateralniObracun(
-                        sudionici=[{"oib": p} for p in path[:-1]],
-                        ukupno_kompenzirano=round(min_amount, 2),
-                        lanac=lanac,
-                    )
-
-        return None
-
-    def _find_cycle(self, graph, current, target, path, visited, max_depth):
-        """DFS cycle detection."""
-        if len(path) > max_depth:
-            return False
-        for neighbor in graph.get(current, {}):
-            if neighbor == target and len(path) > 2:
-                path.append(target)
-                return True
-            if neighbor not in visited:
-                visited.add(neighbor)
-                path.append(neighbor)
-                if self._find_cycle(graph, neighbor, target, path, visited, max_depth):
-                    return True
-                path.pop()
-                visited.discard(neighbor)
-        return False
+                    key = (tvrtka_oib, s.partner_oib)
+                    debts[key] = debts.get(key, 0) + int(
+                        (_d(s.preostalo) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+        rez = solve_multilateral(debts, time_budget_s=time_budget_s)
+        if not rez["ciklusi"]:
+            return None
+
+        ciklusi = [{
+            "sudionici": c["sudionici"],
+            "iznos": c["iznos_c"] / 100,
+            "vrsta": "bilateralna" if len(c["sudionici"]) == 2 else "multilateralna",
+        } for c in rez["ciklusi"]]
+        lanac = [{"od": a, "prema": b, "iznos": f / 100}
+                 for (a, b), f in rez["zatvoreno"].items()]
+        oibs = sorted({oib for c in ciklusi for oib in c["sudionici"]})
+        ukupno = sum(c["iznos_c"] for c in rez["ciklusi"]) / 100
+
+        self._stats["multilateralne"] += 1
+        self._stats["total_kompenzirano"] += rez["zatvoreno_c"] / 100
+        return MultilateralniObracun(
+            sudionici=[{"oib": oib} for oib in oibs],
+            ukupno_kompenzirano=ukupno,
+            lanac=lanac,
+            ciklusi=ciklusi,
+            ukupno_zatvoreno=rez["zatvoreno_c"] / 100,
+            optimalno=rez["optimalno"],
+        )
 
     def generate_knjizenje(self, izjava: KompenzacijaIzjava) -> List[Dict]:
         """Generiraj knjiženja za kompenzaciju."""
@@ -0,0 +1,355 @@
+"""
+Nyx Light — Optimalna multilateralna kompenzacija (cijeli graf dugova)
+
+Dugovi između tvrtki su usmjereni graf (dužnik → vjerovnik, iznos u
+centima). Kompenzacija smije zatvoriti samo dugove koji čine zatvorene
+krugove, tj. cirkulaciju f (0 ≤ f ≤ dug, u svaki čvor ulazi koliko i
+izlazi) — neto pozicija svakog sudionika se ne mijenja. Cilj je
+maksimalna ukupno zatvorena obveza Σ f.
+
+  1. SCC dekompozicija (Tarjan, iterativno) — dug između dvije različite
+     komponente ne leži ni na jednom ciklusu i odmah otpada
+  2. Pohlepno poništavanje ciklusa (DFS s current-arc pokazivačima) —
+     brzo, nakon njega preostali graf je aciklički
+  3. Min-cost tok (primal-dual: Dijkstra s potencijalima + Dinic) —
+     egzaktni optimum; pohlepni tok ostaje kao rezerva ako istekne
+     vremenski budžet
+  4. Dekompozicija optimalne cirkulacije u cikluse s iznosima
+
+Svi iznosi su cijeli centi (int) — nema float drifta u zbrojevima.
+
+Korištenje:
+    rez = solve_multilateral({("A", "B"): 100000, ("B", "C"): 150000, ("C", "A"): 200000})
+    rez["ciklusi"]  → [{"sudionici": ["A", "B", "C"], "iznos_c": 100000}]
+"""
+
+import logging
+import time
+import heapq
+from collections import deque
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger("nyx_light.modules.kompenzacije.multilateral")
+
+Debts = Mapping[Tuple[str, str], int]
+
+
+# ════════════════════════════════════════════════════════
+# SCC (Tarjan, bez rekurzije)
+# ════════════════════════════════════════════════════════
+
+def strongly_connected_components(n: int, adj: Sequence[Sequence[int]]) -> List[List[int]]:
+    """Jako povezane komponente grafa (čvorovi 0..n-1, adj = lista susjeda)."""
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    comps: List[List[int]] = []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            v, i = work[-1]
+            if i == 0:
+                index[v] = low[v] = counter
+                counter += 1
+                stack.append(v)
+                on_stack[v] = True
+            if i < len(adj[v]):
+                work[-1] = (v, i + 1)
+                w = adj[v][i]
+                if index[w] == -1:
+                    work.append((w, 0))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+            work.pop()
+            if work:
+                u = work[-1][0]
+                if low[v] < low[u]:
+                    low[u] = low[v]
+            if low[v] == index[v]:
+                comp = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp.append(w)
+                    if w == v:
+                        break
+                comps.append(comp)
+    return comps
+
+
+# ════════════════════════════════════════════════════════
+# Cirkulacija unutar jedne komponente
+# ════════════════════════════════════════════════════════
+
+class _Component:
+    """Rezidualni graf jedne SCC: bridovi tail→head s kapacitetom i tokom."""
+
+    def __init__(self, n: int, tail: List[int], head: List[int], cap: List[int]):
+        self.n = n
+        self.tail, self.head, self.cap = tail, head, cap
+        self.flow = [0] * len(cap)
+        self.out: List[List[int]] = [[] for _ in range(n)]
+        for e, t in enumerate(tail):
+            self.out[t].append(e)
+
+    def cancel_cycles(self, cap: Optional[List[int]] = None) -> List[Tuple[List[int], int]]:
+        """
+        Pohlepno poništi cikluse dok graf (cap − flow > 0) ne postane acikličan.
+
+        Vraća [(bridovi ciklusa, iznos)]. S ``cap=self.flow`` i praznim
+        tokom ovo je dekompozicija cirkulacije u cikluse.
+        """
+        cap = cap if cap is not None else self.cap
+        flow = self.flow if cap is self.cap else [0] * len(cap)
+        head, tail, out = self.head, self.tail, self.out
+        ptr = [0] * self.n
+        state = [0] * self.n   # 0 neposjećen, 1 na stogu, 2 gotov (nema ciklusa kroz njega)
+        pos = [0] * self.n
+        cycles: List[Tuple[List[int], int]] = []
+
+        for s in range(self.n):
+            if state[s]:
+                continue
+            nodes, edges = [s], []
+            state[s], pos[s] = 1, 0
+            while nodes:
+                v = nodes[-1]
+                ov, p = out[v], ptr[v]
+                while p < len(ov) and (flow[ov[p]] >= cap[ov[p]] or state[head[ov[p]]] == 2):
+                    p += 1
+                ptr[v] = p
+                if p == len(ov):
+                    state[v] = 2
+                    nodes.pop()
+                    if edges:
+                        edges.pop()
+                    continue
+                e = ov[p]
+                w = head[e]
+                if state[w] == 1:
+                    cyc = edges[pos[w]:] + [e]
+                    amt = min(cap[x] - flow[x] for x in cyc)
+                    for x in cyc:
+                        flow[x] += amt
+                    cycles.append((cyc, amt))
+                    # Vrati stog do repa prvog zasićenog brida
+                    k = next(i for i, x in enumerate(cyc) if flow[x] >= cap[x])
+                    keep = pos[w] + k
+                    for u in nodes[keep + 1:]:
+                        state[u] = 0
+                    del nodes[keep + 1:]
+                    del edges[keep:]
+                else:
+                    state[w], pos[w] = 1, len(nodes)
+                    nodes.append(w)
+                    edges.append(e)
+        return cycles
+
+    def optimize(self, deadline: float) -> bool:
+        """
+        Maksimalna cirkulacija kao min-cost tok (primal-dual).
+
+        Kreće od f = dug na svim bridovima; višak/manjak u čvorovima vraća
+        se unatrag po rezidualnim lukovima cijene +1 (smanjenje kompenzacije),
+        pa je najjeftinije vraćanje upravo najveća cirkulacija. Dijkstra s
+        potencijalima + Dinic blokirajući tok na lukovima reducirane cijene 0.
+        Ako istekne vrijeme, zadržava se pohlepni tok i vraća False.
+        """
+        n, m = self.n, len(self.cap)
+        src, snk = n, n + 1
+        size = n + 2
+        to: List[int] = []
+        rcap: List[int] = []
+        cost: List[int] = []
+        adj: List[List[int]] = [[] for _ in range(size)]
+
+        def arc(u: int, v: int, c: int, w: int) -> None:
+            adj[u].append(len(to))
+            to.append(v); rcap.append(c); cost.append(w)
+            adj[v].append(len(to))
+            to.append(u); rcap.append(0); cost.append(-w)
+
+        excess = [0] * n
+        for e in range(m):
+            a, b, c = self.tail[e], self.head[e], self.cap[e]
+            arc(b, a, c, 1)            # luk 2e: smanjenje toka na e (cijena +1)
+            excess[b] += c
+            excess[a] -= c
+        for v, x in enumerate(excess):
+            if x > 0:
+                arc(src, v, x, 0)
+            elif x < 0:
+                arc(v, snk, -x, 0)
+
+        pi = [0] * size
+        inf = float("inf")
+        while True:
+            if time.perf_counter() > deadline:
+                return False
+            # Dijkstra po reduciranim cijenama
+            dist = [inf] * size
+            dist[src] = 0
+            heap = [(0, src)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                pu = pi[u]
+                for x in adj[u]:
+                    if rcap[x] > 0:
+                        v = to[x]
+                        nd = d + cost[x] + pu - pi[v]
+                        if nd < dist[v]:
+                            dist[v] = nd
+                            heapq.heappush(heap, (nd, v))
+            if dist[snk] == inf:
+                break
+            for v in range(size):
+                pi[v] += dist[v] if dist[v] < dist[snk] else dist[snk]
+            # Dinic nad lukovima reducirane cijene 0
+            while True:
+                level = [-1] * size
+                level[src] = 0
+                q = deque([src])
+                while q:
+                    u = q.popleft()
+                    for x in adj[u]:
+                        v = to[x]
+                        if rcap[x] > 0 and level[v] < 0 and cost[x] + pi[u] - pi[v] == 0:
+                            level[v] = level[u] + 1
+                            q.append(v)
+                if level[snk] < 0:
+                    break
+                ptr = [0] * size
+                path: List[int] = []
+                u = src
+                while True:
+                    if u == snk:
+                        amt = min(rcap[x] for x in path)
+                        cut = len(path)
+                        for i, x in enumerate(path):
+                            rcap[x] -= amt
+                            rcap[x ^ 1] += amt
+                            if rcap[x] == 0 and i < cut:
+                                cut = i
+                        del path[cut:]
+                        u = to[path[-1]] if path else src
+                        continue
+                    au, p = adj[u], ptr[u]
+                    while p < len(au):
+                        x = au[p]
+                        v = to[x]
+                        if rcap[x] > 0 and level[v] == level[u] + 1 and cost[x] + pi[u] - pi[v] == 0:
+                            break
+                        p += 1
+                    ptr[u] = p
+                    if p == len(au):
+                        if u == src:
+                            break
+                        level[u] = -1
+                        path.pop()
+                        u = to[path[-1]] if path else src
+                        continue
+                    path.append(au[p])
+                    u = to[au[p]]
+                if time.perf_counter() > deadline:
+                    return False
+
+        for e in range(m):
+            self.flow[e] = rcap[2 * e]
+        return True
+
+
+# ════════════════════════════════════════════════════════
+# Javno sučelje
+# ════════════════════════════════════════════════════════
+
+def solve_multilateral(debts: Debts, time_budget_s: float = 30.0) -> Dict[str, Any]:
+    """
+    Optimalna multilateralna kompenzacija nad cijelim grafom dugova.
+
+    debts: {(dužnik, vjerovnik): iznos u centima}
+    Vraća cikluse, zatvoreni iznos po bridu, preostale dugove i statistiku.
+    ``optimalno`` je False samo ako je istekao ``time_budget_s``
+    (rezultat je tada valjana, ali možda ne maksimalna kompenzacija).
+    """
+    t0 = time.perf_counter()
+    deadline = t0 + time_budget_s
+    names: List[str] = []
+    ids: Dict[str, int] = {}
+    agg: Dict[Tuple[int, int], int] = {}
+    for (a, b), c in debts.items():
+        if a == b or c <= 0:
+            continue
+        for x in (a, b):
+            if x not in ids:
+                ids[x] = len(names)
+                names.append(x)
+        key = (ids[a], ids[b])
+        agg[key] = agg.get(key, 0) + int(c)
+
+    n = len(names)
+    adj: List[List[int]] = [[] for _ in range(n)]
+    for a, b in agg:
+        adj[a].append(b)
+    comps = strongly_connected_components(n, adj)
+    comp_of = [0] * n
+    for ci, comp in enumerate(comps):
+        for v in comp:
+            comp_of[v] = ci
+
+    # Bridovi unutar iste komponente; ostali ne leže ni na jednom ciklusu
+    local = [0] * n
+    for comp in comps:
+        for i, v in enumerate(comp):
+            local[v] = i
+    comp_edges: Dict[int, Tuple[List[int], List[int], List[int]]] = {}
+    for (a, b), c in agg.items():
+        if comp_of[a] == comp_of[b]:
+            t, h, cp = comp_edges.setdefault(comp_of[a], ([], [], []))
+            t.append(local[a])
+            h.append(local[b])
+            cp.append(c)
+
+    cycles: List[Dict[str, Any]] = []
+    settled: Dict[Tuple[int, int], int] = {}
+    optimal = True
+    for ci, (tail, head, cap) in comp_edges.items():
+        comp = comps[ci]
+        g = _Component(len(comp), tail, head, cap)
+        g.cancel_cycles()
+        optimal &= g.optimize(deadline)
+        for cyc, amt in g.cancel_cycles(cap=list(g.flow)):
+            cycles.append({
+                "sudionici": [names[comp[tail[e]]] for e in cyc],
+                "iznos_c": amt,
+            })
+        for e, f in enumerate(g.flow):
+            if f:
+                settled[(comp[tail[e]], comp[head[e]])] = f
+
+    total_debt = sum(agg.values())
+    closed = sum(settled.values())
+    cycles.sort(key=lambda c: c["iznos_c"] * len(c["sudionici"]), reverse=True)
+    return {
+        "ciklusi": cycles,
+        "zatvoreno": {(names[a], names[b]): f for (a, b), f in settled.items()},
+        "preostalo": {(names[a], names[b]): c - settled.get((a, b), 0)
+                      for (a, b), c in agg.items() if c - settled.get((a, b), 0) > 0},
+        "ukupni_dug_c": total_debt,
+        "zatvoreno_c": closed,
+        "optimalno": optimal,
+        "stats": {
+            "sudionika": n,
+            "dugova": len(agg),
+            "komponenti": len(comp_edges),
+            "ciklusa": len(cycles),
+            "udio_zatvorenog": round(closed / total_debt, 4) if total_debt else 0.0,
+            "sekunde": round(time.perf_counter() - t0, 3),
+        },
+    }
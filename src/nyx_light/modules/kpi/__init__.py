@@ -8,7 +8,9 @@ Izračun ključnih financijskih pokazatelja za klijente:
 - Aktivnost (koeficijent obrtaja)
 - Cashflow indikatori
 
-Podaci se izvlače iz bilance (BIL) i RDG-a klijenta.
+Podaci se izvlače iz bilance (BIL) i RDG-a klijenta. Za sve klijente i
+periode odjednom (trend dashboardi) FinancialData se izvodi iz knjiženja
+u ``engine.KPIEngine`` (NumPy, cache zatvorenih perioda).
 """
 
 from decimal import Decimal, ROUND_HALF_UP
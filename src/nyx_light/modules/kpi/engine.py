@@ -0,0 +1,318 @@
+"""
+Nyx Light — KPI engine: pokazatelji za sve klijente i periode iz knjiženja
+
+KPIDashboard.calculate_all računa jedan ručno složeni FinancialData. Za
+trend dashboarde (svi klijenti × 5 godina) KPIEngine:
+
+  1. Jednim upitom čita promet po (klijent, razred datuma, grupa konta) —
+     razredi su omeđeni granicama traženih perioda
+     (SQLiteStorage.aggregate_konto_flows)
+  2. Grupe konta preslikava u polja FinancialData matricom predznaka i
+     slaže polje klijent × razred × polje; kumulativni zbroj po razredima
+     daje stanja bilance i promet RDG-a za svaki period
+  3. Sve pokazatelje računa NumPy operacijama nad cijelim poljem — iste
+     formule kao KPIDashboard (zaokruživanje tek pri izlazu, kao round())
+  4. Zatvorene periode sprema u report_cache (kind "kpi"); svako knjiženje
+     datirano do kraja perioda poništava snapshot (triggeri na bookings)
+
+Periodi: "2025" (godina), "2025-Q2", "2025-03". Bilanca je stanje na kraj
+perioda, RDG je promet u periodu. Kapital uključuje rezultat tekuće godine
+do kraja perioda (prije zaključnih knjiženja). Konta po kontnom planu
+modula kontiranje (razred 1 kratkotrajna imovina, 3/4 obveze, 5/7 rashodi,
+6 prihodi).
+
+Korištenje:
+    engine = KPIEngine()
+    snap = engine.snapshots(storage, ["2024", "2025"])   # {(klijent, period): {...}}
+    engine.trend(storage, ["2021", "2022", "2023", "2024", "2025"], ["K001"])
+"""
+
+import logging
+from dataclasses import fields
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from nyx_light.modules.kpi import FinancialData, FinancijskiKPI
+
+logger = logging.getLogger("nyx_light.modules.kpi.engine")
+
+CACHE_KIND = "kpi"
+
+# Polja FinancialData iz grupa konta: (prefiks, predznak); +1 = dugovni
+# saldo (D − P), −1 = potražni saldo (P − D)
+STANJA: Dict[str, Tuple[Tuple[str, int], ...]] = {
+    "kratkotrajna_imovina": (("1", 1),),
+    "zalihe": (("10", 1), ("11", 1)),
+    "novac_i_ekvivalenti": (("14", 1), ("15", 1)),
+    "potraživanja": (("12", 1),),
+    "ukupna_aktiva": (("0", 1), ("1", 1)),
+    "kratkorocne_obveze": (("4", -1),),
+    "dugorocne_obveze": (("3", -1),),
+    "kapital": (("2", -1),),
+}
+TOKOVI: Dict[str, Tuple[Tuple[str, int], ...]] = {
+    "prihodi": (("6", -1),),
+    "rashodi": (("5", 1), ("7", 1)),
+    "troskovi_kamata": (("761", 1),),
+    "amortizacija": (("53", 1), ("73", 1)),
+    "porez_na_dobit": (("83", 1),),
+}
+_POLJA = list(STANJA) + list(TOKOVI)
+
+# Pokazatelji po redu izlaza (ključevi kao u KPIDashboard.calculate_all)
+KPI_KEYS = [
+    "tekuca_likvidnost", "ubrzana_likvidnost", "gotovinska_likvidnost",
+    "roa_pct", "roe_pct", "neto_profitna_marza_pct", "bruto_profitna_marza_pct",
+    "koef_zaduzenosti_pct", "omjer_duga_i_kapitala", "pokrice_kamata",
+    "obrtaj_ukupne_imovine", "dani_naplate_potrazivanja",
+    "ebitda", "ebitda_marza_pct", "score",
+]
+_ROUND_1 = {"dani_naplate_potrazivanja", "score"}
+
+
+def period_months(period: str) -> Tuple[int, int]:
+    """"2025" / "2025-Q2" / "2025-03" → (prvi, zadnji) mjesec kao godina·12 + mjesec − 1."""
+    if "-Q" in period:
+        year, q = period.split("-Q")
+        first = int(year) * 12 + (int(q) - 1) * 3
+        return first, first + 2
+    if "-" in period:
+        year, month = period.split("-")[:2]
+        m = int(year) * 12 + int(month) - 1
+        return m, m
+    return int(period) * 12, int(period) * 12 + 11
+
+
+def _month_start(idx: int) -> str:
+    return f"{idx // 12:04d}-{idx % 12 + 1:02d}-01"
+
+
+def _weights(grupe: Sequence[str]) -> np.ndarray:
+    """Matrica grupa konta × polje FinancialData (zbroj predznaka prefiksa koji pašu)."""
+    w = np.zeros((len(grupe), len(_POLJA)))
+    for j, polje in enumerate(_POLJA):
+        for prefiks, znak in {**STANJA, **TOKOVI}[polje]:
+            for i, g in enumerate(grupe):
+                if g.startswith(prefiks):
+                    w[i, j] += znak
+    return w
+
+
+def _safe(x: np.ndarray) -> np.ndarray:
+    """`x or 1` iz KPIDashboard, po elementima."""
+    return np.where(x == 0, 1.0, x)
+
+
+def compute_kpi(d: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Svi pokazatelji KPIDashboard.calculate_all nad stupcima FinancialData.
+
+    Vrijednosti nisu zaokružene; NaN znači "nije primjenjivo" (None u
+    calculate_all — pokriće kamata bez kamata, dani naplate bez prihoda).
+    """
+    kr_obveze = _safe(d["kratkorocne_obveze"])
+    aktiva = _safe(d["ukupna_aktiva"])
+    kapital = _safe(d["kapital"])
+    prihodi = _safe(d["prihodi"])
+    kamata = d["troskovi_kamata"]
+    neto = d["neto_dobit"]
+    dobit = d["dobit_prije_oporezivanja"]
+    ebitda = dobit + kamata + d["amortizacija"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = {
+            "tekuca_likvidnost": d["kratkotrajna_imovina"] / kr_obveze,
+            "ubrzana_likvidnost": (d["kratkotrajna_imovina"] - d["zalihe"]) / kr_obveze,
+            "gotovinska_likvidnost": d["novac_i_ekvivalenti"] / kr_obveze,
+            "roa_pct": neto / aktiva * 100,
+            "roe_pct": neto / kapital * 100,
+            "neto_profitna_marza_pct": neto / prihodi * 100,
+            "bruto_profitna_marza_pct": dobit / prihodi * 100,
+            "koef_zaduzenosti_pct": d["ukupne_obveze"] / aktiva * 100,
+            "omjer_duga_i_kapitala": d["ukupne_obveze"] / kapital,
+            "pokrice_kamata": np.where(kamata > 0, dobit / _safe(kamata), np.nan),
+            "obrtaj_ukupne_imovine": d["prihodi"] / aktiva,
+            "dani_naplate_potrazivanja": np.where(
+                d["prihodi"] > 0, _safe(d["potraživanja"]) / (d["prihodi"] / 365), np.nan),
+            "ebitda": ebitda,
+            "ebitda_marza_pct": ebitda / prihodi * 100,
+        }
+
+    # Ocjena financijskog zdravlja (KPIDashboard._health_score)
+    tekuca = out["tekuca_likvidnost"]
+    score = np.full(tekuca.shape, 5.0)
+    score += np.select([tekuca >= 2.0, tekuca >= 1.5, tekuca < 1.0], [1.0, 0.5, -1.5], 0.0)
+    score += np.select([neto > 0, neto < 0], [1.0, -2.0], 0.0)
+    zaduz = d["ukupne_obveze"] / aktiva
+    score += np.select([zaduz < 0.4, zaduz > 0.7], [1.0, -1.5], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marza = np.where(d["prihodi"] > 0, neto / prihodi, 0.0)
+    pozitivno = (d["prihodi"] > 0) & (neto > 0)
+    score += np.where(pozitivno, np.select([marza > 0.10, marza > 0.05], [1.0, 0.5], 0.0), 0.0)
+    out["score"] = np.clip(np.round(score, 1), 1.0, 10.0)
+    return out
+
+
+def _status(score: float) -> str:
+    if score >= 8:
+        return "Odlično"
+    if score >= 6:
+        return "Dobro"
+    if score >= 4:
+        return "Prosječno"
+    return "Rizično"
+
+
+class KPIEngine:
+    """KPI za mnogo (klijent, period) parova odjednom, iz odobrenih knjiženja."""
+
+    def __init__(self):
+        self._stats = {"computed": 0, "cache_hits": 0, "queries": 0}
+
+    # ── Izračun ──
+
+    def financial_data(self, storage, periods: Sequence[str],
+                       client_ids: Optional[Sequence[str]] = None
+                       ) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """
+        Stupci FinancialData za sve klijente × periode.
+
+        Vraća (klijenti, {polje: polje oblika klijenti × periodi}) — klijenti
+        su zadani client_ids ili svi s knjiženjima do kraja zadnjeg perioda.
+        """
+        bounds = [period_months(p) for p in periods]
+        # Granice razreda datuma: 1.1. godine perioda, početak i kraj perioda
+        granice = sorted({_month_start(m) for f, l in bounds
+                          for m in (f // 12 * 12, f, l + 1)})
+        g_pos = {g: i for i, g in enumerate(granice)}
+        rows = storage.aggregate_konto_flows(
+            granice, list(client_ids) if client_ids is not None else None)
+        self._stats["queries"] += 1
+
+        clients = list(client_ids) if client_ids is not None else sorted({r[0] for r in rows})
+        c_idx = {c: i for i, c in enumerate(clients)}
+        n_c, n_b = len(clients), len(granice)
+
+        if rows:
+            cid, razred, grupa, cents = zip(*rows)
+            grupe = sorted(set(grupa))
+            g_idx = {g: i for i, g in enumerate(grupe)}
+            ci = np.fromiter((c_idx[c] for c in cid), np.int64, len(rows))
+            gi = np.fromiter((g_idx[g] for g in grupa), np.int64, len(rows))
+            amount = np.asarray(cents, dtype=np.float64)
+            w = _weights(grupe)[gi]                          # redak × polje
+            flat = ci * n_b + np.asarray(razred, dtype=np.int64)
+            flows = np.stack([np.bincount(flat, weights=amount * w[:, j], minlength=n_c * n_b)
+                              for j in range(len(_POLJA))], axis=-1).reshape(n_c, n_b, len(_POLJA))
+        else:
+            flows = np.zeros((n_c, n_b, len(_POLJA)))
+        # cum[:, k + 1] = zbroj svega datiranog prije granice k
+        cum = np.concatenate([np.zeros((n_c, 1, len(_POLJA))), np.cumsum(flows, axis=1)], axis=1)
+
+        end = np.array([g_pos[_month_start(l + 1)] + 1 for _, l in bounds])
+        start = np.array([g_pos[_month_start(f)] + 1 for f, _ in bounds])
+        jan = np.array([g_pos[_month_start(f // 12 * 12)] + 1 for f, _ in bounds])
+        stanje = cum[:, end, :] / 100
+        promet = (cum[:, end, :] - cum[:, start, :]) / 100
+        ytd = (cum[:, end, :] - cum[:, jan, :]) / 100
+
+        d: Dict[str, np.ndarray] = {}
+        for j, polje in enumerate(_POLJA):
+            d[polje] = stanje[..., j] if polje in STANJA else promet[..., j]
+        d["ukupne_obveze"] = d["kratkorocne_obveze"] + d["dugorocne_obveze"]
+        d["dobit_prije_oporezivanja"] = d["prihodi"] - d["rashodi"]
+        d["neto_dobit"] = d["dobit_prije_oporezivanja"] - d["porez_na_dobit"]
+        j = {p: i for i, p in enumerate(_POLJA)}
+        rezultat_ytd = (ytd[..., j["prihodi"]] - ytd[..., j["rashodi"]]
+                        - ytd[..., j["porez_na_dobit"]])
+        d["kapital"] = d["kapital"] + rezultat_ytd
+        return clients, d
+
+    def compute(self, storage, periods: Sequence[str],
+                client_ids: Optional[Sequence[str]] = None) -> Dict[Tuple[str, str], Dict]:
+        """Snapshotovi bez cachea: {(client_id, period): snapshot}."""
+        periods = list(periods)
+        clients, d = self.financial_data(storage, periods, client_ids)
+        kpi = compute_kpi(d)
+        polja = [f.name for f in fields(FinancialData) if f.name in d]
+        podaci = np.stack([d[p] for p in polja], axis=-1).tolist()
+        vrijednosti = np.stack([kpi[k] for k in KPI_KEYS], axis=-1).tolist()
+
+        out: Dict[Tuple[str, str], Dict] = {}
+        for ci, client in enumerate(clients):
+            for pi, period in enumerate(periods):
+                row = vrijednosti[ci][pi]
+                k = {key: (None if v != v else round(v, 1 if key in _ROUND_1 else 2))
+                     for key, v in zip(KPI_KEYS, row)}
+                score = k.pop("score")
+                out[(client, period)] = {
+                    "client_id": client, "period": period,
+                    "podaci": {p: round(v, 2) for p, v in zip(polja, podaci[ci][pi])},
+                    "kpi": k,
+                    "ocjena": {"score": score, "status": _status(score), "max": 10},
+                }
+        self._stats["computed"] += len(out)
+        return out
+
+    # ── Cache ──
+
+    def snapshots(self, storage, periods: Sequence[str],
+                  client_ids: Optional[Sequence[str]] = None,
+                  use_cache: bool = True) -> Dict[Tuple[str, str], Dict]:
+        """
+        Snapshotovi s cacheom zatvorenih perioda.
+
+        Klijenti kojima nedostaje ijedan zatvoreni period (ili imaju otvoreni)
+        računaju se zajedno jednim upitom; zatvoreni periodi se spremaju.
+        """
+        periods = list(periods)
+        today = date.today().isoformat()
+        ends = {p: _month_start(period_months(p)[1] + 1) for p in periods}
+        closed = [p for p in periods if ends[p] <= today]
+        client_ids = list(client_ids) if client_ids is not None else storage.list_booking_clients()
+
+        cached: Dict[Tuple[str, str], Dict] = {}
+        if use_cache and closed:
+            cached = storage.get_cached_reports(CACHE_KIND, closed, client_ids)
+        open_periods = len(closed) < len(periods)
+        misses = [c for c in client_ids
+                  if open_periods or any((c, p) not in cached for p in closed)]
+        miss_set = set(misses)
+        self._stats["cache_hits"] += len(client_ids) - len(misses)
+
+        results = {k: v for k, v in cached.items() if k[0] not in miss_set}
+        if misses:
+            fresh = self.compute(storage, periods, misses)
+            results.update(fresh)
+            if use_cache:
+                storage.put_cached_reports(CACHE_KIND, [
+                    (c, p, "", ends[p], fresh[(c, p)]) for c in misses for p in closed
+                    if (c, p) not in cached])
+        return results
+
+    def trend(self, storage, periods: Sequence[str],
+              client_ids: Optional[Sequence[str]] = None,
+              use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Trend po klijentu: serije pokazatelja kroz periode + promjena (FinancijskiKPI.trend)."""
+        periods = list(periods)
+        snaps = self.snapshots(storage, periods, client_ids, use_cache)
+        clients = sorted({c for c, _ in snaps})
+        out = {}
+        for client in clients:
+            redovi = [snaps[(client, p)] for p in periods]
+            kpi = [{"period": r["period"], **r["kpi"], "score": r["ocjena"]["score"]}
+                   for r in redovi]
+            brojcani = [k for k in kpi[0] if k != "period"
+                        and all(isinstance(row[k], (int, float)) for row in kpi)]
+            out[client] = {
+                "periods": periods,
+                "kpi": {k: [row[k] for row in kpi] for k in kpi[0] if k != "period"},
+                "trend": FinancijskiKPI.trend([{k: row[k] for k in brojcani} for row in kpi])
+                if len(periods) >= 2 else {},
+            }
+        return out
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
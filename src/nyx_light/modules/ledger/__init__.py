@@ -251,7 +251,7 @@ class GeneralLedger:
             self._conn.commit()
         return self.book(storno_tx, user=user)
 
-    def trial_balance(self, datum_do: str = "") -> Dict[str, Any]:
+    def trial_balance(self, datum_do: str = "", client_id: str = "") -> Dict[str, Any]:
         saldos = {}
         total_d, total_p = ZERO, ZERO
         query = ("SELECT e.konto, e.strana, SUM(CAST(e.iznos AS REAL)) "
@@ -261,6 +261,9 @@ class GeneralLedger:
         if datum_do:
             query += " AND t.datum <= ?"
             params.append(datum_do)
+        if client_id:
+            query += " AND t.client_id = ?"
+            params.append(client_id)
         query += " GROUP BY e.konto, e.strana ORDER BY e.konto"
         for konto, strana, iznos in self._conn.execute(query, params):
             if konto not in saldos:
@@ -279,6 +282,23 @@ class GeneralLedger:
             "balanced": total_d == total_p, "difference": total_d - total_p,
         }
 
+    def trial_balances_by_client(self, datum_do: str = "") -> Dict[str, Dict[str, Decimal]]:
+        """Salda (duguje − potražuje) po kontu za sve klijente jednim upitom."""
+        query = ("SELECT t.client_id, e.konto, "
+                 "SUM(CASE WHEN e.strana = 'duguje' THEN CAST(e.iznos AS REAL) "
+                 "ELSE -CAST(e.iznos AS REAL) END) "
+                 "FROM ledger_entries e JOIN transactions t ON e.tx_id = t.tx_id "
+                 "WHERE t.status = 'proknjizeno'")
+        params: list = []
+        if datum_do:
+            query += " AND t.datum <= ?"
+            params.append(datum_do)
+        query += " GROUP BY t.client_id, e.konto ORDER BY t.client_id, e.konto"
+        out: Dict[str, Dict[str, Decimal]] = {}
+        for client_id, konto, saldo in self._conn.execute(query, params):
+            out.setdefault(client_id or "", {})[konto] = to_decimal(saldo)
+        return out
+
     def verify_integrity(self) -> Dict[str, Any]:
         issues = []
         total_d, total_p = ZERO, ZERO
@@ -4,6 +4,11 @@ Nyx Light — Modul A7: Osnovna sredstva i sitan inventar
 Evidencija dugotrajne imovine, automatski obračun amortizacije,
 praćenje korisnog vijeka i podsjetnici za inventuru.
 
+Sredstva se čuvaju u SQLite registru (``register.AssetRegister``), a
+plan amortizacije za sva sredstva odjednom računa ``schedule`` (NumPy):
+stanje na dan, projekcija do kraja godine i jedno skupno knjiženje
+mjeseca za pipeline.
+
 Prag za dugotrajna imovina: 665,00 EUR (čl. 12. Pravilnika o amortizaciji)
 """
 
@@ -54,14 +59,18 @@ class FixedAsset:
     konto_ispravak: str = "0290"
     inventurni_broj: str = ""
     lokacija: str = ""
+    client_id: str = ""
+    datum_rashoda: str = ""
 
 
 class OsnovnaSredstvaEngine:
     """Evidencija i amortizacija osnovnih sredstava."""
 
-    def __init__(self):
-        self._assets: Dict[str, FixedAsset] = {}
-        self._asset_count = 0
+    def __init__(self, db_path: str = ":memory:"):
+        from nyx_light.modules.osnovna_sredstva.register import AssetRegister
+        self.register = AssetRegister(db_path)
+        self._assets: Dict[str, FixedAsset] = {a.id: a for a in self.register.load()}
+        self._asset_count = self.register.count()
 
     def add_asset(self, asset_data: Dict) -> Dict[str, Any]:
         """Dodaj novo osnovno sredstvo u evidenciju."""
@@ -83,7 +92,7 @@ class OsnovnaSredstvaEngine:
         vrsta = asset_data.get("vrsta", "uredska_oprema")
         stopa_info = AMORTIZACIJSKE_STOPE.get(vrsta, {"vijek": 5, "stopa": 20.0})
 
-        asset_id = f"OS-{self._asset_count + 1:04d}"
+        asset_id = asset_data.get("id") or f"OS-{self._asset_count + 1:04d}"
         asset = FixedAsset(
             id=asset_id,
             naziv=asset_data.get("naziv", ""),
@@ -98,8 +107,10 @@ class OsnovnaSredstvaEngine:
             konto_imovina=self._get_konto_imovina(vrsta),
             inventurni_broj=asset_data.get("inventurni_broj", asset_id),
             lokacija=asset_data.get("lokacija", ""),
+            client_id=asset_data.get("client_id", ""),
         )
 
+        self.register.save(asset)
         self._assets[asset_id] = asset
         self._asset_count += 1
 
@@ -151,14 +162,16 @@ class OsnovnaSredstvaEngine:
 
     def apply_depreciation(self, amounts: List[Dict]):
         """Primijeni amortizaciju (nakon odobrenja)."""
+        changed = []
         for item in amounts:
             aid = item.get("asset_id")
             if aid in self._assets:
-                self._assets[aid].ukupna_amortizacija += item["mjesecna_amortizacija"]
-                self._assets[aid].sadasnja_vrijednost = round(
-                    self._assets[aid].nabavna_vrijednost -
-                    self._assets[aid].ukupna_amortizacija, 2
-                )
+                a = self._assets[aid]
+                a.ukupna_amortizacija += item["mjesecna_amortizacija"]
+                a.sadasnja_vrijednost = round(a.nabavna_vrijednost - a.ukupna_amortizacija, 2)
+                changed.append((aid, a.ukupna_amortizacija, a.sadasnja_vrijednost,
+                                a.potpuno_amortizirano))
+        self.register.update_depreciation(changed)
 
     def get_inventura_list(self) -> List[Dict]:
         """Generiraj inventurnu listu za godišnji popis."""
@@ -195,6 +208,154 @@ class OsnovnaSredstvaEngine:
                     })
         return results
 
+    def dispose_asset(self, asset_id: str, datum: str = "") -> Dict[str, Any]:
+        """Rashod sredstva — amortizacija prestaje nakon mjeseca rashoda."""
+        datum = datum or datetime.now().strftime("%Y-%m-%d")
+        if not self.register.dispose(asset_id, datum):
+            return {"error": f"Sredstvo {asset_id} ne postoji"}
+        if asset_id in self._assets:
+            self._assets[asset_id].rashod = True
+            self._assets[asset_id].datum_rashoda = datum
+        return {"status": "rashod", "id": asset_id, "datum_rashoda": datum}
+
+    # ── Plan amortizacije (vektorizirano, cijeli registar) ──
+
+    def schedule(self, client_id: Optional[str] = None, pro_rata: bool = True):
+        """DepreciationSchedule za sva sredstva klijenta (None = cijeli registar)."""
+        from nyx_light.modules.osnovna_sredstva.schedule import AssetTable, DepreciationSchedule
+        return DepreciationSchedule(
+            AssetTable.from_columns(self.register.columns(client_id), pro_rata=pro_rata))
+
+    def get_as_of(self, datum: str, client_id: Optional[str] = None) -> Dict[str, Any]:
+        """Stanje registra na kraju mjeseca zadanog datuma."""
+        rows = self.schedule(client_id).as_of_rows(datum)
+        return {
+            "datum": datum,
+            "nabavna_vrijednost": round(sum(r["nabavna_vrijednost"] for r in rows), 2),
+            "ispravak": round(sum(r["ispravak"] for r in rows), 2),
+            "sadasnja_vrijednost": round(sum(r["sadasnja_vrijednost"] for r in rows), 2),
+            "sredstva": rows,
+        }
+
+    def project_year_end(self, godina: int = 0,
+                         client_id: Optional[str] = None) -> Dict[str, Any]:
+        """Projekcija do 31.12. — godišnji zbroj i plan po mjesecima."""
+        godina = godina or date.today().year
+        plan = self.schedule(client_id)
+        result = plan.year_totals(godina)
+        result["po_mjesecima"] = plan.monthly_totals(f"{godina}-01", f"{godina}-12")
+        return result
+
+    def prepare_monthly_posting(self, period: str,
+                                client_id: Optional[str] = None) -> Dict[str, Any]:
+        """Amortizacija jednog mjeseca za sva sredstva — ulaz za skupni prijedlog.
+
+        Opseg je točno jedan klijent; klijent bez sredstava dobiva prazan
+        rezultat. Sredstva bez klijenta (jednoklijentski rad) su zaseban
+        opseg "" — samo kad client_id nije zadan.
+        """
+        from nyx_light.modules.osnovna_sredstva.schedule import month_index
+        scope = client_id or ""
+        plan = self.schedule(scope)
+        t = plan.table
+        iznosi = plan.amounts_c(period)
+        cum = plan.accumulated_c(period)
+        idx = iznosi.nonzero()[0]
+        stavke = [
+            {"asset_id": t.ids[i], "naziv": t.nazivi[i], "iznos": int(iznosi[i]) / 100,
+             "konto_ispravak": t.konto_ispravak[i], "ukupna_dosad": int(cum[i]) / 100,
+             "preostala_vrijednost": int(t.nabavna_c[i] - cum[i]) / 100}
+            for i in idx
+        ]
+        po_kontu: Dict[str, int] = {}
+        for i in idx:
+            po_kontu[t.konto_ispravak[i]] = po_kontu.get(t.konto_ispravak[i], 0) + int(iznosi[i])
+        posted = self.register.get_run(scope, period)
+        return {
+            "period": period,
+            "scope": scope,
+            "datum": self._last_day(month_index(period)),
+            "ukupno": int(iznosi.sum()) / 100,
+            "po_kontu": {k: v / 100 for k, v in sorted(po_kontu.items())},
+            "stavke": stavke,
+            "already_posted": posted is not None,
+            "proposal_id": posted["proposal_id"] if posted else "",
+        }
+
+    def mark_posted(self, posting: Dict[str, Any], client_id: str, proposal_id: str = ""):
+        """Zapiši skupno knjiženje mjeseca i ažuriraj ispravak po sredstvu.
+
+        Mjesec se bilježi pod opsegom posting["scope"]; ponovno knjiženje
+        istog opsega ili sredstva → ValueError.
+        """
+        scope = posting.get("scope", client_id)
+        self.register.record_run(scope, posting["period"], proposal_id, posting["stavke"])
+        self._apply_posting(posting["stavke"])
+
+    def reserve_posting(self, posting: Dict[str, Any], client_id: str, proposal_id: str):
+        """Rezerviraj mjesec za prijedlog na čekanju — ispravak se ne dira do odobrenja."""
+        scope = posting.get("scope", client_id)
+        self.register.record_run(scope, posting["period"], proposal_id, posting["stavke"],
+                                 status="pending")
+
+    def confirm_posting(self, proposal_id: str) -> bool:
+        """Odobren prijedlog → mjesec proknjižen, ispravak po sredstvu ažuriran."""
+        run = self.register.confirm_run(proposal_id)
+        if not run:
+            return False
+        posting = self.prepare_monthly_posting(run["period"], run["client_id"] or None)
+        self._apply_posting(posting["stavke"])
+        return True
+
+    def release_posting(self, proposal_id: str) -> bool:
+        """Odbijen prijedlog → rezervacija mjeseca se briše."""
+        return self.register.drop_run(proposal_id)
+
+    def _apply_posting(self, stavke: List[Dict[str, Any]]):
+        updates = []
+        for s in stavke:
+            updates.append((s["asset_id"], s["ukupna_dosad"], s["preostala_vrijednost"],
+                            s["preostala_vrijednost"] <= 0))
+            a = self._assets.get(s["asset_id"])
+            if a:
+                a.ukupna_amortizacija = s["ukupna_dosad"]
+                a.sadasnja_vrijednost = s["preostala_vrijednost"]
+                a.potpuno_amortizirano = s["preostala_vrijednost"] <= 0
+        self.register.update_depreciation(updates)
+
+    def calculate_depreciation(self, nabavna_vrijednost: float, skupina: str = "",
+                               datum_nabave: str = "", naziv: str = "") -> Dict[str, Any]:
+        """Plan amortizacije jednog sredstva po godinama (bez upisa u registar)."""
+        from nyx_light.modules.osnovna_sredstva.schedule import (
+            AssetTable, DepreciationSchedule, month_label,
+        )
+        stopa_info = AMORTIZACIJSKE_STOPE.get(skupina, {"vijek": 5, "stopa": 20.0})
+        datum = datum_nabave or datetime.now().strftime("%Y-%m-%d")
+        plan = DepreciationSchedule(AssetTable.from_columns({
+            "id": ["preview"], "naziv": [naziv],
+            "nabavna_vrijednost": [nabavna_vrijednost],
+            "godisnja_stopa": [stopa_info["stopa"]], "datum_aktivacije": [datum],
+        }))
+        start, end = int(plan.table.start[0]), int(plan.last_month()[0])
+        godine = [plan.year_totals(g) for g in range(start // 12, end // 12 + 1)] \
+            if nabavna_vrijednost > 0 else []
+        return {
+            "naziv": naziv,
+            "skupina": skupina,
+            "nabavna_vrijednost": nabavna_vrijednost,
+            "godisnja_stopa": stopa_info["stopa"],
+            "mjesecna_amortizacija": int(plan.table.mjesecna_c[0]) / 100,
+            "pocetak": month_label(start),
+            "potpuno_amortizirano": month_label(end),
+            "plan": [{"godina": g["godina"], "amortizacija": g["amortizacija"],
+                      "sadasnja_31_12": g["sadasnja_31_12"]} for g in godine],
+        }
+
+    @staticmethod
+    def _last_day(idx: int) -> str:
+        nxt = date(idx // 12 + (idx % 12 == 11), (idx + 1) % 12 + 1, 1)
+        return date.fromordinal(nxt.toordinal() - 1).isoformat()
+
     def _get_konto_imovina(self, vrsta: str) -> str:
         konto_map = {
             "građevinski_objekti": "0210",
@@ -0,0 +1,221 @@
+"""
+Nyx Light — Registar osnovnih sredstava (SQLite)
+
+Trajna evidencija dugotrajne imovine po klijentu i dnevnik mjesečnih
+knjiženja amortizacije:
+
+  - fixed_assets: jedno sredstvo po retku (polja FixedAsset + klijent)
+  - depreciation_runs: jedan red po (klijent, period) — sprječava
+    dvostruko knjiženje istog mjeseca; status "pending" dok prijedlog
+    čeka odobrenje, "posted" nakon odobrenja
+  - depreciation_postings: iznos po sredstvu za svaki proknjiženi mjesec
+"""
+
+import logging
+import sqlite3
+import threading
+from dataclasses import asdict, fields
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from nyx_light.modules.osnovna_sredstva import FixedAsset
+
+logger = logging.getLogger("nyx_light.modules.osnovna_sredstva.register")
+
+_ASSET_FIELDS = [f.name for f in fields(FixedAsset)]
+_BOOL_FIELDS = {"potpuno_amortizirano", "rashod"}
+
+
+class AssetRegister:
+    """SQLite registar osnovnih sredstava."""
+
+    def __init__(self, db_path: str = ":memory:"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if db_path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_db()
+
+    def _init_db(self):
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fixed_assets (
+                id TEXT PRIMARY KEY, client_id TEXT DEFAULT '',
+                naziv TEXT DEFAULT '', opis TEXT DEFAULT '', vrsta TEXT DEFAULT '',
+                nabavna_vrijednost REAL NOT NULL, datum_nabave TEXT DEFAULT '',
+                datum_aktivacije TEXT DEFAULT '', korisni_vijek_godina INTEGER DEFAULT 0,
+                godisnja_stopa REAL DEFAULT 0, metoda TEXT DEFAULT 'linearna',
+                ukupna_amortizacija REAL DEFAULT 0, sadasnja_vrijednost REAL DEFAULT 0,
+                potpuno_amortizirano INTEGER DEFAULT 0, rashod INTEGER DEFAULT 0,
+                datum_rashoda TEXT DEFAULT '',
+                konto_imovina TEXT DEFAULT '', konto_ispravak TEXT DEFAULT '0290',
+                inventurni_broj TEXT DEFAULT '', lokacija TEXT DEFAULT '',
+                created_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_fixed_assets_client ON fixed_assets(client_id);
+            CREATE TABLE IF NOT EXISTS depreciation_runs (
+                client_id TEXT NOT NULL, period TEXT NOT NULL,
+                proposal_id TEXT DEFAULT '', iznos REAL NOT NULL,
+                assets INTEGER NOT NULL, created_at TEXT,
+                status TEXT DEFAULT 'posted',
+                PRIMARY KEY (client_id, period)
+            );
+            CREATE TABLE IF NOT EXISTS depreciation_postings (
+                asset_id TEXT NOT NULL, period TEXT NOT NULL, iznos REAL NOT NULL,
+                PRIMARY KEY (asset_id, period)
+            );
+        """)
+        cols = {r[1] for r in self._conn.execute("PRAGMA table_info(depreciation_runs)")}
+        if "status" not in cols:
+            self._conn.execute(
+                "ALTER TABLE depreciation_runs ADD COLUMN status TEXT DEFAULT 'posted'")
+        self._conn.commit()
+
+    # ── Sredstva ──
+
+    def count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM fixed_assets").fetchone()[0]
+
+    def save(self, asset: FixedAsset):
+        row = asdict(asset)
+        cols = _ASSET_FIELDS + ["created_at"]
+        row["created_at"] = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO fixed_assets ({', '.join(cols)}) "
+                f"VALUES ({', '.join('?' * len(cols))})",
+                [int(row[c]) if c in _BOOL_FIELDS else row[c] for c in cols],
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _to_asset(row: sqlite3.Row) -> FixedAsset:
+        data = {c: row[c] for c in _ASSET_FIELDS}
+        for c in _BOOL_FIELDS:
+            data[c] = bool(data[c])
+        return FixedAsset(**data)
+
+    def get(self, asset_id: str) -> Optional[FixedAsset]:
+        row = self._conn.execute(
+            "SELECT * FROM fixed_assets WHERE id = ?", (asset_id,)).fetchone()
+        return self._to_asset(row) if row else None
+
+    def load(self, client_id: Optional[str] = None) -> List[FixedAsset]:
+        sql, params = self._client_filter(client_id)
+        rows = self._conn.execute(
+            f"SELECT * FROM fixed_assets {sql} ORDER BY rowid", params).fetchall()
+        return [self._to_asset(r) for r in rows]
+
+    @staticmethod
+    def _client_filter(client_id: Optional[str]) -> Tuple[str, tuple]:
+        # Točno jedan klijent; sredstva bez klijenta su zaseban opseg (""),
+        # inače bi se ista amortizacija knjižila jednom po klijentu
+        if client_id is None:
+            return "", ()
+        return "WHERE client_id = ?", (client_id,)
+
+    def has_client(self, client_id: str) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM fixed_assets WHERE client_id = ? LIMIT 1", (client_id,)
+        ).fetchone() is not None
+
+    def columns(self, client_id: Optional[str] = None) -> Dict[str, List[Any]]:
+        """Stupci za AssetTable.from_columns (bez rashodovanih bez datuma)."""
+        sql, params = self._client_filter(client_id)
+        cond = "(rashod = 0 OR datum_rashoda != '')"
+        sql = f"{sql} AND {cond}" if sql else f"WHERE {cond}"
+        rows = self._conn.execute(
+            "SELECT id, naziv, client_id, konto_ispravak, nabavna_vrijednost, godisnja_stopa, "
+            "COALESCE(NULLIF(datum_aktivacije, ''), datum_nabave), datum_rashoda "
+            f"FROM fixed_assets {sql} ORDER BY rowid", params).fetchall()
+        keys = ("id", "naziv", "client_id", "konto_ispravak", "nabavna_vrijednost",
+                "godisnja_stopa", "datum_aktivacije", "datum_rashoda")
+        cols = list(zip(*rows)) if rows else [()] * len(keys)
+        return {k: list(v) for k, v in zip(keys, cols)}
+
+    def dispose(self, asset_id: str, datum: str) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE fixed_assets SET rashod = 1, datum_rashoda = ? WHERE id = ?",
+                (datum, asset_id))
+            self._conn.commit()
+        return cur.rowcount > 0
+
+    def update_depreciation(self, items: Iterable[Tuple[str, float, float, bool]]):
+        """(id, ukupna_amortizacija, sadasnja_vrijednost, potpuno_amortizirano)."""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE fixed_assets SET ukupna_amortizacija = ?, sadasnja_vrijednost = ?, "
+                "potpuno_amortizirano = ? WHERE id = ?",
+                [(u, s, int(p), aid) for aid, u, s, p in items])
+            self._conn.commit()
+
+    # ── Mjesečna knjiženja ──
+
+    def get_run(self, client_id: str, period: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT * FROM depreciation_runs WHERE client_id = ? AND period = ?",
+            (client_id, period)).fetchone()
+        return dict(row) if row else None
+
+    def get_run_by_proposal(self, proposal_id: str) -> Optional[Dict[str, Any]]:
+        if not proposal_id:
+            return None
+        row = self._conn.execute(
+            "SELECT * FROM depreciation_runs WHERE proposal_id = ?", (proposal_id,)).fetchone()
+        return dict(row) if row else None
+
+    def record_run(self, client_id: str, period: str, proposal_id: str,
+                   stavke: List[Dict[str, Any]], status: str = "posted"):
+        """Zapiši mjesec i iznose po sredstvu (jedna transakcija).
+
+        status="pending" rezervira mjesec dok prijedlog čeka odobrenje.
+        Već zapisani (klijent, period) ili (sredstvo, period) → ValueError,
+        ništa se ne zapisuje.
+        """
+        total = sum(round(s["iznos"] * 100) for s in stavke) / 100
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT INTO depreciation_runs "
+                    "(client_id, period, proposal_id, iznos, assets, created_at, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (client_id, period, proposal_id, total, len(stavke),
+                     datetime.now().isoformat(), status))
+                self._conn.executemany(
+                    "INSERT INTO depreciation_postings VALUES (?, ?, ?)",
+                    [(s["asset_id"], period, s["iznos"]) for s in stavke])
+            except sqlite3.IntegrityError as e:
+                self._conn.rollback()
+                raise ValueError(
+                    f"Amortizacija za {period} je već proknjižena ({client_id or 'bez klijenta'})"
+                ) from e
+            self._conn.commit()
+
+    def confirm_run(self, proposal_id: str) -> Optional[Dict[str, Any]]:
+        """Rezervirani mjesec → "posted". None ako prijedlog nije na čekanju."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE depreciation_runs SET status = 'posted' "
+                "WHERE proposal_id = ? AND status = 'pending'", (proposal_id,))
+            self._conn.commit()
+        return self.get_run_by_proposal(proposal_id) if cur.rowcount else None
+
+    def drop_run(self, proposal_id: str) -> bool:
+        """Poništi rezervaciju odbijenog prijedloga — mjesec se može ponovno predložiti."""
+        run = self.get_run_by_proposal(proposal_id)
+        if not run or run["status"] != "pending":
+            return False
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM depreciation_postings WHERE period = ? AND asset_id IN "
+                "(SELECT id FROM fixed_assets WHERE client_id = ?)",
+                (run["period"], run["client_id"]))
+            self._conn.execute(
+                "DELETE FROM depreciation_runs WHERE client_id = ? AND period = ?",
+                (run["client_id"], run["period"]))
+            self._conn.commit()
+        return True
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,226 @@
+"""
+Nyx Light — Vektorizirani plan amortizacije (sva sredstva odjednom)
+
+Linearna amortizacija cijelog registra računa se nad NumPy stupcima u
+cijelim centima (int64), bez petlje po sredstvima i mjesecima:
+
+  - Mjesečni iznos: round(nabavna × stopa / 100 / 12, 2) — isto kao
+    ``OsnovnaSredstvaEngine.calculate_monthly_depreciation``
+  - Prvi mjesec: razmjerno danima od aktivacije (pro rata temporis),
+    ili od prvog dana sljedećeg mjeseca (``pro_rata=False``)
+  - Kumulativ je ograničen nabavnom vrijednošću — zadnji mjesec je ostatak
+  - Rashodovano sredstvo ne amortizira se nakon mjeseca rashoda
+
+Kumulativ do mjeseca k je zatvorena formula
+``min(nabavna, prvi + mjesečni · k)``, pa se stanje "na dan", godišnja
+projekcija i plan za proizvoljan raspon mjeseci dobiju jednom
+operacijom nad matricom sredstva × mjeseci.
+
+Korištenje:
+    table = AssetTable.from_assets(sredstva)        # ili from_columns
+    plan = DepreciationSchedule(table)
+    plan.amounts_c(month_index("2026-03"))  → iznos po sredstvu (centi)
+    plan.matrix_c("2026-01", "2030-12")     → N × 60 mjesečnih iznosa
+    plan.year_totals(2027)                  → amortizacija i stanje 31.12.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from nyx_light.core.numeric import round2
+
+logger = logging.getLogger("nyx_light.modules.osnovna_sredstva.schedule")
+
+# "Nikad" — mjesec rashoda za aktivna sredstva
+NO_END = np.int64(np.iinfo(np.int64).max // 4)
+
+MonthLike = Union[int, str, date]
+
+
+def month_index(value: MonthLike) -> int:
+    """'2026-03', '2026-03-15' ili date → godina·12 + mjesec − 1."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, date):
+        return value.year * 12 + value.month - 1
+    s = str(value)
+    return int(s[:4]) * 12 + int(s[5:7]) - 1
+
+
+def month_label(idx: int) -> str:
+    return f"{idx // 12:04d}-{idx % 12 + 1:02d}"
+
+
+def _month_columns(dates: Sequence[str]):
+    """Datumi (ISO) → (indeks mjeseca, dan u mjesecu, broj dana mjeseca, NaT maska)."""
+    d = np.array([str(x)[:10] if x else "" for x in dates], dtype="datetime64[D]")
+    nat = np.isnat(d)
+    d = np.where(nat, np.datetime64("1970-01-01"), d)
+    m = d.astype("datetime64[M]")
+    first = m.astype("datetime64[D]")
+    idx = m.astype(np.int64) + 1970 * 12
+    day = (d - first).astype(np.int64) + 1
+    dim = ((m + 1).astype("datetime64[D]") - first).astype(np.int64)
+    return idx, day, dim, nat
+
+
+# ════════════════════════════════════════════════════════
+# Ulaz: stupci registra
+# ════════════════════════════════════════════════════════
+
+@dataclass
+class AssetTable:
+    """Stupčasti prikaz registra (jedan redak = jedno sredstvo)."""
+    ids: List[str]
+    nazivi: List[str]
+    client_ids: List[str]
+    konto_ispravak: List[str]
+    nabavna_c: np.ndarray     # int64, centi
+    mjesecna_c: np.ndarray    # int64, puni mjesečni iznos
+    prva_c: np.ndarray        # int64, iznos prvog mjeseca
+    start: np.ndarray         # indeks prvog mjeseca amortizacije
+    end: np.ndarray           # zadnji mjesec (rashod) ili NO_END
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_columns(cls, cols: Mapping[str, Sequence], pro_rata: bool = True) -> "AssetTable":
+        """
+        Ključevi: id, nabavna_vrijednost, godisnja_stopa, datum_aktivacije;
+        opcionalno naziv, client_id, konto_ispravak, datum_rashoda.
+        """
+        ids = list(cols["id"])
+        n = len(ids)
+        nabavna = np.asarray(cols["nabavna_vrijednost"], dtype=np.float64)
+        stopa = np.asarray(cols["godisnja_stopa"], dtype=np.float64)
+
+        mjesecna_c = np.rint(round2(nabavna * stopa / 100 / 12) * 100).astype(np.int64)
+        nabavna_c = np.rint(nabavna * 100).astype(np.int64)
+
+        start, day, dim, _ = _month_columns(cols["datum_aktivacije"])
+        if pro_rata:
+            prva_c = np.rint(mjesecna_c * (dim - day + 1) / dim).astype(np.int64)
+        else:
+            start = start + 1
+            prva_c = mjesecna_c.copy()
+        prva_c = np.minimum(prva_c, nabavna_c)
+
+        end = np.full(n, NO_END, dtype=np.int64)
+        if cols.get("datum_rashoda") is not None:
+            r_idx, _, _, r_nat = _month_columns(cols["datum_rashoda"])
+            end = np.where(r_nat, NO_END, r_idx)
+
+        return cls(
+            ids=ids,
+            nazivi=list(cols.get("naziv") or [""] * n),
+            client_ids=list(cols.get("client_id") or [""] * n),
+            konto_ispravak=list(cols.get("konto_ispravak") or ["0290"] * n),
+            nabavna_c=nabavna_c, mjesecna_c=mjesecna_c, prva_c=prva_c,
+            start=start.astype(np.int64), end=end.astype(np.int64),
+        )
+
+    @classmethod
+    def from_assets(cls, assets: Sequence[Any], pro_rata: bool = True) -> "AssetTable":
+        """Iz liste FixedAsset (datum aktivacije, inače datum nabave)."""
+        return cls.from_columns({
+            "id": [a.id for a in assets],
+            "naziv": [a.naziv for a in assets],
+            "client_id": [getattr(a, "client_id", "") for a in assets],
+            "konto_ispravak": [a.konto_ispravak for a in assets],
+            "nabavna_vrijednost": [a.nabavna_vrijednost for a in assets],
+            "godisnja_stopa": [a.godisnja_stopa for a in assets],
+            "datum_aktivacije": [a.datum_aktivacije or a.datum_nabave for a in assets],
+            "datum_rashoda": [getattr(a, "datum_rashoda", "") for a in assets],
+        }, pro_rata=pro_rata)
+
+
+# ════════════════════════════════════════════════════════
+# Plan amortizacije
+# ════════════════════════════════════════════════════════
+
+class DepreciationSchedule:
+    """Plan amortizacije za cijeli registar — svi upiti su vektorski."""
+
+    def __init__(self, table: AssetTable):
+        self.table = table
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def _cum(self, months: np.ndarray) -> np.ndarray:
+        """Kumulativna amortizacija (centi) na kraju svakog mjeseca → N × M."""
+        t = self.table
+        m = np.minimum(np.asarray(months, dtype=np.int64)[None, :], t.end[:, None])
+        k = m - t.start[:, None]
+        cum = np.minimum(
+            t.nabavna_c[:, None],
+            t.prva_c[:, None] + t.mjesecna_c[:, None] * np.maximum(k, 0),
+        )
+        return np.where(k < 0, 0, cum)
+
+    def accumulated_c(self, month: MonthLike) -> np.ndarray:
+        """Ispravak vrijednosti po sredstvu na kraju mjeseca (uključivo)."""
+        return self._cum(np.array([month_index(month)]))[:, 0]
+
+    def amounts_c(self, month: MonthLike) -> np.ndarray:
+        """Amortizacija po sredstvu u jednom mjesecu."""
+        m = month_index(month)
+        cum = self._cum(np.array([m - 1, m]))
+        return cum[:, 1] - cum[:, 0]
+
+    def matrix_c(self, month_from: MonthLike, month_to: MonthLike) -> np.ndarray:
+        """Mjesečni iznosi za raspon [od, do] → N × M (centi)."""
+        a, b = month_index(month_from), month_index(month_to)
+        if b < a:
+            return np.zeros((len(self.table), 0), dtype=np.int64)
+        return np.diff(self._cum(np.arange(a - 1, b + 1)), axis=1)
+
+    def last_month(self) -> np.ndarray:
+        """Mjesec u kojem je sredstvo potpuno amortizirano (ili rashodovano)."""
+        t = self.table
+        rest = t.nabavna_c - t.prva_c
+        k = np.where(t.mjesecna_c > 0, -(-rest // np.maximum(t.mjesecna_c, 1)), NO_END)
+        done = np.where(rest <= 0, t.start, t.start + k)
+        return np.minimum(done, t.end)
+
+    def monthly_totals(self, month_from: MonthLike, month_to: MonthLike) -> List[Dict[str, Any]]:
+        """Ukupna amortizacija registra po mjesecima."""
+        a = month_index(month_from)
+        sums = self.matrix_c(a, month_to).sum(axis=0)
+        return [{"period": month_label(a + i), "iznos": int(s) / 100}
+                for i, s in enumerate(sums)]
+
+    def year_totals(self, godina: int) -> Dict[str, Any]:
+        """Projekcija za godinu: amortizacija godine i stanje na 31.12."""
+        t = self.table
+        cum = self._cum(np.array([godina * 12 - 1, godina * 12 + 11]))
+        iznos = cum[:, 1] - cum[:, 0]
+        return {
+            "godina": godina,
+            "amortizacija": int(iznos.sum()) / 100,
+            "ispravak_31_12": int(cum[:, 1].sum()) / 100,
+            "sadasnja_31_12": int((t.nabavna_c - cum[:, 1]).sum()) / 100,
+            "nabavna": int(t.nabavna_c.sum()) / 100,
+            "sredstava_u_amortizaciji": int((iznos > 0).sum()),
+        }
+
+    def as_of_rows(self, datum: MonthLike) -> List[Dict[str, Any]]:
+        """Stanje po sredstvu na kraju mjeseca zadanog datuma."""
+        t = self.table
+        cum = self.accumulated_c(datum)
+        sad = t.nabavna_c - cum
+        return [
+            {
+                "id": t.ids[i], "naziv": t.nazivi[i],
+                "nabavna_vrijednost": int(t.nabavna_c[i]) / 100,
+                "ispravak": int(cum[i]) / 100,
+                "sadasnja_vrijednost": int(sad[i]) / 100,
+                "potpuno_amortizirano": bool(sad[i] <= 0),
+            }
+            for i in range(len(t))
+        ]
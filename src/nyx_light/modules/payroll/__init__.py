@@ -183,24 +183,8 @@ class PayrollEngine:
         result.dohodak = round(bruto - result.ukupno_doprinosi_iz, 2)
 
         # ── 3. Osobni odbitak ──
-        odbitak = r.osnovni_osobni_odbitak
-
-        # Uzdržavani članovi
-        odbitak += employee.uzdrzavani_clanovi * r.faktor_uzdrzavani_clan * r.osnovni_osobni_odbitak
-
-        # Djeca (progresivni faktori)
-        djeca_faktori = [r.faktor_dijete_1, r.faktor_dijete_2, r.faktor_dijete_3, r.faktor_dijete_4]
-        for i in range(employee.djeca):
-            if i < len(djeca_faktori):
-                odbitak += djeca_faktori[i] * r.osnovni_osobni_odbitak
-            else:
-                odbitak += (djeca_faktori[-1] + 0.6 * (i - len(djeca_faktori) + 1)) * r.osnovni_osobni_odbitak
-
-        # Invaliditet
-        if employee.invalid:
-            odbitak += r.faktor_invalid_radnik * r.osnovni_osobni_odbitak
-
-        result.osobni_odbitak = round(odbitak, 2)
+        result.osobni_odbitak = self._osobni_odbitak(
+            employee.uzdrzavani_clanovi, employee.djeca, employee.invalid)
 
         # ── 4. Porezna osnovica ──
         result.porezna_osnovica = max(0, round(result.dohodak - result.osobni_odbitak, 2))
@@ -330,6 +314,33 @@ class PayrollEngine:
             "napomena": "Iznosi prema Pravilniku o porezu na dohodak (2026.)",
         }
 
+    def calculate_batch(self, employees, today: Optional[date] = None):
+        """Vektorizirani obračun cijele tvrtke — vidi ``payroll.batch``."""
+        from nyx_light.modules.payroll.batch import calculate_batch
+        return calculate_batch(self, employees, today=today)
+
+    def _osobni_odbitak(self, uzdrzavani_clanovi: int, djeca: int, invalid: bool) -> float:
+        """Osobni odbitak (zaokružen na cent) za kombinaciju olakšica."""
+        r = self.rates
+        odbitak = r.osnovni_osobni_odbitak
+
+        # Uzdržavani članovi
+        odbitak += uzdrzavani_clanovi * r.faktor_uzdrzavani_clan * r.osnovni_osobni_odbitak
+
+        # Djeca (progresivni faktori)
+        djeca_faktori = [r.faktor_dijete_1, r.faktor_dijete_2, r.faktor_dijete_3, r.faktor_dijete_4]
+        for i in range(djeca):
+            if i < len(djeca_faktori):
+                odbitak += djeca_faktori[i] * r.osnovni_osobni_odbitak
+            else:
+                odbitak += (djeca_faktori[-1] + 0.6 * (i - len(djeca_faktori) + 1)) * r.osnovni_osobni_odbitak
+
+        # Invaliditet
+        if invalid:
+            odbitak += r.faktor_invalid_radnik * r.osnovni_osobni_odbitak
+
+        return round(odbitak, 2)
+
     def _get_prirez(self, city: str) -> float:
         """Dohvati stopu prireza za grad."""
         prirez_map = {
@@ -0,0 +1,294 @@
+"""
+Nyx Light — Vektorizirani obračun plaća (cijela tvrtka u jednom prolazu)
+
+Stupčasti (columnar) ekvivalent ``PayrollEngine.calculate``: zaposlenici
+se pretvore u NumPy stupce, a doprinosi, osobni odbitak, porez (dvije
+stope), prirez i olakšica za mlade računaju se nad cijelim nizom.
+
+  - Osobni odbitak i prirez: računaju se jednom po jedinstvenoj
+    kombinaciji (uzdržavani, djeca, invalid) / gradu, pa se mapiraju
+  - Zaokruživanje: ``round2`` (core.numeric) daje bit-identičan rezultat kao Pythonov
+    ``round(x, 2)`` — rezultati su jednaki skalarnom obračunu u centima
+  - JOPPD zbrojevi: sumiraju se cijeli centi (int64), bez float drifta
+
+Korištenje:
+    engine = PayrollEngine()
+    batch = engine.calculate_batch(zaposlenici)      # ili dict stupaca
+    batch.joppd_totals()   → ukupno bruto/MIO/porez/prirez/neto/zdravstveno
+    batch.to_results()     → List[PayrollResult] (pipeline, JOPPD)
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+from nyx_light.core.numeric import round2
+from nyx_light.modules.payroll import Employee, PayrollEngine, PayrollResult
+
+logger = logging.getLogger("nyx_light.modules.payroll.batch")
+
+# Stupci rezultata (isti nazivi kao polja PayrollResult)
+RESULT_COLUMNS = (
+    "bruto_placa", "mio_stup_1", "mio_stup_2", "ukupno_doprinosi_iz",
+    "dohodak", "osobni_odbitak", "porezna_osnovica",
+    "porez", "prirez", "ukupno_porez_prirez",
+    "olaksica_mladi_pct", "olaksica_iznos", "neto_placa",
+    "zdravstveno", "ukupni_trosak_poslodavca",
+)
+
+# JOPPD zbroj → stupac rezultata (ključevi kao JOPPDObrazac.ukupno_*)
+JOPPD_TOTALS = {
+    "bruto": "bruto_placa",
+    "mio_1": "mio_stup_1",
+    "mio_2": "mio_stup_2",
+    "porez": "porez",
+    "prirez": "prirez",
+    "neto": "neto_placa",
+    "zdravstveno": "zdravstveno",
+}
+
+
+def _cents_sum(a: np.ndarray) -> float:
+    return int(np.rint(a * 100.0).astype(np.int64).sum()) / 100.0
+
+
+def _as_date(value) -> Optional[date]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+# ════════════════════════════════════════════════════════
+# Ulaz: tablica zaposlenika
+# ════════════════════════════════════════════════════════
+
+@dataclass
+class EmployeeTable:
+    """Stupčasti prikaz liste zaposlenika."""
+    names: List[str]
+    oibs: List[str]
+    cities: List[str]
+    bruto: np.ndarray
+    radno_vrijeme_pct: np.ndarray
+    uzdrzavani: np.ndarray
+    djeca: np.ndarray
+    invalid: np.ndarray
+    mio_stup_2: np.ndarray
+    birth_dates: List[Optional[date]]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_employees(cls, employees: Sequence[Employee]) -> "EmployeeTable":
+        return cls.from_columns({
+            "name": [e.name for e in employees],
+            "oib": [e.oib for e in employees],
+            "city": [e.city for e in employees],
+            "bruto_placa": [e.bruto_placa for e in employees],
+            "radno_vrijeme_pct": [e.radno_vrijeme_pct for e in employees],
+            "uzdrzavani_clanovi": [e.uzdrzavani_clanovi for e in employees],
+            "djeca": [e.djeca for e in employees],
+            "invalid": [e.invalid for e in employees],
+            "mio_stup_2": [e.mio_stup_2 for e in employees],
+            "birth_date": [e.birth_date for e in employees],
+        })
+
+    @classmethod
+    def from_columns(cls, cols: Mapping[str, Sequence]) -> "EmployeeTable":
+        """Tablica iz dict-a stupaca (ključevi = polja ``Employee``)."""
+        bruto = np.asarray(cols["bruto_placa"], dtype=np.float64)
+        n = len(bruto)
+
+        def col(key, default, dtype):
+            if key in cols:
+                return np.asarray(cols[key], dtype=dtype)
+            return np.full(n, default, dtype=dtype)
+
+        return cls(
+            names=list(cols.get("name", [""] * n)),
+            oibs=list(cols.get("oib", [""] * n)),
+            cities=list(cols.get("city", ["Zagreb"] * n)),
+            bruto=bruto,
+            radno_vrijeme_pct=col("radno_vrijeme_pct", 100.0, np.float64),
+            uzdrzavani=col("uzdrzavani_clanovi", 0, np.int64),
+            djeca=col("djeca", 0, np.int64),
+            invalid=col("invalid", False, bool),
+            mio_stup_2=col("mio_stup_2", True, bool),
+            birth_dates=[_as_date(d) for d in cols.get("birth_date", [None] * n)],
+        )
+
+
+# ════════════════════════════════════════════════════════
+# Rezultat
+# ════════════════════════════════════════════════════════
+
+@dataclass
+class PayrollBatchResult:
+    """Rezultat vektoriziranog obračuna — stupci + meta po zaposleniku."""
+    names: List[str]
+    oibs: List[str]
+    columns: Dict[str, np.ndarray]
+    ages: np.ndarray
+    below_minimum: np.ndarray
+    min_placa: np.ndarray
+    mio_stup_2: np.ndarray
+    warnings: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def joppd_totals(self) -> Dict[str, float]:
+        """Ukupni iznosi za JOPPD (zbroj u centima)."""
+        return {k: _cents_sum(self.columns[c]) for k, c in JOPPD_TOTALS.items()}
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Lista dict-ova po zaposleniku (za API)."""
+        lists = {c: self.columns[c].tolist() for c in RESULT_COLUMNS}
+        return [
+            {"employee_name": name, "oib": oib, **{c: lists[c][i] for c in RESULT_COLUMNS}}
+            for i, (name, oib) in enumerate(zip(self.names, self.oibs))
+        ]
+
+    def to_results(self) -> List[PayrollResult]:
+        """Pretvori u PayrollResult objekte (poruke kao skalarni obračun)."""
+        out = []
+        for i, row in enumerate(self.rows()):
+            row.pop("oib")
+            pr = PayrollResult(**row)
+            if self.below_minimum[i]:
+                pr.warnings.append(
+                    f"⚠️ Bruto plaća ({pr.bruto_placa:.2f} EUR) ispod minimalne "
+                    f"({self.min_placa[i]:.2f} EUR)!"
+                )
+            if not self.mio_stup_2[i]:
+                pr.notes.append("Radnik nema II. mirovinski stup — ukupno 20% ide u I. stup")
+            age = int(self.ages[i])
+            if age >= 0 and age < 25:
+                pr.notes.append(f"Olakšica za mlade do 25 (dob: {age}) — 100% oslobođenje poreza")
+            elif age >= 0 and age < 30:
+                pr.notes.append(f"Olakšica za mlade 25-30 (dob: {age}) — 50% oslobođenje poreza")
+            out.append(pr)
+        return out
+
+
+# ════════════════════════════════════════════════════════
+# Obračun
+# ════════════════════════════════════════════════════════
+
+def calculate_batch(
+    engine: PayrollEngine,
+    employees: Union[Sequence[Employee], Mapping[str, Sequence], EmployeeTable],
+    today: Optional[date] = None,
+) -> PayrollBatchResult:
+    """Obračunaj plaće za sve zaposlenike odjednom (iste stope kao ``engine``)."""
+    if isinstance(employees, EmployeeTable):
+        t = employees
+    elif isinstance(employees, Mapping):
+        t = EmployeeTable.from_columns(employees)
+    else:
+        t = EmployeeTable.from_employees(employees)
+
+    r = engine.rates
+    n = len(t)
+    bruto = t.bruto
+
+    # ── Validacija (minimalna plaća) ──
+    min_placa = r.minimalna_bruto * (t.radno_vrijeme_pct / 100.0)
+    below = bruto < min_placa
+
+    # ── 1. Doprinosi IZ plaće ──
+    mio_1 = np.where(
+        t.mio_stup_2,
+        round2(bruto * r.mio_stup_1_pct / 100),
+        round2(bruto * (r.mio_stup_1_pct + r.mio_stup_2_pct) / 100),
+    )
+    mio_2 = np.where(t.mio_stup_2, round2(bruto * r.mio_stup_2_pct / 100), 0.0)
+    doprinosi = round2(mio_1 + mio_2)
+
+    # ── 2. Dohodak ──
+    dohodak = round2(bruto - doprinosi)
+
+    # ── 3. Osobni odbitak (jednom po jedinstvenoj kombinaciji) ──
+    keys = (t.uzdrzavani * 1024 + t.djeca) * 2 + t.invalid
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    odbitak_uniq = np.array(
+        [engine._osobni_odbitak(int(k) // 2048, int(k) // 2 % 1024, bool(k % 2)) for k in uniq],
+        dtype=np.float64,
+    )
+    odbitak = odbitak_uniq[inverse.reshape(-1)]
+
+    # ── 4. Porezna osnovica ──
+    osnovica = np.maximum(0.0, round2(dohodak - odbitak))
+
+    # ── 5. Porez (dvije stope) ──
+    porez_nizi = round(r.porez_prag_mjesecni * r.porez_stopa_niza_pct / 100, 2)
+    porez = np.where(
+        osnovica <= r.porez_prag_mjesecni,
+        round2(osnovica * r.porez_stopa_niza_pct / 100),
+        round2(porez_nizi + round2((osnovica - r.porez_prag_mjesecni) * r.porez_stopa_visa_pct / 100)),
+    )
+
+    # ── 6. Prirez (lookup jednom po gradu) ──
+    city_pct = {c: engine._get_prirez(c) for c in set(t.cities)}
+    prirez_pct = np.array([city_pct[c] for c in t.cities], dtype=np.float64)
+    prirez = round2(porez * prirez_pct / 100)
+    porez_prirez = round2(porez + prirez)
+
+    # ── 7. Olakšica za mlade ──
+    ref = today or date.today()
+    has_birth = np.array([d is not None for d in t.birth_dates], dtype=bool)
+    by = np.array([d.year if d else 0 for d in t.birth_dates], dtype=np.int64)
+    bm = np.array([d.month if d else 0 for d in t.birth_dates], dtype=np.int64)
+    bd = np.array([d.day if d else 0 for d in t.birth_dates], dtype=np.int64)
+    before_birthday = (bm > ref.month) | ((bm == ref.month) & (bd > ref.day))
+    ages = np.where(has_birth, ref.year - by - before_birthday, -1)
+    do_25 = has_birth & (ages < 25)
+    do_30 = has_birth & (ages >= 25) & (ages < 30)
+
+    pola = round2(porez_prirez * 0.5)
+    olaksica_pct = np.where(do_25, r.olaksica_mladi_do_25_pct,
+                            np.where(do_30, r.olaksica_mladi_25_30_pct, 0.0))
+    olaksica_iznos = np.where(do_25, porez_prirez, np.where(do_30, pola, 0.0))
+    porez_prirez = np.where(do_25, 0.0, np.where(do_30, pola, porez_prirez))
+    # Bez olakšice → dob se ne prijavljuje u napomenama
+    ages = np.where(do_25 | do_30, ages, -1)
+
+    # ── 8. Neto ──
+    neto = round2(bruto - doprinosi - porez_prirez)
+
+    # ── 9–10. Doprinosi NA plaću, trošak poslodavca ──
+    zdravstveno = round2(bruto * r.zdravstveno_pct / 100)
+    trosak = round2(bruto + zdravstveno)
+
+    engine._calc_count += n
+    columns = {
+        "bruto_placa": bruto,
+        "mio_stup_1": mio_1,
+        "mio_stup_2": mio_2,
+        "ukupno_doprinosi_iz": doprinosi,
+        "dohodak": dohodak,
+        "osobni_odbitak": odbitak,
+        "porezna_osnovica": osnovica,
+        "porez": porez,
+        "prirez": prirez,
+        "ukupno_porez_prirez": porez_prirez,
+        "olaksica_mladi_pct": olaksica_pct,
+        "olaksica_iznos": olaksica_iznos,
+        "neto_placa": neto,
+        "zdravstveno": zdravstveno,
+        "ukupni_trosak_poslodavca": trosak,
+    }
+    warnings = []
+    if below.any():
+        warnings.append(f"{int(below.sum())} zaposlenika ispod minimalne plaće")
+    return PayrollBatchResult(
+        names=t.names, oibs=t.oibs, columns=columns, ages=ages,
+        below_minimum=below, min_placa=min_placa, mio_stup_2=t.mio_stup_2,
+        warnings=warnings,
+    )
@@ -8,14 +8,19 @@ Priprema podataka za PDV prijavu na ePorezna:
 - Intrastat flagging
 - Provjera rokova (20. u mjesecu)
 
+PPO se može izračunati i direktno iz spremljenih knjiženja
+(``calculate_from_storage``): SQLite grupira odobrene račune po
+tipu/stopi/EU zastavicama, a zatvoreni periodi se keširaju dok novo
+knjiženje u periodu ne poništi cache (trigger na ``bookings``).
+
 NAPOMENA: Ovaj modul PRIPREMA podatke — predaju na ePorezna radi računovođa.
 """
 
 from decimal import Decimal, ROUND_HALF_UP
 import logging
-from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Any, Dict, List
+from dataclasses import asdict, dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 logger = logging.getLogger("nyx_light.modules.pdv_prijava")
 
@@ -139,6 +144,85 @@ class PDVPrijavaEngine:
         self._generation_count += 1
         return ppo
 
+    # ── PPO iz spremljenih knjiženja (SQL agregacija) ──
+
+    CACHE_KIND = "ppo"
+
+    @staticmethod
+    def period_bounds(period: str) -> Tuple[str, str, bool]:
+        """"2026-02" / "2026-Q1" → (od, do_isključivo, mjesečna)."""
+        if "-Q" in period:
+            year, q = period.split("-Q")
+            start_month, mjesecna = (int(q) - 1) * 3 + 1, False
+            months = 3
+        else:
+            year, m = period.split("-")[:2]
+            start_month, mjesecna, months = int(m), True, 1
+        y, end_month = int(year), start_month + months
+        if end_month > 12:
+            y, end_month = y + 1, end_month - 12
+        return f"{int(year)}-{start_month:02d}-01", f"{y}-{end_month:02d}-01", mjesecna
+
+    def _from_groups(self, groups: Iterable[Dict], period: str, oib: str,
+                     naziv: str, mjesecna: bool) -> PPOObrazac:
+        """Agregirane grupe → PPO (ista pravila kao calculate, po grupi umjesto po računu)."""
+        tipovi = {"izlazni_racun": "izlazni", "ulazni_racun": "ulazni"}
+        stavke, count = [], 0
+        for g in groups:
+            stavke.append(PDVStavka(
+                tip=tipovi.get(g["document_type"], g["document_type"]),
+                osnovica=g["osnovica"], pdv_stopa=g["pdv_stopa"], pdv_iznos=g["pdv_iznos"],
+                eu_transakcija=g["eu_transakcija"], reverse_charge=g["reverse_charge"],
+            ))
+            count += g["count"]
+        ppo = self.calculate(stavke, oib, naziv, period=period, mjesecna=mjesecna)
+        ppo.stavke_count = count
+        return ppo
+
+    def calculate_from_storage(self, storage, client_id: str, period: str,
+                               oib_obveznika: str = "", naziv_obveznika: str = "",
+                               use_cache: bool = True) -> PPOObrazac:
+        """PPO za klijenta i period direktno iz odobrenih knjiženja."""
+        return self.calculate_batch_from_storage(
+            storage, [{"client_id": client_id, "oib": oib_obveznika, "naziv": naziv_obveznika}],
+            period, use_cache=use_cache,
+        )[client_id]
+
+    def calculate_batch_from_storage(self, storage, clients: Iterable[Dict], period: str,
+                                     use_cache: bool = True) -> Dict[str, PPOObrazac]:
+        """
+        PPO za više klijenata odjednom — jedan grupirani SQL upit za sve
+        kojima nema važećeg cachea. ``clients``: dictovi s client_id, oib, naziv.
+        """
+        date_from, date_to, mjesecna = self.period_bounds(period)
+        closed = date_to <= date.today().isoformat()
+        clients = list(clients)
+        results: Dict[str, PPOObrazac] = {}
+
+        misses = []
+        for c in clients:
+            cached = storage.get_cached_report(self.CACHE_KIND, c["client_id"], period) \
+                if use_cache and closed else None
+            if cached:
+                results[c["client_id"]] = PPOObrazac(**cached)
+            else:
+                misses.append(c)
+        if not misses:
+            return results
+
+        grouped: Dict[str, List[Dict]] = {c["client_id"]: [] for c in misses}
+        for g in storage.aggregate_vat(date_from, date_to, list(grouped)):
+            grouped[g["client_id"]].append(g)
+
+        for c in misses:
+            ppo = self._from_groups(grouped[c["client_id"]], period,
+                                    c.get("oib", ""), c.get("naziv", ""), mjesecna)
+            results[c["client_id"]] = ppo
+            if use_cache and closed:
+                storage.put_cached_report(self.CACHE_KIND, c["client_id"], period,
+                                          date_from, date_to, asdict(ppo))
+        return results
+
     def _add_izlazni(self, ppo: PPOObrazac, s: PDVStavka):
         """Dodaj izlazni račun u PDV prijavu."""
         if s.eu_transakcija and s.reverse_charge:
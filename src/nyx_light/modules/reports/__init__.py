@@ -9,7 +9,9 @@ Generira financijske izvještaje u Excel (.xlsx) formatu:
   5. Kartice konta (Account Ledger)
   6. IOS pregled (Reconciliation Overview)
 
-Excel generiranje koristi openpyxl (već instaliran).
+Excel generiranje koristi openpyxl (već instaliran) u write-only modu
+(writer.ReportSheet) — redovi kartica i bruto bilanci čitaju se iz
+generatora i zapisuju odmah. Za najveće izvoze: format="csv".
 PDF generiranje: opcionalno s reportlab ili html2pdf.
 
 Apple Silicon: <50ms za Excel sa 1000 redaka.
@@ -19,14 +21,14 @@ import logging
 from datetime import date, datetime
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from nyx_light.modules.reports.writer import ReportSheet, write_csv
 
 logger = logging.getLogger("nyx_light.modules.reports")
 
 try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
+    from openpyxl.styles import Font, PatternFill, Border, Side
     HAS_OPENPYXL = True
 except ImportError:
     HAS_OPENPYXL = False
@@ -89,65 +91,62 @@ class ReportGenerator:
         if not HAS_OPENPYXL:
             return self._fallback_csv("bilanca", data)
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Bilanca"
+        sheet = ReportSheet("Bilanca", self.styles, money_cols=[2, 3])
 
         # Zaglavlje
-        row = self._write_report_header(ws, "BILANCA", period)
+        self._write_report_header(sheet, "BILANCA", period)
 
         # Aktiva
-        row = self._write_section_header(ws, row, "AKTIVA")
-        row = self._write_table_header(ws, row, ["Konto", "Naziv", "Tekuća god.", "Prethodna god."])
+        self._write_section_header(sheet, "AKTIVA")
+        self._write_table_header(sheet, ["Konto", "Naziv", "Tekuća god.", "Prethodna god."])
         aktiva_total_t = 0
         aktiva_total_p = 0
         for item in data.get("aktiva", []):
             is_group = len(str(item.get("konto", ""))) <= 1
-            row = self._write_data_row(ws, row, [
+            sheet.data_row([
                 item.get("konto", ""),
                 item.get("naziv", ""),
                 item.get("tekuca", 0),
                 item.get("prethodna", 0),
-            ], bold=is_group, money_cols=[2, 3])
+            ], bold=is_group)
             if is_group:
                 aktiva_total_t += item.get("tekuca", 0)
                 aktiva_total_p += item.get("prethodna", 0)
 
-        row = self._write_total_row(ws, row, "UKUPNO AKTIVA", aktiva_total_t, aktiva_total_p)
-        row += 1
+        self._write_total_row(sheet, "UKUPNO AKTIVA", aktiva_total_t, aktiva_total_p)
+        sheet.blank()
 
         # Pasiva
-        row = self._write_section_header(ws, row, "PASIVA")
-        row = self._write_table_header(ws, row, ["Konto", "Naziv", "Tekuća god.", "Prethodna god."])
+        self._write_section_header(sheet, "PASIVA")
+        self._write_table_header(sheet, ["Konto", "Naziv", "Tekuća god.", "Prethodna god."])
         pasiva_total_t = 0
         pasiva_total_p = 0
         for item in data.get("pasiva", []):
             is_group = len(str(item.get("konto", ""))) <= 1
-            row = self._write_data_row(ws, row, [
+            sheet.data_row([
                 item.get("konto", ""),
                 item.get("naziv", ""),
                 item.get("tekuca", 0),
                 item.get("prethodna", 0),
-            ], bold=is_group, money_cols=[2, 3])
+            ], bold=is_group)
             if is_group:
                 pasiva_total_t += item.get("tekuca", 0)
                 pasiva_total_p += item.get("prethodna", 0)
 
-        row = self._write_total_row(ws, row, "UKUPNO PASIVA", pasiva_total_t, pasiva_total_p)
+        self._write_total_row(sheet, "UKUPNO PASIVA", pasiva_total_t, pasiva_total_p)
 
         # Kontrola: aktiva == pasiva
-        row += 1
+        sheet.blank()
         diff = aktiva_total_t - pasiva_total_t
-        ws.cell(row=row, column=1, value="KONTROLA (A-P):").font = self.styles.BOLD_FONT
-        c = ws.cell(row=row, column=3, value=diff)
-        c.number_format = self.styles.MONEY_FORMAT
-        c.font = Font(name="Calibri", bold=True, size=10,
-                      color="22c55e" if abs(diff) < 0.01 else "ef4444")
+        sheet.row([
+            sheet.cell("KONTROLA (A-P):", "label"), None,
+            sheet.cell(diff, "label", number_format=self.styles.MONEY_FORMAT,
+                       font=Font(name="Calibri", bold=True, size=10,
+                                 color="22c55e" if abs(diff) < 0.01 else "ef4444")),
+        ])
 
-        self._auto_width(ws)
         path = output_path or f"data/exports/bilanca_{period or date.today().isoformat()}.xlsx"
-        Path(path).parent.mkdir(parents=True, exist_ok=True)
-        wb.save(path)
+        sheet.save(path)
         logger.info(f"Bilanca generirana: {path}")
         return path
 
@@ -174,108 +173,109 @@ class ReportGenerator:
         if not HAS_OPENPYXL:
             return self._fallback_csv("rdg", data)
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "RDG"
+        sheet = ReportSheet("RDG", self.styles, money_cols=[2, 3])
 
-        row = self._write_report_header(ws, "RAČUN DOBITI I GUBITKA", period)
+        self._write_report_header(sheet, "RAČUN DOBITI I GUBITKA", period)
 
         # Prihodi
-        row = self._write_section_header(ws, row, "PRIHODI")
-        row = self._write_table_header(ws, row, ["Rbr.", "Naziv", "Tekuća god.", "Prethodna god."])
+        self._write_section_header(sheet, "PRIHODI")
+        self._write_table_header(sheet, ["Rbr.", "Naziv", "Tekuća god.", "Prethodna god."])
         ukupno_prihodi_t = 0
         ukupno_prihodi_p = 0
         for item in data.get("prihodi", []):
             is_group = item.get("rbr", "").endswith(".")
-            row = self._write_data_row(ws, row, [
+            sheet.data_row([
                 item.get("rbr", ""), item.get("naziv", ""),
                 item.get("tekuca", 0), item.get("prethodna", 0),
-            ], bold=is_group and len(item.get("rbr", "")) <= 3, money_cols=[2, 3])
+            ], bold=is_group and len(item.get("rbr", "")) <= 3)
             if item.get("rbr", "") in ("I.", "II.", "III."):
                 ukupno_prihodi_t += item.get("tekuca", 0)
                 ukupno_prihodi_p += item.get("prethodna", 0)
 
-        row = self._write_total_row(ws, row, "UKUPNI PRIHODI", ukupno_prihodi_t, ukupno_prihodi_p)
-        row += 1
+        self._write_total_row(sheet, "UKUPNI PRIHODI", ukupno_prihodi_t, ukupno_prihodi_p)
+        sheet.blank()
 
         # Rashodi
-        row = self._write_section_header(ws, row, "RASHODI")
-        row = self._write_table_header(ws, row, ["Rbr.", "Naziv", "Tekuća god.", "Prethodna god."])
+        self._write_section_header(sheet, "RASHODI")
+        self._write_table_header(sheet, ["Rbr.", "Naziv", "Tekuća god.", "Prethodna god."])
         ukupno_rashodi_t = 0
         ukupno_rashodi_p = 0
         for item in data.get("rashodi", []):
             is_group = item.get("rbr", "").endswith(".")
-            row = self._write_data_row(ws, row, [
+            sheet.data_row([
                 item.get("rbr", ""), item.get("naziv", ""),
                 item.get("tekuca", 0), item.get("prethodna", 0),
-            ], bold=is_group and len(item.get("rbr", "")) <= 3, money_cols=[2, 3])
+            ], bold=is_group and len(item.get("rbr", "")) <= 3)
             if item.get("rbr", "") in ("IV.", "V.", "VI."):
                 ukupno_rashodi_t += item.get("tekuca", 0)
                 ukupno_rashodi_p += item.get("prethodna", 0)
 
-        row = self._write_total_row(ws, row, "UKUPNI RASHODI", ukupno_rashodi_t, ukupno_rashodi_p)
-        row += 1
+        self._write_total_row(sheet, "UKUPNI RASHODI", ukupno_rashodi_t, ukupno_rashodi_p)
+        sheet.blank()
 
         # Dobit/Gubitak
         dobit_t = ukupno_prihodi_t - ukupno_rashodi_t
         dobit_p = ukupno_prihodi_p - ukupno_rashodi_p
-        row = self._write_total_row(ws, row, "DOBIT / GUBITAK", dobit_t, dobit_p)
+        self._write_total_row(sheet, "DOBIT / GUBITAK", dobit_t, dobit_p)
 
-        self._auto_width(ws)
         path = output_path or f"data/exports/rdg_{period or date.today().isoformat()}.xlsx"
-        Path(path).parent.mkdir(parents=True, exist_ok=True)
-        wb.save(path)
+        sheet.save(path)
         logger.info(f"RDG generiran: {path}")
         return path
 
     # ── BRUTO BILANCA ──
 
-    def generate_bruto_bilanca(self, stavke: List[Dict], period: str = "",
-                                output_path: str = "") -> str:
+    def generate_bruto_bilanca(self, stavke: Iterable[Dict], period: str = "",
+                                output_path: str = "", format: str = "xlsx") -> str:
         """
         Generiraj bruto bilancu (Trial Balance).
 
         stavke: [{"konto": "4010", "naziv": "...", "duguje": X, "potrazuje": Y, "saldo": Z}]
+        — lista ili generator (npr. izravno iz SQL kursora); redovi se ne
+        zadržavaju u memoriji. format="csv" za najbrži izvoz bez stilova.
         """
-        if not HAS_OPENPYXL:
+        if not HAS_OPENPYXL and format != "csv":
+            stavke = list(stavke)
             return self._fallback_csv("bruto_bilanca", {"stavke": stavke})
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Bruto bilanca"
-
-        row = self._write_report_header(ws, "BRUTO BILANCA", period)
-        row = self._write_table_header(ws, row,
-            ["Konto", "Naziv", "Duguje", "Potražuje", "Saldo duguje", "Saldo potražuje"])
-
-        total_d, total_p, total_sd, total_sp = 0, 0, 0, 0
-        for i, s in enumerate(stavke):
-            saldo = s.get("saldo", s.get("duguje", 0) - s.get("potrazuje", 0))
-            sd = max(saldo, 0)
-            sp = max(-saldo, 0)
-            row = self._write_data_row(ws, row, [
-                s.get("konto", ""), s.get("naziv", ""),
-                s.get("duguje", 0), s.get("potrazuje", 0), sd, sp,
-            ], money_cols=[2, 3, 4, 5], alt_row=(i % 2 == 1))
-            total_d += s.get("duguje", 0)
-            total_p += s.get("potrazuje", 0)
-            total_sd += sd
-            total_sp += sp
+        totals = [0, 0, 0, 0]
+
+        def rows():
+            for s in stavke:
+                d = s.get("duguje", 0)
+                p = s.get("potrazuje", 0)
+                saldo = s.get("saldo", d - p)
+                sd = max(saldo, 0)
+                sp = max(-saldo, 0)
+                totals[0] += d
+                totals[1] += p
+                totals[2] += sd
+                totals[3] += sp
+                yield [s.get("konto", ""), s.get("naziv", ""), d, p, sd, sp]
+
+        headers = ["Konto", "Naziv", "Duguje", "Potražuje", "Saldo duguje", "Saldo potražuje"]
+        name = f"bruto_bilanca_{period or date.today().isoformat()}"
+
+        if format == "csv":
+            def rows_with_total():
+                yield from rows()
+                yield ["", "UKUPNO"] + [round(v, 2) for v in totals]
+            path = output_path or f"data/exports/{name}.csv"
+            write_csv(path, headers, rows_with_total(),
+                      preamble=self._report_header_rows("BRUTO BILANCA", period))
+            return path
+
+        sheet = ReportSheet("Bruto bilanca", self.styles, money_cols=[2, 3, 4, 5])
+        self._write_report_header(sheet, "BRUTO BILANCA", period)
+        self._write_table_header(sheet, headers)
+        sheet.stream(rows())
 
         # Total row
-        for col, val in enumerate([total_d, total_p, total_sd, total_sp], 3):
-            c = ws.cell(row=row, column=col, value=round(val, 2))
-            c.number_format = self.styles.MONEY_FORMAT
-            c.font = self.styles.BOLD_FONT
-            if self.styles.TOTAL_FILL:
-                c.fill = self.styles.TOTAL_FILL
-        ws.cell(row=row, column=1, value="").font = self.styles.BOLD_FONT
-        ws.cell(row=row, column=2, value="UKUPNO").font = self.styles.BOLD_FONT
-
-        self._auto_width(ws)
-        path = output_path or f"data/exports/bruto_bilanca_{period or date.today().isoformat()}.xlsx"
-        Path(path).parent.mkdir(parents=True, exist_ok=True)
-        wb.save(path)
+        sheet.row(["", "UKUPNO"] + [round(v, 2) for v in totals],
+                  styles=["label", "label"] + ["total_money"] * 4)
+
+        path = output_path or f"data/exports/{name}.xlsx"
+        sheet.save(path)
         return path
 
     # ── PDV REKAPITULACIJA ──
@@ -294,144 +294,115 @@ class ReportGenerator:
         if not HAS_OPENPYXL:
             return self._fallback_csv("pdv_recap", data)
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "PDV Rekapitulacija"
+        sheet = ReportSheet("PDV Rekapitulacija", self.styles, money_cols=[1, 2])
 
-        row = self._write_report_header(ws, "PDV REKAPITULACIJA", period)
+        self._write_report_header(sheet, "PDV REKAPITULACIJA", period)
 
         # Izlazni PDV
-        row = self._write_section_header(ws, row, "IZLAZNI PDV (obračunati)")
-        row = self._write_table_header(ws, row, ["Stopa", "Osnovica", "PDV"])
+        self._write_section_header(sheet, "IZLAZNI PDV (obračunati)")
+        self._write_table_header(sheet, ["Stopa", "Osnovica", "PDV"])
         total_izl_o, total_izl_p = 0, 0
         for s in data.get("izlazni", []):
-            row = self._write_data_row(ws, row, [
-                f"{s['stopa']}%", s["osnovica"], s["pdv"]
-            ], money_cols=[1, 2])
+            sheet.data_row([f"{s['stopa']}%", s["osnovica"], s["pdv"]])
             total_izl_o += s["osnovica"]
             total_izl_p += s["pdv"]
-        row = self._write_total_row(ws, row, "UKUPNO IZLAZNI", total_izl_o, total_izl_p)
-        row += 1
+        self._write_total_row(sheet, "UKUPNO IZLAZNI", total_izl_o, total_izl_p)
+        sheet.blank()
 
         # Ulazni PDV (pretporez)
-        row = self._write_section_header(ws, row, "ULAZNI PDV (pretporez)")
-        row = self._write_table_header(ws, row, ["Stopa", "Osnovica", "PDV"])
+        self._write_section_header(sheet, "ULAZNI PDV (pretporez)")
+        self._write_table_header(sheet, ["Stopa", "Osnovica", "PDV"])
         total_ul_o, total_ul_p = 0, 0
         for s in data.get("ulazni", []):
-            row = self._write_data_row(ws, row, [
-                f"{s['stopa']}%", s["osnovica"], s["pdv"]
-            ], money_cols=[1, 2])
+            sheet.data_row([f"{s['stopa']}%", s["osnovica"], s["pdv"]])
             total_ul_o += s["osnovica"]
             total_ul_p += s["pdv"]
-        row = self._write_total_row(ws, row, "UKUPNO PRETPOREZ", total_ul_o, total_ul_p)
-        row += 1
+        self._write_total_row(sheet, "UKUPNO PRETPOREZ", total_ul_o, total_ul_p)
+        sheet.blank()
 
         # Obveza
         obveza = total_izl_p - total_ul_p
-        ws.cell(row=row, column=1, value="OBVEZA ZA UPLATU:" if obveza >= 0 else "ZAHTJEV ZA POVRAT:").font = self.styles.BOLD_FONT
-        c = ws.cell(row=row, column=3, value=round(abs(obveza), 2))
-        c.number_format = self.styles.MONEY_FORMAT
-        c.font = Font(name="Calibri", bold=True, size=12,
-                      color="ef4444" if obveza > 0 else "22c55e")
+        sheet.row([
+            sheet.cell("OBVEZA ZA UPLATU:" if obveza >= 0 else "ZAHTJEV ZA POVRAT:", "label"),
+            None,
+            sheet.cell(round(abs(obveza), 2), "label", number_format=self.styles.MONEY_FORMAT,
+                       font=Font(name="Calibri", bold=True, size=12,
+                                 color="ef4444" if obveza > 0 else "22c55e")),
+        ])
 
-        self._auto_width(ws)
         path = output_path or f"data/exports/pdv_recap_{period or date.today().isoformat()}.xlsx"
-        Path(path).parent.mkdir(parents=True, exist_ok=True)
-        wb.save(path)
+        sheet.save(path)
         return path
 
     # ── KARTICA KONTA ──
 
-    def generate_kartica(self, konto: str, naziv: str, stavke: List[Dict],
-                         period: str = "", output_path: str = "") -> str:
-        """Generiraj karticu konta."""
-        if not HAS_OPENPYXL:
+    def generate_kartica(self, konto: str, naziv: str, stavke: Iterable[Dict],
+                         period: str = "", output_path: str = "",
+                         format: str = "xlsx") -> str:
+        """
+        Generiraj karticu konta.
+
+        stavke: lista ili generator stavki — redovi se zapisuju čim stignu,
+        saldo se vodi u hodu. format="csv" za najbrži izvoz bez stilova.
+        """
+        if not HAS_OPENPYXL and format != "csv":
+            stavke = list(stavke)
             return self._fallback_csv(f"kartica_{konto}", {"stavke": stavke})
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = f"Konto {konto}"
-
-        row = self._write_report_header(ws, f"KARTICA KONTA {konto} — {naziv}", period)
-        row = self._write_table_header(ws, row,
-            ["Datum", "Dokument", "Opis", "Duguje", "Potražuje", "Saldo"])
-
-        saldo = 0
-        for i, s in enumerate(stavke):
-            d = s.get("duguje", 0)
-            p = s.get("potrazuje", 0)
-            saldo += d - p
-            row = self._write_data_row(ws, row, [
-                s.get("datum", ""), s.get("dokument", ""), s.get("opis", ""),
-                d, p, saldo,
-            ], money_cols=[3, 4, 5], alt_row=(i % 2 == 1))
-
-        self._auto_width(ws)
-        path = output_path or f"data/exports/kartica_{konto}_{period or date.today().isoformat()}.xlsx"
-        Path(path).parent.mkdir(parents=True, exist_ok=True)
-        wb.save(path)
+        def rows():
+            saldo = 0
+            for s in stavke:
+                d = s.get("duguje", 0)
+                p = s.get("potrazuje", 0)
+                saldo += d - p
+                yield [s.get("datum", ""), s.get("dokument", ""), s.get("opis", ""), d, p, saldo]
+
+        headers = ["Datum", "Dokument", "Opis", "Duguje", "Potražuje", "Saldo"]
+        title = f"KARTICA KONTA {konto} — {naziv}"
+        name = f"kartica_{konto}_{period or date.today().isoformat()}"
+
+        if format == "csv":
+            path = output_path or f"data/exports/{name}.csv"
+            write_csv(path, headers, rows(), preamble=self._report_header_rows(title, period))
+            return path
+
+        sheet = ReportSheet(f"Konto {konto}", self.styles, money_cols=[3, 4, 5])
+        self._write_report_header(sheet, title, period)
+        self._write_table_header(sheet, headers)
+        sheet.stream(rows())
+
+        path = output_path or f"data/exports/{name}.xlsx"
+        sheet.save(path)
         return path
 
     # ── HELPERS ──
 
-    def _write_report_header(self, ws, title: str, period: str) -> int:
-        ws.cell(row=1, column=1, value=self.firma_naziv or "Nyx Light").font = self.styles.HEADER_FONT
-        ws.cell(row=2, column=1, value=f"OIB: {self.firma_oib}" if self.firma_oib else "").font = self.styles.NORMAL_FONT
-        ws.cell(row=3, column=1, value=title).font = Font(name="Calibri", bold=True, size=12)
-        ws.cell(row=4, column=1,
-                value=f"Period: {period}" if period else f"Datum: {date.today().strftime('%d.%m.%Y.')}"
-        ).font = self.styles.NORMAL_FONT
-        return 6
-
-    def _write_section_header(self, ws, row: int, title: str) -> int:
-        ws.cell(row=row, column=1, value=title).font = self.styles.SUBHEADER_FONT
-        return row + 1
-
-    def _write_table_header(self, ws, row: int, headers: List[str]) -> int:
-        for col, h in enumerate(headers, 1):
-            c = ws.cell(row=row, column=col, value=h)
-            if self.styles.HEADER_FILL:
-                c.fill = self.styles.HEADER_FILL
-            if self.styles.HEADER_FONT_WHITE:
-                c.font = self.styles.HEADER_FONT_WHITE
-            c.alignment = Alignment(horizontal="center") if HAS_OPENPYXL else None
-        return row + 1
-
-    def _write_data_row(self, ws, row: int, values: list,
-                        bold: bool = False, money_cols: list = None,
-                        alt_row: bool = False) -> int:
-        money_cols = money_cols or []
-        for col, v in enumerate(values, 1):
-            c = ws.cell(row=row, column=col, value=v)
-            c.font = self.styles.BOLD_FONT if bold else self.styles.NORMAL_FONT
-            if (col - 1) in money_cols and isinstance(v, (int, float)):
-                c.number_format = self.styles.MONEY_FORMAT
-            if alt_row and self.styles.ALT_ROW_FILL:
-                c.fill = self.styles.ALT_ROW_FILL
-            if self.styles.THIN_BORDER:
-                c.border = self.styles.THIN_BORDER
-        return row + 1
-
-    def _write_total_row(self, ws, row: int, label: str, *values) -> int:
-        ws.cell(row=row, column=2, value=label).font = self.styles.BOLD_FONT
-        if self.styles.TOTAL_FILL:
-            ws.cell(row=row, column=2).fill = self.styles.TOTAL_FILL
-        for i, v in enumerate(values):
-            c = ws.cell(row=row, column=3 + i, value=round(v, 2))
-            c.number_format = self.styles.MONEY_FORMAT
-            c.font = self.styles.BOLD_FONT
-            if self.styles.TOTAL_FILL:
-                c.fill = self.styles.TOTAL_FILL
-        return row + 1
-
-    def _auto_width(self, ws):
-        for col in ws.columns:
-            max_len = 0
-            col_letter = get_column_letter(col[0].column)
-            for cell in col:
-                val = str(cell.value or "")
-                max_len = max(max_len, len(val))
-            ws.column_dimensions[col_letter].width = min(max_len + 3, 40)
+    def _report_header_rows(self, title: str, period: str) -> List[List[str]]:
+        return [
+            [self.firma_naziv or "Nyx Light"],
+            [f"OIB: {self.firma_oib}" if self.firma_oib else ""],
+            [title],
+            [f"Period: {period}" if period else f"Datum: {date.today().strftime('%d.%m.%Y.')}"],
+            [],
+        ]
+
+    def _write_report_header(self, sheet: ReportSheet, title: str, period: str):
+        firma, oib, naslov, razdoblje, prazno = self._report_header_rows(title, period)
+        sheet.row(firma, "title")
+        sheet.row(oib, "info")
+        sheet.row(naslov, "subtitle")
+        sheet.row(razdoblje, "info")
+        sheet.row(prazno)
+
+    def _write_section_header(self, sheet: ReportSheet, title: str):
+        sheet.row([title], "section")
+
+    def _write_table_header(self, sheet: ReportSheet, headers: List[str]):
+        sheet.row(headers, "header")
+
+    def _write_total_row(self, sheet: ReportSheet, label: str, *values):
+        sheet.row([None, label] + [round(v, 2) for v in values],
+                  styles=[None, "total"] + ["total_money"] * len(values))
 
     def _fallback_csv(self, name: str, data: Dict) -> str:
         """Fallback: generiraj CSV ako openpyxl nije dostupan."""
@@ -0,0 +1,259 @@
+"""
+Nyx Light — Streaming renderiranje izvještaja
+
+Kartice konta i bruto bilance s tisućama redaka ne stanu udobno u obični
+openpyxl workbook (grid svih ćelija u memoriji + još jedan prolaz kroz sve
+ćelije za širine stupaca). ReportSheet piše write-only:
+
+  1. Redovi prije tijela izvještaja (zaglavlje, sekcije) se bufferiraju
+  2. Širine stupaca računaju se iz statistike podataka — bufferirani redovi
+     + uzorak od prvih WIDTH_SAMPLE redaka toka — i postavljaju prije prvog
+     zapisanog retka (write-only ih ne može mijenjati naknadno)
+  3. Redovi se zatim čitaju iz generatora i odmah zapisuju; stilovi su
+     NamedStyle objekti registrirani jednom po workbooku, ćelije kopiraju
+     njihov StyleArray
+
+Za najveće izvoze postoji i CSV put (write_csv) — bez stilova, isti stupci.
+
+Korištenje:
+    sheet = ReportSheet("Kartica", ReportStyles(), money_cols=[3, 4, 5])
+    sheet.row(["Firma d.o.o."], "title")
+    sheet.stream(redovi_generator)
+    sheet.save("data/exports/kartica.xlsx")
+"""
+
+import csv
+import logging
+from copy import copy
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger("nyx_light.modules.reports.writer")
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import Cell, WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, NamedStyle
+    from openpyxl.utils import get_column_letter
+    HAS_OPENPYXL = True
+except ImportError:
+    HAS_OPENPYXL = False
+
+WIDTH_SAMPLE = 2000
+MAX_WIDTH = 40
+# Stupci s iznosima u toku: salda/ukupni iznosi na kraju mogu biti veći
+# od svega u uzorku — širina za 99.999.999,99 €
+MONEY_MIN_WIDTH = 17
+
+
+def _money_len(v: Any) -> int:
+    return len(f"{v:,.2f} €")
+
+
+class ColumnWidths:
+    """Statistika duljina po stupcu → širine (najdulja vrijednost + 3, najviše 40)."""
+
+    def __init__(self, money_cols: Sequence[int] = ()):
+        self.money_cols = set(money_cols)
+        self.max_len: List[int] = []
+
+    def observe(self, values: Sequence[Any]):
+        max_len = self.max_len
+        if len(values) > len(max_len):
+            max_len.extend([0] * (len(values) - len(max_len)))
+        for i, v in enumerate(values):
+            if isinstance(v, Cell):
+                v = v.value
+            if v is None:
+                continue
+            if i in self.money_cols and isinstance(v, (int, float)):
+                n = _money_len(v)
+            else:
+                n = len(str(v))
+            if n > max_len[i]:
+                max_len[i] = n
+
+    def widths(self, money_min: int = 0) -> List[int]:
+        out = []
+        for i, n in enumerate(self.max_len):
+            w = min(n + 3, MAX_WIDTH)
+            if money_min and i in self.money_cols:
+                w = max(w, money_min)
+            out.append(w)
+        return out
+
+
+def _style_specs(styles) -> Dict[str, Dict[str, Any]]:
+    """NamedStyle definicije iz ReportStyles (fontovi/ispune su zajednički objekti)."""
+    border = styles.THIN_BORDER
+    money = styles.MONEY_FORMAT
+    specs = {
+        "title": {"font": styles.HEADER_FONT},
+        "subtitle": {"font": Font(name="Calibri", bold=True, size=12)},
+        "info": {"font": styles.NORMAL_FONT},
+        "section": {"font": styles.SUBHEADER_FONT},
+        "label": {"font": styles.BOLD_FONT},
+        "header": {"font": styles.HEADER_FONT_WHITE, "fill": styles.HEADER_FILL,
+                   "alignment": Alignment(horizontal="center")},
+        "total": {"font": styles.BOLD_FONT, "fill": styles.TOTAL_FILL},
+        "total_money": {"font": styles.BOLD_FONT, "fill": styles.TOTAL_FILL,
+                        "number_format": money},
+    }
+    # Podatkovne ćelije: normal/bold × obični/alternativni redak × tekst/iznos
+    for weight, font in (("normal", styles.NORMAL_FONT), ("bold", styles.BOLD_FONT)):
+        for alt in ("", "_alt"):
+            for kind, fmt in (("", None), ("_money", money)):
+                spec = {"font": font, "border": border}
+                if alt:
+                    spec["fill"] = styles.ALT_ROW_FILL
+                if fmt:
+                    spec["number_format"] = fmt
+                specs[f"{weight}{kind}{alt}"] = spec
+    return specs
+
+
+class ReportSheet:
+    """Jedan list izvještaja u openpyxl write-only modu."""
+
+    def __init__(self, title: str, styles, money_cols: Sequence[int] = (),
+                 width_sample: int = WIDTH_SAMPLE):
+        if not HAS_OPENPYXL:
+            raise RuntimeError("openpyxl nije instaliran")
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet(title)
+        self.money_cols = set(money_cols)
+        self.width_sample = width_sample
+        self.rows_written = 0
+        self._stats = ColumnWidths(money_cols)
+        self._pending: List[list] = []
+        self._started = False
+        self._streamed = False
+        self._arrays: Dict[str, Any] = {}
+        for name, spec in _style_specs(styles).items():
+            ns = NamedStyle(name=f"nyx_{name}")
+            for attr, obj in spec.items():
+                if obj is not None:
+                    setattr(ns, attr, obj)
+            self.wb.add_named_style(ns)
+            self._arrays[name] = ns.as_tuple()
+
+    # ── Ćelije i redovi ──
+
+    def cell(self, value: Any, style: str, **attrs):
+        """Ćelija sa zajedničkim stilom; attrs (npr. font=...) za pojedinačne iznimke."""
+        c = WriteOnlyCell(self.ws, value=value)
+        c._style = copy(self._arrays[style])
+        for attr, obj in attrs.items():
+            setattr(c, attr, obj)
+        return c
+
+    def row(self, values: Sequence[Any], style: Optional[str] = None,
+            styles: Optional[Sequence[Optional[str]]] = None):
+        """Redak s jednim stilom ili listom stilova po stupcu (None = bez stila / gotova ćelija)."""
+        if styles is None:
+            styles = [style] * len(values)
+        cells = [v if st is None else self.cell(v, st) for v, st in zip(values, styles)]
+        if self._started:
+            self.ws.append(cells)
+        else:
+            self._stats.observe(values)
+            self._pending.append(cells)
+        self.rows_written += 1
+
+    def blank(self):
+        self.row([])
+
+    def data_row(self, values: Sequence[Any], bold: bool = False, alt: bool = False):
+        """Podatkovni redak: obrub, iznosi u money_cols dobivaju MONEY_FORMAT."""
+        self.row(values, styles=self._data_styles(values, bold, alt))
+
+    def _data_styles(self, values: Sequence[Any], bold: bool, alt: bool) -> List[str]:
+        weight = "bold" if bold else "normal"
+        suffix = "_alt" if alt else ""
+        money = self.money_cols
+        return [f"{weight}_money{suffix}" if i in money and isinstance(v, (int, float))
+                else f"{weight}{suffix}" for i, v in enumerate(values)]
+
+    def stream(self, rows: Iterable[Sequence[Any]], alt_rows: bool = True):
+        """
+        Zapiši podatkovne retke iz iterabla/generatora.
+
+        Prvih width_sample redaka ulazi u statistiku širina, zatim se širine
+        fiksiraju i ostatak se piše bez zadržavanja u memoriji.
+        """
+        it = iter(rows)
+        if not self._started:
+            head = list(islice(it, self.width_sample))
+            for values in head:
+                self._stats.observe(values)
+            self._streamed = True
+            self._start()
+            it = chain(head, it)
+
+        ws_append = self.ws.append
+        arrays = self._arrays
+        cell_cls = WriteOnlyCell
+        ws = self.ws
+        styles_cache: Dict[tuple, List[Any]] = {}
+        money = self.money_cols
+        n = 0
+        for n, values in enumerate(it, 1):
+            alt = alt_rows and n % 2 == 0
+            key = (len(values), alt) + tuple(
+                i in money and isinstance(v, (int, float)) for i, v in enumerate(values))
+            row_arrays = styles_cache.get(key)
+            if row_arrays is None:
+                row_arrays = [arrays[s] for s in self._data_styles(values, False, alt)]
+                styles_cache[key] = row_arrays
+            cells = []
+            for v, arr in zip(values, row_arrays):
+                c = cell_cls(ws, value=v)
+                c._style = copy(arr)
+                cells.append(c)
+            ws_append(cells)
+        self.rows_written += n
+
+    def _start(self):
+        if self._started:
+            return
+        widths = self._stats.widths(MONEY_MIN_WIDTH if self._streamed else 0)
+        for i, w in enumerate(widths, 1):
+            self.ws.column_dimensions[get_column_letter(i)].width = w
+        self._started = True
+        for cells in self._pending:
+            self.ws.append(cells)
+        self._pending = []
+
+    def save(self, path: str) -> str:
+        self._start()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.wb.save(path)
+        return path
+
+
+# ════════════════════════════════════════════════════════
+# CSV (najbrži put za velike izvoze)
+# ════════════════════════════════════════════════════════
+
+def write_csv(path: str, headers: Sequence[str], rows: Iterable[Sequence[Any]],
+              preamble: Iterable[Sequence[Any]] = ()) -> int:
+    """
+    Zapiši CSV (";" i utf-8-sig kao _fallback_csv — Excel ga otvara s hrvatskim znakovima).
+
+    Redovi se pišu u blokovima izravno iz iterabla. Vraća broj podatkovnih redaka.
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerows(preamble)
+        w.writerow(headers)
+        it: Iterator = iter(rows)
+        while True:
+            block = list(islice(it, 10000))
+            if not block:
+                break
+            w.writerows(block)
+            n += len(block)
+    return n
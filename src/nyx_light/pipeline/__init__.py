@@ -593,6 +593,34 @@ class BookingPipeline:
             source_module="osnovna_sredstva",
         )
 
+    def from_depreciation_batch(self, posting: Dict, client_id: str,
+                                erp: str = "CPP") -> BookingProposal:
+        """Amortizacija cijelog mjeseca (A7) kao jedan prijedlog.
+
+        ``posting`` je rezultat OsnovnaSredstvaEngine.prepare_monthly_posting;
+        trošak ide na 5300, ispravak zbirno po kontu ispravka.
+        """
+        period = posting["period"]
+        n = len(posting["stavke"])
+        lines = [{"konto": "5300", "strana": "duguje", "iznos": posting["ukupno"],
+                  "opis": f"Amortizacija {period} ({n} sredstava)"}]
+        for konto, iznos in posting["po_kontu"].items():
+            lines.append({"konto": konto, "strana": "potrazuje", "iznos": iznos,
+                          "opis": f"Ispravak vrijednosti {period}"})
+        return BookingProposal(
+            client_id=client_id,
+            document_type=DocumentType.AMORTIZACIJA.value,
+            erp_target=erp,
+            lines=lines,
+            datum_dokumenta=posting.get("datum", ""),
+            broj_dokumenta=f"AM-{period}",
+            opis=f"Mjesečna amortizacija {period}: {n} sredstava",
+            ukupni_iznos=posting["ukupno"],
+            confidence=0.99,
+            ai_reasoning="Linearna amortizacija prema Pravilniku o amortizaciji (plan iz registra OS)",
+            source_module="osnovna_sredstva",
+        )
+
     def from_ios(self, ios_data: Dict, client_id: str,
                  erp: str = "CPP") -> BookingProposal:
         """Pretvori IOS razliku (A9) u BookingProposal."""
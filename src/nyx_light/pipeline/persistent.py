@@ -70,12 +70,17 @@ class PersistentPipeline:
                 "erp_target": proposal.erp_target,
             })
 
-        # Also save the aggregate
+        # Also save the aggregate (s PDV podacima — izvor za PPO agregaciju)
         self.db.save_booking({
             "id": result["id"],
             "client_id": proposal.client_id,
             "document_type": proposal.document_type,
             "iznos": proposal.ukupni_iznos,
+            "pdv_stopa": proposal.pdv_stopa,
+            "pdv_iznos": proposal.pdv_iznos,
+            "osnovica": proposal.osnovica,
+            "oib": proposal.oib_partnera,
+            "datum_dokumenta": proposal.datum_dokumenta,
             "opis": proposal.opis,
             "status": "pending",
             "confidence": proposal.confidence,
@@ -1,4 +1,5 @@
 """Safety and hard boundaries."""
+from .keyword_automaton import KeywordAutomaton, fold_text
 from .overseer import AccountingOverseer
 
-__all__ = ["AccountingOverseer"]
+__all__ = ["AccountingOverseer", "KeywordAutomaton", "fold_text"]
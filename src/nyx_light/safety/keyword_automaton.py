@@ -0,0 +1,120 @@
+"""
+Nyx Light — Aho–Corasick automat za sigurnosne ključne riječi
+
+Sve liste ključnih riječi (kategorija → fraze) kompiliraju se u jedan
+automat; tekst se prođe jednom i vrate se svi pogoci po kategorijama.
+Tekst i fraze se prije uspoređivanja svode na mala slova bez dijakritika
+(č/ć→c, ž→z, š→s, đ→d), pa "tuzba" i "tužba" daju isti pogodak.
+
+Podudaranje je po podnizu (kao dosadašnji ``in``), uključujući
+preklapanja: "otkaz radniku" daje i "otkaz" i "otkaz radniku".
+
+Prijelaz DFA-a preko cijele riječi (stanje, " riječ") se pamti: poruke
+koriste mali rječnik (račun, konto, PDV…), pa je prolaz većinom jedan
+dict lookup po riječi umjesto petlje po znakovima.
+"""
+
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger("nyx_light.safety.keyword_automaton")
+
+_FOLD = (("č", "c"), ("ć", "c"), ("ž", "z"), ("š", "s"), ("đ", "d"))
+WORD_CACHE_SIZE = 100_000      # pamćenih prijelaza (stanje, riječ) prije pražnjenja
+
+
+def fold_text(text: str) -> str:
+    """Mala slova bez hrvatskih dijakritika (replace je brži od translate)."""
+    text = text.lower()
+    if not text.isascii():
+        for src, dst in _FOLD:
+            text = text.replace(src, dst)
+    return text
+
+
+class KeywordAutomaton:
+    """Jedan prolaz kroz tekst → svi pogoci svih kategorija."""
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        # Fraza može biti u više kategorija (npr. "tužb") — id po (kategorija, fraza)
+        self._phrases: List[Tuple[str, str]] = [
+            (category, phrase) for category, phrases in categories.items()
+            for phrase in phrases if phrase
+        ]
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for pid, (_, phrase) in enumerate(self._phrases):
+            state = 0
+            for ch in fold_text(phrase):
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    out.append([])
+                    goto[state][ch] = nxt
+                state = nxt
+            out[state].append(pid)
+
+        # Failure linkovi (BFS), zatim potpuni DFA: delta[s][ch] bez vraćanja
+        fail = [0] * len(goto)
+        delta = [dict(g) for g in goto]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                out[nxt] = out[nxt] + out[fail[nxt]]
+            for ch, nxt in delta[fail[state]].items():
+                delta[state].setdefault(ch, nxt)
+
+        self._delta = delta
+        self._out = out
+        self._terminal = frozenset(s for s, o in enumerate(out) if o)
+        self._words: List[Dict[str, Tuple[int, Tuple[int, ...]]]] = [{} for _ in delta]
+        self._cached = 0
+        logger.debug("KeywordAutomaton: %d fraza, %d stanja",
+                     len(self._phrases), len(delta))
+
+    def _step(self, state: int, chunk: str) -> Tuple[int, Tuple[int, ...]]:
+        """Prijelaz preko niza znakova → (novo stanje, posjećena završna stanja)."""
+        delta, terminal = self._delta, self._terminal
+        ends: Tuple[int, ...] = ()
+        for ch in chunk:
+            state = delta[state].get(ch, 0)
+            if state in terminal:
+                ends += (state,)
+        return state, ends
+
+    def _end_states(self, text: str) -> set:
+        words = fold_text(text).split(" ")
+        state, found = self._step(0, words[0])
+        ends = set(found)
+        cache = self._words
+        for word in words[1:]:
+            hit = cache[state].get(word)
+            if hit is None:
+                if self._cached >= WORD_CACHE_SIZE:
+                    self._words = cache = [{} for _ in self._delta]
+                    self._cached = 0
+                hit = cache[state][word] = self._step(state, " " + word)
+                self._cached += 1
+            state, found = hit
+            if found:
+                ends.update(found)
+        return ends
+
+    def scan(self, text: str) -> Dict[str, List[str]]:
+        """Kategorija → pogođene fraze (redom kako su navedene u listi)."""
+        ends = self._end_states(text)
+        if not ends:
+            return {}
+        hits: Dict[str, List[str]] = {}
+        for pid in sorted({pid for s in ends for pid in self._out[s]}):
+            category, phrase = self._phrases[pid]
+            hits.setdefault(category, []).append(phrase)
+        return hits
+
+    def __len__(self) -> int:
+        return len(self._phrases)
@@ -11,12 +11,18 @@ Refinirana granica (per TENA BE Faza 1):
   bolovanje, vrste ugovora za kalkulaciju). ZABRANJENO kad je pravni
   savjet (sporovi, tužbe, ugovorno savjetovanje).
 
+Sve liste ključnih riječi kompiliraju se u jedan Aho–Corasick automat
+(KeywordAutomaton): poruka se prođe jednom, bez obzira na dijakritike,
+a odluka se donosi nad skupom pogodaka po kategorijama.
+
 Adapted from Nyx 47.0 OverseerSafetyMesh.
 """
 
 import logging
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from .keyword_automaton import KeywordAutomaton
 
 logger = logging.getLogger("nyx_light.safety")
 
@@ -66,6 +72,19 @@ WARNING_KEYWORDS = [
     "pošalji u CPP", "pošalji u Synesis",  # bez odobrenja
 ]
 
+# Indikatori da je radno-pravni pojam dio obračuna plaće
+PAYROLL_INDICATORS = [
+    "obračun", "plaća", "neto", "bruto", "doprinos",
+    "JOPPD", "isplata", "naknada", "kalkulacija",
+]
+
+CLOUD_KEYWORDS = ["openai", "anthropic", "chatgpt", "cloud api", "external api"]
+
+# Opis prijedloga knjiženja — pojmovi koji traže upozorenje
+BOOKING_KEYWORDS = {
+    "reprezentacija": ["reprezentacij"],     # reprezentacija, -e, -i …
+}
+
 
 class AccountingOverseer:
     """
@@ -77,6 +96,15 @@ class AccountingOverseer:
     def __init__(self):
         self._evaluations = 0
         self._blocks = 0
+        self._gate = KeywordAutomaton({
+            "labor_law": RADNO_PRAVO_ALWAYS_FORBIDDEN,
+            "payroll_context": RADNO_PRAVO_PAYROLL_CONTEXT,
+            "payroll_indicator": PAYROLL_INDICATORS,
+            "legal_domain": FORBIDDEN_DOMAINS,
+            "autonomous_booking": WARNING_KEYWORDS,
+            "privacy": CLOUD_KEYWORDS,
+        })
+        self._booking_gate = KeywordAutomaton(BOOKING_KEYWORDS)
         logger.info("AccountingOverseer inicijaliziran s 3 tvrde granice")
 
     def evaluate(self, content: str, action_type: str = "query") -> Dict[str, Any]:
@@ -87,83 +115,64 @@ class AccountingOverseer:
             {approved: bool, reason: str, hard_boundary: bool}
         """
         self._evaluations += 1
-        content_lower = content.lower()
+        hits = self._gate.scan(content)
 
         # ── PROVJERA: Radno pravo — uvijek zabranjeno ──
-        for forbidden_rp in RADNO_PRAVO_ALWAYS_FORBIDDEN:
-            if forbidden_rp in content_lower:
-                self._blocks += 1
-                return {
-                    "approved": False,
-                    "reason": (
-                        f"⛔ TVRDA GRANICA: Upit o '{forbidden_rp}' zahtijeva "
-                        "pravnog stručnjaka. Nyx Light pokriva isključivo "
-                        "računovodstveni i porezni aspekt radnog odnosa."
-                    ),
-                    "hard_boundary": True,
-                    "boundary_type": "labor_law",
-                }
-
-        # ── PROVJERA: Je li ovo radno pravo u payroll kontekstu? ──
-        is_payroll_context = any(
-            kw in content_lower for kw in RADNO_PRAVO_PAYROLL_CONTEXT
-        )
-        payroll_indicators = [
-            "obračun", "plaća", "neto", "bruto", "doprinos",
-            "JOPPD", "isplata", "naknada", "kalkulacija",
-        ]
-        has_payroll_indicator = any(
-            ind.lower() in content_lower for ind in payroll_indicators
-        )
+        if "labor_law" in hits:
+            self._blocks += 1
+            return {
+                "approved": False,
+                "reason": (
+                    f"⛔ TVRDA GRANICA: Upit o '{hits['labor_law'][0]}' zahtijeva "
+                    "pravnog stručnjaka. Nyx Light pokriva isključivo "
+                    "računovodstveni i porezni aspekt radnog odnosa."
+                ),
+                "hard_boundary": True,
+                "boundary_type": "labor_law",
+            }
 
         # ── TVRDA GRANICA 1: Zabrana pravnog savjetovanja ──
-        for forbidden in FORBIDDEN_DOMAINS:
-            if forbidden in content_lower:
-                # Iznimka: ako je payroll kontekst, dopusti radno-pravne pojmove
-                if is_payroll_context and has_payroll_indicator:
-                    continue  # Dopusti — kontekst je obračun
-                
-                self._blocks += 1
-                return {
-                    "approved": False,
-                    "reason": (
-                        f"⛔ TVRDA GRANICA: Upit se odnosi na '{forbidden}' "
-                        "što je izvan domene računovodstva. "
-                        "Molimo obratite se odgovarajućem stručnjaku — "
-                        "Nyx Light ne pruža pravne savjete."
-                    ),
-                    "hard_boundary": True,
-                    "boundary_type": "legal_domain",
-                }
+        # Iznimka: radno-pravni pojmovi u kontekstu obračuna plaće
+        is_payroll = "payroll_context" in hits and "payroll_indicator" in hits
+        if "legal_domain" in hits and not is_payroll:
+            self._blocks += 1
+            return {
+                "approved": False,
+                "reason": (
+                    f"⛔ TVRDA GRANICA: Upit se odnosi na '{hits['legal_domain'][0]}' "
+                    "što je izvan domene računovodstva. "
+                    "Molimo obratite se odgovarajućem stručnjaku — "
+                    "Nyx Light ne pruža pravne savjete."
+                ),
+                "hard_boundary": True,
+                "boundary_type": "legal_domain",
+            }
 
         # ── TVRDA GRANICA 2: Zabrana autonomnog knjiženja ──
-        for warning in WARNING_KEYWORDS:
-            if warning in content_lower:
-                self._blocks += 1
-                return {
-                    "approved": False,
-                    "reason": (
-                        "⛔ TVRDA GRANICA: Zahtjev za autonomno knjiženje. "
-                        "Svako knjiženje MORA biti odobreno klikom 'Odobri' "
-                        "od strane računovođe. Human-in-the-Loop je obavezan."
-                    ),
-                    "hard_boundary": True,
-                    "boundary_type": "autonomous_booking",
-                }
+        if "autonomous_booking" in hits:
+            self._blocks += 1
+            return {
+                "approved": False,
+                "reason": (
+                    "⛔ TVRDA GRANICA: Zahtjev za autonomno knjiženje. "
+                    "Svako knjiženje MORA biti odobreno klikom 'Odobri' "
+                    "od strane računovođe. Human-in-the-Loop je obavezan."
+                ),
+                "hard_boundary": True,
+                "boundary_type": "autonomous_booking",
+            }
 
         # ── TVRDA GRANICA 3: Cloud API zabrana ──
-        cloud_keywords = ["openai", "anthropic", "chatgpt", "cloud api", "external api"]
-        for kw in cloud_keywords:
-            if kw in content_lower:
-                return {
-                    "approved": False,
-                    "reason": (
-                        "⛔ TVRDA GRANICA: Pristup cloud API-jima je zabranjen. "
-                        "Svi podaci (OIB, plaće, poslovne tajne) moraju ostati 100% lokalno."
-                    ),
-                    "hard_boundary": True,
-                    "boundary_type": "privacy",
-                }
+        if "privacy" in hits:
+            return {
+                "approved": False,
+                "reason": (
+                    "⛔ TVRDA GRANICA: Pristup cloud API-jima je zabranjen. "
+                    "Svi podaci (OIB, plaće, poslovne tajne) moraju ostati 100% lokalno."
+                ),
+                "hard_boundary": True,
+                "boundary_type": "privacy",
+            }
 
         # Odobreno
         return {
@@ -193,7 +202,7 @@ class AccountingOverseer:
                 )
 
         # Provjera reprezentacije
-        if "reprezentacija" in str(booking.get("opis", "")).lower():
+        if "reprezentacija" in self._booking_gate.scan(str(booking.get("opis", ""))):
             warnings.append(
                 "⚠️ Troškovi reprezentacije — porezno nepriznati iznad limita. "
                 "Provjeriti primjenjivost odbitka."
@@ -205,6 +214,10 @@ class AccountingOverseer:
             "requires_approval": True,  # UVIJEK
         }
 
+    def scan(self, content: str) -> Dict[str, List[str]]:
+        """Svi pogoci sigurnosnih ključnih riječi po kategoriji (bez odluke)."""
+        return self._gate.scan(content)
+
     def get_stats(self) -> Dict[str, Any]:
         return {
             "evaluations": self._evaluations,
@@ -3,8 +3,9 @@ Nyx Light — Scheduler (Noćni zadaci)
 
 Automatski pokreće noćne zadatke:
   - 02:00 — Nightly DPO training
+  - 02:30 — Arhiviranje zatvorenih mjeseci audit traga
   - 03:00 — Automatski backup
-  - 04:00 — Provjera ažuriranja zakona
+  - 04:00 — Zagrijavanje n-gram cachea (prefiksni trie) i spremanje na disk
   - 05:00 — Čišćenje starih log-ova
 """
 
@@ -112,7 +113,8 @@ class NyxScheduler:
         }
 
 
-def setup_default_scheduler(dpo_trainer=None, backup_manager=None) -> NyxScheduler:
+def setup_default_scheduler(dpo_trainer=None, backup_manager=None,
+                            audit_archive=None, ngram_warmer=None) -> NyxScheduler:
     """Kreiraj scheduler s default noćnim zadacima."""
     scheduler = NyxScheduler()
 
@@ -120,9 +122,19 @@ def setup_default_scheduler(dpo_trainer=None, backup_manager=None) -> NyxSchedul
         scheduler.add_task("nightly_dpo", hour=2, minute=0,
                           func=dpo_trainer.train_nightly)
 
+    # Prije backupa: zatvoreni mjeseci iz vrućih baza → komprimirani segmenti
+    if audit_archive:
+        scheduler.add_task("audit_archive", hour=2, minute=30,
+                          func=audit_archive.roll)
+
     if backup_manager:
         scheduler.add_task("nightly_backup", hour=3, minute=0,
-                          func=lambda: backup_manager.create_backup("nightly"))
+                          func=lambda: backup_manager.create_backup(
+                              "nightly", mode="incremental"))
+
+    # Nakon DPO-a: n-gram trie za speculative drafting iz novih odobrenih odgovora
+    if ngram_warmer:
+        scheduler.add_task("ngram_prewarm", hour=4, minute=0, func=ngram_warmer)
 
     # Cleanup old logs
     def cleanup_logs():
@@ -552,6 +552,8 @@ class TokenManager:
     def __init__(self, secret_key: str = ""):
         self.secret = secret_key or secrets.token_hex(32)
         self._tokens: Dict[str, Dict] = {}
+        # token → unix exp (bez parsiranja ISO datuma pri svakoj validaciji)
+        self._expiry: Dict[str, float] = {}
 
     def create_token(self, user: UserAccount, ip: str = "") -> str:
         """Kreiraj session token za korisnika."""
@@ -568,31 +570,33 @@ class TokenManager:
             "expires_at": expires.isoformat(),
             "ip": ip,
         }
+        self._expiry[token] = expires.timestamp()
         return token
 
     def validate_token(self, token: str) -> Optional[Dict]:
         """Validiraj token. Vraća user info ili None."""
-        data = self._tokens.get(token)
-        if not data:
+        exp = self._expiry.get(token)
+        if exp is None:
             return None
-        if datetime.now() > datetime.fromisoformat(data["expires_at"]):
-            del self._tokens[token]
+        if time.time() > exp:
+            self.revoke_token(token)
             return None
-        return data
+        return self._tokens.get(token)
 
     def revoke_token(self, token: str):
         self._tokens.pop(token, None)
+        self._expiry.pop(token, None)
 
     def revoke_user_tokens(self, username: str):
         to_remove = [t for t, d in self._tokens.items() if d["username"] == username]
         for t in to_remove:
-            del self._tokens[t]
+            self.revoke_token(t)
 
     def active_sessions(self, include_hidden: bool = False) -> List[Dict]:
-        now = datetime.now()
+        now = time.time()
         active = []
         for token, data in list(self._tokens.items()):
-            if now < datetime.fromisoformat(data["expires_at"]):
+            if now < self._expiry.get(token, 0):
                 # Sakrij super_admin sesije od običnih korisnika
                 if not include_hidden and data["role"] == "super_admin":
                     continue
@@ -489,6 +489,14 @@ class UMAController:
         else:
             return PressureLevel.EMERGENCY
 
+    def budget_bytes(self, region_type: MemoryRegionType) -> int:
+        """Total byte budget for a region type."""
+        return int(self.total_bytes * self._budgets.get(region_type, 0))
+
+    def get_region(self, region_id: str) -> Optional[MemoryRegion]:
+        """Tracked region or None (released or evicted)."""
+        return self._regions.get(region_id)
+
     def budget_remaining_gb(self, region_type: MemoryRegionType) -> float:
         budget_bytes = int(self.total_bytes * self._budgets.get(region_type, 0))
         used = sum(
@@ -929,6 +937,11 @@ class SiliconRuntime:
         """Reset singleton (for testing)."""
         cls._instance = None
 
+    def batch_decision(self) -> BatchConfig:
+        """Live batch size / max tokens from current pressure & thermal (no full snapshot)."""
+        mem = read_memory_pressure()
+        return self.batch_controller.compute(mem.pressure_level, read_thermal_state())
+
     def health_check(self) -> Dict[str, Any]:
         """Complete health snapshot."""
         mem = read_memory_pressure()
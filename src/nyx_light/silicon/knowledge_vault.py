@@ -74,6 +74,7 @@ import shutil
 import sqlite3
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
@@ -101,6 +102,19 @@ KNOWLEDGE_PATHS = [
     "config.json",           # Configuration
 ]
 
+# Manifest hashing
+HASH_ALGORITHMS = ("sha256", "blake2b")       # blake2b wins on CPUs without SHA extensions
+HASH_CHUNK_BYTES = 1 << 20                    # 1 MiB buffered reads
+PARALLEL_HASH_MIN_BYTES = 8 << 20             # below this, threads cost more than they save
+HASH_WORKERS = min(8, os.cpu_count() or 1)    # hashlib releases the GIL during update()
+
+# (path, size, mtime, inode) → hash cache. Must live OUTSIDE KNOWLEDGE_PATHS,
+# otherwise every verify would change a file covered by the next manifest.
+HASH_CACHE_PATH = "data/models/manifest_hash_cache.json"
+# Files modified this recently are not cached (mtime granularity: a second
+# write within the same tick would keep size + mtime and go unnoticed)
+RACY_MTIME_S = 2.0
+
 # Minimum DPO pairs needed before retraining
 MIN_DPO_PAIRS_FOR_RETRAIN = 10
 
@@ -162,15 +176,22 @@ class IntegrityManifest:
 
     Created before model swap, verified after.
     Any mismatch = ROLLBACK.
+
+    dir_hashes/merkle_root form a Merkle tree over file_hashes, so
+    verification only compares files in directories whose hash changed.
+    Manifests without a root (older JSON) are verified file by file.
     """
     manifest_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
     created_at: str = field(
         default_factory=lambda: datetime.now(timezone.utc).isoformat()
     )
     base_dir: str = ""
-    file_hashes: Dict[str, str] = field(default_factory=dict)  # path → sha256
+    file_hashes: Dict[str, str] = field(default_factory=dict)  # path → digest
     total_files: int = 0
     total_size_bytes: int = 0
+    algorithm: str = "sha256"
+    dir_hashes: Dict[str, str] = field(default_factory=dict)   # dir → Merkle hash
+    merkle_root: str = ""
 
     def to_json(self) -> str:
         return json.dumps({
@@ -179,6 +200,9 @@ class IntegrityManifest:
             "base_dir": self.base_dir,
             "total_files": self.total_files,
             "total_size_bytes": self.total_size_bytes,
+            "algorithm": self.algorithm,
+            "merkle_root": self.merkle_root,
+            "dir_hashes": self.dir_hashes,
             "file_hashes": self.file_hashes,
         }, indent=2, ensure_ascii=False)
 
@@ -255,8 +279,25 @@ class KnowledgeVault:
       6. Complete audit trail of every operation
     """
 
-    def __init__(self, base_dir: str = "."):
+    def __init__(
+        self,
+        base_dir: str = ".",
+        hash_algorithm: str = "sha256",
+        hash_workers: int = HASH_WORKERS,
+        use_hash_cache: bool = True,
+    ):
+        if hash_algorithm not in HASH_ALGORITHMS:
+            raise ValueError(
+                f"Unsupported hash algorithm {hash_algorithm!r}, "
+                f"expected one of {HASH_ALGORITHMS}"
+            )
         self.base_dir = Path(base_dir)
+        self.hash_algorithm = hash_algorithm
+        self.hash_workers = max(1, hash_workers)
+        self.use_hash_cache = use_hash_cache
+        self.last_hash_stats: Dict[str, Any] = {}
+        self._hash_cache: Optional[Dict[str, list]] = None
+        self._hash_cache_dirty = False
         self._adapter_registry: Dict[str, AdapterRecord] = {}
         self._swap_history: List[SwapLog] = []
         self._ensure_paths()
@@ -318,54 +359,90 @@ class KnowledgeVault:
     # ──────────────────────────────────────────────────────
 
     def create_manifest(self) -> IntegrityManifest:
-        """Create SHA-256 manifest of all knowledge files.
+        """Create a hash manifest (+ Merkle tree) of all knowledge files.
 
         This is the cryptographic snapshot taken BEFORE a model swap.
         After swap, verify_manifest() checks nothing was corrupted.
+        Files unchanged since the last manifest (same size, mtime and
+        inode) reuse their cached hash; the rest are hashed in parallel.
         """
-        manifest = IntegrityManifest(base_dir=str(self.base_dir))
+        manifest = IntegrityManifest(
+            base_dir=str(self.base_dir), algorithm=self.hash_algorithm
+        )
+        rel_paths = self._knowledge_files()
+        current = self._hash_paths(rel_paths, self.hash_algorithm)
+
         total_size = 0
+        for rel in rel_paths:
+            entry = current[rel]
+            if entry is None:  # Vanished between listing and hashing
+                logger.warning("Manifest: %s disappeared, skipped", rel)
+                continue
+            manifest.file_hashes[rel] = entry[1]
+            total_size += entry[0]
+        manifest.total_files = len(manifest.file_hashes)
+        manifest.total_size_bytes = total_size
 
-        for kp in KNOWLEDGE_PATHS:
-            path = self.base_dir / kp
-            if path.is_file():
-                h = _sha256_file(path)
-                manifest.file_hashes[kp] = h
-                manifest.total_files += 1
-                total_size += path.stat().st_size
-            elif path.is_dir():
-                for f in sorted(path.rglob("*")):
-                    if f.is_file():
-                        rel = str(f.relative_to(self.base_dir))
-                        h = _sha256_file(f)
-                        manifest.file_hashes[rel] = h
-                        manifest.total_files += 1
-                        total_size += f.stat().st_size
+        tree = _merkle_tree(manifest.file_hashes, manifest.algorithm)
+        manifest.merkle_root = tree.pop("")
+        manifest.dir_hashes = tree
 
-        manifest.total_size_bytes = total_size
+        self._prune_hash_cache(manifest.file_hashes)
+        self._save_hash_cache()
         logger.info(
-            "Manifest %s: %d files, %.1f MB",
+            "Manifest %s: %d files, %.1f MB (%d re-hashed, %.1f MB read, %.2fs)",
             manifest.manifest_id,
             manifest.total_files,
             total_size / (1024 * 1024),
+            self.last_hash_stats["rehashed"],
+            self.last_hash_stats["rehashed_bytes"] / (1024 * 1024),
+            self.last_hash_stats["seconds"],
         )
         return manifest
 
-    def verify_manifest(self, manifest: IntegrityManifest) -> Tuple[bool, List[str]]:
+    def verify_manifest(
+        self, manifest: IntegrityManifest, rehash: bool = False
+    ) -> Tuple[bool, List[str]]:
         """Verify knowledge integrity against a manifest.
 
-        Returns (all_ok, list_of_mismatches).
+        Returns (all_ok, list_of_mismatches). Every manifest file is hashed
+        (unchanged ones come from the stat cache); the Merkle tree then only
+        narrows the comparison: equal roots → done, otherwise only files in
+        directories whose hash differs are compared.
+        rehash=True ignores the stat cache and reads every file again.
         """
+        current = self._hash_paths(
+            list(manifest.file_hashes), manifest.algorithm, rehash=rehash
+        )
+        self._save_hash_cache()
+
+        suspects = manifest.file_hashes.keys()
+        if manifest.merkle_root:
+            tree = _merkle_tree(
+                {rel: e[1] for rel, e in current.items() if e is not None},
+                manifest.algorithm,
+            )
+            if tree.pop("") == manifest.merkle_root:
+                suspects = ()
+            else:
+                # Root differs → root-level files (config.json, ...) are suspects too
+                changed_dirs = {""} | {
+                    d for d, h in manifest.dir_hashes.items() if tree.get(d) != h
+                }
+                suspects = [
+                    rel for rel in manifest.file_hashes
+                    if rel.rpartition("/")[0] in changed_dirs
+                ]
+
         mismatches = []
-        for rel_path, expected_hash in manifest.file_hashes.items():
-            full_path = self.base_dir / rel_path
-            if not full_path.exists():
+        for rel_path in suspects:
+            expected_hash = manifest.file_hashes[rel_path]
+            entry = current[rel_path]
+            if entry is None:
                 mismatches.append(f"MISSING: {rel_path}")
-                continue
-            actual_hash = _sha256_file(full_path)
-            if actual_hash != expected_hash:
+            elif entry[1] != expected_hash:
                 mismatches.append(
-                    f"CHANGED: {rel_path} (expected {expected_hash[:12]}... got {actual_hash[:12]}...)"
+                    f"CHANGED: {rel_path} (expected {expected_hash[:12]}... got {entry[1][:12]}...)"
                 )
 
         if mismatches:
@@ -375,11 +452,108 @@ class KnowledgeVault:
             )
         else:
             logger.info(
-                "Knowledge integrity check PASSED: %d files verified",
-                manifest.total_files
+                "Knowledge integrity check PASSED: %d files verified (%d re-hashed)",
+                manifest.total_files,
+                self.last_hash_stats["rehashed"],
             )
         return len(mismatches) == 0, mismatches
 
+    def _knowledge_files(self) -> List[str]:
+        """All files under KNOWLEDGE_PATHS, relative to base_dir."""
+        rel_paths = []
+        for kp in KNOWLEDGE_PATHS:
+            path = self.base_dir / kp
+            if path.is_file():
+                rel_paths.append(kp)
+            elif path.is_dir():
+                for f in sorted(path.rglob("*")):
+                    if f.is_file():
+                        rel_paths.append(f.relative_to(self.base_dir).as_posix())
+        return rel_paths
+
+    def _hash_paths(
+        self, rel_paths: List[str], algorithm: str, rehash: bool = False
+    ) -> Dict[str, Optional[Tuple[int, str]]]:
+        """rel path → (size, digest), None if the file is missing.
+
+        A cache entry is reused only if algorithm, size, mtime and inode
+        all match; everything else is hashed (in parallel for large sets).
+        """
+        t0 = time.perf_counter()
+        cache = self._load_hash_cache()
+        now = time.time()
+        result: Dict[str, Optional[Tuple[int, str]]] = {}
+        todo: List[Tuple[str, Tuple[int, int, int], bool]] = []
+
+        for rel in rel_paths:
+            try:
+                st = os.stat(self.base_dir / rel)
+            except OSError:
+                result[rel] = None
+                continue
+            key = (st.st_size, st.st_mtime_ns, st.st_ino)
+            entry = cache.get(rel)
+            if not rehash and entry and entry[0] == algorithm and tuple(entry[1:4]) == key:
+                result[rel] = (st.st_size, entry[4])
+            else:
+                todo.append((rel, key, now - st.st_mtime_ns / 1e9 > RACY_MTIME_S))
+
+        digests = _hash_files(
+            [(self.base_dir / rel, key[0]) for rel, key, _ in todo],
+            algorithm,
+            self.hash_workers,
+        )
+        for (rel, key, stable), digest in zip(todo, digests):
+            if digest is None:
+                result[rel] = None
+                continue
+            result[rel] = (key[0], digest)
+            if stable and self.use_hash_cache:
+                cache[rel] = [algorithm, *key, digest]
+                self._hash_cache_dirty = True
+
+        self.last_hash_stats = {
+            "files": len(rel_paths),
+            "rehashed": len(todo),
+            "rehashed_bytes": sum(key[0] for _, key, _ in todo),
+            "seconds": round(time.perf_counter() - t0, 3),
+        }
+        return result
+
+    def _load_hash_cache(self) -> Dict[str, list]:
+        """Lazy-load the stat → hash cache (empty if disabled or unreadable)."""
+        if self._hash_cache is None:
+            self._hash_cache = {}
+            cache_path = self.base_dir / HASH_CACHE_PATH
+            if self.use_hash_cache and cache_path.exists():
+                try:
+                    data = json.loads(cache_path.read_text())
+                    if data.get("version") == 1:
+                        self._hash_cache = data.get("entries", {})
+                except Exception as e:
+                    logger.warning("Failed to load manifest hash cache: %s", e)
+        return self._hash_cache
+
+    def _prune_hash_cache(self, live: Dict[str, str]):
+        """Drop cache entries for files that no longer exist."""
+        cache = self._load_hash_cache()
+        stale = [rel for rel in cache if rel not in live]
+        for rel in stale:
+            del cache[rel]
+        if stale:
+            self._hash_cache_dirty = True
+
+    def _save_hash_cache(self):
+        """Persist the hash cache atomically (tmp file + rename)."""
+        if not (self.use_hash_cache and self._hash_cache_dirty):
+            return
+        cache_path = self.base_dir / HASH_CACHE_PATH
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": 1, "entries": self._hash_cache}))
+        os.replace(tmp, cache_path)
+        self._hash_cache_dirty = False
+
     # ──────────────────────────────────────────────────────
     # LoRA ADAPTER MANAGEMENT
     # ──────────────────────────────────────────────────────
@@ -509,24 +683,43 @@ class KnowledgeVault:
         DPO pairs are MODEL-INDEPENDENT — they contain:
           {prompt, chosen_response, rejected_response}
         So they can train ANY model's LoRA adapter.
+        Streams line by line; pairs repeated across nightly datasets
+        (same prompt/chosen/rejected content) are written once.
         """
+        from nyx_light.memory.dpo import dpo_content_key
+
         dpo_dir = self.base_dir / "data/dpo_datasets"
         if not dpo_dir.exists():
             return None
 
         export_path = dpo_dir / f"retrain_export_{int(time.time())}.jsonl"
         pair_count = 0
+        duplicates = 0
+        seen: Set[bytes] = set()
 
-        with open(export_path, "w") as out:
+        with open(export_path, "w", buffering=1024 * 1024) as out:
             for f in sorted(dpo_dir.glob("*.jsonl")):
                 if f.name.startswith("retrain_export"):
                     continue
                 with open(f) as fh:
                     for line in fh:
                         line = line.strip()
-                        if line:
-                            out.write(line + "\n")
-                            pair_count += 1
+                        if not line:
+                            continue
+                        try:
+                            d = json.loads(line)
+                            key = dpo_content_key(
+                                d["prompt"], d["chosen"], d["rejected"]
+                            )
+                        except (ValueError, KeyError, TypeError, AttributeError):
+                            key = None  # Unknown format → copy as-is
+                        if key is not None:
+                            if key in seen:
+                                duplicates += 1
+                                continue
+                            seen.add(key)
+                        out.write(line + "\n")
+                        pair_count += 1
 
         if pair_count < MIN_DPO_PAIRS_FOR_RETRAIN:
             export_path.unlink(missing_ok=True)
@@ -537,8 +730,8 @@ class KnowledgeVault:
             return None
 
         logger.info(
-            "Exported %d DPO pairs to %s for retraining",
-            pair_count, export_path
+            "Exported %d DPO pairs to %s for retraining (%d duplicates skipped)",
+            pair_count, export_path, duplicates
         )
         return str(export_path)
 
@@ -880,15 +1073,75 @@ class KnowledgeVault:
 # HELPER FUNCTIONS
 # ══════════════════════════════════════════════════════════════
 
-def _sha256_file(path: Path) -> str:
-    """Compute SHA-256 hash of a file."""
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
-            h.update(chunk)
+def _hash_file(path: Path, algorithm: str = "sha256") -> str:
+    """Hash a file with 1 MiB buffered reads (no per-chunk allocation)."""
+    h = hashlib.new(algorithm)
+    buf = bytearray(HASH_CHUNK_BYTES)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buf):
+            h.update(view[:n])
     return h.hexdigest()
 
 
+def _hash_files(
+    files: List[Tuple[Path, int]], algorithm: str, workers: int = HASH_WORKERS
+) -> List[Optional[str]]:
+    """Hash (path, size) pairs, in input order; None for unreadable files.
+
+    Large sets go to a thread pool, biggest files first so one huge
+    adapter does not start last and dominate the wall time.
+    """
+    def one(path: Path) -> Optional[str]:
+        try:
+            return _hash_file(path, algorithm)
+        except OSError as e:
+            logger.warning("Cannot hash %s: %s", path, e)
+            return None
+
+    total = sum(size for _, size in files)
+    if workers <= 1 or len(files) < 2 or total < PARALLEL_HASH_MIN_BYTES:
+        return [one(path) for path, _ in files]
+
+    order = sorted(range(len(files)), key=lambda i: -files[i][1])
+    digests: List[Optional[str]] = [None] * len(files)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nyx-hash") as pool:
+        futures = {i: pool.submit(one, files[i][0]) for i in order}
+        for i, fut in futures.items():
+            digests[i] = fut.result()
+    return digests
+
+
+def _merkle_tree(file_hashes: Dict[str, str], algorithm: str = "sha256") -> Dict[str, str]:
+    """Directory → Merkle hash over its sorted children ("" = root).
+
+    A directory hash covers names and hashes of its files and
+    subdirectories, so equal hashes mean identical subtrees.
+    """
+    children: Dict[str, Dict[str, Optional[str]]] = {"": {}}
+    for rel, digest in file_hashes.items():
+        parent, _, name = rel.rpartition("/")
+        children.setdefault(parent, {})[name] = "f" + digest
+        while parent:
+            grand, _, dir_name = parent.rpartition("/")
+            siblings = children.setdefault(grand, {})
+            if dir_name in siblings:
+                break
+            siblings[dir_name] = None  # Subdirectory, filled bottom-up
+            parent = grand
+
+    hashes: Dict[str, str] = {}
+    for d in sorted(children, key=lambda p: p.count("/") + bool(p), reverse=True):
+        h = hashlib.new(algorithm)
+        for name in sorted(children[d]):
+            value = children[d][name]
+            if value is None:
+                value = "d" + hashes[f"{d}/{name}" if d else name]
+            h.update(f"{name}\0{value}\n".encode())
+        hashes[d] = h.hexdigest()
+    return hashes
+
+
 def _safe_name(model_id: str) -> str:
     """Convert model ID to safe directory name."""
     return model_id.replace("/", "_").replace("\\", "_").replace(" ", "_")
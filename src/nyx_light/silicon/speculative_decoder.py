@@ -35,13 +35,18 @@ Author: Dr. Mladen Mešter · Nexellum Lab d.o.o.
 from __future__ import annotations
 
 import asyncio
+import heapq
+import json
 import logging
 import math
+import os
 import random
 import time
+from array import array
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger("nyx_light.silicon.speculative")
 
@@ -84,6 +89,8 @@ class SpeculativeConfig:
     # N-gram fallback
     ngram_n: int = 4                      # N-gram context window
     ngram_min_frequency: int = 3          # Min occurrences to use
+    ngram_min_context: int = 2            # Shortest context to back off to
+    ngram_cache_path: Optional[str] = "data/models/ngram_trie.bin"  # Persisted trie
 
 
 @dataclass
@@ -157,6 +164,12 @@ class VerifyResult:
 # N-gram Draft Cache (zero-model speculative)
 # ═══════════════════════════════════════════════════════════════
 
+_ROOT = 0
+_NGRAM_MAGIC = b"NYXNGRAM1\n"
+_FIB_HASH = 0x9E3779B97F4A7C15            # Fibonacci hashing for the edge table
+_U64 = (1 << 64) - 1
+
+
 class NgramDraftCache:
     """
     N-gram based draft token prediction.
@@ -166,64 +179,253 @@ class NgramDraftCache:
       "PDV 25% na" → high frequency
       "Obveza prema dobavljaču" → high frequency
 
-    This cache builds n-gram statistics from accepted tokens
-    and uses them for zero-cost draft predictions.
+    Counts of every n-gram up to n+1 tokens live in one trie stored in
+    flat arrays (token, count, parent, first child, next sibling, most
+    frequent child); edges (node, token) → child are an open-addressing
+    hash table in two more arrays. ~50 bytes per node instead of a tuple
+    key plus a dict per context. Drafting backs off from the longest matching
+    context (n tokens) down to ``min_context`` tokens.
+
+    The trie is pre-warmed from the law corpus, kontni plan and approved
+    answers (``prewarm``), persisted with ``save``/``load`` and updated
+    from tokens accepted during generation.
     """
 
-    def __init__(self, n: int = 4, min_freq: int = 3):
+    def __init__(self, n: int = 4, min_freq: int = 3, min_context: int = 2,
+                 max_nodes: int = 4_000_000):
         self._n = n
         self._min_freq = min_freq
-        self._ngrams: Dict[tuple, Dict[int, int]] = {}  # context → {next_token: count}
+        self._min_context = max(1, min(min_context, n))
+        self._max_nodes = max_nodes
+        self._token = array("i", [-1])
+        self._count = array("I", [0])
+        self._parent = array("i", [-1])
+        self._first = array("i", [-1])
+        self._sibling = array("i", [-1])
+        self._best = array("i", [-1])
+        self._init_edges(1 << 10)
+        self._full = False
         self._total_predictions = 0
         self._total_hits = 0
 
-    def update(self, tokens: List[int]):
-        """Add accepted token sequence to n-gram statistics."""
-        for i in range(len(tokens) - self._n):
-            context = tuple(tokens[i:i + self._n])
-            next_tok = tokens[i + self._n]
-            if context not in self._ngrams:
-                self._ngrams[context] = {}
-            self._ngrams[context][next_tok] = self._ngrams[context].get(next_tok, 0) + 1
+    # ── Edge table: (node << 32) | token → child, linear probing ──
+
+    def _init_edges(self, size: int):
+        self._edge_keys = array("q", [-1]) * size
+        self._edge_vals = array("i", [0]) * size
+        self._edge_shift = 64 - (size.bit_length() - 1)
+        self._edge_mask = size - 1
+        self._edge_used = 0
+
+    def _slot(self, key: int) -> int:
+        keys, mask = self._edge_keys, self._edge_mask
+        h = ((key * _FIB_HASH) & _U64) >> self._edge_shift
+        while True:
+            k = keys[h]
+            if k == key or k == -1:
+                return h
+            h = (h + 1) & mask
+
+    def _rehash(self, size: int):
+        self._init_edges(size)
+        token, parent = self._token, self._parent
+        for node in range(1, len(token)):
+            h = self._slot((parent[node] << 32) | token[node])
+            self._edge_keys[h] = (parent[node] << 32) | token[node]
+            self._edge_vals[h] = node
+        self._edge_used = len(token) - 1
+
+    # ── Trie ──
+
+    def _child(self, node: int, token: int, create: bool) -> int:
+        key = (node << 32) | token
+        h = self._slot(key)
+        if self._edge_keys[h] == key:
+            return self._edge_vals[h]
+        if not create:
+            return -1
+        if len(self._token) >= self._max_nodes:
+            if not self._full:
+                logger.warning("N-gram trie full (%d nodes) — new n-grams ignored",
+                               self._max_nodes)
+                self._full = True
+            return -1
+        child = len(self._token)
+        self._token.append(token)
+        self._count.append(0)
+        self._parent.append(node)
+        self._first.append(-1)
+        self._sibling.append(self._first[node])
+        self._best.append(-1)
+        self._first[node] = child
+        self._edge_keys[h] = key
+        self._edge_vals[h] = child
+        self._edge_used += 1
+        if self._edge_used * 2 > len(self._edge_keys):
+            self._rehash(len(self._edge_keys) * 2)
+        return child
+
+    def _bump(self, node: int):
+        count = self._count
+        count[node] += 1
+        parent = self._parent[node]
+        best = self._best[parent]
+        if best < 0 or count[node] > count[best]:
+            self._best[parent] = node
+
+    def update(self, tokens: List[int], start: int = 0):
+        """Add accepted token sequence to n-gram statistics.
+
+        Only n-grams ending at ``tokens[start:]`` are counted, so a window
+        with ``start`` = number of already counted tokens adds each token once.
+        """
+        span = self._n + 1
+        for i in range(len(tokens)):
+            node = _ROOT
+            for j in range(i, min(i + span, len(tokens))):
+                node = self._child(node, tokens[j], create=True)
+                if node < 0:
+                    break
+                if j >= start:
+                    self._bump(node)
+
+    def _context_node(self, context: List[int]) -> int:
+        """Node of the longest context suffix with a frequent continuation (-1 if none)."""
+        for size in range(min(self._n, len(context)), self._min_context - 1, -1):
+            node = _ROOT
+            for tok in context[len(context) - size:]:
+                node = self._child(node, tok, create=False)
+                if node < 0:
+                    break
+            if node >= 0:
+                best = self._best[node]
+                if best >= 0 and self._count[best] >= self._min_freq:
+                    return node
+        return -1
+
+    def _extend(self, context: List[int], k: int) -> Tuple[List[int], List[float]]:
+        tokens: List[int] = []
+        log_probs: List[float] = []
+        current = list(context[-self._n:])
+        for _ in range(k):
+            node = self._context_node(current)
+            if node < 0:
+                break
+            best = self._best[node]
+            tok = self._token[best]
+            tokens.append(tok)
+            log_probs.append(math.log(max(self._count[best] / self._child_total(node), 1e-10)))
+            current = current[1 - self._n:] + [tok] if self._n > 1 else [tok]
+        return tokens, log_probs
+
+    def _child_total(self, node: int) -> int:
+        total, child = 0, self._first[node]
+        while child >= 0:
+            total += self._count[child]
+            child = self._sibling[child]
+        return max(1, total)
+
+    # ── Drafting ──
 
     def draft(self, context: List[int], k: int) -> Optional[DraftResult]:
         """
         Draft K tokens using n-gram lookup.
         Returns None if n-gram cache doesn't have sufficient data.
         """
-        if len(context) < self._n:
+        self._total_predictions += 1
+        if len(context) < self._min_context:
             return None
+        tokens, log_probs = self._extend(context, k)
+        if not tokens:
+            return None
+        self._total_hits += 1
+        return DraftResult(tokens=tokens, log_probs=log_probs, latency_ms=0.01)
 
-        tokens = []
-        log_probs = []
-        current = list(context)
-
-        for _ in range(k):
-            key = tuple(current[-self._n:])
-            if key not in self._ngrams:
-                break
-            candidates = self._ngrams[key]
-            # Find most frequent next token
-            best_tok = max(candidates, key=candidates.get)
-            freq = candidates[best_tok]
-            total = sum(candidates.values())
-
-            if freq < self._min_freq:
-                break
-
-            prob = freq / total
-            tokens.append(best_tok)
-            log_probs.append(math.log(max(prob, 1e-10)))
-            current.append(best_tok)
+    def draft_tree(self, context: List[int], k: int, branches: int = 3) -> List[DraftResult]:
+        """Up to ``branches`` candidate drafts, one per frequent first token.
 
+        Each branch is extended greedily to K tokens; candidates are ordered
+        by probability (first = what ``draft`` returns). A target model with
+        tree attention verifies them in one pass; otherwise verify the first.
+        """
         self._total_predictions += 1
-        if tokens:
+        node = self._context_node(context) if len(context) >= self._min_context else -1
+        if node < 0:
+            return []
+        total = self._child_total(node)
+        firsts = []
+        child = self._first[node]
+        while child >= 0:
+            if self._count[child] >= self._min_freq:
+                firsts.append((self._count[child], child))
+            child = self._sibling[child]
+        drafts = []
+        for count, child in heapq.nlargest(branches, firsts):
+            tok = self._token[child]
+            rest, rest_lp = self._extend(list(context) + [tok], k - 1)
+            drafts.append(DraftResult(tokens=[tok] + rest,
+                                      log_probs=[math.log(count / total)] + rest_lp,
+                                      latency_ms=0.01))
+        if drafts:
             self._total_hits += 1
-
-        if not tokens:
-            return None
-
-        return DraftResult(tokens=tokens, log_probs=log_probs, latency_ms=0.01)
+        return drafts
+
+    # ── Pre-warming & persistence ──
+
+    def prewarm(self, texts: Iterable[str], encode: Callable[[str], List[int]]) -> int:
+        """Count n-grams of corpus texts (laws, kontni plan, approved answers) → tokens."""
+        total = 0
+        for text in texts:
+            tokens = list(encode(text))
+            self.update(tokens)
+            total += len(tokens)
+        logger.info("N-gram trie pre-warmed: %d tokens → %d nodes", total, self.vocab_size)
+        return total
+
+    def save(self, path: str):
+        """Persist the trie (token/count/parent arrays) atomically."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(target.suffix + ".tmp")
+        header = {"n": self._n, "min_freq": self._min_freq,
+                  "min_context": self._min_context, "nodes": len(self._token)}
+        with open(tmp, "wb") as f:
+            f.write(_NGRAM_MAGIC)
+            f.write(json.dumps(header).encode() + b"\n")
+            self._token.tofile(f)
+            self._count.tofile(f)
+            self._parent.tofile(f)
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, path: str, max_nodes: int = 4_000_000) -> "NgramDraftCache":
+        """Load a trie written by ``save``."""
+        with open(path, "rb") as f:
+            if f.read(len(_NGRAM_MAGIC)) != _NGRAM_MAGIC:
+                raise ValueError(f"{path}: not an n-gram trie file")
+            header = json.loads(f.readline())
+            cache = cls(n=header["n"], min_freq=header["min_freq"],
+                        min_context=header["min_context"],
+                        max_nodes=max(max_nodes, header["nodes"]))
+            nodes = header["nodes"]
+            for arr in (cache._token, cache._count, cache._parent):
+                del arr[:]
+                arr.fromfile(f, nodes)
+        cache._first = array("i", [-1]) * nodes
+        cache._sibling = array("i", [-1]) * nodes
+        cache._best = array("i", [-1]) * nodes
+        token, count, parent = cache._token, cache._count, cache._parent
+        cache._rehash(1 << max(10, (2 * nodes).bit_length()))
+        for node in range(1, nodes):            # parents always precede children
+            p = parent[node]
+            cache._sibling[node] = cache._first[p]
+            cache._first[p] = node
+            best = cache._best[p]
+            if best < 0 or count[node] > count[best]:
+                cache._best[p] = node
+        return cache
+
+    # ── Stats ──
 
     @property
     def hit_rate(self) -> float:
@@ -231,7 +433,12 @@ class NgramDraftCache:
 
     @property
     def vocab_size(self) -> int:
-        return len(self._ngrams)
+        return len(self._token) - 1
+
+    def memory_bytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (
+            self._token, self._count, self._parent, self._first, self._sibling,
+            self._best, self._edge_keys, self._edge_vals))
 
     def stats(self) -> Dict[str, Any]:
         return {
@@ -239,9 +446,131 @@ class NgramDraftCache:
             "vocab_entries": self.vocab_size,
             "hit_rate": round(self.hit_rate * 100, 1),
             "predictions": self._total_predictions,
+            "memory_mb": round(self.memory_bytes() / 1024 ** 2, 2),
         }
 
 
+def iter_warm_texts(laws_dir: Optional[str] = "data/laws",
+                    dpo_db: Optional[str] = "data/dpo_training.db",
+                    kontni_plan: bool = True, max_answers: int = 20000) -> Iterator[str]:
+    """Pre-warm corpus: law texts, kontni plan (``konto naziv``), approved answers."""
+    if laws_dir and Path(laws_dir).is_dir():
+        for path in sorted(Path(laws_dir).iterdir()):
+            if path.suffix in (".md", ".txt"):
+                yield path.read_text(encoding="utf-8", errors="ignore")
+    if kontni_plan:
+        try:
+            from nyx_light.modules.kontiranje.kontni_plan import get_full_kontni_plan
+            yield "\n".join(f"{konto} {name}" for konto, name in get_full_kontni_plan().items())
+        except ImportError:
+            pass
+    if dpo_db and Path(dpo_db).exists():
+        import sqlite3
+        conn = sqlite3.connect(dpo_db)
+        try:
+            rows = conn.execute("SELECT chosen FROM preference_pairs ORDER BY id DESC LIMIT ?",
+                                (max_answers,)).fetchall()
+        except sqlite3.Error as e:
+            logger.debug("Approved answers unavailable: %s", e)
+            rows = []
+        finally:
+            conn.close()
+        for (chosen,) in rows:
+            yield chosen
+
+
+def load_target_encoder(model_path: str) -> Optional[Callable[[str], List[int]]]:
+    """``encode`` of the target model's tokenizer (transformers); None if unavailable."""
+    if not Path(model_path).is_dir():
+        return None
+    try:
+        from transformers import AutoTokenizer
+    except ImportError:
+        return None
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+    except Exception as e:
+        logger.warning("Tokenizer %s not loaded: %s", model_path, e)
+        return None
+    return lambda text: tokenizer.encode(text, add_special_tokens=False)
+
+
+def prewarm_ngram_cache(config: Optional[SpeculativeConfig] = None,
+                        encode: Optional[Callable[[str], List[int]]] = None,
+                        texts: Optional[Iterable[str]] = None,
+                        models_dir: str = "data/models") -> Dict[str, Any]:
+    """Rebuild the n-gram trie from the warm corpus and save it to ``ngram_cache_path``.
+
+    Run nightly (after DPO, so new approved answers are included); the
+    engine loads the file on its next start. Drafts are target token ids,
+    so without the target tokenizer (``encode``) nothing is written.
+    """
+    config = config or SpeculativeConfig()
+    if not config.ngram_cache_path:
+        return {"status": "skipped", "reason": "ngram_cache_path not set"}
+    if encode is None:
+        encode = load_target_encoder(str(Path(models_dir) / config.target_model_name))
+    if encode is None:
+        return {"status": "skipped", "reason": f"no tokenizer for {config.target_model_name}"}
+    t0 = time.perf_counter()
+    cache = NgramDraftCache(n=config.ngram_n, min_freq=config.ngram_min_frequency,
+                            min_context=config.ngram_min_context)
+    tokens = cache.prewarm(iter_warm_texts() if texts is None else texts, encode)
+    cache.save(config.ngram_cache_path)
+    return {"status": "saved", "path": config.ngram_cache_path, "tokens": tokens,
+            "nodes": cache.vocab_size, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def evaluate_ngram_drafts(cache: NgramDraftCache, transcripts: Iterable[List[int]],
+                          k: int = 5, branches: int = 1, learn: bool = True) -> Dict[str, Any]:
+    """Offline replay of recorded answers (token ids) against the n-gram drafter.
+
+    Each step drafts K tokens (or a tree of ``branches`` candidates) from the
+    tokens so far; the target "accepts" the longest prefix that matches the
+    recording and adds one token of its own. With ``learn`` the cache is
+    updated with the recording as generation would do.
+    """
+    steps = drafted = accepted = draft_steps = tokens_out = 0
+    for seq in transcripts:
+        seq = list(seq)
+        pos = min(len(seq), cache._min_context)
+        if learn:
+            cache.update(seq[:pos])
+        while pos < len(seq):
+            context = seq[:pos]
+            if branches > 1:
+                candidates = [d.tokens for d in cache.draft_tree(context, k, branches)]
+            else:
+                single = cache.draft(context, k)
+                candidates = [single.tokens] if single else []
+            step_accepted = 0
+            if candidates:
+                draft_steps += 1
+                drafted += sum(len(c) for c in candidates)
+                truth = seq[pos:pos + k]
+                for cand in candidates:
+                    n = 0
+                    while n < len(cand) and n < len(truth) and cand[n] == truth[n]:
+                        n += 1
+                    step_accepted = max(step_accepted, n)
+                accepted += step_accepted
+            new_pos = min(len(seq), pos + step_accepted + 1)
+            if learn:
+                w0 = max(0, pos - cache._n)
+                cache.update(seq[w0:new_pos], start=pos - w0)
+            tokens_out += new_pos - pos
+            pos = new_pos
+            steps += 1
+    return {
+        "steps": steps,
+        "tokens": tokens_out,
+        "tokens_per_step": round(tokens_out / max(1, steps), 3),
+        "drafted_tokens_per_step": round(drafted / max(1, draft_steps), 3),
+        "acceptance_rate": round(accepted / max(1, drafted) * 100, 1),
+        "draft_hit_rate": round(draft_steps / max(1, steps) * 100, 1),
+    }
+
+
 # ═══════════════════════════════════════════════════════════════
 # Speculative Decoding Engine
 # ═══════════════════════════════════════════════════════════════
@@ -281,10 +610,7 @@ class SpeculativeDecodingEngine:
         self._thermal_fn = thermal_fn
         self._stats = SpeculativeStats()
         self._current_k = self._config.num_speculative_tokens
-        self._ngram_cache = NgramDraftCache(
-            n=self._config.ngram_n,
-            min_freq=self._config.ngram_min_frequency,
-        )
+        self._ngram_cache = self._load_ngram_cache()
         self._enabled = self._config.draft_strategy != DraftStrategy.DISABLED
 
         logger.info(
@@ -295,6 +621,28 @@ class SpeculativeDecodingEngine:
             self._current_k,
         )
 
+    def _load_ngram_cache(self) -> NgramDraftCache:
+        path = self._config.ngram_cache_path
+        if path and Path(path).exists():
+            try:
+                return NgramDraftCache.load(path)
+            except (OSError, ValueError, EOFError) as e:   # EOFError: truncated file
+                logger.warning("N-gram trie %s not loaded: %s", path, e)
+        return NgramDraftCache(
+            n=self._config.ngram_n,
+            min_freq=self._config.ngram_min_frequency,
+            min_context=self._config.ngram_min_context,
+        )
+
+    def save_ngram_cache(self):
+        """Persist the n-gram trie so the next start is already warm."""
+        if self._config.ngram_cache_path:
+            self._ngram_cache.save(self._config.ngram_cache_path)
+
+    @property
+    def ngram_cache(self) -> NgramDraftCache:
+        return self._ngram_cache
+
     @property
     def enabled(self) -> bool:
         return self._enabled
@@ -370,14 +718,16 @@ class SpeculativeDecodingEngine:
             self._stats.total_rejected_tokens += len(draft_result.tokens) - len(accepted)
             generated.extend(accepted)
 
-            # Update n-gram cache with accepted tokens
-            if accepted:
-                self._ngram_cache.update(generated[-len(accepted) - self._config.ngram_n:])
-
             # Add correction token if target disagrees
             if verify_result.correction_token is not None:
                 generated.append(verify_result.correction_token)
 
+            # Update n-gram trie with tokens confirmed by the target
+            new = len(accepted) + (verify_result.correction_token is not None)
+            if new:
+                window = generated[-new - self._config.ngram_n:]
+                self._ngram_cache.update(window, start=len(window) - new)
+
             # Step 5: Adaptive K
             self._adapt_k()
 
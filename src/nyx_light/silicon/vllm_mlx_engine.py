@@ -95,6 +95,8 @@ class VLLMMLXConfig:
     # Prompt caching
     enable_prompt_cache: bool = True
     prompt_cache_dir: str = "data/prompt_cache"
+    prompt_cache_max_gb: float = 4.0      # Resident KV states (radix prefix cache)
+    prompt_cache_spill: bool = True       # Spill cold prefixes to prompt_cache_dir
     system_prompt_hash: str = ""  # Cached system prompt KV state
 
     # vLLM-MLX server
@@ -127,60 +129,441 @@ class VLLMMLXConfig:
 # PROMPT CACHE (from Nyx Stones vllm_mlx_provider.py)
 # ══════════════════════════════════════════════════════════════
 
-class PromptCache:
-    """Cache system prompt KV state to eliminate redundant prefill.
+PROMPT_CACHE_MAX_BYTES = 1 << 30        # 1 GiB when neither max_bytes nor UMA is given
+PROMPT_CACHE_MAX_DISK_BYTES = 4 << 30   # cold entries spilled to cache_dir
+
+
+def _common_len(edge: Tuple[int, ...], tokens: Tuple[int, ...], start: int) -> int:
+    """Length of the common prefix of ``edge`` and ``tokens[start:]`` (slice compares)."""
+    n = min(len(edge), len(tokens) - start)
+    if tokens[start:start + n] == edge[:n]:
+        return n
+    lo, hi = 0, n - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if tokens[start:start + mid] == edge[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _sizeof(kv_state: Any) -> int:
+    """Bytes held by a KV state: ``nbytes`` (mlx/numpy, per layer for lists) or getsizeof."""
+    if isinstance(kv_state, (list, tuple)) and kv_state and all(
+            hasattr(c, "nbytes") for c in kv_state):
+        return int(sum(c.nbytes for c in kv_state))
+    nbytes = getattr(kv_state, "nbytes", None)
+    if isinstance(nbytes, (int, float)):
+        return int(nbytes)
+    import sys
+    return sys.getsizeof(kv_state)
+
+
+class _RadixNode:
+    __slots__ = ("key", "children", "parent", "kv", "nbytes", "priority",
+                 "last_access", "spill_path", "node_id")
+
+    def __init__(self, key: Tuple[int, ...] = (), parent: Optional["_RadixNode"] = None):
+        self.key = key                        # edge label (tokens from parent)
+        self.children: Dict[int, _RadixNode] = {}
+        self.parent = parent
+        self.kv: Any = None                   # KV state for root → this node
+        self.nbytes = 0
+        self.priority = None
+        self.last_access = 0
+        self.spill_path: Optional[Path] = None
+        self.node_id = 0
+
+    @property
+    def cached(self) -> bool:
+        return self.kv is not None or self.spill_path is not None
 
-    In accounting, every user gets the same long system prompt
-    (~2000 tokens of accounting rules, legal context, etc.).
-    Caching the KV state of this prompt saves ~500ms per request.
 
-    Strategy:
-      1. First request with system prompt → compute KV state → cache
-      2. Subsequent requests → load cached KV state → only compute user part
-      3. Cache key = SHA-256 of system prompt text
-      4. Invalidate if system prompt changes
+def _trim_mlx_cache(kv_cache: Any, n: int) -> Any:
+    """Copy of an mlx_lm prompt cache without its last ``n`` tokens."""
+    import copy
+    from mlx_lm.models.cache import trim_prompt_cache
+
+    trimmed = copy.deepcopy(kv_cache)
+    trim_prompt_cache(trimmed, n)
+    return trimmed
+
+
+class PromptCache:
+    """Radix (prefix-tree) cache of KV states keyed by token prefixes.
+
+    Every user shares the system prompt, users of the same client share
+    the client block, so KV states are stored per token prefix and a
+    request reuses the longest cached prefix — only the rest is prefilled.
+
+      - Keys: token ids (``tokenizer.encode``) or UTF-8 bytes of a string
+      - Branch points: with ``trim_kv`` an insert that diverges from a cached
+        prompt also stores the trimmed KV of the common prefix (system,
+        system + client, ...), so the next prompt with that prefix reuses it
+      - Byte budget: ``max_bytes`` ∩ UMAController PROMPT_CACHE budget; each
+        resident entry is a UMA region, so UMA status shows the real usage
+      - Eviction: lowest MemoryPriority first, then least recently used;
+        PINNED entries (e.g. the system prompt) are never evicted
+      - Spill: evicted entries are pickled to ``cache_dir`` (bounded by
+        ``max_disk_bytes``) and reloaded on the next hit
+      - Metrics: hit ratio, saved prefill tokens, evictions, spills
     """
 
-    def __init__(self, cache_dir: str = "data/prompt_cache"):
+    def __init__(self, cache_dir: str = "data/prompt_cache",
+                 max_bytes: Optional[int] = None, uma: Any = None,
+                 spill_to_disk: bool = False,
+                 max_disk_bytes: int = PROMPT_CACHE_MAX_DISK_BYTES,
+                 tokenizer: Any = None, trim_kv: Any = None):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self._cache: Dict[str, Any] = {}  # hash → KV state
+        self.uma = uma
+        self.spill_to_disk = spill_to_disk
+        self.max_disk_bytes = max_disk_bytes
+        self.tokenizer = tokenizer
+        self.trim_kv = trim_kv                # (kv_state, n) → copy without the last n tokens
+
+        budget = max_bytes if max_bytes is not None else (
+            None if uma is not None else PROMPT_CACHE_MAX_BYTES)
+        if uma is not None:
+            from .apple_silicon import MemoryRegionType
+            uma_budget = uma.budget_bytes(MemoryRegionType.PROMPT_CACHE)
+            budget = uma_budget if budget is None else min(budget, uma_budget)
+        self.max_bytes = budget
+
+        self._root = _RadixNode()
+        self._resident: Dict[int, _RadixNode] = {}
+        self._spilled: Dict[int, _RadixNode] = {}
+        self._pinned: set = set()             # nodes of the insert in progress
+        self._next_id = 0
+        self._clock = 0
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._reset_counters()
+
+    def _reset_counters(self):
         self._hit_count = 0
         self._miss_count = 0
+        self._tokens_queried = 0
+        self._saved_tokens = 0
+        self._evictions = 0
+        self._spills = 0
+        self._disk_hits = 0
+
+    # ── Keys ──
 
     def get_key(self, prompt: str) -> str:
         """SHA-256 hash of prompt text."""
         return hashlib.sha256(prompt.encode()).hexdigest()[:32]
 
+    def tokens(self, prompt: str) -> Tuple[int, ...]:
+        if self.tokenizer is not None:
+            return tuple(self.tokenizer.encode(prompt))
+        return tuple(prompt.encode("utf-8"))
+
+    # ── Token-level API ──
+
+    def insert(self, tokens, kv_state: Any, nbytes: Optional[int] = None,
+               priority: Any = None) -> bool:
+        """Store the KV state for the prefix ``tokens``; False if it cannot fit."""
+        from .apple_silicon import MemoryPriority
+        tokens = tuple(tokens)
+        if not tokens:
+            return False
+        node, splits = self._node_for(tokens)
+        if node.cached:
+            self._drop(node, prune=False)
+        node.kv = kv_state
+        node.nbytes = int(nbytes if nbytes is not None else _sizeof(kv_state))
+        node.priority = priority or MemoryPriority.NORMAL
+        # Pin the new leaf and split nodes: evicting a sibling must not
+        # evict them or merge a split node out of the tree mid-insert
+        self._pinned = {node} | {mid for mid, _ in splits}
+        try:
+            admitted = self._admit(node)
+            if admitted:
+                for mid, depth in splits:
+                    self._store_branch(mid, kv_state, len(tokens) - depth, node.priority)
+        finally:
+            self._pinned = set()
+        if not admitted:
+            node.kv = None
+            self._prune(node)
+            return False
+        for mid, _ in splits:
+            if not mid.cached:
+                self._prune(mid)
+        return True
+
+    def _store_branch(self, node: _RadixNode, kv_state: Any, trim: int, priority: Any):
+        if self.trim_kv is None or node.cached or not self._attached(node):
+            return
+        try:
+            node.kv = self.trim_kv(kv_state, trim)
+        except Exception as e:
+            logger.debug("Prompt cache trim failed: %s", e)
+            node.kv = None
+            return
+        node.nbytes = _sizeof(node.kv)
+        node.priority = priority
+        if not self._admit(node):
+            node.kv = None
+
+    def match(self, tokens) -> Tuple[int, Any]:
+        """Longest cached prefix of ``tokens`` → (matched token count, KV state)."""
+        tokens = tuple(tokens)
+        self._tokens_queried += len(tokens)
+        node, i, best, best_len = self._root, 0, None, 0
+        while i < len(tokens):
+            child = node.children.get(tokens[i])
+            if child is None:
+                break
+            c = _common_len(child.key, tokens, i)
+            if c < len(child.key):
+                break
+            i += c
+            node = child
+            if node.cached:
+                best, best_len = node, i
+
+        if best is not None and best.kv is not None and self._lost_region(best):
+            # UMAController evicted the region under pressure — memory is gone
+            self._evictions += 1
+            if not (self.spill_to_disk and self._spill(best)):
+                self._drop(best)
+                best, best_len = None, 0
+        if best is not None and best.kv is None and not self._load(best):
+            best, best_len = None, 0
+        if best is None:
+            self._miss_count += 1
+            return 0, None
+        self._touch(best)
+        self._hit_count += 1
+        self._saved_tokens += best_len
+        return best_len, best.kv
+
+    def remove(self, tokens) -> bool:
+        node = self._find(tuple(tokens))
+        if node is None or not node.cached:
+            return False
+        self._drop(node)
+        return True
+
+    # ── String API (exact prompt) ──
+
     def has(self, prompt: str) -> bool:
         """Check if prompt KV state is cached."""
-        return self.get_key(prompt) in self._cache
+        node = self._find(self.tokens(prompt))
+        return node is not None and node.cached
 
     def get(self, prompt: str) -> Optional[Any]:
-        """Get cached KV state."""
-        key = self.get_key(prompt)
-        if key in self._cache:
-            self._hit_count += 1
-            return self._cache[key]
-        self._miss_count += 1
+        """Get cached KV state for exactly this prompt."""
+        toks = self.tokens(prompt)
+        matched, kv = self.match(toks)
+        if matched == len(toks):
+            return kv
+        if matched:                       # prefix hit does not count for an exact get
+            self._hit_count -= 1
+            self._saved_tokens -= matched
+            self._miss_count += 1
         return None
 
-    def put(self, prompt: str, kv_state: Any):
+    def put(self, prompt: str, kv_state: Any, nbytes: Optional[int] = None,
+            priority: Any = None):
         """Cache KV state for prompt."""
-        key = self.get_key(prompt)
-        self._cache[key] = kv_state
-        logger.debug("Prompt cache: stored %s (%d entries)", key[:12], len(self._cache))
+        self.insert(self.tokens(prompt), kv_state, nbytes, priority)
+        logger.debug("Prompt cache: stored %s (%d entries)",
+                     self.get_key(prompt)[:12], len(self._resident))
 
     def invalidate(self, prompt: str):
         """Invalidate cache for prompt."""
-        key = self.get_key(prompt)
-        self._cache.pop(key, None)
+        self.remove(self.tokens(prompt))
 
     def clear(self):
-        """Clear entire cache."""
-        self._cache.clear()
-        self._hit_count = 0
-        self._miss_count = 0
+        """Clear entire cache (memory, UMA regions and spilled files)."""
+        for node in list(self._resident.values()) + list(self._spilled.values()):
+            self._drop(node, prune=False)
+        self._root = _RadixNode()
+        self._reset_counters()
+
+    # ── Tree ──
+
+    def _find(self, tokens: Tuple[int, ...]) -> Optional[_RadixNode]:
+        node, i = self._root, 0
+        while i < len(tokens):
+            child = node.children.get(tokens[i])
+            if child is None or _common_len(child.key, tokens, i) < len(child.key):
+                return None
+            i += len(child.key)
+            node = child
+        return node if tokens else None
+
+    def _node_for(self, tokens: Tuple[int, ...]) -> Tuple[_RadixNode, List[Tuple[_RadixNode, int]]]:
+        """Node for ``tokens``, splitting edges as needed → (node, [(split node, depth)])."""
+        node, i, splits = self._root, 0, []
+        while i < len(tokens):
+            child = node.children.get(tokens[i])
+            if child is None:
+                if node is not self._root and not node.cached:
+                    splits.append((node, i))
+                leaf = _RadixNode(tokens[i:], node)
+                node.children[tokens[i]] = leaf
+                return self._assign_id(leaf), splits
+            c = _common_len(child.key, tokens, i)
+            if c < len(child.key):
+                mid = _RadixNode(child.key[:c], node)
+                node.children[tokens[i]] = mid
+                child.key = child.key[c:]
+                child.parent = mid
+                mid.children[child.key[0]] = child
+                self._assign_id(mid)
+                child = mid                   # diverging rest → new leaf under mid (below)
+            node = child
+            i += c
+        return node, splits
+
+    def _assign_id(self, node: _RadixNode) -> _RadixNode:
+        self._next_id += 1
+        node.node_id = self._next_id
+        return node
+
+    def _attached(self, node: _RadixNode) -> bool:
+        while node is not self._root:
+            parent = node.parent
+            if parent is None or parent.children.get(node.key[0]) is not node:
+                return False
+            node = parent
+        return True
+
+    def _prune(self, node: _RadixNode):
+        """Remove empty leaves upward and merge pass-through nodes."""
+        while (node is not self._root and node not in self._pinned
+               and not node.cached and not node.children):
+            parent = node.parent
+            parent.children.pop(node.key[0], None)
+            node = parent
+        if (node is not self._root and node not in self._pinned
+                and not node.cached and len(node.children) == 1):
+            (child,) = node.children.values()
+            child.key = node.key + child.key
+            child.parent = node.parent
+            node.parent.children[child.key[0]] = child
+
+    def _touch(self, node: _RadixNode):
+        self._clock += 1
+        node.last_access = self._clock
+        if self.uma is not None:
+            region = self.uma.get_region(self._region_id(node))
+            if region is not None:
+                region.touch()
+
+    # ── Memory budget ──
+
+    @staticmethod
+    def _region_id(node: _RadixNode) -> str:
+        return f"prompt_cache/{node.node_id}"
+
+    def _lost_region(self, node: _RadixNode) -> bool:
+        return self.uma is not None and self.uma.get_region(self._region_id(node)) is None
+
+    def _admit(self, node: _RadixNode) -> bool:
+        """Make ``node`` resident within the byte budget (evicting others)."""
+        if self.max_bytes is not None and node.nbytes > self.max_bytes:
+            return False
+        if self.max_bytes is not None and self._bytes + node.nbytes > self.max_bytes:
+            self._evict(self._bytes + node.nbytes - self.max_bytes, keep=node)
+            if self._bytes + node.nbytes > self.max_bytes:
+                return False
+        if self.uma is not None:
+            from .apple_silicon import MemoryRegionType
+            region = self.uma.allocate(self._region_id(node), MemoryRegionType.PROMPT_CACHE,
+                                       node.nbytes / (1024 ** 3), priority=node.priority)
+            if region is None:
+                return False
+        self._bytes += node.nbytes
+        self._resident[node.node_id] = node
+        self._touch(node)
+        return True
+
+    def _evict(self, needed: int, keep: Optional[_RadixNode] = None):
+        from .apple_silicon import MemoryPriority
+        candidates = sorted(
+            (n for n in self._resident.values()
+             if n is not keep and n not in self._pinned
+             and n.priority != MemoryPriority.PINNED),
+            key=lambda n: (n.priority.value, n.last_access))
+        freed = 0
+        for node in candidates:
+            if freed >= needed:
+                break
+            freed += node.nbytes
+            self._evictions += 1
+            if self.spill_to_disk and self._spill(node):
+                continue
+            self._drop(node)
+
+    def _release(self, node: _RadixNode):
+        if self._resident.pop(node.node_id, None) is not None:
+            self._bytes -= node.nbytes
+            if self.uma is not None:
+                self.uma.release(self._region_id(node))
+        node.kv = None
+
+    def _drop(self, node: _RadixNode, prune: bool = True):
+        self._release(node)
+        if node.spill_path is not None:
+            self._disk_bytes -= node.nbytes
+            self._spilled.pop(node.node_id, None)
+            node.spill_path.unlink(missing_ok=True)
+            node.spill_path = None
+        if prune:
+            self._prune(node)
+
+    # ── Disk spill ──
+
+    def _spill(self, node: _RadixNode) -> bool:
+        import pickle
+        if node.nbytes > self.max_disk_bytes:
+            return False
+        path = self.cache_dir / f"{node.node_id:08d}-{self._clock}.kv"
+        try:
+            with open(path, "wb") as f:
+                pickle.dump(node.kv, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug("Prompt cache spill failed: %s", e)
+            path.unlink(missing_ok=True)
+            return False
+        self._release(node)
+        node.spill_path = path
+        self._spilled[node.node_id] = node
+        self._disk_bytes += node.nbytes
+        self._spills += 1
+        while self._disk_bytes > self.max_disk_bytes and self._spilled:
+            coldest = min(self._spilled.values(), key=lambda n: n.last_access)
+            self._drop(coldest)
+        return True
+
+    def _load(self, node: _RadixNode) -> bool:
+        import pickle
+        try:
+            with open(node.spill_path, "rb") as f:
+                kv_state = pickle.load(f)
+        except Exception as e:
+            logger.debug("Prompt cache reload failed: %s", e)
+            self._drop(node)
+            return False
+        self._spilled.pop(node.node_id, None)
+        self._disk_bytes -= node.nbytes
+        node.spill_path.unlink(missing_ok=True)
+        node.spill_path = None
+        node.kv = kv_state
+        self._disk_hits += 1
+        if not self._admit(node):
+            self._drop(node)
+            return False
+        return True
+
+    # ── Metrics ──
 
     @property
     def hit_rate(self) -> float:
@@ -189,10 +572,20 @@ class PromptCache:
 
     def stats(self) -> Dict[str, Any]:
         return {
-            "entries": len(self._cache),
+            "entries": len(self._resident) + len(self._spilled),
+            "resident_entries": len(self._resident),
+            "spilled_entries": len(self._spilled),
             "hits": self._hit_count,
             "misses": self._miss_count,
             "hit_rate": round(self.hit_rate * 100, 1),
+            "saved_prefill_tokens": self._saved_tokens,
+            "token_hit_rate": round(self._saved_tokens / max(1, self._tokens_queried) * 100, 1),
+            "bytes": self._bytes,
+            "budget_bytes": self.max_bytes,
+            "disk_bytes": self._disk_bytes,
+            "evictions": self._evictions,
+            "spills": self._spills,
+            "disk_hits": self._disk_hits,
         }
 
 
@@ -221,7 +614,12 @@ class VLLMMLXEngine:
 
     def __init__(self, config: Optional[VLLMMLXConfig] = None):
         self.config = config or VLLMMLXConfig()
-        self.prompt_cache = PromptCache(self.config.prompt_cache_dir)
+        self.prompt_cache = PromptCache(
+            self.config.prompt_cache_dir,
+            max_bytes=int(self.config.prompt_cache_max_gb * (1024 ** 3)),
+            spill_to_disk=self.config.prompt_cache_spill,
+            trim_kv=_trim_mlx_cache,
+        )
         self._backend = self.config.backend
         self._model = None
         self._tokenizer = None
@@ -407,6 +805,11 @@ class VLLMMLXEngine:
 
             # Format messages into prompt
             prompt = self._format_messages(messages)
+            tokens, kv_cache, extra = None, None, {}
+            if self.config.enable_prompt_cache:
+                tokens, kv_cache, prompt = self._reuse_prefix(prompt)
+                if kv_cache is not None:
+                    extra["prompt_cache"] = kv_cache
 
             # Generate with MLX optimizations
             response = mlx_generate(
@@ -417,13 +820,53 @@ class VLLMMLXEngine:
                 temp=temperature,
                 top_p=self.config.top_p,
                 repetition_penalty=self.config.repetition_penalty,
+                **extra,
             )
+            if kv_cache is not None:
+                self._store_prefix(tokens, kv_cache)
             return response
 
         except Exception as e:
             logger.error("Direct generation failed: %s", e)
             return f"[Greška u generiranju: {e}]"
 
+    def _reuse_prefix(self, prompt: str) -> Tuple[Optional[List[int]], Any, Any]:
+        """Longest cached prefix → (prompt tokens, KV cache to extend, remaining prompt).
+
+        The cached state is copied (generation mutates it); only the tokens
+        after the matched prefix are prefilled. Without mlx_lm prompt-cache
+        support the plain prompt is returned.
+        """
+        try:
+            import copy
+            from mlx_lm.models.cache import make_prompt_cache, trim_prompt_cache
+
+            tokens = list(self._tokenizer.encode(prompt))
+            self.prompt_cache.tokenizer = self._tokenizer
+            matched, kv_state = self.prompt_cache.match(tokens)
+            if kv_state is None:
+                return tokens, make_prompt_cache(self._model), tokens
+            kv_cache = copy.deepcopy(kv_state)
+            if matched >= len(tokens):          # at least one token must be prefilled
+                trim_prompt_cache(kv_cache, matched - len(tokens) + 1)
+                matched = len(tokens) - 1
+            return tokens, kv_cache, tokens[matched:]
+        except Exception as e:
+            logger.debug("Prompt cache unavailable: %s", e)
+            return None, None, prompt
+
+    def _store_prefix(self, tokens: List[int], kv_cache: Any):
+        """Trim generated tokens off the KV cache and store it under the prompt."""
+        try:
+            from mlx_lm.models.cache import trim_prompt_cache
+
+            generated = kv_cache[0].offset - len(tokens)
+            if generated > 0:
+                trim_prompt_cache(kv_cache, generated)
+            self.prompt_cache.insert(tokens, kv_cache)
+        except Exception as e:
+            logger.debug("Prompt cache store failed: %s", e)
+
     async def _generate_vllm(
         self, messages: List[Dict], max_tokens: int, temperature: float
     ) -> str:
@@ -16,7 +16,7 @@ import sqlite3
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger("nyx_light.storage")
 
@@ -62,7 +62,10 @@ class SQLiteStorage:
                 erp_target TEXT DEFAULT 'CPP',
                 exported INTEGER DEFAULT 0,
                 created_at TEXT DEFAULT (datetime('now')),
-                updated_at TEXT DEFAULT (datetime('now'))
+                updated_at TEXT DEFAULT (datetime('now')),
+                osnovica REAL,
+                eu_transakcija INTEGER DEFAULT 0,
+                reverse_charge INTEGER DEFAULT 0
             );
 
             CREATE TABLE IF NOT EXISTS corrections (
@@ -106,13 +109,58 @@ class SQLiteStorage:
                 created_at TEXT DEFAULT (datetime('now'))
             );
 
+            -- Izračunati izvještaji (npr. PPO) po zatvorenom periodu
+            CREATE TABLE IF NOT EXISTS report_cache (
+                kind TEXT NOT NULL,
+                client_id TEXT NOT NULL,
+                period TEXT NOT NULL,
+                date_from TEXT NOT NULL,
+                date_to TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at TEXT DEFAULT (datetime('now')),
+                PRIMARY KEY (kind, client_id, period)
+            );
+
             CREATE INDEX IF NOT EXISTS idx_bookings_client ON bookings(client_id);
             CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings(status);
             CREATE INDEX IF NOT EXISTS idx_corrections_client ON corrections(client_id);
             CREATE INDEX IF NOT EXISTS idx_audit_user ON audit_log(user_id);
         """)
+        self._migrate()
+        self._conn.executescript("""
+            CREATE INDEX IF NOT EXISTS idx_bookings_client_datum
+                ON bookings(client_id, datum_dokumenta);
+
+            -- Svako knjiženje u periodu poništava keširane izvještaje tog perioda
+            CREATE TRIGGER IF NOT EXISTS trg_bookings_cache_ins AFTER INSERT ON bookings BEGIN
+                DELETE FROM report_cache WHERE client_id = NEW.client_id
+                    AND NEW.datum_dokumenta >= date_from AND NEW.datum_dokumenta < date_to;
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_bookings_cache_upd AFTER UPDATE ON bookings BEGIN
+                DELETE FROM report_cache WHERE
+                    (client_id = NEW.client_id
+                     AND NEW.datum_dokumenta >= date_from AND NEW.datum_dokumenta < date_to)
+                    OR (client_id = OLD.client_id
+                     AND OLD.datum_dokumenta >= date_from AND OLD.datum_dokumenta < date_to);
+            END;
+            CREATE TRIGGER IF NOT EXISTS trg_bookings_cache_del AFTER DELETE ON bookings BEGIN
+                DELETE FROM report_cache WHERE client_id = OLD.client_id
+                    AND OLD.datum_dokumenta >= date_from AND OLD.datum_dokumenta < date_to;
+            END;
+        """)
+        # INSERT OR REPLACE → i DELETE trigger za zamijenjeni redak
+        self._conn.execute("PRAGMA recursive_triggers=ON")
         self._conn.commit()
 
+    def _migrate(self):
+        """Dodaj stupce koji nedostaju u starijim bazama."""
+        cols = {r[1] for r in self._conn.execute("PRAGMA table_info(bookings)")}
+        for name, decl in (("osnovica", "REAL"),
+                           ("eu_transakcija", "INTEGER DEFAULT 0"),
+                           ("reverse_charge", "INTEGER DEFAULT 0")):
+            if name not in cols:
+                self._conn.execute(f"ALTER TABLE bookings ADD COLUMN {name} {decl}")
+
     def save_booking(self, booking: Dict[str, Any]) -> str:
         """Spremi prijedlog knjiženja."""
         booking_id = booking.get("id", f"bk_{int(time.time()*1000)}")
@@ -121,8 +169,8 @@ class SQLiteStorage:
                (id, client_id, document_type, konto_duguje, konto_potrazuje,
                 iznos, pdv_stopa, pdv_iznos, opis, oib,
                 datum_dokumenta, datum_knjizenja, status, confidence,
-                ai_reasoning, erp_target)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                ai_reasoning, erp_target, osnovica, eu_transakcija, reverse_charge)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (
                 booking_id,
                 booking.get("client_id", ""),
@@ -140,6 +188,9 @@ class SQLiteStorage:
                 booking.get("confidence", 0),
                 booking.get("ai_reasoning", ""),
                 booking.get("erp_target", "CPP"),
+                booking.get("osnovica"),
+                int(bool(booking.get("eu_transakcija", False))),
+                int(bool(booking.get("reverse_charge", False))),
             ),
         )
         self._conn.commit()
@@ -207,18 +258,39 @@ class SQLiteStorage:
             ).fetchall()
         return [dict(r) for r in rows]
 
-    def get_approved_bookings(self, client_id: str = "", exported: bool = False) -> List[Dict]:
-        """Dohvati odobrena knjiženja (za izvoz u ERP)."""
-        query = "SELECT * FROM bookings WHERE status='approved'"
+    @staticmethod
+    def _approved_filter(client_id: str, exported: bool):
+        where = " WHERE status='approved'"
         params = []
         if client_id:
-            query += " AND client_id=?"
+            where += " AND client_id=?"
             params.append(client_id)
         if not exported:
-            query += " AND exported=0"
-        query += " ORDER BY datum_knjizenja"
-        rows = self._conn.execute(query, params).fetchall()
-        return [dict(r) for r in rows]
+            where += " AND exported=0"
+        return where, params
+
+    def get_approved_bookings(self, client_id: str = "", exported: bool = False) -> List[Dict]:
+        """Dohvati odobrena knjiženja (za izvoz u ERP)."""
+        return list(self.iter_approved_bookings(client_id, exported))
+
+    def iter_approved_bookings(self, client_id: str = "", exported: bool = False,
+                               chunk_size: int = 1000) -> Iterator[Dict]:
+        """Streaming varijanta get_approved_bookings — fetchmany po chunk_size redaka."""
+        where, params = self._approved_filter(client_id, exported)
+        cursor = self._conn.execute(
+            "SELECT * FROM bookings" + where + " ORDER BY datum_knjizenja", params,
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for r in rows:
+                yield dict(r)
+
+    def count_approved_bookings(self, client_id: str = "", exported: bool = False) -> int:
+        """Broj odobrenih knjiženja (za zaglavlje streaming izvoza)."""
+        where, params = self._approved_filter(client_id, exported)
+        return self._conn.execute("SELECT COUNT(*) FROM bookings" + where, params).fetchone()[0]
 
     def mark_exported(self, booking_ids: List[str]):
         """Označi knjiženja kao izvezena u ERP."""
@@ -229,6 +301,154 @@ class SQLiteStorage:
         )
         self._conn.commit()
 
+    def aggregate_vat(self, date_from: str, date_to: str,
+                      client_ids: Optional[List[str]] = None) -> List[Dict]:
+        """
+        PDV zbrojevi odobrenih računa po (klijent, tip, stopa, EU, RC).
+
+        Period je [date_from, date_to). Iznosi se zbrajaju u centima
+        (INTEGER) pa nema float drifta ni kod stotina tisuća stavki.
+        """
+        where = ("status='approved' AND document_type IN ('ulazni_racun', 'izlazni_racun')"
+                 " AND datum_dokumenta >= ? AND datum_dokumenta < ?")
+        params: List[Any] = [date_from, date_to]
+        if client_ids is not None:
+            where += f" AND client_id IN ({','.join('?' for _ in client_ids)})"
+            params.extend(client_ids)
+        rows = self._conn.execute(
+            f"""SELECT client_id, document_type, pdv_stopa, eu_transakcija, reverse_charge,
+                      SUM(CAST(ROUND(COALESCE(osnovica, iznos - pdv_iznos) * 100) AS INTEGER)),
+                      SUM(CAST(ROUND(pdv_iznos * 100) AS INTEGER)),
+                      COUNT(*)
+               FROM bookings WHERE {where}
+               GROUP BY client_id, document_type, pdv_stopa, eu_transakcija, reverse_charge""",
+            params,
+        ).fetchall()
+        return [
+            {"client_id": r[0], "document_type": r[1], "pdv_stopa": r[2],
+             "eu_transakcija": bool(r[3]), "reverse_charge": bool(r[4]),
+             "osnovica": (r[5] or 0) / 100, "pdv_iznos": (r[6] or 0) / 100, "count": r[7]}
+            for r in rows
+        ]
+
+    def iter_open_items(self, datum_do: str, datum_od: str = "",
+                        client_ids: Optional[List[str]] = None,
+                        chunk_size: int = 5000) -> Iterator[Dict]:
+        """
+        Stavke za IOS — odobreni ulazni/izlazni računi s OIB-om partnera.
+
+        Jedan upit za sve klijente, sortiran po (klijent, partner, datum).
+        Izlazni račun → duguje (partner duguje nama), ulazni → potražuje.
+        """
+        where = ("status='approved' AND document_type IN ('ulazni_racun', 'izlazni_racun')"
+                 " AND oib != '' AND datum_dokumenta <= ?")
+        params: List[Any] = [datum_do]
+        if datum_od:
+            where += " AND datum_dokumenta >= ?"
+            params.append(datum_od)
+        if client_ids is not None:
+            where += f" AND client_id IN ({','.join('?' for _ in client_ids)})"
+            params.extend(client_ids)
+        cursor = self._conn.execute(
+            f"""SELECT client_id, oib, id, datum_dokumenta, opis, document_type, iznos
+               FROM bookings WHERE {where}
+               ORDER BY client_id, oib, datum_dokumenta, id""",
+            params,
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for client_id, oib, bid, datum, opis, doc_type, iznos in rows:
+                izlazni = doc_type == "izlazni_racun"
+                yield {"client_id": client_id, "partner_oib": oib, "broj_dokumenta": bid,
+                       "datum_dokumenta": datum, "datum_dospijeca": "", "opis": opis or "",
+                       "duguje": iznos if izlazni else 0.0,
+                       "potrazuje": 0.0 if izlazni else iznos}
+
+    def aggregate_konto_flows(self, boundaries: List[str],
+                              client_ids: Optional[List[str]] = None,
+                              konto_len: int = 3) -> List[Tuple[str, int, str, int]]:
+        """
+        Promet odobrenih knjiženja po (klijent, razred datuma, grupa konta).
+
+        ``boundaries`` su rastući datumi; razred i obuhvaća
+        boundaries[i-1] <= datum < boundaries[i] (razred 0 = sve prije prve
+        granice), knjiženja od zadnje granice nadalje se ne čitaju. Grupa =
+        prvih konto_len znamenki konta (bruto bilanca po kontu: jedna granica,
+        konto_len=4). Vraća (client_id, razred, grupa, duguje −
+        potražuje u centima) — iznos ide na konto_duguje kao duguje i na
+        konto_potrazuje kao potražuje, sve u jednom grupiranom upitu.
+        """
+        razred = ("CASE " + " ".join(f"WHEN datum_dokumenta < ? THEN {i}"
+                                     for i in range(len(boundaries) - 1))
+                  + f" ELSE {len(boundaries) - 1} END") if len(boundaries) > 1 else "0"
+        where = "status='approved' AND datum_dokumenta < ?"
+        params: List[Any] = [*boundaries[:-1], boundaries[-1]]
+        if client_ids is not None:
+            where += f" AND client_id IN ({','.join('?' for _ in client_ids)})"
+            params.extend(client_ids)
+        cents = "CAST(ROUND(iznos * 100) AS INTEGER)"
+        rows = self._conn.execute(
+            f"""SELECT client_id, razred, grupa, SUM(c) FROM (
+                   SELECT client_id, {razred} AS razred,
+                          substr(konto_duguje, 1, {konto_len:d}) AS grupa, {cents} AS c
+                   FROM bookings WHERE {where} AND COALESCE(konto_duguje, '') != ''
+                   UNION ALL
+                   SELECT client_id, {razred}, substr(konto_potrazuje, 1, {konto_len:d}), -{cents}
+                   FROM bookings WHERE {where} AND COALESCE(konto_potrazuje, '') != ''
+               ) GROUP BY client_id, razred, grupa""",
+            params + params,
+        ).fetchall()
+        return [tuple(r) for r in rows]
+
+    def get_active_clients(self) -> Dict[str, Dict[str, str]]:
+        """Aktivni klijenti → {client_id: {"naziv", "oib"}} (zaglavlja obrazaca)."""
+        return {r[0]: {"naziv": r[1], "oib": r[2] or ""} for r in self._conn.execute(
+            "SELECT id, name, oib FROM clients WHERE active=1 ORDER BY id")}
+
+    def list_booking_clients(self) -> List[str]:
+        """Klijenti s barem jednim odobrenim knjiženjem."""
+        return [r[0] for r in self._conn.execute(
+            "SELECT DISTINCT client_id FROM bookings WHERE status='approved' ORDER BY client_id")]
+
+    def get_cached_report(self, kind: str, client_id: str, period: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT payload FROM report_cache WHERE kind=? AND client_id=? AND period=?",
+            (kind, client_id, period),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_cached_report(self, kind: str, client_id: str, period: str,
+                          date_from: str, date_to: str, payload: Dict):
+        """Spremi izvještaj; triggeri na bookings ga brišu pri novom knjiženju u periodu."""
+        self._conn.execute(
+            """INSERT OR REPLACE INTO report_cache
+               (kind, client_id, period, date_from, date_to, payload) VALUES (?, ?, ?, ?, ?, ?)""",
+            (kind, client_id, period, date_from, date_to, json.dumps(payload)),
+        )
+        self._conn.commit()
+
+    def get_cached_reports(self, kind: str, periods: List[str],
+                           client_ids: Optional[List[str]] = None) -> Dict[Tuple[str, str], Dict]:
+        """Više keširanih izvještaja jednim upitom → {(client_id, period): payload}."""
+        where = f"kind=? AND period IN ({','.join('?' for _ in periods)})"
+        params: List[Any] = [kind, *periods]
+        if client_ids is not None:
+            where += f" AND client_id IN ({','.join('?' for _ in client_ids)})"
+            params.extend(client_ids)
+        return {(r[0], r[1]): json.loads(r[2]) for r in self._conn.execute(
+            f"SELECT client_id, period, payload FROM report_cache WHERE {where}", params)}
+
+    def put_cached_reports(self, kind: str, rows: Iterable[Tuple[str, str, str, str, Dict]]):
+        """Spremi više izvještaja (client_id, period, date_from, date_to, payload) u jednoj transakciji."""
+        self._conn.executemany(
+            """INSERT OR REPLACE INTO report_cache
+               (kind, client_id, period, date_from, date_to, payload) VALUES (?, ?, ?, ?, ?, ?)""",
+            [(kind, cid, period, df, dt, json.dumps(payload)) for cid, period, df, dt, payload in rows],
+        )
+        self._conn.commit()
+
     def get_todays_corrections(self) -> List[Dict]:
         """Dohvati današnje ispravke (za Nightly DPO)."""
         today = datetime.now().strftime("%Y-%m-%d")
@@ -13,6 +13,10 @@ Confidence Score:
   - 3/3 slažu se → 0.95-1.00 → Prikaži korisniku
   - 2/3 slažu se → 0.70-0.94 → Prikaži + upozorenje
   - 1/3 ili manje  → < 0.70    → ZAUSTAVI, zatraži ljudsku provjeru
+
+Batch (verify_batch): stavke se grupiraju po tipu, svaka jedinstvena
+vrijednost provjerava se jednom, a kontrolne znamenke OIB-a (ISO 7064
+mod 11,10) i IBAN-a (mod 97) računaju se vektorski (NumPy) za cijelu grupu.
 """
 
 import logging
@@ -21,9 +25,50 @@ from datetime import datetime
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
 logger = logging.getLogger("nyx_light.verification.triple_check")
 
 
+# ═══════════════════════════════════════
+# VEKTORSKE KONTROLNE ZNAMENKE
+# ═══════════════════════════════════════
+
+def oib_control_digits(oibs: List[str]) -> "np.ndarray":
+    """ISO 7064 mod 11,10 kontrolna znamenka za listu OIB-a (11 ASCII znamenki)."""
+    d = np.frombuffer("".join(oibs).encode("ascii"), dtype=np.uint8).reshape(-1, 11)
+    d = d.astype(np.int16) - 48
+    remainder = np.full(len(oibs), 10, dtype=np.int16)
+    for j in range(10):
+        remainder = (remainder + d[:, j]) % 10
+        remainder[remainder == 0] = 10
+        remainder = (remainder * 2) % 11
+    check = 11 - remainder
+    check[check == 10] = 0
+    return check
+
+
+def iban_mod97(ibans: List[str]) -> "np.ndarray":
+    """IBAN mod 97 ostatak (1 = valjan) za IBAN-e iste duljine (ASCII A-Z0-9).
+
+    Znamenka pomiče ostatak ×10, slovo (A=10 … Z=35) ×100 — isto kao
+    int(numerički_niz) % 97, bez velikih brojeva.
+    """
+    rearranged = "".join(s[4:] + s[:4] for s in ibans)
+    c = np.frombuffer(rearranged.encode("ascii"), dtype=np.uint8).reshape(len(ibans), -1)
+    letter = c >= 65
+    value = np.where(letter, c.astype(np.int64) - 55, c.astype(np.int64) - 48)
+    shift = np.where(letter, 100, 10)
+    remainder = np.zeros(len(ibans), dtype=np.int64)
+    for j in range(c.shape[1]):
+        remainder = (remainder * shift[:, j] + value[:, j]) % 97
+    return remainder
+
+
 class CheckResult(Enum):
     PASS = "pass"
     FAIL = "fail"
@@ -145,64 +190,157 @@ class TripleVerifier:
         Returns:
             TripleCheckResult s konsenzusom i confidence score-om
         """
-        ctx = context or {}
         result = TripleCheckResult(field_name=field_type, original_value=value)
+        result.check_1, result.check_2, result.check_3 = self._run_checks(
+            field_type, value, context or {})
+        self._finish(result)
+
+        logger.info(
+            "Triple check [%s]: %s (confidence=%.2f, human_review=%s)",
+            field_type, result.consensus.value,
+            result.confidence, result.needs_human_review,
+        )
+
+        return result
 
+    def _run_checks(self, field_type: str, value: Any, ctx: Dict,
+                    overrides: Optional[Dict[int, VerificationResult]] = None
+                    ) -> List[VerificationResult]:
+        """Pokreni (najviše 3) registrirane provjere → [check_1, check_2, check_3]."""
         checks = self._checks.get(field_type, {})
-        check_list = list(checks.items())
+        out: List[Optional[VerificationResult]] = [None, None, None]
 
         # Pokreni sve registrirane provjere (min 3)
-        for i, (name, fn) in enumerate(check_list[:3]):
+        for i, (name, fn) in enumerate(list(checks.items())[:3]):
+            if overrides and i in overrides:
+                out[i] = overrides[i]
+                continue
             try:
-                vr = fn(value, ctx)
-                if i == 0:
-                    result.check_1 = vr
-                elif i == 1:
-                    result.check_2 = vr
-                elif i == 2:
-                    result.check_3 = vr
+                out[i] = fn(value, ctx)
             except Exception as e:
                 logger.error("Check %s failed: %s", name, e)
-                vr = VerificationResult(
+                out[i] = VerificationResult(
                     check_name=name,
                     result=CheckResult.UNCERTAIN,
                     value=None,
                     details=f"Error: {e}",
                 )
-                if i == 0:
-                    result.check_1 = vr
-                elif i == 1:
-                    result.check_2 = vr
-                elif i == 2:
-                    result.check_3 = vr
 
         # Popuni nedostajuće provjere
-        for i, attr in enumerate(["check_1", "check_2", "check_3"]):
-            if getattr(result, attr) is None:
-                setattr(result, attr, VerificationResult(
+        for i in range(3):
+            if out[i] is None:
+                out[i] = VerificationResult(
                     check_name=f"missing_{i}",
                     result=CheckResult.UNCERTAIN,
                     value=None,
                     details="Provjera nije registrirana za ovaj tip",
-                ))
+                )
+        return out
 
+    def _finish(self, result: TripleCheckResult):
         result.compute_consensus()
 
         # Statistike
         self._stats["total"] += 1
         self._stats[result.consensus.value] += 1
 
-        logger.info(
-            "Triple check [%s]: %s (confidence=%.2f, human_review=%s)",
-            field_type, result.consensus.value,
-            result.confidence, result.needs_human_review,
-        )
+    def verify_batch(self, items: List[Tuple[str, Any, Dict]]) -> List[TripleCheckResult]:
+        """
+        Verificiraj batch podataka (npr. svi OIB/IBAN/PDV iz uvoza).
 
-        return result
+        Stavke se grupiraju po tipu. Za OIB i IBAN (ugrađene provjere ne
+        ovise o kontekstu) svaka jedinstvena vrijednost provjerava se jednom,
+        a algoritamska provjera ide vektorski; vrijednosti koje nisu čisti
+        ASCII zapis idu kroz provjeru po stavci. Ostali tipovi — po stavci.
+        """
+        results: List[Optional[TripleCheckResult]] = [None] * len(items)
+        groups: Dict[str, List[int]] = {}
+        for i, (field_type, _, _) in enumerate(items):
+            groups.setdefault(field_type, []).append(i)
+
+        for field_type, idx in groups.items():
+            batch = self._batch_checks(field_type)
+            if batch is None:
+                for i in idx:
+                    _, value, ctx = items[i]
+                    result = TripleCheckResult(field_name=field_type, original_value=value)
+                    result.check_1, result.check_2, result.check_3 = self._run_checks(
+                        field_type, value, ctx or {})
+                    self._finish(result)
+                    results[i] = result
+                continue
+
+            normalize, algo = batch
+            memo: Dict[str, List[VerificationResult]] = {}
+            keys = [normalize(items[i][1]) for i in idx]
+            unique = list(dict.fromkeys(keys))
+            algo_results = algo(unique) if HAS_NUMPY else {}
+            for key in unique:
+                overrides = {1: algo_results[key]} if key in algo_results else None
+                memo[key] = self._run_checks(field_type, key, {}, overrides)
+            for i, key in zip(idx, keys):
+                result = TripleCheckResult(field_name=field_type, original_value=items[i][1])
+                result.check_1, result.check_2, result.check_3 = memo[key]
+                self._finish(result)
+                results[i] = result
+
+        if items:
+            review = sum(1 for r in results if r.needs_human_review)
+            logger.info("Triple check batch: %d stavki (%s), %d za ljudsku provjeru",
+                        len(items), ", ".join(f"{ft}={len(ix)}" for ft, ix in groups.items()),
+                        review)
+        return results
+
+    def _batch_checks(self, field_type: str):
+        """(normalizacija, vektorska algo provjera) ako su registrirane ugrađene provjere."""
+        builtin = {
+            "oib": ((self._oib_ai_check, self._oib_algo_check, self._oib_rule_check),
+                    lambda v: str(v).strip(), self._oib_algo_batch),
+            "iban": ((self._iban_ai_check, self._iban_algo_check, self._iban_rule_check),
+                     lambda v: str(v).replace(" ", "").upper(), self._iban_algo_batch),
+        }.get(field_type)
+        if builtin is None:
+            return None
+        fns, normalize, algo = builtin
+        if tuple(self._checks.get(field_type, {}).values())[:3] != fns:
+            return None              # provjere su zamijenjene — po stavci
+        return normalize, algo
 
-    def verify_batch(self, items: List[Tuple[str, Any, Dict]]) -> List[TripleCheckResult]:
-        """Verificiraj batch podataka."""
-        return [self.verify(ft, val, ctx) for ft, val, ctx in items]
+    @staticmethod
+    def _oib_algo_batch(oibs: List[str]) -> Dict[str, VerificationResult]:
+        """ISO 7064 mod 11,10 za sve OIB-e od 11 ASCII znamenki odjednom."""
+        ok = [s for s in oibs if len(s) == 11 and s.isascii() and s.isdigit()]
+        if not ok:
+            return {}
+        out = {}
+        for s, check in zip(ok, oib_control_digits(ok).tolist()):
+            is_valid = check == int(s[10])
+            out[s] = VerificationResult(
+                check_name="algo_check",
+                result=CheckResult.PASS if is_valid else CheckResult.FAIL,
+                value=s if is_valid else None,
+                details=f"ISO 7064 mod 11,10: {'PASS' if is_valid else 'FAIL'} (kontrolna={check}, zadnja={s[10]})",
+            )
+        return out
+
+    @staticmethod
+    def _iban_algo_batch(ibans: List[str]) -> Dict[str, VerificationResult]:
+        """IBAN mod 97 za sve IBAN-e (A-Z0-9, ≥ 5 znakova), grupirano po duljini."""
+        by_len: Dict[int, List[str]] = {}
+        for s in ibans:
+            if len(s) >= 5 and s.isascii() and s.isalnum():
+                by_len.setdefault(len(s), []).append(s)
+        out = {}
+        for group in by_len.values():
+            for s, rem in zip(group, iban_mod97(group).tolist()):
+                ok = rem == 1
+                out[s] = VerificationResult(
+                    check_name="algo_check",
+                    result=CheckResult.PASS if ok else CheckResult.FAIL,
+                    value=s if ok else None,
+                    details=f"IBAN mod 97: {'PASS' if ok else 'FAIL'}",
+                )
+        return out
 
     def get_stats(self) -> Dict[str, Any]:
         total = self._stats["total"]
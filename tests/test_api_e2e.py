@@ -484,6 +484,38 @@ class TestBackup:
         stats = bm.get_stats()
         assert "total_backups" in stats
 
+    def test_incremental_backup_dedup_and_restore(self, tmp_path, monkeypatch):
+        import sqlite3
+        from nyx_light.backup import BackupManager
+        monkeypatch.chdir(tmp_path)
+        Path("data/memory_db").mkdir(parents=True)
+        Path("data/dpo_datasets").mkdir(parents=True)
+        conn = sqlite3.connect("data/memory_db/nyx_light.db")
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        conn.executemany("INSERT INTO t (v) VALUES (?)", [("x" * 500,)] * 5000)
+        conn.commit()
+        Path("data/dpo_datasets/pairs.jsonl").write_text('{"p": 1}\n' * 20000)
+
+        bm = BackupManager(backup_dir="data/backups")
+        first = bm.create_backup("inc1", mode="incremental")
+        assert first["mode"] == "incremental"
+        assert first["metrics"]["chunks_new"] == first["metrics"]["chunks_total"]
+
+        conn.execute("UPDATE t SET v='promjena' WHERE id=1")
+        conn.commit()
+        conn.close()
+        second = bm.create_backup("inc2", mode="incremental")
+        m = second["metrics"]
+        assert 0 < m["chunks_new"] < m["chunks_total"]
+        assert m["dedup_ratio"] > 0.5
+
+        result = bm.restore_backup(first["name"], target_root="restored")
+        assert result["status"] == "ok" and result["restored"] == 2
+        old = sqlite3.connect("restored/data/memory_db/nyx_light.db")
+        assert old.execute("SELECT v FROM t WHERE id=1").fetchone()[0] == "x" * 500
+        old.close()
+        assert Path("restored/data/dpo_datasets/pairs.jsonl").read_text().count("\n") == 20000
+
 
 class TestScheduler:
     def test_scheduler_creation(self):
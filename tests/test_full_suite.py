@@ -95,6 +95,37 @@ class TestERPExporter:
         self.exporter.export_synesis_csv(self._sample_bookings(), "test")
         stats = self.exporter.get_stats()
         assert stats["total_exports"] == 2
+
+    def test_export_cpp_xml_from_generator_gzip(self):
+        import gzip
+        import xml.etree.ElementTree as ET
+
+        def gen():
+            for b in self._sample_bookings():
+                yield dict(b, opis=b["opis"] + " & <ostalo>")
+
+        result = self.exporter.export_cpp_xml(gen(), "klijent_GZ", compress=True, count=2)
+        assert result["file"].endswith(".xml.gz")
+        assert result["records"] == 2
+        with gzip.open(result["file"], "rt", encoding="utf-8") as f:
+            root = ET.parse(f).getroot()
+        assert root.find("Zaglavlje/BrojStavki").text == "2"
+        stavke = root.findall("Stavke/Stavka")
+        assert [s.find("RedniBroj").text for s in stavke] == ["1", "2"]
+        assert stavke[0].find("Opis").text == "Usluga web dizajna & <ostalo>"
+
+    def test_streaming_json_matches_json_dumps(self):
+        import io
+        from nyx_light.export.streaming import write_json_document
+
+        meta = {"client_id": "K1", "record_count": 2}
+        item = lambda i, b: {"rb": i, "opis": b["opis"]}
+        for bookings in (self._sample_bookings(), []):
+            buf = io.StringIO()
+            write_json_document(buf, meta, iter(bookings), item)
+            expected = {"meta": meta,
+                        "bookings": [item(i, b) for i, b in enumerate(bookings, 1)]}
+            assert buf.getvalue() == json.dumps(expected, indent=2, ensure_ascii=False)
 """Tests za Session Manager."""
 
 from nyx_light.sessions.manager import SessionManager
@@ -110,3 +110,46 @@ class TestMoEStats:
         assert "8/128" in stats["active_experts"]
         assert "memory" in stats
         assert stats["memory"]["model_architecture"] == "MoE"
+
+
+class TestVLLMHttpClient:
+    """Async HTTP prema vLLM-MLX serveru (stub OpenAI-kompatibilan server)."""
+
+    MSGS = [{"role": "user", "content": "Kontiraj račun"}]
+
+    def test_concurrent_requests_do_not_serialize(self):
+        import asyncio
+        import time
+        from scripts.bench_llm_http import StubServer
+
+        with StubServer(delay=0.3, tokens=5) as stub:
+            async def run():
+                llm = NyxLightLLM(LLMConfig(vllm_port=stub.port))
+                await llm.refresh_health()
+                t0 = time.perf_counter()
+                out = await asyncio.gather(*(llm.generate(self.MSGS) for _ in range(8)))
+                sec = time.perf_counter() - t0
+                tokens = [t async for t in llm.generate_stream(self.MSGS)]
+                stats = llm.get_stats()["http"]
+                await llm.aclose()
+                return out, sec, tokens, stats
+
+            out, sec, tokens, stats = asyncio.run(run())
+        assert all(r["content"].startswith("tok0") for r in out)
+        assert sec < 8 * 0.3 / 2          # serijski bi trajalo 2.4 s
+        assert "".join(tokens) == "tok0 tok1 tok2 tok3 tok4 "
+        assert stats["health_checks"] == 1 and stats["errors"] == 0
+
+    def test_server_down_uses_cached_health(self):
+        import asyncio
+        llm = NyxLightLLM(LLMConfig(vllm_port=1))
+
+        async def run():
+            first = await llm.generate(self.MSGS)
+            second = await llm.generate(self.MSGS)
+            await llm.aclose()
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert "Estimation Mode" in first["content"] and "Estimation Mode" in second["content"]
+        assert llm._http_stats["health_checks"] == 1
@@ -39,3 +39,42 @@ class TestAccountingOverseer:
             "km_naknada": 0.50,
         })
         assert len(result["warnings"]) > 0
+
+    def test_diacritic_folding(self):
+        """'tuzba' bez dijakritika blokira isto kao 'tužba'."""
+        result = self.overseer.evaluate("Kako napisati TUZBU protiv dobavljaca?")
+        assert result["approved"] is False
+        assert result["boundary_type"] == "labor_law"
+        # Payroll kontekst bez dijakritika i dalje prolazi
+        result = self.overseer.evaluate("Obracun otpremnine kod otkaz radniku, bruto 2000")
+        assert result["approved"] is True
+
+    def test_scan_returns_all_categories(self):
+        hits = self.overseer.scan("Otkaz radniku — obračun neto plaće, pošalji u cpp preko ChatGPT")
+        assert hits["payroll_context"] == ["otkaz"]
+        assert hits["legal_domain"] == ["otkaz radniku"]
+        assert set(hits["payroll_indicator"]) == {"obračun", "neto"}
+        assert hits["autonomous_booking"] == ["pošalji u CPP"]
+        assert hits["privacy"] == ["chatgpt"]
+        assert self.overseer.scan("Koji konto za uredski materijal?") == {}
+
+    def test_booking_keywords_use_automaton(self):
+        result = self.overseer.validate_booking({"opis": "Trošak REPREZENTACIJE"})
+        assert any("reprezentacije" in w for w in result["warnings"])
+
+
+class TestKeywordAutomaton:
+    def test_overlapping_matches_in_one_pass(self):
+        from nyx_light.safety import KeywordAutomaton
+        ac = KeywordAutomaton({"a": ["he", "she", "hers"], "b": ["his", "she"]})
+        assert ac.scan("ushers") == {"a": ["he", "she", "hers"], "b": ["she"]}
+        assert ac.scan("ahishe") == {"a": ["he", "she"], "b": ["his", "she"]}
+        assert ac.scan("xyz") == {}
+
+    def test_word_cache_matches_across_words(self):
+        """Fraze preko granice riječi i s razmakom na kraju ("sud ")."""
+        from nyx_light.safety import KeywordAutomaton
+        ac = KeywordAutomaton({"x": ["sud ", "ugovor o radu", "o r"]})
+        for _ in range(2):                      # drugi prolaz iz cachea riječi
+            assert ac.scan("Ugovor o radu i sud  danas") == {"x": ["sud ", "ugovor o radu", "o r"]}
+            assert ac.scan("sud") == {}
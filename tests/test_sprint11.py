@@ -125,6 +125,55 @@ class TestAuthManager:
         assert len(users) >= 1
         assert users[0].username == "admin"
 
+    def test_verify_token_cached(self):
+        token = self.mgr.login("admin", "admin")["token"]
+        first = self.mgr.verify_token(token)
+        assert self.mgr.verify_token(token) is first
+        assert self.mgr._token_cache.get_stats()["hits"] >= 1
+
+    def test_revoke_token(self):
+        token = self.mgr.login("admin", "admin")["token"]
+        assert self.mgr.verify_token(token) is not None
+        self.mgr.revoke_token(token)
+        assert self.mgr.verify_token(token) is None
+
+    def test_change_password_revokes_tokens(self):
+        token = self.mgr.login("admin", "admin")["token"]
+        assert self.mgr.verify_token(token) is not None
+        self.mgr.change_password("admin", "novo")
+        assert self.mgr.verify_token(token) is None
+        fresh = self.mgr.login("admin", "novo")["token"]
+        assert self.mgr.verify_token(fresh) is not None
+
+    def test_login_async(self):
+        import asyncio
+        result = asyncio.run(self.mgr.login_async("admin", "admin"))
+        assert result["ok"] is True
+
+
+class TestTokenCache:
+    def _auth(self, username="u", ttl=60):
+        import time
+        from nyx_light.auth import AuthToken, Role
+        now = time.time()
+        return AuthToken("id", username, Role.ASISTENT, now, now + ttl)
+
+    def test_lru_bound(self):
+        from nyx_light.auth import TokenCache
+        cache = TokenCache(max_size=2)
+        for d in ("a", "b", "c"):
+            cache.put(d, self._auth())
+        assert len(cache) == 2
+        assert cache.get("a") is None
+        assert cache.get("c") is not None
+
+    def test_expired_evicted(self):
+        from nyx_light.auth import TokenCache
+        cache = TokenCache()
+        cache.put("x", self._auth(ttl=-1))
+        assert cache.get("x") is None
+        assert len(cache) == 0
+
 
 # ═══════════════════════════════════════════════════
 # MODEL MANAGER TESTS
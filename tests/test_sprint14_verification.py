@@ -176,6 +176,37 @@ class TestTripleVerification(unittest.TestCase):
         self.assertEqual(results[0].field_name, "oib")
         self.assertEqual(results[1].field_name, "pdv_iznos")
 
+    def test_batch_matches_single_verify(self):
+        """Vektorski batch (OIB mod 11,10, IBAN mod 97) = verify() po stavci."""
+        values = [
+            ("oib", "94577403194"), ("oib", " 94577403194 "), ("oib", "94577403195"),
+            ("oib", "00000000000"), ("oib", "1234"), ("oib", "9457740319٤"), ("oib", 94577403194),
+            ("iban", "HR1210010051863000160"), ("iban", "hr12 1001 0051 8630 0016 0"),
+            ("iban", "HR1210010051863000161"), ("iban", "GB82WEST12345698765432"),
+            ("iban", "HR12-1001"), ("iban", "HR1"),
+            ("pdv_iznos", 25.0), ("konto", "4010"),
+        ]
+        items = [(ft, v, {"osnovica": 100.0}) for ft, v in values] * 3
+        batch = TripleVerifier().verify_batch(items)
+        single = TripleVerifier()
+        for (ft, v, ctx), got in zip(items, batch):
+            expected = single.verify(ft, v, ctx)
+            self.assertEqual(got.to_dict(), expected.to_dict(), (ft, v))
+            for attr in ("check_1", "check_2", "check_3"):
+                self.assertEqual(getattr(got, attr).details, getattr(expected, attr).details)
+        stats = TripleVerifier()
+        stats.verify_batch(items)
+        self.assertEqual(stats.get_stats(), single.get_stats())
+
+    def test_batch_respects_custom_checks(self):
+        """Zamijenjena provjera → batch ide po stavci kroz nju."""
+        v = TripleVerifier()
+        v.register_check("oib", "algo_check", lambda val, ctx: VerificationResult(
+            "algo_check", CheckResult.FAIL, None, "custom"))
+        result = v.verify_batch([("oib", "94577403194", {})])[0]
+        self.assertEqual(result.check_2.details, "custom")
+        self.assertEqual(result.consensus, ConsensusLevel.MAJORITY)
+
     # ── Stats ──
 
     def test_stats_tracking(self):
@@ -901,6 +901,121 @@ class TestKnowledgeVaultIntegrity:
         assert isinstance(manifest.file_hashes, dict)
         assert manifest.total_files >= 0
 
+    @staticmethod
+    def _vault_tree(base, files):
+        """Knowledge datoteke s mtime u prošlosti (izvan "racy" prozora)."""
+        import os
+        import time
+        for rel, data in files.items():
+            path = base / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            old = time.time() - 3600
+            os.utime(path, (old, old))
+
+    def test_manifest_merkle_verify(self, tmp_path):
+        """Merkle root: netaknuto → OK; izmjena/brisanje → točno te datoteke."""
+        from nyx_light.silicon.knowledge_vault import KnowledgeVault
+        self._vault_tree(tmp_path, {
+            "data/rag_db/seg/a.bin": b"a" * 4096,
+            "data/rag_db/seg/b.bin": b"b" * 4096,
+            "data/dpo_datasets/pairs.jsonl": b'{"chosen": "4010"}\n',
+            "config.json": b"{}",
+        })
+        vault = KnowledgeVault(base_dir=str(tmp_path))
+        manifest = vault.create_manifest()
+        assert manifest.total_files == 4
+        assert manifest.merkle_root
+        assert {"data", "data/rag_db", "data/rag_db/seg"} <= set(manifest.dir_hashes)
+        assert vault.verify_manifest(manifest) == (True, [])
+
+        (tmp_path / "data/rag_db/seg/a.bin").write_bytes(b"x" * 4096)
+        (tmp_path / "data/dpo_datasets/pairs.jsonl").unlink()
+        ok, mismatches = vault.verify_manifest(manifest)
+        assert not ok
+        assert len(mismatches) == 2
+        assert mismatches[0].startswith("CHANGED: data/rag_db/seg/a.bin")
+        assert mismatches[1] == "MISSING: data/dpo_datasets/pairs.jsonl"
+
+        # Samo datoteka u korijenu (roditelj "") mora se i dalje otkriti
+        fresh = vault.create_manifest()
+        (tmp_path / "config.json").write_bytes(b'{"model": "drugi"}')
+        ok, mismatches = vault.verify_manifest(fresh)
+        assert not ok
+        assert len(mismatches) == 1 and mismatches[0].startswith("CHANGED: config.json")
+
+    def test_manifest_hash_cache_rehashes_only_changed(self, tmp_path):
+        """Drugi manifest čita samo promijenjene datoteke (size/mtime/inode)."""
+        from nyx_light.silicon.knowledge_vault import KnowledgeVault
+        self._vault_tree(tmp_path, {f"data/models/lora/v{i}/w.bin": bytes([i]) * 2048
+                                    for i in range(6)})
+        first = KnowledgeVault(base_dir=str(tmp_path)).create_manifest()
+
+        vault = KnowledgeVault(base_dir=str(tmp_path))  # cache s diska
+        again = vault.create_manifest()
+        assert vault.last_hash_stats["rehashed"] == 0
+        assert again.merkle_root == first.merkle_root
+
+        # Ista veličina, novi sadržaj i mtime → mora se ponovno hashirati
+        self._vault_tree(tmp_path, {"data/models/lora/v2/w.bin": b"z" * 2048})
+        changed = vault.create_manifest()
+        assert vault.last_hash_stats["rehashed"] == 1
+        assert changed.merkle_root != first.merkle_root
+        assert vault.verify_manifest(first)[1][0].startswith(
+            "CHANGED: data/models/lora/v2/w.bin")
+
+    def test_manifest_blake2b_and_legacy_json(self, tmp_path):
+        """BLAKE2b opcija + stari manifest bez Merkle roota se i dalje provjerava."""
+        import json
+        from nyx_light.silicon.knowledge_vault import IntegrityManifest, KnowledgeVault
+        self._vault_tree(tmp_path, {"data/laws/zakon.txt": b"Zakon o PDV-u" * 100})
+        vault = KnowledgeVault(base_dir=str(tmp_path), hash_algorithm="blake2b",
+                               use_hash_cache=False)
+        manifest = vault.create_manifest()
+        assert manifest.algorithm == "blake2b"
+        assert len(manifest.file_hashes["data/laws/zakon.txt"]) == 128
+        assert vault.verify_manifest(IntegrityManifest.from_json(manifest.to_json()))[0]
+        assert not (tmp_path / "data/models/manifest_hash_cache.json").exists()
+
+        legacy = json.loads(KnowledgeVault(base_dir=str(tmp_path)).create_manifest().to_json())
+        for key in ("algorithm", "merkle_root", "dir_hashes"):
+            legacy.pop(key)
+        assert vault.verify_manifest(IntegrityManifest.from_json(json.dumps(legacy))) == (True, [])
+        with pytest.raises(ValueError):
+            KnowledgeVault(base_dir=str(tmp_path), hash_algorithm="md5")
+
+    def test_parallel_hashing_keeps_order(self, tmp_path, monkeypatch):
+        """Thread pool (najveće prve) vraća hasheve istim redom kao ulaz."""
+        import hashlib
+        from nyx_light.silicon import knowledge_vault as kv
+        monkeypatch.setattr(kv, "PARALLEL_HASH_MIN_BYTES", 0)
+        files = []
+        for i, size in enumerate([10, 3_000_000, 0, 70_000]):
+            path = tmp_path / f"f{i}.bin"
+            path.write_bytes(bytes([i]) * size)
+            files.append((path, size))
+        files.append((tmp_path / "missing.bin", 0))
+        digests = kv._hash_files(files, "sha256", workers=3)
+        assert digests[:4] == [hashlib.sha256(p.read_bytes()).hexdigest() for p, _ in files[:4]]
+        assert digests[4] is None
+
+    def test_dpo_retrain_export_dedup(self, tmp_path):
+        """Retrain export spaja noćne datasete i preskače ponovljene parove."""
+        import json
+        from nyx_light.silicon.knowledge_vault import KnowledgeVault
+        vault = KnowledgeVault(base_dir=str(tmp_path))
+        dpo_dir = tmp_path / "data/dpo_datasets"
+        for night in range(2):
+            rows = [{"prompt": f"Račun {i}", "chosen": "4010", "rejected": "4090",
+                     "metadata": {"night": night}} for i in range(12)]
+            (dpo_dir / f"dpo_night{night}.jsonl").write_text(
+                "\n".join(json.dumps(r, ensure_ascii=False) for r in rows) + "\n")
+        path = vault.export_dpo_for_retrain()
+        assert path
+        lines = open(path).read().splitlines()
+        assert len(lines) == 12
+        assert all(json.loads(l)["metadata"]["night"] == 0 for l in lines)
+
     def test_memory_verification(self):
         """verify_memory_intact() mora dati izvještaj o svim slojevima."""
         from nyx_light.silicon.knowledge_vault import KnowledgeVault
@@ -1009,6 +1124,179 @@ class TestVLLMMLXEngine:
         # Hit rate
         assert cache.hit_rate > 0
 
+    class FakeKV:
+        """Lažno KV stanje (kao mlx cache: ima nbytes)."""
+
+        def __init__(self, name, nbytes=100):
+            self.name, self.nbytes = name, nbytes
+
+    def test_prompt_cache_shared_prefix(self, tmp_path):
+        """Radix cache vraća najdulji cachirani prefiks (system → klijent)."""
+        from nyx_light.silicon.vllm_mlx_engine import PromptCache
+        cache = PromptCache(str(tmp_path))
+        system, client = [1, 2, 3, 4], [1, 2, 3, 4, 7, 7]
+        cache.insert(system, self.FakeKV("sys"))
+        cache.insert(client, self.FakeKV("klijent"))
+
+        n, kv = cache.match(client + [9, 9, 9])
+        assert (n, kv.name) == (6, "klijent")
+        n, kv = cache.match(system + [5, 5])          # drugi klijent — samo system
+        assert (n, kv.name) == (4, "sys")
+        assert cache.match([8, 8]) == (0, None)
+        assert cache.match([1, 2, 3]) == (0, None)     # pola system prompta nije cachirano
+
+        s = cache.stats()
+        assert s["hits"] == 2 and s["misses"] == 2
+        assert s["saved_prefill_tokens"] == 10
+        assert s["entries"] == 2 and s["bytes"] == 200
+
+        cache.remove(system)
+        n, kv = cache.match(client)
+        assert (n, kv.name) == (6, "klijent")
+
+        # trim_kv: točka grananja dva prompta dobiva KV zajedničkog prefiksa
+        trimmed = PromptCache(str(tmp_path / "t"),
+                              trim_kv=lambda kv, n: self.FakeKV(f"{kv.name}-{n}"))
+        trimmed.insert([5, 6, 7, 1], self.FakeKV("a"))
+        trimmed.insert([5, 6, 7, 2, 2], self.FakeKV("b"))
+        n, kv = trimmed.match([5, 6, 7, 3])
+        assert (n, kv.name) == (3, "b-2")
+
+    def test_prompt_cache_split_under_tight_budget(self, tmp_path):
+        """Grananje uz pun budžet: izbacivanje brata ne smije otkačiti novi unos."""
+        from nyx_light.silicon.vllm_mlx_engine import PromptCache
+        cache = PromptCache(str(tmp_path), max_bytes=150,
+                            trim_kv=lambda kv, n: self.FakeKV(f"{kv.name}-{n}"))
+        assert cache.insert([1, 2, 3, 4], self.FakeKV("a"))
+        assert cache.insert([1, 2, 9], self.FakeKV("b"))
+
+        n, kv = cache.match([1, 2, 9, 5])
+        assert (n, kv.name) == (3, "b")
+        assert cache.match([1, 2, 3, 4]) == (0, None)
+        assert list(cache._root.children[1].key) == [1, 2, 9]
+        s = cache.stats()
+        assert s["entries"] == 1 and s["bytes"] == 100
+
+    def test_prompt_cache_budget_eviction_and_spill(self, tmp_path):
+        """Budžet bajtova: LRU + prioritet, PINNED ostaje, hladni idu na disk."""
+        from nyx_light.silicon.apple_silicon import MemoryPriority
+        from nyx_light.silicon.vllm_mlx_engine import PromptCache
+        cache = PromptCache(str(tmp_path), max_bytes=300, spill_to_disk=True)
+        cache.insert([1, 1], self.FakeKV("sys"), priority=MemoryPriority.PINNED)
+        cache.insert([1, 1, 2], self.FakeKV("a"))
+        cache.insert([1, 1, 3], self.FakeKV("b"))
+        cache.match([1, 1, 2, 5])                      # a je svježiji od b
+        cache.insert([1, 1, 4], self.FakeKV("c"))
+
+        s = cache.stats()
+        assert s["bytes"] <= 300 and s["resident_entries"] == 3
+        assert s["evictions"] == 1 and s["spills"] == 1 and s["spilled_entries"] == 1
+        assert len(list(tmp_path.glob("*.kv"))) == 1
+
+        n, kv = cache.match([1, 1, 3, 9])              # b se vraća s diska
+        assert (n, kv.name) == (3, "b")
+        s = cache.stats()
+        assert s["disk_hits"] == 1 and s["bytes"] <= 300
+        assert cache.match([1, 1, 9])[1].name == "sys"   # PINNED nikad ne ispada
+
+        assert cache.insert([2], self.FakeKV("velik", 10_000)) is False
+        cache.clear()
+        assert cache.stats()["entries"] == 0 and not list(tmp_path.glob("*.kv"))
+
+    def test_prompt_cache_uma_regions(self, tmp_path):
+        """Svaki unos je UMA regija PROMPT_CACHE; budžet ne prelazi UMA budžet."""
+        from nyx_light.silicon.apple_silicon import MemoryRegionType, UMAController
+        from nyx_light.silicon.vllm_mlx_engine import PromptCache
+        uma = UMAController(total_gb=1)
+        cache = PromptCache(str(tmp_path), max_bytes=1 << 40, uma=uma)
+        assert cache.max_bytes == uma.budget_bytes(MemoryRegionType.PROMPT_CACHE)
+
+        cache.insert([1, 2], self.FakeKV("sys", 1 << 20))
+        regions = [r for r in uma._regions.values()
+                   if r.region_type == MemoryRegionType.PROMPT_CACHE]
+        assert len(regions) == 1 and regions[0].size_bytes == 1 << 20
+
+        uma.release(regions[0].region_id)              # UMA ga izbacio pod pritiskom
+        assert cache.match([1, 2, 3]) == (0, None)
+        assert cache.stats()["entries"] == 0
+
+
+class TestNgramDraftCache:
+    """N-gram trie za speculative drafting."""
+
+    KONTO = [40, 10, 7, 99, 3]                     # "Konto 4010 — Nabava materijala"
+
+    def test_draft_backoff_and_tree(self):
+        """Drafta najčešći nastavak, s kraćim kontekstom ako dulji nije viđen."""
+        from nyx_light.silicon.speculative_decoder import NgramDraftCache
+        cache = NgramDraftCache(n=3, min_freq=2)
+        for _ in range(3):
+            cache.update([1] + self.KONTO)
+        cache.update([2, 40, 10, 8, 8])
+        cache.update([2, 40, 10, 8, 8])
+
+        assert cache.draft([1, 40, 10], k=3).tokens == [7, 99, 3]
+        # [5, 40, 10] nikad viđen → back-off na [40, 10]
+        assert cache.draft([5, 40, 10], k=2).tokens == [7, 99]
+        assert cache.draft([77, 78], k=3) is None
+
+        tree = cache.draft_tree([5, 40, 10], k=3, branches=3)
+        assert [d.tokens for d in tree] == [[7, 99, 3], [8, 8]]
+        assert tree[0].log_probs[0] > tree[1].log_probs[0]
+
+        # update(start=) broji samo nove tokene prozora
+        before = cache.stats()["vocab_entries"]
+        cache.update([1, 40, 10, 7], start=4)
+        cache.update([1, 40, 10, 7], start=4)
+        assert cache.draft([1, 40, 10], k=1).tokens == [7]
+        assert cache.stats()["vocab_entries"] == before
+
+    def test_persist_prewarm_and_evaluate(self, tmp_path):
+        """Trie preživi restart; pre-warm iz korpusa podiže prihvaćanje."""
+        from nyx_light.silicon.speculative_decoder import (
+            NgramDraftCache, SpeculativeConfig, SpeculativeDecodingEngine,
+            evaluate_ngram_drafts, iter_warm_texts)
+        vocab = {}
+        encode = lambda text: [vocab.setdefault(w, len(vocab)) for w in text.split()]
+        laws = tmp_path / "laws"
+        laws.mkdir()
+        (laws / "pdv.md").write_text("obveza PDV-a nastaje danom isporuke dobara " * 5)
+        texts = list(iter_warm_texts(str(laws), dpo_db=None))
+        assert len(texts) == 2 and "4010" in texts[1]
+
+        warm = NgramDraftCache(n=3, min_freq=2)
+        assert warm.prewarm(texts, encode) > 0
+        answers = [encode("prema Zakonu obveza PDV-a nastaje danom isporuke dobara")] * 2
+        cold = evaluate_ngram_drafts(NgramDraftCache(n=3, min_freq=2), answers)
+        hot = evaluate_ngram_drafts(warm, answers)
+        assert hot["tokens_per_step"] > cold["tokens_per_step"]
+        assert hot["acceptance_rate"] > 0 and hot["drafted_tokens_per_step"] > 0
+
+        path = tmp_path / "ngram.bin"
+        warm.save(str(path))
+        engine = SpeculativeDecodingEngine(SpeculativeConfig(ngram_cache_path=str(path)))
+        restored = engine.ngram_cache
+        assert restored.stats()["vocab_entries"] == warm.stats()["vocab_entries"]
+        ctx = encode("obveza PDV-a")
+        assert restored.draft(ctx, 3).tokens == warm.draft(ctx, 3).tokens
+
+    def test_prewarm_saves_trie_and_truncated_file_falls_back(self, tmp_path):
+        from nyx_light.silicon.speculative_decoder import (
+            SpeculativeConfig, SpeculativeDecodingEngine, prewarm_ngram_cache)
+        vocab = {}
+        encode = lambda text: [vocab.setdefault(w, len(vocab)) for w in text.split()]
+        path = tmp_path / "models" / "ngram_trie.bin"
+        config = SpeculativeConfig(ngram_cache_path=str(path))
+        assert prewarm_ngram_cache(config, texts=["a b c"],
+                                   models_dir=str(tmp_path))["status"] == "skipped"
+
+        res = prewarm_ngram_cache(config, encode, texts=["konto 4010 nabava materijala"] * 4)
+        assert res["status"] == "saved" and res["tokens"] == 16 and path.exists()
+        assert SpeculativeDecodingEngine(config).ngram_cache.vocab_size == res["nodes"]
+
+        path.write_bytes(path.read_bytes()[:-8])       # skraćena datoteka → EOFError
+        assert SpeculativeDecodingEngine(config).ngram_cache.vocab_size == 0
+
 
 # ═════════════════════════════════════════════════════════════
 # L. MATH VS AI SEPARATION SUMMARY
@@ -602,6 +602,121 @@ class TestChatBridge:
         bridge.clear_history("sess_test")
         assert "sess_test" not in bridge._histories
 
+    def test_prompt_budget_and_shared_prefix_order(self):
+        from nyx_light.llm.chat_bridge import ChatBridge, ChatContext, ChatMessage
+        bridge = ChatBridge(max_context_tokens=2048, max_tokens=512)
+        bridge._histories["s"] = [ChatMessage("user" if i % 2 == 0 else "assistant",
+                                              f"poruka {i} " + "riječ " * 150)
+                                  for i in range(12)]
+        ctx = ChatContext(
+            rag_results=[{"source": "ZoPDV čl. 40", "text": "Porezni obveznik " * 400}],
+            semantic_facts=["Klijent vodi PDV po naplaćenoj naknadi"],
+            client_info={"name": "Firma d.o.o.", "oib": "12345678901"},
+            request_notes=["[Router: moguć modul 'pdv' (55%)]"],
+        )
+        built = bridge.build_prompt("Kako kontirati predujam?", "s", ctx)
+        msgs = built.messages
+
+        assert built.tokens <= 2048 - 512
+        assert built.trimmed_tokens > 0
+        # system → klijent + zakoni → historija → bilješke upita → upit
+        assert msgs[1]["content"].index("Firma d.o.o.") < msgs[1]["content"].index("ZoPDV")
+        assert "Router" in msgs[-2]["content"] and msgs[-1]["content"] == "Kako kontirati predujam?"
+        history = [m["content"] for m in msgs[2:-2]]
+        assert history and history[-1].startswith("poruka 11")   # najnovije ostaju
+
+    def test_prompt_prefix_hits_across_users_of_same_client(self):
+        from nyx_light.llm.chat_bridge import ChatBridge, ChatContext
+        bridge = ChatBridge()
+        ctx = lambda note: ChatContext(
+            semantic_facts=["Uredski materijal → 4091"],
+            client_info={"name": "Firma d.o.o.", "oib": "12345678901"},
+            request_notes=[note])
+        first = bridge.build_prompt("Pitanje A", "user1", ctx("[Router: A]"))
+        second = bridge.build_prompt("Pitanje B", "user2", ctx("[Router: B]"))
+
+        assert first.prefix_hit_tokens == 0
+        # system + klijent dijele se, bilješke upita ne
+        assert second.prefix_hit_tokens == second.sections["system"] + second.sections["client"]
+        assert bridge.get_stats()["prompt"]["prefix_hit_tokens"] == second.prefix_hit_tokens
+
+    def test_concurrent_chats_coalesced_into_one_batch(self):
+        import asyncio
+        from nyx_light.llm.chat_bridge import ChatBridge
+        from scripts.bench_llm_batch import BatchStubServer
+
+        with BatchStubServer(base=0.05, per_item=0.0) as stub:
+            async def run():
+                bridge = ChatBridge(llm_url=stub.url, coalesce_ms=20)
+                out = await asyncio.gather(*(bridge.chat(f"upit {i}", f"s{i}")
+                                             for i in range(5)))
+                stats = bridge.get_stats()["batching"]
+                await bridge.aclose()
+                return out, stats
+
+            out, stats = asyncio.run(run())
+        assert [r.content for r in out] == [f"odgovor na: upit {i}" for i in range(5)]
+        assert stub.calls == [5]
+        assert stats["batched_calls"] == 1 and stats["errors"] == 0
+
+    def test_coalescer_follows_runtime_decision_and_pipelines(self):
+        import asyncio
+        from nyx_light.llm.batcher import RequestCoalescer
+        from nyx_light.silicon.apple_silicon import BatchConfig
+        from scripts.bench_llm_batch import BatchStubServer
+
+        class Runtime:   # WARNING pressure: batch 2, max 512 tokena
+            def batch_decision(self):
+                return BatchConfig(current_batch_size=2, current_max_tokens=512)
+
+        msgs = lambda i: [{"role": "user", "content": f"upit {i}"}]
+        with BatchStubServer(base=0.02, per_item=0.0, accept_lists=False) as stub:
+            async def run():
+                co = RequestCoalescer(stub.url, window_ms=20, runtime=Runtime())
+                out = await asyncio.gather(*(co.chat(msgs(i)) for i in range(5)))
+                stats = co.get_stats()
+                await co.aclose()
+                return out, stats
+
+            out, stats = asyncio.run(run())
+        assert [text for text, _ in out] == [f"odgovor na: upit {i}" for i in range(5)]
+        # Server odbija listu promptova → nalet pojedinačnih zahtjeva
+        assert stats["batch_size"] == 2 and stats["max_tokens_cap"] == 512
+        assert stats["batch_prompts"] is False and stats["pipelined_calls"] == 5
+
+    def test_coalescer_other_400_keeps_batching_and_tokens_match(self):
+        import asyncio
+        from nyx_light.llm.batcher import RequestCoalescer
+        from scripts.bench_llm_batch import BatchStubServer
+
+        # 400 koji nije greška formata liste → batch pojedinačno, batching ostaje
+        with BatchStubServer(base=0.01, per_item=0.0, accept_lists=False,
+                             list_error="maximum context length exceeded") as stub:
+            async def run():
+                co = RequestCoalescer(stub.url, window_ms=20, max_batch=3)
+                out = await asyncio.gather(*(co.complete(f"upit {i}") for i in range(3)))
+                stats = co.get_stats()
+                await co.aclose()
+                return out, stats
+
+            out, stats = asyncio.run(run())
+        assert [text for text, _ in out] == [f"odgovor na: upit {i}" for i in range(3)]
+        assert stats["batch_prompts"] is True and stats["errors"] == 0
+        assert stats["pipelined_calls"] == 3
+
+        # tokeni = upit + odgovor i u batchu i pojedinačno
+        with BatchStubServer(base=0.01, per_item=0.0) as stub:
+            async def tokens():
+                co = RequestCoalescer(stub.url, window_ms=20, max_batch=2)
+                batched = await asyncio.gather(co.complete("upit 1"), co.complete("upit 2"))
+                single = await co.complete("upit 3")
+                await co.aclose()
+                return [t for _, t in batched], single[1]
+
+            batched, single = asyncio.run(tokens())
+        assert stub.calls == [2, 1]
+        assert batched == [single, single] == [2 + 4, 2 + 4]
+
 
 # ═══════════════════════════════════════════
 # INTEGRATION SANITY
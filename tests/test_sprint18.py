@@ -145,6 +145,136 @@ class TestKompenzacije:
         assert result is not None
         assert result.ukupno_kompenzirano == 1000  # min in cycle
 
+    def test_multilateral_nets_whole_graph(self):
+        from nyx_light.modules.kompenzacije import KompenzacijeEngine, OtvorenaStavka
+        engine = KompenzacijeEngine()
+        # Prijeboj A⇄B zatvara samo 2; optimum je krug A→B→C→A (3)
+        stavke_po_tvrtki = {
+            "A": [OtvorenaStavka(partner_oib="B", preostalo=1, tip="dugovanje")],
+            "B": [OtvorenaStavka(partner_oib="A", preostalo=1, tip="dugovanje"),
+                  OtvorenaStavka(partner_oib="C", preostalo=1, tip="dugovanje")],
+            "C": [OtvorenaStavka(partner_oib="A", preostalo=1, tip="dugovanje")],
+        }
+        result = engine.find_multilateral(stavke_po_tvrtki)
+        assert result.optimalno
+        assert result.ukupno_zatvoreno == 3
+        assert {c["vrsta"] for c in result.ciklusi} == {"multilateralna"}
+
+        stavke_po_tvrtki["D"] = [OtvorenaStavka(partner_oib="E", preostalo=250.5, tip="dugovanje")]
+        stavke_po_tvrtki["E"] = [OtvorenaStavka(partner_oib="D", preostalo=100.25, tip="dugovanje")]
+        result = engine.find_multilateral(stavke_po_tvrtki)
+        assert result.ukupno_zatvoreno == 3 + 2 * 100.25
+        assert {"od": "D", "prema": "E", "iznos": 100.25} in result.lanac
+
+    def test_multilateral_solver_is_circulation(self):
+        import random
+        from nyx_light.modules.kompenzacije.multilateral import solve_multilateral
+        rnd = random.Random(3)
+        debts = {}
+        for _ in range(400):
+            a, b = rnd.sample(range(60), 2)
+            debts[(f"T{a}", f"T{b}")] = rnd.randint(1, 10_000)
+        rez = solve_multilateral(debts)
+        saldo = {}
+        for (a, b), f in rez["zatvoreno"].items():
+            assert 0 < f <= debts[(a, b)]
+            saldo[a] = saldo.get(a, 0) + f
+            saldo[b] = saldo.get(b, 0) - f
+        assert set(saldo.values()) == {0}   # neto pozicije nepromijenjene
+        assert rez["optimalno"]
+        assert sum(c["iznos_c"] * len(c["sudionici"]) for c in rez["ciklusi"]) == rez["zatvoreno_c"]
+
+
+# ═══════════════════════════════════════════
+# IOS KAMPANJA
+# ═══════════════════════════════════════════
+
+class TestIOSCampaign:
+    def _storage(self, tmp_path):
+        from nyx_light.storage.sqlite_store import SQLiteStorage
+        storage = SQLiteStorage(str(tmp_path / "nyx.db"))
+        for cid in ("K001", "K002"):
+            for oib in ("11111111111", "22222222222"):
+                for i, tip in enumerate(("izlazni_racun", "izlazni_racun", "ulazni_racun")):
+                    bid = storage.save_booking({
+                        "id": f"{cid}-{oib}-{i}", "client_id": cid, "document_type": tip,
+                        "iznos": 100.0 * (i + 1), "oib": oib,
+                        "datum_dokumenta": f"2026-0{i + 1}-15"})
+                    storage.approve_booking(bid, "ana")
+        storage.save_booking({"id": "pending", "client_id": "K001", "oib": "11111111111",
+                              "document_type": "izlazni_racun", "iznos": 999,
+                              "datum_dokumenta": "2026-01-01"})
+        return storage
+
+    def test_campaign_from_storage(self, tmp_path):
+        import openpyxl
+        from nyx_light.modules.ios_reconciliation.campaign import IOSCampaign, IOSStore
+        store = IOSStore(str(tmp_path / "ios.db"))
+        rez = IOSCampaign(store, str(tmp_path / "ios")).run_from_storage(
+            self._storage(tmp_path), "2026-12-31",
+            clients={"K001": {"naziv": "Alfa d.o.o.", "oib": "12345678903"}}, workers=2)
+        assert (rez["forms"], rez["stavke"], rez["clients"], rez["excel"]) == (4, 12, 2, 4)
+
+        forms = store.list_forms(client_id="K001")
+        assert len(forms) == 2
+        assert all(f["saldo"] == 100 + 200 - 300 for f in forms)   # izlazni − ulazni
+        form = store.load_form("IOS-K001-11111111111-2026-12-31")
+        assert form.client_name == "Alfa d.o.o."
+        assert [s.duguje for s in form.stavke] == [100.0, 200.0, 0.0]
+
+        ws = openpyxl.load_workbook(forms[0]["excel_path"])["IOS"]
+        assert ws["A1"].value == "IZVOD OTVORENIH STAVKI (IOS)"
+        assert ws["F14"].value == 300 and ws["G14"].value == 300   # UKUPNO
+        assert ws["F11"].number_format == "#,##0.00"
+
+    def test_responses_persist_across_instances(self, tmp_path):
+        from nyx_light.modules.ios_reconciliation.ios import IOSReconciliation
+        db = str(tmp_path / "ios.db")
+        ios = IOSReconciliation(str(tmp_path / "ios"), db_path=db)
+        form_id = ios.generate_ios_form(
+            "K001", partner_oib="11111111111", datum_do="2026-12-31",
+            stavke=[{"broj_dokumenta": "R-1", "duguje": 500}])["form_id"]
+        ios.mark_sent(form_id, "partner@example.hr")
+
+        r = IOSReconciliation(str(tmp_path / "ios"), db_path=db).receive_response(
+            form_id, confirmed=False, partner_stavke=[{"broj_dokumenta": "R-1", "duguje": 450}])
+        assert r["status"] == "disputed"
+        assert r["razlike"][0]["razlika"] == 50
+
+        stats = IOSReconciliation(str(tmp_path / "ios"), db_path=db).get_stats()
+        assert stats == {"total_forms": 1, "by_status": {"disputed": 1}, "total_razlike": 1}
+
+    def test_get_all_forms_same_shape_with_store(self, tmp_path):
+        from nyx_light.modules.ios_reconciliation.ios import IOSReconciliation
+        stavke = [{"broj_dokumenta": "R-1", "duguje": 500}]
+        memory = IOSReconciliation(str(tmp_path / "ios"))
+        stored = IOSReconciliation(str(tmp_path / "ios"), db_path=str(tmp_path / "ios.db"))
+        for ios in (memory, stored):
+            fid = ios.generate_ios_form("K001", client_name="Alfa", partner_oib="11111111111",
+                                        datum_do="2026-12-31", stavke=stavke)["form_id"]
+            ios.receive_response(fid, confirmed=False,
+                                 partner_stavke=[{"broj_dokumenta": "R-1", "duguje": 450}])
+        (u_memoriji,) = memory.get_all_forms("K001")
+        (iz_baze,) = IOSReconciliation(str(tmp_path / "ios"),
+                                       db_path=str(tmp_path / "ios.db")).get_all_forms("K001")
+        assert set(iz_baze) == set(u_memoriji)
+        for key in ("form_id", "client_name", "period", "stavke", "ukupno_duguje",
+                    "ukupno_potrazuje", "saldo", "status", "razlike_count"):
+            assert iz_baze[key] == u_memoriji[key], key
+        assert iz_baze["razlike_count"] == 1 and iz_baze["stavke"][0]["duguje"] == 500
+
+    def test_campaign_period_matches_query(self, tmp_path):
+        from nyx_light.modules.ios_reconciliation.campaign import IOSCampaign, IOSStore
+        storage = self._storage(tmp_path)
+        bid = storage.save_booking({"id": "stari", "client_id": "K001", "oib": "11111111111",
+                                    "document_type": "izlazni_racun", "iznos": 50.0,
+                                    "datum_dokumenta": "2025-11-30"})
+        storage.approve_booking(bid, "ana")
+        rez = IOSCampaign(IOSStore(), str(tmp_path / "ios")).run_from_storage(
+            storage, "2026-12-31", workers=64)
+        assert rez["datum_od"] == "2026-01-01" and rez["stavke"] == 12   # 2025. nije u razdoblju
+        assert 1 <= rez["workers"] <= (os.cpu_count() or 1)
+
 
 # ═══════════════════════════════════════════
 # REPORTS
@@ -211,6 +341,37 @@ class TestReports:
         assert Path(path).exists()
         Path(path).unlink()
 
+    def test_kartica_streams_generator(self):
+        import openpyxl
+        from nyx_light.modules.reports import ReportGenerator
+        gen = ReportGenerator("Test d.o.o.")
+        stavke = ({"datum": "2026-01-15", "dokument": f"UR-{i}", "opis": "Nabava",
+                   "duguje": 100, "potrazuje": 0} for i in range(3000))
+        path = gen.generate_kartica("4010", "Materijal", stavke, output_path="/tmp/test_kartica_gen.xlsx")
+        ws = openpyxl.load_workbook(path).active
+        assert ws.max_row == 6 + 3000
+        assert ws.cell(row=6, column=1).value == "Datum"
+        assert ws.cell(row=3006, column=6).value == 300000
+        assert ws.cell(row=3006, column=6).number_format == "#,##0.00 €"
+        assert ws.cell(row=8, column=1).fill.fgColor.rgb.endswith("f8f9fa")
+        assert ws.column_dimensions["F"].width >= 17
+        Path(path).unlink()
+
+    def test_bruto_bilanca_csv(self):
+        import csv
+        from nyx_light.modules.reports import ReportGenerator
+        gen = ReportGenerator()
+        stavke = [
+            {"konto": "4010", "naziv": "Materijalni troškovi", "duguje": 50000, "potrazuje": 0},
+            {"konto": "2200", "naziv": "Dobavljači", "duguje": 10000, "potrazuje": 50000},
+        ]
+        path = gen.generate_bruto_bilanca(iter(stavke), output_path="/tmp/test_bb.csv", format="csv")
+        with open(path, encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f, delimiter=";"))
+        assert rows[5][0] == "Konto"
+        assert rows[-1] == ["", "UKUPNO", "60000", "50000", "50000", "40000"]
+        Path(path).unlink()
+
 
 # ═══════════════════════════════════════════
 # AUDIT EXPORT
@@ -439,6 +600,31 @@ class TestSprint18Endpoints:
         assert resp.status_code == 200
         assert resp.json()["izjava"]["iznos"] == 3000
 
+    def test_ios_campaign(self, client, headers):
+        resp = client.post("/api/ios/campaign", headers=headers,
+                           json={"datum_do": "2000-12-31", "workers": 1})
+        assert resp.status_code == 200
+        assert resp.json()["forms"] == 0
+        assert client.post("/api/ios/campaign", headers=headers, json={}).status_code == 400
+        assert client.post("/api/ios/campaign", headers=headers,
+                           json={"datum_do": "31.12.2000."}).status_code == 400
+
+    def test_kpi_trend(self, client, headers):
+        resp = client.get("/api/kpi/trend?periods=2001,2002&client_id=NEMA", headers=headers)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["periods"] == ["2001", "2002"]
+        assert body["clients"]["NEMA"]["kpi"]["tekuca_likvidnost"] == [0.0, 0.0]
+
+    def test_gfi_godisnji(self, client, headers):
+        resp = client.post("/api/gfi/godisnji", headers=headers,
+                           json={"godina": 2000, "client_ids": ["NEMA"]})
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["clients"] == 1 and body["balanced"] == 1
+        assert client.post("/api/gfi/godisnji", headers=headers,
+                           json={"godina": "lani"}).status_code == 400
+
     def test_report_bilanca(self, client, headers):
         resp = client.post("/api/reports/bilanca", headers=headers, json={
             "firma": "Test", "oib": "12345678901", "period": "2026",
@@ -575,6 +761,146 @@ class TestAuditLogger:
         entries = audit.query(severity="critical")
         assert len(entries) == 1
 
+    def test_keyset_pagination(self, tmp_path):
+        from nyx_light.audit import AuditLogger
+        audit = AuditLogger(db_path=str(tmp_path / "audit.db"))
+        for i in range(25):
+            audit.log("booking", f"a{i}", user="ivan")
+        seen, before_id = [], 0
+        while True:
+            page = audit.query(user="ivan", limit=10, before_id=before_id)
+            seen.extend(e["action"] for e in page)
+            if len(page) < 10:
+                break
+            before_id = page[-1]["id"]
+        assert seen == [f"a{i}" for i in reversed(range(25))]
+        assert audit.query(limit=5, offset=20)[0]["action"] == "a4"
+
+    def test_batched_appends_flush(self, tmp_path):
+        import sqlite3
+        from nyx_light.audit import AuditLogger
+        db = tmp_path / "audit.db"
+        audit = AuditLogger(db_path=str(db), batch_size=100, flush_interval=60)
+        for i in range(5):
+            audit.log("booking", f"a{i}")
+        raw = sqlite3.connect(str(db))
+        assert raw.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 0
+        audit.log_security("brute_force_attempt")  # sinkroni flush
+        assert raw.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 6
+        audit.log("booking", "late")
+        audit.close()
+        assert raw.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 7
+        raw.close()
+
+    def test_failed_flush_keeps_rows(self, tmp_path):
+        import sqlite3
+        from nyx_light.audit import AuditLogger
+        db = tmp_path / "audit.db"
+        audit = AuditLogger(db_path=str(db), batch_size=100, flush_interval=60)
+        audit.log("booking", "a0")
+        raw = sqlite3.connect(str(db))
+        raw.execute("ALTER TABLE audit_log RENAME TO audit_log_tmp")
+        raw.commit()
+        with pytest.raises(sqlite3.OperationalError):
+            audit.flush()
+        audit.log("booking", "a1")
+        raw.execute("ALTER TABLE audit_log_tmp RENAME TO audit_log")
+        raw.commit()
+        assert audit.flush() == 2
+        assert [r[0] for r in raw.execute("SELECT action FROM audit_log ORDER BY id")] == ["a0", "a1"]
+        audit.close()
+        raw.close()
+
+    def test_streaming_export(self, tmp_path):
+        import csv
+        from nyx_light.audit import AuditLogger
+        from nyx_light.audit.export import AuditExporter
+        audit = AuditLogger(db_path=str(tmp_path / "audit.db"))
+        for i in range(2500):
+            audit.log("booking", f"a{i}", user="ivan")
+        exporter = AuditExporter(audit_store=audit)
+        out = exporter.export_csv(exporter.iter_entries(user="ivan"),
+                                  str(tmp_path / "audit.csv"))
+        with open(out, encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f, delimiter=";"))
+        assert len(rows) == 2500 == exporter.last_export_count
+        path = exporter.export_json(exporter.iter_entries(), str(tmp_path / "a.json"))
+        with open(path) as f:
+            data = json.load(f)
+        assert data["count"] == 2500 and data["entries"][0]["action"] == "a2499"
+        # action/client_id/module vrijede i kad store ima iter_entries
+        audit.log("login", "prijava", user="ana", client_id="K1")
+        assert [e["action"] for e in exporter.iter_entries(client_id="K1")] == ["prijava"]
+        assert len(list(exporter.iter_entries(action="a7"))) == 1
+        assert exporter.get_entries(module="login")[0]["user"] == "ana"
+        assert exporter.get_entries(module="booking", action="prijava") == []
+
+
+class TestAuditArchive:
+    def _seed(self, tmp_path):
+        import sqlite3
+        from nyx_light.auth import AuthManager
+        from nyx_light.audit import AuditLogger
+        audit = AuditLogger(db_path=str(tmp_path / "audit.db"), flush_interval=0)
+        audit.log("booking", "created", user="ivan")
+        audit.close()
+        AuthManager(db_path=str(tmp_path / "auth.db"))._audit("login", "u1", "ana", "")
+        for db, table in (("audit.db", "audit_log"), ("auth.db", "audit_log")):
+            conn = sqlite3.connect(str(tmp_path / db))
+            conn.execute(f"UPDATE {table} SET timestamp='2026-01-15T10:00:00'")
+            conn.commit()
+            conn.close()
+        audit = AuditLogger(db_path=str(tmp_path / "audit.db"), flush_interval=0)
+        audit.log("booking", "approved", user="ivan")  # tekući period ostaje vruć
+        audit.close()
+
+    def _archive(self, tmp_path):
+        from nyx_light.audit.archive import AuditArchive, DEFAULT_SOURCES
+        from dataclasses import replace
+        sources = [replace(s, db_path=str(tmp_path / Path(s.db_path).name))
+                   for s in DEFAULT_SOURCES]
+        return AuditArchive(archive_dir=str(tmp_path / "archive"), sources=sources)
+
+    def test_roll_closed_months(self, tmp_path):
+        import sqlite3
+        self._seed(tmp_path)
+        archive = self._archive(tmp_path)
+        result = archive.roll()
+        assert result["segments_created"] == 2
+        assert result["periods"] == ["2026-01"]
+        hot = sqlite3.connect(str(tmp_path / "audit.db"))
+        assert hot.execute("SELECT COUNT(*) FROM audit_log").fetchone()[0] == 1
+        hot.close()
+        assert archive.roll()["segments_created"] == 0
+        assert archive.verify()["valid"]
+
+    def test_query_across_segments(self, tmp_path):
+        self._seed(tmp_path)
+        archive = self._archive(tmp_path)
+        archive.roll()
+        entries = list(archive.iter_entries())
+        assert [e["action"] for e in entries] == ["created", "login", "approved"]
+        assert [e["action"] for e in archive.get_entries(user="ivan")] == ["approved", "created"]
+        assert archive.get_entries(period_from="2026-01-01", period_to="2026-01-31",
+                                   user="ana")[0]["source"] == "auth"
+        assert [e["source"] for e in archive.get_entries(action="login")] == ["auth"]
+        assert [e["action"] for e in archive.iter_entries(module="booking")] == [
+            "created", "approved"]
+        assert archive.get_entries(client_id="K-NEMA") == []
+
+    def test_tamper_detection(self, tmp_path):
+        import gzip, os
+        self._seed(tmp_path)
+        archive = self._archive(tmp_path)
+        archive.roll()
+        seg = tmp_path / "archive" / archive.segments[0]["file"]
+        os.chmod(seg, 0o644)
+        with gzip.open(seg, "wb") as f:
+            f.write(b'{"id": 1, "action": "obrisano"}\n')
+        report = archive.verify()
+        assert not report["valid"]
+        assert "sadržaj izmijenjen" in report["errors"][0]
+
 
 # ═══════════════════════════════════════════
 # NEW MULTICLIENT PIPELINE
@@ -352,6 +352,62 @@ class TestDPODatasetBuilder:
             remaining = builder.get_unused_pairs()
             assert len(remaining) == 0
 
+    def test_export_dedup_and_shards(self):
+        from nyx_light.memory.dpo import DPODatasetBuilder
+        with tempfile.TemporaryDirectory() as tmp:
+            builder = DPODatasetBuilder(db_path=os.path.join(tmp, "dpo.db"))
+            for i in range(60):
+                builder.record_correction(f"Račun {i}", f"Konto 4010 {i}", f"Konto 4090 {i}", "u1")
+            # Isti sadržaj, razlika samo u razmacima/velikim slovima
+            for i in range(10):
+                builder.record_correction(f"  RAČUN {i} ", f"konto  4010 {i}", f"Konto 4090 {i}", "u2")
+            result = builder.export_dataset(
+                output_path=os.path.join(tmp, "ds.jsonl"), min_pairs=50,
+                max_pairs=0, shard_bytes=2048, chunk_size=7)
+            assert result["exported"] is True
+            assert result["pairs_count"] == 60
+            assert result["duplicates_skipped"] == 10
+            assert result["scanned"] == 70
+            assert len(result["shards"]) > 1
+            assert result["path"] == os.path.join(tmp, "ds.part0001.jsonl")
+            lines = []
+            for shard in result["shards"]:
+                assert os.path.getsize(shard) <= 2048
+                with open(shard) as f:
+                    lines += [json.loads(l) for l in f]
+            assert len(lines) == 60
+            assert len({l["prompt"].strip().lower() for l in lines}) == 60
+            assert not any(n.endswith(".tmp") for n in os.listdir(tmp))
+            assert builder.get_stats()["unused_corrections"] == 0
+
+    def test_export_too_few_unique_marks_nothing(self):
+        from nyx_light.memory.dpo import DPODatasetBuilder
+        with tempfile.TemporaryDirectory() as tmp:
+            builder = DPODatasetBuilder(db_path=os.path.join(tmp, "dpo.db"))
+            for _ in range(55):
+                builder.record_correction("isti prompt", "isti chosen", "isti rejected", "u1")
+            result = builder.export_dataset(
+                output_path=os.path.join(tmp, "ds.jsonl"), min_pairs=50)
+            assert result["exported"] is False
+            assert result["duplicates_skipped"] == 54
+            assert os.listdir(tmp) == ["dpo.db"]
+            assert builder.get_stats()["unused_corrections"] == 55
+
+    def test_export_respects_max_pairs_newest_first(self):
+        from nyx_light.memory.dpo import DPODatasetBuilder
+        with tempfile.TemporaryDirectory() as tmp:
+            builder = DPODatasetBuilder(db_path=os.path.join(tmp, "dpo.db"))
+            for i in range(12):
+                builder.record_correction(f"p{i}", f"c{i}", f"r{i}", "u1")
+            newest = [p.pair_id for p in builder.get_unused_pairs(limit=5)]
+            result = builder.export_dataset(
+                output_path=os.path.join(tmp, "ds.jsonl"), min_pairs=5,
+                max_pairs=5, chunk_size=2)
+            assert result["pairs_count"] == 5
+            with open(result["path"]) as f:
+                assert [json.loads(l)["metadata"]["pair_id"] for l in f] == newest
+            assert len(builder.get_unused_pairs()) == 7
+
     def test_stats(self):
         from nyx_light.memory.dpo import DPODatasetBuilder
         with tempfile.TemporaryDirectory() as tmp:
@@ -395,6 +451,17 @@ class TestNightlyDPORunner:
             assert result.status == "completed"
             assert result.deployed is True
             assert result.pairs_count == 55
+            assert result.export_seconds > 0
+            assert result.dataset_shards == 1
+            assert result.dataset_bytes > 0
+            assert result.duplicates_skipped == 0
+
+            # trening dobiva sve izvezene (i označene) parove
+            with open(os.path.join(result.checkpoint_path, "adapter_config.json")) as f:
+                dataset = json.load(f)["dataset"]
+            with open(dataset) as f:
+                assert sum(1 for _ in f) == 55
+            assert builder.get_stats()["unused_corrections"] == 0
 
     def test_stats(self):
         from nyx_light.memory.dpo import NightlyDPORunner, DPODatasetBuilder
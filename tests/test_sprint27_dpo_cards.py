@@ -121,6 +121,45 @@ class TestDPOPairRecording:
         shutil.rmtree(d, ignore_errors=True)
 
 
+    @pytest.mark.asyncio
+    async def test_train_nightly_dedups_in_one_transaction(self):
+        import shutil
+        from nyx_light.finetune.nightly_dpo import NightlyDPOTrainer
+        d = f"/tmp/nyx-test-dpo-dedup-{int(__import__('time').time())}"
+        trainer = NightlyDPOTrainer(data_dir=d)
+        for i in range(12):
+            trainer.record_pair(prompt=f"P{i}", chosen=f"C{i}", rejected=f"R{i}")
+            trainer.record_pair(prompt=f"p{i} ", chosen=f"c{i}", rejected=f"r{i}")
+        result = await trainer.train_nightly()
+        assert result["pairs_used"] == 12
+        assert result["duplicates_skipped"] == 12
+        assert trainer.get_stats()["unused_pairs"] == 0
+        datasets = list(Path(d, "dpo_datasets").glob("*.jsonl"))
+        assert len(datasets) == 1
+        assert len(datasets[0].read_text().splitlines()) == 12
+
+        # Premalo jedinstvenih → ništa se ne zapisuje ni ne označava
+        for _ in range(15):
+            trainer.record_pair(prompt="isti", chosen="isti", rejected="isti")
+        result = await trainer.train_nightly()
+        assert result["status"] == "skipped"
+        assert trainer.get_stats()["unused_pairs"] == 15
+        assert len(list(Path(d, "dpo_datasets").iterdir())) == 1
+        shutil.rmtree(d, ignore_errors=True)
+
+    def test_export_unused_marks_every_chunk(self):
+        import shutil
+        from nyx_light.finetune.nightly_dpo import NightlyDPOTrainer
+        d = f"/tmp/nyx-test-dpo-chunks-{int(__import__('time').time())}"
+        trainer = NightlyDPOTrainer(data_dir=d)
+        for i in range(12):
+            trainer.record_pair(prompt=f"P{i}", chosen=f"C{i}", rejected=f"R{i}")
+        export = trainer.export_unused("run_x", limit=10, min_pairs=1, chunk_size=4)
+        assert export["pairs_count"] == 10
+        assert trainer.get_stats()["unused_pairs"] == 2
+        assert len(trainer.collect_unused_pairs()) == 2
+        shutil.rmtree(d, ignore_errors=True)
+
 class TestDPOSchedulerWiring:
     """Test da scheduler ima DPO task."""
 
@@ -140,6 +179,13 @@ class TestDPOSchedulerWiring:
         assert dpo_task.func is not None
         shutil.rmtree(d, ignore_errors=True)
 
+    def test_scheduler_has_ngram_prewarm_task(self):
+        from nyx_light.scheduler import setup_default_scheduler
+        warmer = lambda: {"status": "saved"}
+        scheduler = setup_default_scheduler(ngram_warmer=warmer)
+        task = [t for t in scheduler.tasks if t.name == "ngram_prewarm"][0]
+        assert (task.hour, task.minute, task.func) == (4, 0, warmer)
+
     def test_scheduler_has_backup_task(self):
         from nyx_light.scheduler import setup_default_scheduler
         backup = MagicMock()
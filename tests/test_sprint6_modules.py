@@ -125,6 +125,43 @@ class TestPayrollEngine:
         assert n["dnevnica_rh_puna"] > 0
         assert n["regres_god"] > 0
 
+    def test_batch_parity_sa_skalarnim(self):
+        """Vektorizirani obračun = skalarni, u centima (uklj. napomene)."""
+        import random
+        from dataclasses import asdict
+        rnd = random.Random(7)
+        emps = [
+            self.Employee(
+                name=f"R{i}", bruto_placa=round(rnd.uniform(400, 12000), 2),
+                city=rnd.choice(["Zagreb", "Split", "Osijek", "Vukovar"]),
+                uzdrzavani_clanovi=rnd.randint(0, 2), djeca=rnd.randint(0, 6),
+                invalid=rnd.random() < 0.2, mio_stup_2=rnd.random() < 0.7,
+                birth_date=rnd.choice([None, date(rnd.randint(1965, 2005), 3, 14)]),
+            )
+            for i in range(500)
+        ]
+        batch = self.pe.calculate_batch(emps)
+        for emp, res in zip(emps, batch.to_results()):
+            assert asdict(res) == asdict(self.pe.calculate(emp))
+
+    def test_batch_joppd_totals(self):
+        emps = [self.Employee(name="A", bruto_placa=2000.0),
+                self.Employee(name="B", bruto_placa=3000.0, mio_stup_2=False)]
+        totals = self.pe.calculate_batch(emps).joppd_totals()
+        assert totals["bruto"] == 5000.0
+        assert totals["mio_1"] == 300.0 + 600.0
+        assert totals["mio_2"] == 100.0
+        assert totals["zdravstveno"] == 825.0
+
+    def test_batch_iz_stupaca(self):
+        batch = self.pe.calculate_batch({
+            "name": ["A", "B"], "bruto_placa": [2000.0, 500.0],
+            "birth_date": ["2003-01-01", None],
+        })
+        assert len(batch) == 2
+        assert batch.columns["ukupno_porez_prirez"][0] == 0.0
+        assert batch.warnings  # B ispod minimalne
+
 
 # ═══════════════════════════════════════════════════════
 # OUTGOING INVOICE VALIDATOR
@@ -327,6 +364,60 @@ class TestDeadlineTracker:
         assert any("JOPPD" in n for n in names)
 
 
+class TestDeadlineCalendar:
+    """Materijalizirani kalendar rokova za sve klijente (SQLite)."""
+
+    def setup_method(self):
+        from nyx_light.modules.deadlines.calendar import DeadlineCalendar
+        self.cal = DeadlineCalendar()
+        self.cal.sync_clients({
+            "K001": None,
+            "K002": {"pdv_mjesecna": False, "ima_place": False},
+        }, today=date(2026, 3, 1))
+
+    def test_matches_tracker_and_profile(self):
+        up = self.cal.upcoming(7, today=date(2026, 3, 14))
+        k1 = {r["deadline"] for r in up if r["client_id"] == "K001"}
+        k2 = {r["deadline"] for r in up if r["client_id"] == "K002"}
+        assert k1 == {"JOPPD obrazac", "PDV prijava (mjesečna)",
+                      "EC Sales List (zbirna prijava)"}
+        assert k2 == {"EC Sales List (zbirna prijava)"}
+        assert [r["due_date"] for r in up] == sorted(r["due_date"] for r in up)
+
+    def test_rolling_horizon_24_months(self):
+        rows = self.cal.due_between("2028-02-01", "2028-02-29", ["K001"])
+        assert any(r["deadline"] == "JOPPD obrazac" for r in rows)
+        assert not self.cal.due_between("2028-03-01", "2028-03-31", ["K001"])
+        # Upit kasnije u vremenu produžuje horizont
+        self.cal.upcoming(7, today=date(2026, 9, 1))
+        assert self.cal.due_between("2028-03-01", "2028-03-31", ["K001"])
+
+    def test_completion_and_override_are_incremental(self):
+        from nyx_light.modules.deadlines import ClientDeadlineManager
+        mgr = ClientDeadlineManager(calendar=self.cal)
+        mgr.mark_completed("K001", "JOPPD obrazac", "2026-03-10")
+        mgr.set_client_deadline("K001", "PDV prijava (mjesečna)", "2026-03-25")
+        overdue = self.cal.overdue(today=date(2026, 3, 24), client_ids=["K001"])
+        # JOPPD ispunjen, PDV pomaknut — kasni samo EC Sales List (20.3.)
+        assert {o["deadline"] for o in overdue} == {"EC Sales List (zbirna prijava)"}
+        up = self.cal.upcoming(3, today=date(2026, 3, 24), client_ids=["K001"])
+        assert up[0]["deadline"] == "PDV prijava (mjesečna)" and up[0]["overridden"] == 1
+
+    def test_profile_change_rebuilds_future_only(self):
+        self.cal.mark_completed("K002", "EC Sales List (zbirna prijava)", "2026-03-19")
+        self.cal.sync_client("K002", {"pdv_mjesecna": True}, today=date(2026, 3, 22))
+        rows = self.cal.due_between("2026-03-01", "2026-04-30", ["K002"], status="open")
+        assert ("PDV prijava (mjesečna)", "2026-04-20") in {(r["deadline"], r["due_date"]) for r in rows}
+        done = self.cal.due_between("2026-03-01", "2026-03-31", ["K002"], status="done")
+        assert len(done) == 1
+
+    def test_client_added_mid_month_has_no_past_deadlines(self):
+        self.cal.sync_client("K003", None, today=date(2026, 3, 22))
+        assert not self.cal.overdue(today=date(2026, 3, 22), client_ids=["K003"])
+        rows = self.cal.due_between("2026-03-01", "2026-04-30", ["K003"])
+        assert rows and min(r["due_date"] for r in rows) >= "2026-03-22"
+
+
 # ═══════════════════════════════════════════════════════
 # KONTNI PLAN (PROŠIRENI)
 # ═══════════════════════════════════════════════════════
@@ -103,10 +103,47 @@ class TestNyxLightAppSkeleton:
         self.app.add_fixed_asset({
             "naziv": "Laptop", "vrsta": "računalna_oprema",
             "nabavna_vrijednost": 1200.0,
-        })
+        }, client_id="CPP-001")
         result = self.app.run_monthly_depreciation("CPP-001")
         assert result["submitted"] == 1
 
+    def test_depreciation_client_without_assets_is_empty(self):
+        self.app.add_fixed_asset({
+            "naziv": "Laptop", "vrsta": "računalna_oprema",
+            "nabavna_vrijednost": 1200.0, "datum_aktivacije": "2026-01-01",
+        })
+        result = self.app.run_monthly_depreciation("CPP-001", "2026-02")
+        assert result["status"] == "empty"
+
+    def test_depreciation_month_posted_once(self):
+        for naziv in ("Server", "Printer"):
+            self.app.add_fixed_asset({
+                "naziv": naziv, "vrsta": "uredska_oprema",
+                "nabavna_vrijednost": 2400.0, "datum_aktivacije": "2026-01-01",
+            }, client_id="SYN-001")
+        result = self.app.run_monthly_depreciation("SYN-001", "2026-02")
+        assert result["batch_size"] == 2
+        assert result["iznos"] == 100.0
+        again = self.app.run_monthly_depreciation("SYN-001", "2026-02")
+        assert again["status"] == "already_posted"
+
+    def test_depreciation_applied_only_on_approval(self):
+        r = self.app.add_fixed_asset({
+            "naziv": "Server", "vrsta": "uredska_oprema",
+            "nabavna_vrijednost": 2400.0, "datum_aktivacije": "2026-01-01",
+        }, client_id="SYN-001")
+        os_engine = self.app.osnovna_sredstva
+        first = self.app.run_monthly_depreciation("SYN-001", "2026-02")
+        assert os_engine.register.get(r["id"]).ukupna_amortizacija == 0
+        # Odbijen prijedlog oslobađa mjesec
+        self.app.reject(first["id"], "ana", "Krivi period")
+        assert os_engine.register.get_run("SYN-001", "2026-02") is None
+        second = self.app.run_monthly_depreciation("SYN-001", "2026-02")
+        assert second["submitted"] == 1
+        self.app.approve(second["id"], "ana")
+        assert os_engine.register.get_run("SYN-001", "2026-02")["status"] == "posted"
+        assert os_engine.register.get(r["id"]).ukupna_amortizacija == 100.0
+
     def test_sitan_inventar_not_depreciated(self):
         r = self.app.add_fixed_asset({"naziv": "Miš", "nabavna_vrijednost": 30.0})
         assert r["status"] == "sitan_inventar"
@@ -305,6 +342,62 @@ class TestPDVPrijavaModule:
         assert ppo.izlazni_13_pdv == 65
         assert ppo.izlazni_5_pdv == 10
 
+    def _storage_with_invoices(self, tmp_path):
+        from nyx_light.storage.sqlite_store import SQLiteStorage
+        st = SQLiteStorage(str(tmp_path / "pdv.db"))
+        rows = [
+            ("izlazni_racun", 1000.0, 25, 250.0, False, False, "2025-02-03"),
+            ("izlazni_racun", 500.0, 13, 65.0, False, False, "2025-02-10"),
+            ("izlazni_racun", 5000.0, 0, 0.0, True, True, "2025-02-11"),
+            ("ulazni_racun", 800.0, 25, 200.0, False, False, "2025-02-20"),
+            ("ulazni_racun", 999.0, 25, 249.75, False, False, "2025-03-01"),  # izvan perioda
+        ]
+        for i, (dt, osn, stopa, pdv, eu, rc, datum) in enumerate(rows):
+            st.save_booking({"id": f"r{i}", "client_id": "K1", "document_type": dt,
+                             "iznos": osn + pdv, "osnovica": osn, "pdv_stopa": stopa,
+                             "pdv_iznos": pdv, "eu_transakcija": eu, "reverse_charge": rc,
+                             "datum_dokumenta": datum})
+            st.approve_booking(f"r{i}", "ana")
+        st.save_booking({"id": "pending", "client_id": "K1", "document_type": "izlazni_racun",
+                         "iznos": 100, "pdv_iznos": 20, "datum_dokumenta": "2025-02-05"})
+        return st
+
+    def test_ppo_from_storage_matches_calculate(self, tmp_path):
+        st = self._storage_with_invoices(tmp_path)
+        ppo = self.engine.calculate_from_storage(st, "K1", "2025-02")
+        ref = self.engine.calculate([
+            self.PDVStavka(tip="izlazni", osnovica=1000, pdv_stopa=25, pdv_iznos=250),
+            self.PDVStavka(tip="izlazni", osnovica=500, pdv_stopa=13, pdv_iznos=65),
+            self.PDVStavka(tip="izlazni", osnovica=5000, pdv_stopa=0,
+                           eu_transakcija=True, reverse_charge=True),
+            self.PDVStavka(tip="ulazni", osnovica=800, pdv_stopa=25, pdv_iznos=200),
+        ], period="2025-02")
+        assert ppo.stavke_count == 4
+        for f in ("izlazni_25_pdv", "izlazni_13_pdv", "eu_isporuke_osnovica",
+                  "pretporez_25", "ukupna_obveza", "za_uplatu"):
+            assert getattr(ppo, f) == getattr(ref, f)
+
+    def test_ppo_cache_invalidated_by_new_posting(self, tmp_path):
+        st = self._storage_with_invoices(tmp_path)
+        first = self.engine.calculate_from_storage(st, "K1", "2025-02")
+        assert st.get_cached_report("ppo", "K1", "2025-02") is not None
+        st.save_booking({"id": "novi", "client_id": "K1", "document_type": "izlazni_racun",
+                         "iznos": 125, "osnovica": 100, "pdv_stopa": 25, "pdv_iznos": 25,
+                         "datum_dokumenta": "2025-02-28"})
+        assert st.get_cached_report("ppo", "K1", "2025-02") is None
+        st.approve_booking("novi", "ana")
+        second = self.engine.calculate_from_storage(st, "K1", "2025-02")
+        assert second.izlazni_25_pdv == first.izlazni_25_pdv + 25
+
+    def test_ppo_batch_and_quarter(self, tmp_path):
+        st = self._storage_with_invoices(tmp_path)
+        res = self.engine.calculate_batch_from_storage(
+            st, [{"client_id": "K1"}, {"client_id": "K2"}], "2025-Q1")
+        assert res["K1"].stavke_count == 5
+        assert res["K1"].mjesecna is False
+        assert res["K2"].stavke_count == 0
+        assert self.engine.period_bounds("2025-Q4")[:2] == ("2025-10-01", "2026-01-01")
+
 
 class TestEnhancedBlagajna:
     """Testovi za Enhanced Blagajna V2."""
@@ -233,6 +233,42 @@ class TestJOPPD:
         assert d["requires_approval"] is True
         assert d["ukupno"]["bruto"] == 1000.0
 
+    def test_incremental_batches(self):
+        """Više payroll batch-eva puni isti obrazac, totali u jednom prolazu."""
+        obrazac = self.gen.new_obrazac("12345678903", "Test d.o.o.",
+                                       period_month=3, period_year=2026)
+        prvi = [self.pe.calculate(self.Employee(name="A", bruto_placa=2000))]
+        self.gen.add_payroll_results(obrazac, prvi)
+        batch = self.pe.calculate_batch([self.Employee(name="B", bruto_placa=1500),
+                                         self.Employee(name="C", bruto_placa=3000)])
+        assert self.gen.add_payroll_batch(obrazac, batch) == 2
+        assert [s.redni_broj for s in obrazac.stavke] == [1, 2, 3]
+        assert obrazac.ukupno_bruto == 6500.0
+        assert obrazac.ukupno_mio_1 == round(sum(s.mio_stup_1 for s in obrazac.stavke), 2)
+        assert obrazac.stavke[2].datum_od == "2026-03-01"
+
+    def test_streaming_export(self, tmp_path):
+        import gzip
+        batch = self.pe.calculate_batch([self.Employee(name=f"R{i}", bruto_placa=1000 + i)
+                                         for i in range(50)])
+        obrazac = self.gen.new_obrazac("123", "Test & Co", period_month=1, period_year=2026)
+        info = self.gen.export_xml(obrazac, str(tmp_path / "joppd.xml"),
+                                   stavke=self.gen.stavke_from_batch(batch, 2026, 1),
+                                   compress=True)
+        assert info["records"] == 50
+        assert obrazac.stavke == []  # stavke nisu držane u memoriji
+        assert obrazac.ukupno_bruto == 0.0  # obrazac ostaje nepromijenjen
+        xml = gzip.open(info["file"], "rt", encoding="utf-8").read()
+        assert "<RedniBroj>50</RedniBroj>" in xml
+        assert "Test &amp; Co" in xml
+        ukupno = f"<UkupnoBruto>{batch.joppd_totals()['bruto']:.2f}</UkupnoBruto>"
+        assert ukupno in xml
+
+        # Ponovljeni izvoz ne zbraja dvaput
+        again = self.gen.export_xml(obrazac, str(tmp_path / "joppd2.xml"),
+                                    stavke=self.gen.stavke_from_batch(batch, 2026, 1))
+        assert ukupno in open(again["file"], encoding="utf-8").read()
+
 
 # ═══════════════════════════════════════════════════════
 # OSNOVNA SREDSTVA
@@ -278,6 +314,88 @@ class TestOsnovnaSredstva:
         assert len(inv) == 1
         assert inv[0]["lokacija"] == "Ured 1"
 
+    def test_register_persists(self, tmp_path):
+        from nyx_light.modules.osnovna_sredstva import OsnovnaSredstvaEngine
+        db = str(tmp_path / "os.db")
+        OsnovnaSredstvaEngine(db).add_asset({
+            "naziv": "Kombi", "vrsta": "teretna_vozila", "nabavna_vrijednost": 24000.0,
+            "datum_aktivacije": "2025-01-01", "client_id": "K001",
+        })
+        engine = OsnovnaSredstvaEngine(db)
+        assert engine.get_stats()["total_assets"] == 1
+        r = engine.add_asset({"naziv": "Viličar", "nabavna_vrijednost": 9000.0})
+        assert r["id"] == "OS-0002"
+
+    def test_schedule_partial_month_and_cap(self):
+        self.engine.add_asset({
+            "naziv": "Laptop", "vrsta": "računalna_oprema",
+            "nabavna_vrijednost": 1200.0, "datum_aktivacije": "2026-03-16",
+        })
+        plan = self.engine.schedule()
+        # 50.00 / mj; ožujak 16/31 dana → 25.81
+        assert plan.amounts_c("2026-02")[0] == 0
+        assert plan.amounts_c("2026-03")[0] == 2581
+        assert plan.amounts_c("2026-04")[0] == 5000
+        months = plan.matrix_c("2026-01", "2029-12")[0]
+        assert months.sum() == 120000            # nikad preko nabavne
+        assert months[26] == 2419                # zadnji mjesec = ostatak
+        assert self.engine.get_as_of("2028-12-31")["sadasnja_vrijednost"] == 0.0
+
+    def test_year_end_projection_and_dispose(self):
+        self.engine.add_asset({
+            "naziv": "Stol", "vrsta": "namjestaj",
+            "nabavna_vrijednost": 1200.0, "datum_aktivacije": "2026-01-01",
+        })
+        r = self.engine.add_asset({
+            "naziv": "Auto", "vrsta": "osobni_automobili",
+            "nabavna_vrijednost": 30000.0, "datum_aktivacije": "2026-01-01",
+        })
+        proj = self.engine.project_year_end(2026)
+        assert proj["amortizacija"] == 6240.0    # 12 × (20 + 500)
+        assert len(proj["po_mjesecima"]) == 12
+        self.engine.dispose_asset(r["id"], "2026-06-20")
+        assert self.engine.project_year_end(2026)["amortizacija"] == 240.0 + 3000.0
+
+    def test_monthly_posting_is_one_proposal(self):
+        from nyx_light.pipeline import BookingPipeline
+        for i in range(5):
+            self.engine.add_asset({
+                "naziv": f"Računalo {i}", "vrsta": "računalna_oprema",
+                "nabavna_vrijednost": 1000.0 + i, "datum_aktivacije": "2026-01-01",
+            })
+        posting = self.engine.prepare_monthly_posting("2026-02")
+        assert len(posting["stavke"]) == 5
+        p = BookingPipeline().from_depreciation_batch(posting, "K001")
+        duguje = sum(l["iznos"] for l in p.lines if l["strana"] == "duguje")
+        potrazuje = sum(l["iznos"] for l in p.lines if l["strana"] == "potrazuje")
+        assert round(duguje, 2) == round(potrazuje, 2) == posting["ukupno"]
+        assert p.datum_dokumenta == "2026-02-28"
+        self.engine.mark_posted(posting, "K001", p.id)
+        assert self.engine.prepare_monthly_posting("2026-02")["already_posted"]
+
+    def test_posting_scope_is_exact_client(self):
+        import pytest
+        self.engine.add_asset({"naziv": "Zajednički", "nabavna_vrijednost": 1200.0,
+                               "vrsta": "računalna_oprema", "datum_aktivacije": "2026-01-01"})
+        self.engine.add_asset({"naziv": "K1 laptop", "nabavna_vrijednost": 2400.0,
+                               "vrsta": "računalna_oprema", "datum_aktivacije": "2026-01-01",
+                               "client_id": "K1"})
+        k1 = self.engine.prepare_monthly_posting("2026-02", "K1")
+        assert [s["naziv"] for s in k1["stavke"]] == ["K1 laptop"]
+        self.engine.mark_posted(k1, "K1", "P1")
+        # Klijent bez sredstava ne dobiva sredstva bez klijenta
+        assert self.engine.prepare_monthly_posting("2026-02", "K2")["stavke"] == []
+        # Sredstva bez klijenta: opseg "", knjiži se jednom mjesečno
+        k2 = self.engine.prepare_monthly_posting("2026-02")
+        assert [s["naziv"] for s in k2["stavke"]] == ["Zajednički"]
+        self.engine.mark_posted(k2, "", "P2")
+        k3 = self.engine.prepare_monthly_posting("2026-02")
+        assert k3["already_posted"] and k3["proposal_id"] == "P2"
+        # Isto sredstvo u istom mjesecu ne smije se proknjižiti dvaput
+        with pytest.raises(ValueError):
+            self.engine.register.record_run("K3", "2026-02", "P3", k2["stavke"])
+        assert self.engine.register.get_run("K3", "2026-02") is None
+
 
 # ═══════════════════════════════════════════════════════
 # GFI PRIPREMA
@@ -210,6 +210,60 @@ class TestKPIDashboard:
         assert result["ocjena"]["score"] >= 7.0  # Healthy company
         assert result["ocjena"]["status"] in ("Odlično", "Dobro")
 
+    def _storage_with_ledger(self, tmp_path):
+        from nyx_light.storage.sqlite_store import SQLiteStorage
+        st = SQLiteStorage(str(tmp_path / "kpi.db"))
+        knjizenja = [  # (konto D, konto P, iznos, datum)
+            ("1500", "2000", 300_000, "2024-01-02"),   # uplata temeljnog kapitala
+            ("1000", "4000", 100_000, "2024-02-10"),   # zalihe od dobavljača
+            ("1200", "6000", 400_000, "2024-06-30"),   # prodaja
+            ("5000", "1000", 60_000, "2024-07-15"),    # utrošak materijala
+            ("7610", "1500", 10_000, "2024-09-01"),    # kamate
+            ("1500", "1200", 150_000, "2025-03-01"),   # naplata
+            ("1200", "6000", 200_000, "2025-05-05"),
+        ]
+        for i, (d, p, iznos, datum) in enumerate(knjizenja):
+            st.save_booking({"id": f"k{i}", "client_id": "K1", "document_type": "temeljnica",
+                             "konto_duguje": d, "konto_potrazuje": p, "iznos": iznos,
+                             "datum_dokumenta": datum, "status": "approved"})
+        return st
+
+    def test_engine_matches_calculate_all(self, tmp_path):
+        from nyx_light.modules.kpi.engine import KPIEngine
+        st = self._storage_with_ledger(tmp_path)
+        snaps = KPIEngine().compute(st, ["2024", "2025-Q1", "2025"], ["K1", "K2"])
+        p24 = snaps[("K1", "2024")]["podaci"]
+        assert p24["prihodi"] == 400_000 and p24["rashodi"] == 70_000
+        assert p24["kratkotrajna_imovina"] == 730_000
+        assert p24["kapital"] == 300_000 + 330_000   # + rezultat tekuće godine
+        assert snaps[("K1", "2025-Q1")]["podaci"]["prihodi"] == 0
+        assert snaps[("K2", "2025")]["podaci"]["ukupna_aktiva"] == 0
+        for snap in snaps.values():
+            ref = self.kpi.calculate_all(self.FinancialData(**snap["podaci"]))
+            assert snap["kpi"]["tekuca_likvidnost"] == ref["likvidnost"]["tekuca_likvidnost"]
+            assert snap["kpi"]["pokrice_kamata"] == ref["zaduzenost"]["pokrice_kamata"]
+            assert snap["kpi"]["dani_naplate_potrazivanja"] == \
+                ref["aktivnost"]["dani_naplate_potrazivanja"]
+            assert snap["kpi"]["ebitda"] == ref["ebitda"]["ebitda"]
+            assert snap["ocjena"] == ref["ocjena"]
+
+    def test_engine_trend_cache_invalidated(self, tmp_path):
+        from nyx_light.modules.kpi.engine import KPIEngine
+        st = self._storage_with_ledger(tmp_path)
+        engine = KPIEngine()
+        trend = engine.trend(st, ["2024", "2025"])
+        assert trend["K1"]["kpi"]["obrtaj_ukupne_imovine"] == [0.55, 0.22]
+        assert trend["K1"]["trend"]["roa_pct"]["trend"] == "↓"
+        assert st.get_cached_report("kpi", "K1", "2024") is not None
+        engine.trend(st, ["2024", "2025"])
+        assert engine.get_stats()["cache_hits"] == 1
+        # Knjiženje datirano prije kraja 2024. mijenja stanja → snapshot se briše
+        st.save_booking({"id": "novo", "client_id": "K1", "document_type": "temeljnica",
+                         "konto_duguje": "1500", "konto_potrazuje": "2000", "iznos": 70_000,
+                         "datum_dokumenta": "2023-12-31", "status": "approved"})
+        assert st.get_cached_report("kpi", "K1", "2024") is None
+        assert engine.trend(st, ["2024"])["K1"]["kpi"]["obrtaj_ukupne_imovine"] == [0.5]
+
 
 class TestE2ESprint8:
     """E2E integracija Sprint 8 modula kroz NyxLightApp."""
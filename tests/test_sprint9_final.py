@@ -168,6 +168,69 @@ class TestGFIXML:
         xml = self.gen.to_xml(izvj)
         assert "<AOP>041</AOP>" in xml
 
+    def _ledger(self):
+        from nyx_light.modules.ledger import GeneralLedger, LedgerEntry, Transaction
+        ledger = GeneralLedger()
+        for datum, cid, d, p, iznos in [
+            ("2024-03-01", "A", "1500", "2000", 10000), ("2024-05-01", "A", "5000", "1500", 1000),
+            ("2025-02-01", "A", "1200", "6000", 5000), ("2025-03-01", "A", "7100", "4000", 2000),
+            ("2025-03-01", "B", "1400", "2000", 300),
+        ]:
+            ledger.book(Transaction(datum=datum, opis="test", client_id=cid, entries=[
+                LedgerEntry(d, "duguje", iznos), LedgerEntry(p, "potrazuje", iznos)]))
+        return ledger
+
+    def test_aop_trie_longest_prefix(self):
+        from nyx_light.modules.gfi_xml.aop_mapping import AOPTrie
+        trie = AOPTrie()
+        assert trie.lookup("1209")[1] == "036"
+        assert trie.lookup("1250")[1] == "039"
+        assert trie.lookup("6210")[1] == "119"
+        assert trie.lookup("8000")[0] is None
+        assert trie.lookup("9999") is None
+
+    def test_from_trial_balance(self):
+        ledger = self._ledger()
+        rez = self.gen.generate_from_trial_balance(
+            ledger.trial_balance("2025-12-31", client_id="A"),
+            ledger.trial_balance("2024-12-31", client_id="A"), godina=2025)
+        bil = {p.aop: p.tekuce for p in rez["bilanca"].pozicije}
+        rdg = {p.aop: p.tekuce for p in rez["rdg"].pozicije}
+        assert rez["balanced"] and bil["043"] == bil["067"] == 14000
+        # RDG je samo 2025; nezatvoreni gubitak 2024 ide u zadržanu dobit
+        assert rdg["129"] == 3000 and bil["051"] == 3000 and bil["050"] == -1000
+
+    def test_from_erp_rows(self):
+        from nyx_light.modules.gfi_xml.aop_mapping import AOPMapper
+        rez = AOPMapper().map([
+            {"Konto": "1200", "Duguje": "1.000,00", "Potrazuje": "0", "Saldo": ""},
+            {"Konto": "6000", "Duguje": 0, "Potrazuje": 1000, "Saldo": -1000},
+            {"Konto": "9999", "Saldo": "5"},
+        ])
+        assert rez["bilanca"]["036"] == 1000 and rez["rdg"]["102"] == 1000
+        assert rez["nemapirano"] == {"9999": 5.0}
+
+    def test_batch_ledger_and_storage(self, tmp_path):
+        from nyx_light.modules.gfi_xml.aop_mapping import GFIBatch
+        from nyx_light.storage.sqlite_store import SQLiteStorage
+        rez = GFIBatch(str(tmp_path / "gfi")).run_from_ledger(
+            self._ledger(), 2025, clients={"A": {"oib": "12345678903", "naziv": "A d.o.o."}})
+        assert rez["clients"] == rez["balanced"] == 2
+        a = rez["rezultati"][0]
+        assert a["client_id"] == "A" and a["dobit"] == 3000
+        assert "12345678903" in open(a["files"][0], encoding="utf-8").read()
+
+        storage = SQLiteStorage(str(tmp_path / "nyx.db"))
+        storage._conn.executemany(
+            "INSERT INTO bookings (id, client_id, document_type, konto_duguje, konto_potrazuje, "
+            "iznos, datum_dokumenta, status) VALUES (?, 'A', 'temeljnica', ?, ?, ?, ?, 'approved')",
+            [("b1", "1500", "2000", 10000, "2024-03-01"), ("b2", "5000", "1500", 1000, "2024-05-01"),
+             ("b3", "1200", "6000", 5000, "2025-02-01"), ("b4", "7100", "4000", 2000, "2025-03-01")])
+        s = GFIBatch().run_from_storage(storage, 2025)["rezultati"][0]
+        assert {k: s[k] for k in ("aktiva", "pasiva", "dobit")} == \
+            {k: a[k] for k in ("aktiva", "pasiva", "dobit")}
+        assert "<AOP>050</AOP>" in s["xml"]["bilanca"]
+
 
 class TestFakturiranje:
     """F3: Fakturiranje usluga ureda."""